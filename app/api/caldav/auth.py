@@ -25,25 +25,20 @@ def _require_basic(request: Request) -> tuple[str, str]:
 
 
 def authenticate_caldav(request: Request, db: Session) -> User:
-    """Verify Basic Auth credentials and return the matching User."""
+    """Verify Basic Auth credentials and return the matching User (sync — call via run_db)."""
     username, password = _require_basic(request)
-    user = db.query(User).filter(User.email == username).first()
-    if not user:
-        raise HTTPException(
-            status_code=401,
-            headers={"WWW-Authenticate": 'Basic realm="FinLife CalDAV"'},
-            detail="Invalid credentials",
-        )
-    token_row = (
-        db.query(CalDAVTokenModel)
+    # Один запрос: пользователь + активный токен
+    user = (
+        db.query(User)
+        .join(CalDAVTokenModel, CalDAVTokenModel.account_id == User.id)
         .filter(
-            CalDAVTokenModel.account_id == user.id,
+            User.email == username,
             CalDAVTokenModel.token == password,
             CalDAVTokenModel.enabled.is_(True),
         )
         .first()
     )
-    if not token_row:
+    if not user:
         raise HTTPException(
             status_code=401,
             headers={"WWW-Authenticate": 'Basic realm="FinLife CalDAV"'},
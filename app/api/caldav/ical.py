@@ -58,13 +58,20 @@ def task_to_vcalendar(
     return "\r\n".join(lines) + "\r\n"
 
 
-def task_etag(task: TaskModel) -> str:
-    # Use the most recent modification timestamp so iOS detects status changes.
+def task_etag(task: TaskModel, seq: int | None = None) -> str:
+    # seq из журнала caldav_changes меняется при любой правке задачи.
+    if seq is not None:
+        return seq_etag(task.task_id, seq)
+    # Задача без записи в журнале — по последней метке времени.
     stamp = task.completed_at or task.archived_at or task.created_at
     ts = int(stamp.timestamp()) if stamp else 0
     return f'"{task.task_id}-{ts}"'
 
 
+def seq_etag(task_id: int, seq: int) -> str:
+    return f'"{task_id}-s{seq}"'
+
+
 # ── Parsing ────────────────────────────────────────────────────────────────
 
 def parse_vtodo(ical_text: str) -> dict:
@@ -7,11 +7,24 @@ Discovery flow:
   PROPFIND /caldav/principals/{uid}/  →  same
   PROPFIND /caldav/calendars/{uid}/   →  home collection + tasks calendar (Depth:1)
   PROPFIND /caldav/calendars/{uid}/tasks/  →  calendar + all task items (Depth:1)
-  REPORT   /caldav/calendars/{uid}/tasks/  →  all tasks with VTODO calendar-data
+  REPORT   /caldav/calendars/{uid}/tasks/  →  sync-collection / calendar-multiget / calendar-query
   GET/PUT/DELETE /caldav/calendars/{uid}/tasks/{filename}  →  individual tasks
+
+Incremental sync (app.application.caldav_sync):
+  getctag / sync-token  — per-account change counter; an unchanged calendar
+                          is one PK lookup and an empty multistatus;
+  sync-collection       — only tasks changed since the token, 404 for
+                          archived/deleted ones (RFC 6578);
+  ETag                  — "<task_id>-s<seq>", If-None-Match on GET → 304.
+
+Handlers are async only to read the request body; auth and all DB work run
+in the sync _<handler> functions via run_db (app.infrastructure.db.offload),
+so a slow REPORT does not block the event loop.
 """
 import re
+import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
+from xml.sax.saxutils import escape
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import Response
@@ -21,6 +34,8 @@ from app.api.deps import get_db
 from app.api.caldav.auth import authenticate_caldav
 from app.api.caldav import ical
 from app.infrastructure.db.models import TaskModel, TaskReminderModel, User
+from app.infrastructure.db.offload import run_db
+from app.application import caldav_sync
 from app.application.tasks_usecases import CreateTaskUseCase
 
 router = APIRouter(prefix="/caldav", tags=["caldav"], redirect_slashes=False)
@@ -30,6 +45,9 @@ _CT_XML = "application/xml; charset=utf-8"
 _CT_ICS = "text/calendar; charset=utf-8"
 _DAV_CAPS = "1, 2, calendar-access"
 _ALLOW = "OPTIONS, GET, HEAD, PUT, DELETE, PROPFIND, REPORT"
+_NS_DAV = "{DAV:}"
+_NS_CAL = "{urn:ietf:params:xml:ns:caldav}"
+_SYNC_TOKEN_PREFIX = "urn:finlife:caldav-sync:"
 
 
 # ── XML helpers ───────────────────────────────────────────────────────────────
@@ -42,11 +60,14 @@ def _xml(body: str, status: int = 207) -> Response:
     )
 
 
-def _ms(*responses: str) -> str:
+def _ms(*responses: str, sync_token: str | None = None) -> str:
     """Wrap responses in <D:multistatus>."""
+    tail = f"<D:sync-token>{sync_token}</D:sync-token>" if sync_token is not None else ""
     return (
-        '<D:multistatus xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+        '<D:multistatus xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav"'
+        ' xmlns:CS="http://calendarserver.org/ns/">'
         + "".join(responses)
+        + tail
         + "</D:multistatus>"
     )
 
@@ -61,6 +82,11 @@ def _resp(href: str, ok_props: str, missing_props: str = "") -> str:
     return r
 
 
+def _gone(href: str) -> str:
+    """Member removed since the client's sync-token (RFC 6578 §3.5.2)."""
+    return f"<D:response><D:href>{href}</D:href><D:status>HTTP/1.1 404 Not Found</D:status></D:response>"
+
+
 def _principal_props(uid: int) -> str:
     return (
         f"<D:current-user-principal><D:href>/caldav/principals/{uid}/</D:href></D:current-user-principal>"
@@ -70,15 +96,40 @@ def _principal_props(uid: int) -> str:
     )
 
 
-def _calendar_props(uid: int) -> str:
+def _calendar_props(uid: int, seq: int) -> str:
     return (
         f"<D:resourcetype><D:collection/><C:calendar/></D:resourcetype>"
         f"<D:displayname>Задачи FinLife</D:displayname>"
         f"<C:supported-calendar-component-set><C:comp name=\"VTODO\"/></C:supported-calendar-component-set>"
         f"<D:getcontenttype>text/calendar; charset=utf-8</D:getcontenttype>"
+        f"<CS:getctag>\"{seq}\"</CS:getctag>"
+        f"<D:sync-token>{_sync_token(uid, seq)}</D:sync-token>"
+        f"<D:supported-report-set>"
+        f"<D:supported-report><D:report><D:sync-collection/></D:report></D:supported-report>"
+        f"<D:supported-report><D:report><C:calendar-multiget/></D:report></D:supported-report>"
+        f"<D:supported-report><D:report><C:calendar-query/></D:report></D:supported-report>"
+        f"</D:supported-report-set>"
     )
 
 
+def _sync_token(uid: int, seq: int) -> str:
+    return f"{_SYNC_TOKEN_PREFIX}{uid}:{seq}"
+
+
+def _parse_sync_token(token: str, uid: int) -> int | None:
+    """seq from a token issued for this collection, None if it is not ours."""
+    if not token.startswith(_SYNC_TOKEN_PREFIX):
+        return None
+    owner, _, seq = token[len(_SYNC_TOKEN_PREFIX):].partition(":")
+    if owner != str(uid) or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def _task_href(uid: int, task_id: int) -> str:
+    return f"/caldav/calendars/{uid}/tasks/task-{task_id}.ics"
+
+
 # ── OPTIONS ───────────────────────────────────────────────────────────────────
 
 @router.api_route("/", methods=["OPTIONS"])
@@ -92,7 +143,7 @@ async def options_all(path: str = "") -> Response:
 @router.api_route("", methods=["PROPFIND"])
 @router.api_route("/", methods=["PROPFIND"])
 async def propfind_root(request: Request, db: Session = Depends(get_db)) -> Response:
-    user: User = authenticate_caldav(request, db)
+    user: User = await run_db(authenticate_caldav, request, db)
     return _xml(_ms(_resp(request.url.path, _principal_props(user.id))))
 
 
@@ -100,7 +151,7 @@ async def propfind_root(request: Request, db: Session = Depends(get_db)) -> Resp
 async def propfind_principal(
     request: Request, user_id: int, db: Session = Depends(get_db)
 ) -> Response:
-    user: User = authenticate_caldav(request, db)
+    user: User = await run_db(authenticate_caldav, request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
     return _xml(_ms(_resp(request.url.path, _principal_props(user.id))))
@@ -112,6 +163,10 @@ async def propfind_principal(
 async def propfind_home(
     request: Request, user_id: int, db: Session = Depends(get_db)
 ) -> Response:
+    return await run_db(_propfind_home, request, user_id, db)
+
+
+def _propfind_home(request: Request, user_id: int, db: Session) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
@@ -125,7 +180,8 @@ async def propfind_home(
     depth = request.headers.get("Depth", "0")
     inner = _resp(f"/caldav/calendars/{uid}/", home_props)
     if depth != "0":
-        inner += _resp(f"/caldav/calendars/{uid}/tasks/", _calendar_props(uid))
+        seq = caldav_sync.current_seq(db, uid)
+        inner += _resp(f"/caldav/calendars/{uid}/tasks/", _calendar_props(uid, seq))
     return _xml(_ms(inner))
 
 
@@ -135,12 +191,17 @@ async def propfind_home(
 async def propfind_tasks(
     request: Request, user_id: int, db: Session = Depends(get_db)
 ) -> Response:
+    return await run_db(_propfind_tasks, request, user_id, db)
+
+
+def _propfind_tasks(request: Request, user_id: int, db: Session) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
     uid = user.id
 
-    inner = _resp(f"/caldav/calendars/{uid}/tasks/", _calendar_props(uid))
+    seq = caldav_sync.current_seq(db, uid)
+    inner = _resp(f"/caldav/calendars/{uid}/tasks/", _calendar_props(uid, seq))
 
     depth = request.headers.get("Depth", "0")
     if depth != "0":
@@ -149,50 +210,132 @@ async def propfind_tasks(
             .filter(TaskModel.account_id == uid, TaskModel.status != "ARCHIVED")
             .all()
         )
+        seqs = caldav_sync.task_seqs(db, uid)
         for task in tasks:
-            fname = f"task-{task.task_id}.ics"
             item_props = (
-                f"<D:getetag>{ical.task_etag(task)}</D:getetag>"
+                f"<D:getetag>{ical.task_etag(task, seqs.get(task.task_id))}</D:getetag>"
                 "<D:getcontenttype>text/calendar; charset=utf-8</D:getcontenttype>"
             )
-            inner += _resp(f"/caldav/calendars/{uid}/tasks/{fname}", item_props)
+            inner += _resp(_task_href(uid, task.task_id), item_props)
 
     return _xml(_ms(inner))
 
 
-# ── REPORT calendar-query (syncs all tasks with content) ─────────────────────
+# ── REPORT sync-collection / calendar-multiget / calendar-query ──────────────
 
 @router.api_route("/calendars/{user_id}/tasks/", methods=["REPORT"])
 async def report_tasks(
     request: Request, user_id: int, db: Session = Depends(get_db)
 ) -> Response:
+    body = await request.body()
+    return await run_db(_report_tasks, request, user_id, body, db)
+
+
+def _report_tasks(request: Request, user_id: int, body: bytes, db: Session) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
     uid = user.id
 
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        root = None  # пустое/битое тело — отдаём всё, как calendar-query
+    # calendar-data только если клиент его просит (или тело не разобрано)
+    with_data = root is None or root.find(f".//{_NS_CAL}calendar-data") is not None
+
+    if root is not None and root.tag == f"{_NS_DAV}sync-collection":
+        return _sync_collection(db, uid, root, with_data)
+    if root is not None and root.tag == f"{_NS_CAL}calendar-multiget":
+        return _calendar_multiget(db, uid, root, with_data)
+
     tasks = (
         db.query(TaskModel)
         .filter(TaskModel.account_id == uid, TaskModel.status != "ARCHIVED")
         .all()
     )
+    return _xml(_ms(_task_responses(db, uid, tasks, with_data)))
+
+
+def _sync_collection(db: Session, uid: int, root: ET.Element, with_data: bool) -> Response:
+    """RFC 6578: members changed since the client's token + the new token."""
+    seq = caldav_sync.current_seq(db, uid)
+    token = (root.findtext(f"{_NS_DAV}sync-token") or "").strip()
+
+    if not token:
+        # Первая синхронизация — весь календарь
+        tasks = (
+            db.query(TaskModel)
+            .filter(TaskModel.account_id == uid, TaskModel.status != "ARCHIVED")
+            .all()
+        )
+        inner = _task_responses(db, uid, tasks, with_data)
+        return _xml(_ms(inner, sync_token=_sync_token(uid, seq)))
+
+    since = _parse_sync_token(token, uid)
+    if since is None or since > seq:
+        return _xml(
+            '<D:error xmlns:D="DAV:"><D:valid-sync-token/></D:error>', status=403,
+        )
+    if since == seq:
+        return _xml(_ms(sync_token=token))
+
+    changes = caldav_sync.changes_since(db, uid, since)
+    live_ids = [c.task_id for c in changes if not c.deleted]
+    tasks = (
+        db.query(TaskModel)
+        .filter(TaskModel.account_id == uid, TaskModel.task_id.in_(live_ids))
+        .all()
+    ) if live_ids else []
+    inner = "".join(_gone(_task_href(uid, c.task_id)) for c in changes if c.deleted)
+    inner += _task_responses(db, uid, tasks, with_data)
+    return _xml(_ms(inner, sync_token=_sync_token(uid, seq)))
+
+
+def _calendar_multiget(db: Session, uid: int, root: ET.Element, with_data: bool) -> Response:
+    """RFC 4791 §7.9: the requested hrefs, 404 for unknown ones."""
+    wanted: dict[int, str] = {}
+    missing: list[str] = []
+    for el in root.iter(f"{_NS_DAV}href"):
+        href = (el.text or "").strip()
+        m = _FILENAME_RE.match(href.rstrip("/").rsplit("/", 1)[-1])
+        if m:
+            wanted[int(m.group(1))] = href
+        elif href:
+            missing.append(href)
+
+    tasks = (
+        db.query(TaskModel)
+        .filter(
+            TaskModel.account_id == uid,
+            TaskModel.task_id.in_(list(wanted)),
+            TaskModel.status != "ARCHIVED",
+        )
+        .all()
+    ) if wanted else []
+    found = {t.task_id for t in tasks}
+    missing += [href for task_id, href in wanted.items() if task_id not in found]
+    inner = _task_responses(db, uid, tasks, with_data) + "".join(_gone(h) for h in missing)
+    return _xml(_ms(inner))
+
+
+def _task_responses(db: Session, uid: int, tasks: list[TaskModel], with_data: bool) -> str:
+    """<D:response> per task: getetag (+ calendar-data); reminders in one query."""
     task_ids = [t.task_id for t in tasks]
+    seqs = caldav_sync.task_seqs(db, uid, task_ids)
     reminders_by_task: dict[int, list] = {}
-    if task_ids:
+    if task_ids and with_data:
         for r in db.query(TaskReminderModel).filter(TaskReminderModel.task_id.in_(task_ids)).all():
             reminders_by_task.setdefault(r.task_id, []).append(r)
 
     inner = ""
     for task in tasks:
-        fname = f"task-{task.task_id}.ics"
-        vtodo = ical.task_to_vcalendar(task, reminders_by_task.get(task.task_id))
-        item_props = (
-            f"<D:getetag>{ical.task_etag(task)}</D:getetag>"
-            f"<C:calendar-data>{vtodo}</C:calendar-data>"
-        )
-        inner += _resp(f"/caldav/calendars/{uid}/tasks/{fname}", item_props)
-
-    return _xml(_ms(inner))
+        item_props = f"<D:getetag>{ical.task_etag(task, seqs.get(task.task_id))}</D:getetag>"
+        if with_data:
+            vtodo = ical.task_to_vcalendar(task, reminders_by_task.get(task.task_id))
+            item_props += f"<C:calendar-data>{escape(vtodo)}</C:calendar-data>"
+        inner += _resp(_task_href(uid, task.task_id), item_props)
+    return inner
 
 
 # ── GET individual task ───────────────────────────────────────────────────────
@@ -201,16 +344,31 @@ async def report_tasks(
 async def get_task(
     request: Request, user_id: int, filename: str, db: Session = Depends(get_db)
 ) -> Response:
+    return await run_db(_get_task, request, user_id, filename, db)
+
+
+def _get_task(request: Request, user_id: int, filename: str, db: Session) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
 
+    # Условный GET: ETag берётся из журнала, задачу не загружаем
+    if_none_match = request.headers.get("If-None-Match", "")
+    m = _FILENAME_RE.match(filename)
+    task_id = int(m.group(1)) if m else None
+    seq = caldav_sync.task_seqs(db, user.id, [task_id]).get(task_id) if m else None
+    if seq is not None and _etag_matches(if_none_match, ical.seq_etag(task_id, seq)):
+        return Response(status_code=304, headers={"ETag": ical.seq_etag(task_id, seq), "DAV": _DAV_CAPS})
+
     task = _get_task_or_404(filename, user.id, db)
+    etag = ical.task_etag(task, seq)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "DAV": _DAV_CAPS})
     reminders = db.query(TaskReminderModel).filter(TaskReminderModel.task_id == task.task_id).all()
     return Response(
         content=ical.task_to_vcalendar(task, reminders),
         media_type=_CT_ICS,
-        headers={"ETag": ical.task_etag(task), "DAV": _DAV_CAPS},
+        headers={"ETag": etag, "DAV": _DAV_CAPS},
     )
 
 
@@ -219,12 +377,18 @@ async def get_task(
 @router.api_route("/calendars/{user_id}/tasks/{filename}", methods=["PUT"])
 async def put_task(
     request: Request, user_id: int, filename: str, db: Session = Depends(get_db)
+) -> Response:
+    body_bytes = await request.body()
+    return await run_db(_put_task, request, user_id, filename, body_bytes, db)
+
+
+def _put_task(
+    request: Request, user_id: int, filename: str, body_bytes: bytes, db: Session
 ) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
 
-    body_bytes = await request.body()
     vtodo = ical.parse_vtodo(body_bytes.decode("utf-8", errors="replace"))
 
     m = _FILENAME_RE.match(filename)
@@ -237,8 +401,9 @@ async def put_task(
         )
         if task:
             _apply_vtodo(task, vtodo)
+            seq = caldav_sync.record_changes(db, user.id, [task.task_id])
             db.commit()
-            return Response(status_code=204, headers={"ETag": ical.task_etag(task)})
+            return Response(status_code=204, headers={"ETag": ical.task_etag(task, seq)})
 
     # New task (iOS is creating a task with a client-generated filename)
     due_date = vtodo.get("due_date")
@@ -254,6 +419,7 @@ async def put_task(
         actor_user_id=user.id,
     )
     task = db.query(TaskModel).filter(TaskModel.task_id == task_id).first()
+    seq = caldav_sync.task_seqs(db, user.id, [task_id]).get(task_id)
     import logging as _log
     _log.getLogger(__name__).info(
         "CalDAV PUT: created task_id=%s title=%r due=%s for user_id=%s (ios_filename=%s)",
@@ -264,7 +430,7 @@ async def put_task(
         status_code=201,
         headers={
             "Location": f"/caldav/calendars/{user_id}/tasks/{new_fname}",
-            "ETag": ical.task_etag(task) if task else f'"{task_id}-0"',
+            "ETag": ical.task_etag(task, seq) if task else f'"{task_id}-0"',
         },
     )
 
@@ -275,18 +441,28 @@ async def put_task(
 async def delete_task(
     request: Request, user_id: int, filename: str, db: Session = Depends(get_db)
 ) -> Response:
+    return await run_db(_delete_task, request, user_id, filename, db)
+
+
+def _delete_task(request: Request, user_id: int, filename: str, db: Session) -> Response:
     user: User = authenticate_caldav(request, db)
     if user.id != user_id:
         raise HTTPException(status_code=403)
 
     task = _get_task_or_404(filename, user.id, db)
     task.status = "ARCHIVED"
+    caldav_sync.record_changes(db, user.id, [task.task_id])
     db.commit()
     return Response(status_code=204)
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 def _get_task_or_404(filename: str, account_id: int, db: Session) -> TaskModel:
     m = _FILENAME_RE.match(filename)
     if not m:
@@ -49,6 +49,7 @@ from app.application.categories import (
 )
 from app.application.transactions import CreateTransactionUseCase, UpdateTransactionUseCase, TransactionValidationError
 from app.application.work_categories import CreateWorkCategoryUseCase, UpdateWorkCategoryUseCase, ArchiveWorkCategoryUseCase, UnarchiveWorkCategoryUseCase, WorkCategoryValidationError
+from app.application import caldav_sync
 from app.application.tasks_usecases import CreateTaskUseCase, CompleteTaskUseCase, ArchiveTaskUseCase, UncompleteTaskUseCase, UpdateTaskUseCase, TaskValidationError
 from app.domain.task_due_spec import DueSpecValidationError, ReminderSpecValidationError
 from app.application.habits import (
@@ -469,7 +470,7 @@ def dashboard(request: Request, db: Session = Depends(get_db)):
     ]
 
     # 17. Efficiency score widget
-    _eff_data = EfficiencyService(db).calculate(user_id, today)
+    _eff_data = EfficiencyService(db).get_or_calculate(user_id, today)
     dash_efficiency = {
         "score": _eff_data["efficiency_score"],
         "snap_date": _eff_data.get("snapshot_date", today),
@@ -3199,6 +3200,7 @@ def task_reminder_add(
     if not existing:
         db.add(TaskReminderModel(task_id=task_id, offset_minutes=offset_minutes, reminder_kind=reminder_kind))
         try:
+            caldav_sync.record_changes(db, user_id, [task_id])
             db.commit()
         except Exception:
             db.rollback()
@@ -3219,6 +3221,7 @@ def task_reminder_delete(request: Request, task_id: int, reminder_id: int, db: S
         TaskReminderModel.id == reminder_id,
         TaskReminderModel.task_id == task_id,
     ).delete()
+    caldav_sync.record_changes(db, user_id, [task_id])
     db.commit()
     return RedirectResponse(f"/tasks/{task_id}/reminders", status_code=302)
 
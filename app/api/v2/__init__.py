@@ -4,11 +4,13 @@ API v2 — JSON-first endpoints for the Next.js frontend.
 Coexists with SSR pages (app/api/v1/pages.py) which remain unchanged.
 Auth: same session cookie as SSR (credentials: 'include' from frontend).
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from . import me, dashboard, projects, tasks, task_attachments, notifications, notification_settings, efficiency, habits, subscriptions, events, event_task_templates, knowledge, strategy, finance, plan, profile, auth, budget, goals, planned_ops, analytics, push, shared_lists, list_images, digests, admin_config, search, counters, caldav_token, documents, maintenance, body_metrics, meal_plan, dishes, media, football, collection, flashcards, ai_ops, telegram_bot, debts, checks, plan_accuracy
 
-router = APIRouter(prefix="/api/v2", tags=["v2"])
+from .deps import consistent_read
+
+router = APIRouter(prefix="/api/v2", tags=["v2"], dependencies=[Depends(consistent_read)])
 router.include_router(auth.router)
 router.include_router(me.router)
 router.include_router(dashboard.router)
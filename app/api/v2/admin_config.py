@@ -1,7 +1,8 @@
 """
 Admin endpoints for managing application-level configuration via the UI.
 
-Currently supports: OpenAI API key (stored in app_config table).
+Currently supports: OpenAI, Kinopoisk and API-Football keys (stored in app_config
+table) and a read-only view of scheduler job runs.
 """
 import logging
 
@@ -230,3 +231,13 @@ def update_football_config(
         source=source,
         masked=_mask_key(raw) if raw else None,
     )
+
+
+# ── Scheduler jobs (read-only) ───────────────────────────────────────────────
+
+@router.get("/scheduler-jobs")
+def get_scheduler_jobs(request: Request, db: Session = Depends(get_db)):
+    """Per-job lease owner and run durations across all workers."""
+    from app.application.scheduler_leases import job_stats
+    _require_admin(request, db)
+    return job_stats(db)
@@ -14,20 +14,22 @@ from datetime import date, datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, Request, Query
 
 logger = logging.getLogger(__name__)
-from sqlalchemy import func, case, and_, or_, extract, cast, TIMESTAMP
+from sqlalchemy import func, case, and_, or_, extract
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.session import get_db
 from app.api.v2.deps import get_user_id
 from app.application.analytics import AnalyticsService
+from app.readmodels.wallet_balance_history import balances_at
 from app.infrastructure.db.models import (
     TaskModel, HabitModel, HabitOccurrence,
     WalletBalance, TransactionFeed, GoalInfo, GoalWalletBalance,
     SubscriptionModel, SubscriptionMemberModel,
     UserActivityDaily, CategoryInfo, WorkCategory,
     BudgetLine, BudgetMonth, MandatoryCategory,
-    OperationOccurrence, OperationTemplateModel,
+    OperationOccurrence, OperationTemplateModel, BudgetFactCube,
 )
+from app.readmodels.fact_cube import sum_facts
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -918,29 +920,13 @@ def budget_stats(
     d_end = datetime(next_y, next_m, 1)
 
     # ── Fact per month per category ───────────────────────────────────────────
-    # Эффективная дата для бюджета: budget_month-переопределение или occurred_at
-    _bdt = func.coalesce(
-        cast(TransactionFeed.budget_month, TIMESTAMP(timezone=True)),
-        TransactionFeed.occurred_at,
-    )
-    _yr = extract("year", _bdt)
-    _mo = extract("month", _bdt)
-    fact_rows = (
-        db.query(
-            _yr.label("yr"),
-            _mo.label("mo"),
-            TransactionFeed.category_id,
-            TransactionFeed.operation_type,
-            func.sum(TransactionFeed.amount).label("total"),
-        )
-        .filter(
-            TransactionFeed.account_id == user_id,
-            TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
-            _bdt >= d_start,
-            _bdt < d_end,
-        )
-        .group_by(_yr, _mo, TransactionFeed.category_id, TransactionFeed.operation_type)
-        .all()
+    # Бюджетный день куба: budget_month-переопределение или дата операции
+    _yr = extract("year", BudgetFactCube.day)
+    _mo = extract("month", BudgetFactCube.day)
+    fact_rows = sum_facts(
+        db, user_id, d_start, d_end,
+        [_yr.label("yr"), _mo.label("mo"), BudgetFactCube.category_id, BudgetFactCube.operation_type],
+        BudgetFactCube.operation_type.in_(["INCOME", "EXPENSE"]),
     )
 
     fact_map: dict = {}
@@ -948,7 +934,7 @@ def budget_stats(
     for r in fact_rows:
         y, m = int(r.yr), int(r.mo)
         val = float(r.total)
-        key4 = (y, m, r.category_id, r.operation_type)
+        key4 = (y, m, r.category_id or None, r.operation_type)
         fact_map[key4] = fact_map.get(key4, 0.0) + val
         key3 = (y, m, r.operation_type)
         monthly_totals[key3] = monthly_totals.get(key3, 0.0) + val
@@ -1289,64 +1275,61 @@ def savings_report(
         return {"totals": None, "wallets": [], "months": []}
 
     wallet_ids = [w.wallet_id for w in wallets]
-    ops = (
-        db.query(TransactionFeed)
-        .filter(
-            TransactionFeed.account_id == user_id,
-            or_(
-                TransactionFeed.wallet_id.in_(wallet_ids),
-                TransactionFeed.from_wallet_id.in_(wallet_ids),
-                TransactionFeed.to_wallet_id.in_(wallet_ids),
-            ),
-        )
-        .order_by(TransactionFeed.occurred_at.desc())
-        .all()
-    )
 
     # Метки последних 12 месяцев (старые -> новые) + границы (конец месяца)
     now = datetime.now(timezone.utc)
     month_labels: list[str] = []
-    boundaries: list[datetime] = []  # начало СЛЕДУЮЩЕГО месяца = конец текущего
+    boundaries: list[date] = []  # начало СЛЕДУЮЩЕГО месяца = конец текущего
     y, m = now.year, now.month
     for _ in range(months_window):
         month_labels.append(f"{y:04d}-{m:02d}")
         ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
-        boundaries.append(datetime(ny, nm, 1, tzinfo=timezone.utc))
+        boundaries.append(date(ny, nm, 1))
         y, m = (y - 1, 12) if m == 1 else (y, m - 1)
     month_labels.reverse()
     boundaries.reverse()
 
-    def wallet_delta(op, wid: int) -> Decimal:
-        """Влияние операции на баланс кошелька wid."""
-        amt = Decimal(str(op.amount))
-        d = Decimal("0")
-        if op.operation_type == "INCOME" and op.wallet_id == wid:
-            d += amt
-        elif op.operation_type == "EXPENSE" and op.wallet_id == wid:
-            d -= amt
-        elif op.operation_type == "TRANSFER":
-            if op.to_wallet_id == wid:
-                d += amt
-            if op.from_wallet_id == wid:
-                d -= amt
-        return d
+    # Суммы по (тип, кошельки, месяц) одним GROUP BY вместо всей ленты
+    occ_year = extract("year", TransactionFeed.occurred_at)
+    occ_month = extract("month", TransactionFeed.occurred_at)
+    agg = (
+        db.query(
+            TransactionFeed.operation_type,
+            TransactionFeed.wallet_id,
+            TransactionFeed.from_wallet_id,
+            TransactionFeed.to_wallet_id,
+            occ_year.label("y"),
+            occ_month.label("m"),
+            func.sum(TransactionFeed.amount).label("total"),
+        )
+        .filter(
+            TransactionFeed.account_id == user_id,
+            or_(
+                TransactionFeed.wallet_id.in_(wallet_ids),
+                TransactionFeed.from_wallet_id.in_(wallet_ids),
+                TransactionFeed.to_wallet_id.in_(wallet_ids),
+            ),
+        )
+        .group_by(
+            TransactionFeed.operation_type,
+            TransactionFeed.wallet_id,
+            TransactionFeed.from_wallet_id,
+            TransactionFeed.to_wallet_id,
+            occ_year,
+            occ_month,
+        )
+        .all()
+    )
+    month_end = balances_at(db, wallets, boundaries)
 
     out_wallets = []
     total_balance = Decimal("0")
     total_income_all = Decimal("0")
     total_income_12m = Decimal("0")
     monthly_income_total = {lbl: Decimal("0") for lbl in month_labels}
-    window_start = boundaries[0] - timedelta(days=1)  # приблизит. старт окна
-    window_start = datetime(
-        int(month_labels[0][:4]), int(month_labels[0][5:7]), 1, tzinfo=timezone.utc
-    )
 
     for w in wallets:
         wid = w.wallet_id
-        w_ops = [
-            op for op in ops
-            if op.wallet_id == wid or op.from_wallet_id == wid or op.to_wallet_id == wid
-        ]
 
         income_all = Decimal("0")
         expense_all = Decimal("0")
@@ -1354,10 +1337,9 @@ def savings_report(
         contrib_out = Decimal("0")
         monthly = {lbl: {"income": Decimal("0"), "contrib": Decimal("0")} for lbl in month_labels}
 
-        for op in w_ops:
-            amt = Decimal(str(op.amount))
-            occ = op.occurred_at
-            lbl = f"{occ.year:04d}-{occ.month:02d}"
+        for op in agg:
+            amt = Decimal(str(op.total or 0))
+            lbl = f"{int(op.y):04d}-{int(op.m):02d}"
             if op.operation_type == "INCOME" and op.wallet_id == wid:
                 income_all += amt
                 if lbl in monthly:
@@ -1375,18 +1357,9 @@ def savings_report(
                     if lbl in monthly:
                         monthly[lbl]["contrib"] -= amt
 
-        # Баланс на конец каждого месяца: обратный проход от текущего баланса
+        # Баланс на конец каждого месяца — из снимков wallet_balance_daily
         balance_now = Decimal(str(w.balance))
-        month_end_balances: list[Decimal] = []
-        running = balance_now
-        ops_iter = iter(w_ops)  # уже отсортированы по occurred_at desc
-        op_cur = next(ops_iter, None)
-        for boundary in reversed(boundaries):  # от новых к старым
-            while op_cur is not None and op_cur.occurred_at >= boundary:
-                running -= wallet_delta(op_cur, wid)
-                op_cur = next(ops_iter, None)
-            month_end_balances.append(running)
-        month_end_balances.reverse()
+        month_end_balances = month_end[wid]
 
         income_12m = sum(
             (v["income"] for v in monthly.values()), Decimal("0")
@@ -1475,8 +1448,8 @@ def net_worth_report(
     capital — money − debt + себестоимость коллекции.
     Считается 1-в-1 как «Фин. результат» на дашборде. Личные долги
     (мне должны / я должен) в капитал НЕ входят — показываются отдельно.
-    Балансы на конец месяца восстанавливаются обратным проходом по ленте
-    (включая архивные кошельки — для честной истории).
+    Балансы на конец месяца берутся из wallet_balance_daily (carry-forward
+    снимков, включая архивные кошельки — для честной истории).
     """
     from decimal import Decimal
 
@@ -1493,21 +1466,7 @@ def net_worth_report(
     if not wallets:
         return {"months": [], "current": None}
 
-    wallet_ids = [w.wallet_id for w in wallets]
     wtype = {w.wallet_id: w.wallet_type for w in wallets}
-    ops = (
-        db.query(TransactionFeed)
-        .filter(
-            TransactionFeed.account_id == user_id,
-            or_(
-                TransactionFeed.wallet_id.in_(wallet_ids),
-                TransactionFeed.from_wallet_id.in_(wallet_ids),
-                TransactionFeed.to_wallet_id.in_(wallet_ids),
-            ),
-        )
-        .order_by(TransactionFeed.occurred_at.desc())
-        .all()
-    )
 
     now = datetime.now(timezone.utc)
     month_labels: list[str] = []
@@ -1531,39 +1490,8 @@ def net_worth_report(
         month_labels.reverse()
         boundaries.reverse()
 
-    def wallet_delta(op, wid: int) -> Decimal:
-        amt = Decimal(str(op.amount))
-        d = Decimal("0")
-        if op.operation_type == "INCOME" and op.wallet_id == wid:
-            d += amt
-        elif op.operation_type == "EXPENSE" and op.wallet_id == wid:
-            d -= amt
-        elif op.operation_type == "TRANSFER":
-            if op.to_wallet_id == wid:
-                d += amt
-            if op.from_wallet_id == wid:
-                d -= amt
-        return d
-
-    # month-end балансы по каждому кошельку
-    per_wallet_series: dict[int, list[Decimal]] = {}
-    for w in wallets:
-        wid = w.wallet_id
-        w_ops = [
-            op for op in ops
-            if op.wallet_id == wid or op.from_wallet_id == wid or op.to_wallet_id == wid
-        ]
-        running = Decimal(str(w.balance))
-        series: list[Decimal] = []
-        ops_iter = iter(w_ops)
-        op_cur = next(ops_iter, None)
-        for boundary in reversed(boundaries):
-            while op_cur is not None and op_cur.occurred_at >= boundary:
-                running -= wallet_delta(op_cur, wid)
-                op_cur = next(ops_iter, None)
-            series.append(running)
-        series.reverse()
-        per_wallet_series[wid] = series
+    # Балансы на границах периодов — из снимков wallet_balance_daily
+    per_wallet_series = balances_at(db, wallets, [b.date() for b in boundaries])
 
     # ── Личные долги (RUB): мне должны = актив, я должен = пассив ────────────
     from app.infrastructure.db.models import DebtModel, DebtPaymentModel
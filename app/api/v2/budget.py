@@ -418,8 +418,9 @@ def plan_suggestion(
     что повторяется чаще, и получается.
     """
     from datetime import date as _date, datetime as _dt
-    from sqlalchemy import func as _f, cast as _cast, TIMESTAMP as _TS, extract as _ex
-    from app.infrastructure.db.models import TransactionFeed
+    from sqlalchemy import extract as _ex
+    from app.infrastructure.db.models import BudgetFactCube
+    from app.readmodels.fact_cube import sum_facts
 
     user_id = get_user_id(request, db)
     today = _date.today()
@@ -436,20 +437,11 @@ def plan_suggestion(
     d_start = _dt(months[0][0], months[0][1], 1)
     d_end = _dt(cur[0], cur[1], 1)
 
-    _bdt = _f.coalesce(_cast(TransactionFeed.budget_month, _TS(timezone=True)), TransactionFeed.occurred_at)
-    rows = (
-        db.query(
-            _ex("year", _bdt).label("yr"), _ex("month", _bdt).label("mo"),
-            _f.sum(TransactionFeed.amount).label("total"),
-        )
-        .filter(
-            TransactionFeed.account_id == user_id,
-            TransactionFeed.operation_type == kind,
-            TransactionFeed.category_id == category_id,
-            _bdt >= d_start, _bdt < d_end,
-        )
-        .group_by(_ex("year", _bdt), _ex("month", _bdt))
-        .all()
+    rows = sum_facts(
+        db, user_id, d_start, d_end,
+        [_ex("year", BudgetFactCube.day).label("yr"), _ex("month", BudgetFactCube.day).label("mo")],
+        BudgetFactCube.operation_type == kind,
+        BudgetFactCube.category_id == category_id,
     )
     vals = [float(r.total) for r in rows if r.total and float(r.total) > 0]
     if len(vals) < 2:
@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 from app.infrastructure.db.session import get_db
 from app.api.v2.deps import get_user_id
 from app.application.dashboard import DashboardService
+from app.application.dashboard_cache import DashboardCache
 from app.config import get_settings
 
 router = APIRouter()
@@ -211,41 +212,95 @@ class DashboardResponse(BaseModel):
     shopping_items: list[ShoppingItem] = []
 
 
-# ── Route ─────────────────────────────────────────────────────────────────────
-
-@router.get("/dashboard", response_model=DashboardResponse)
-def get_dashboard(request: Request, db: Session = Depends(get_db)):
-    from app.infrastructure.db.models import (
-        EfficiencySnapshot, EventOccurrenceModel, CalendarEventModel,
-        WorkCategory, SubscriptionMemberModel, SubscriptionModel, ContactModel,
+# ── Block builders ────────────────────────────────────────────────────────────
+
+def _to_item(d: dict) -> DashboardItem:
+    return DashboardItem(
+        kind=d["kind"],
+        id=d["id"],
+        title=d["title"],
+        date=d.get("date"),
+        time=str(d["time"]) if d.get("time") else None,
+        is_done=d["is_done"],
+        is_overdue=d["is_overdue"],
+        category_emoji=d.get("category_emoji"),
+        category_name=d.get("category_name"),
+        meta={k: (str(v) if isinstance(v, Decimal) else v) for k, v in d.get("meta", {}).items()},
     )
-    from app.application.xp import XpService
 
-    user_id = get_user_id(request, db)
-    svc = DashboardService(db)
-    today = datetime.now(ZoneInfo(get_settings().TIMEZONE)).date()
 
-    # Досоздаём занятия на сегодня при чтении — генерация при создании
-    # привычки/задачи ненадёжна (гонка с фоновым планировщиком), поэтому
-    # дашборд гарантирует, что сегодняшние вхождения существуют. Идемпотентно.
-    from app.application.occurrence_generator import OccurrenceGenerator
-    try:
-        OccurrenceGenerator(db).generate_all(user_id)
-    except Exception:
-        pass  # генерация не должна ронять дашборд
-
-    # ── Existing blocks ────────────────────────────────────────────────────────
+def _build_today(svc: DashboardService, user_id: int, today: date) -> TodayBlock:
     today_block_raw = svc.get_today_block(user_id, today)
+    return TodayBlock(
+        overdue=[_to_item(x) for x in today_block_raw["overdue"]],
+        active=[_to_item(x) for x in today_block_raw["active"]],
+        done=[_to_item(x) for x in today_block_raw["done"]],
+        events=[_to_item(x) for x in today_block_raw["events"]],
+        progress=ProgressBlock(**today_block_raw["progress"]),
+        vacation=today_block_raw.get("vacation", False),
+        vacation_end=today_block_raw.get("vacation_end"),
+    )
+
+
+def _build_upcoming(svc: DashboardService, user_id: int, today: date) -> list[UpcomingPayment]:
     upcoming_raw = svc.get_upcoming_payments(user_id, today)
-    heatmap_raw = svc.get_habit_heatmap(user_id, today)
+    return [
+        UpcomingPayment(
+            occurrence_id=p["occurrence_id"],
+            template_id=p["template_id"],
+            title=p["title"],
+            scheduled_date=p["scheduled_date"],
+            kind=p["kind"],
+            kind_label=p["kind_label"],
+            amount=p["amount"],
+            amount_formatted=p["amount_formatted"],
+            days_until=p["days_until"],
+            wallet_id=p.get("wallet_id"),
+            destination_wallet_id=p.get("destination_wallet_id"),
+            category_id=p.get("category_id"),
+        )
+        for p in upcoming_raw
+    ]
+
+
+def _build_fin_summary(svc: DashboardService, user_id: int, today: date) -> dict[str, FinancialCurrencyBlock]:
     fin_summary_raw = svc.get_financial_summary(user_id, today)
-    fin_state_raw = svc.get_fin_state_summary(user_id, today)
+    return {
+        cur: FinancialCurrencyBlock(
+            income=float(v["income"]),
+            expense=float(v["expense"]),
+            difference=float(v["difference"]),
+        )
+        for cur, v in fin_summary_raw.items()
+    }
+
+
+def _build_feed(svc: DashboardService, user_id: int, today: date) -> list[FeedGroup]:
     feed_raw = svc.get_dashboard_feed(user_id, today)
+    feed = []
+    for group in feed_raw:
+        events = [
+            FeedEvent(
+                icon=e["icon"],
+                title=e["title"],
+                subtitle=e["subtitle"],
+                occurred_at=e["occurred_at"],
+                time_str=e["time_str"],
+                amount_label=e.get("amount_label"),
+                amount_css=e.get("amount_css"),
+            )
+            for e in group["events"]
+        ]
+        feed.append(FeedGroup(label=group["label"], date=group["date"], events=events))
+    return feed
+
+
+def _build_level(db: Session, user_id: int) -> LevelBlock | None:
+    from app.application.xp import XpService
 
-    # ── Level ──────────────────────────────────────────────────────────────────
     try:
         xp_data = XpService(db).get_xp_profile(user_id)
-        level_block = LevelBlock(
+        return LevelBlock(
             level=xp_data["level"],
             total_xp=xp_data["total_xp"],
             current_level_xp=xp_data["current_level_xp"],
@@ -254,24 +309,12 @@ def get_dashboard(request: Request, db: Session = Depends(get_db)):
             xp_this_month=xp_data.get("xp_this_month", 0),
         )
     except Exception:
-        level_block = None
+        return None
 
-    # ── Efficiency ─────────────────────────────────────────────────────────────
-    try:
-        snap = (
-            db.query(EfficiencySnapshot)
-            .filter(EfficiencySnapshot.account_id == user_id)
-            .order_by(EfficiencySnapshot.snapshot_date.desc())
-            .first()
-        )
-        efficiency_block = EfficiencyBlock(
-            score=int(snap.efficiency_score) if snap else 0,
-            snapshot_date=snap.snapshot_date if snap else None,
-        ) if snap else None
-    except Exception:
-        efficiency_block = None
 
-    # ── Week events ────────────────────────────────────────────────────────────
+def _build_week_events(db: Session, user_id: int, today: date) -> list[WeekEvent]:
+    from app.infrastructure.db.models import EventOccurrenceModel, CalendarEventModel, WorkCategory
+
     week_end = today + timedelta(days=6)
     try:
         # Batch-load category emojis
@@ -325,6 +368,71 @@ def get_dashboard(request: Request, db: Session = Depends(get_db)):
                 ))
     except Exception:
         week_events = []
+    return week_events
+
+
+def _dump(value: Any) -> Any:
+    """JSON-совместимое представление блока для кэша."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, list):
+        return [_dump(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _dump(v) for k, v in value.items()}
+    return value
+
+
+# ── Route ─────────────────────────────────────────────────────────────────────
+
+@router.get("/dashboard", response_model=DashboardResponse)
+def get_dashboard(request: Request, db: Session = Depends(get_db)):
+    from app.infrastructure.db.models import (
+        EfficiencySnapshot, SubscriptionMemberModel, SubscriptionModel, ContactModel,
+    )
+
+    user_id = get_user_id(request, db)
+    svc = DashboardService(db)
+    today = datetime.now(ZoneInfo(get_settings().TIMEZONE)).date()
+
+    # Досоздаём занятия на сегодня при чтении — генерация при создании
+    # привычки/задачи ненадёжна (гонка с фоновым планировщиком), поэтому
+    # дашборд гарантирует, что сегодняшние вхождения существуют. Идемпотентно.
+    from app.application.occurrence_generator import OccurrenceGenerator
+    try:
+        OccurrenceGenerator(db).generate_all(user_id)
+    except Exception:
+        pass  # генерация не должна ронять дашборд
+
+    # ── Cached blocks (see app/application/dashboard_cache.py) ────────────────
+    cache = DashboardCache(db, user_id, today)
+    blocks = {
+        name: cache.get(name, lambda build=build: _dump(build()))
+        for name, build in (
+            ("today", lambda: _build_today(svc, user_id, today)),
+            ("upcoming_payments", lambda: _build_upcoming(svc, user_id, today)),
+            ("habit_heatmap", lambda: [HeatmapCell(**c) for c in svc.get_habit_heatmap(user_id, today)]),
+            ("financial_summary", lambda: _build_fin_summary(svc, user_id, today)),
+            ("fin_state", lambda: FinStateBlock(**svc.get_fin_state_summary(user_id, today))),
+            ("feed", lambda: _build_feed(svc, user_id, today)),
+            ("level", lambda: _build_level(db, user_id)),
+            ("week_events", lambda: _build_week_events(db, user_id, today)),
+        )
+    }
+
+    # ── Efficiency ─────────────────────────────────────────────────────────────
+    try:
+        snap = (
+            db.query(EfficiencySnapshot)
+            .filter(EfficiencySnapshot.account_id == user_id)
+            .order_by(EfficiencySnapshot.snapshot_date.desc())
+            .first()
+        )
+        efficiency_block = EfficiencyBlock(
+            score=int(snap.efficiency_score) if snap else 0,
+            snapshot_date=snap.snapshot_date if snap else None,
+        ) if snap else None
+    except Exception:
+        efficiency_block = None
 
     # ── Expiring subscriptions ─────────────────────────────────────────────────
     try:
@@ -424,79 +532,6 @@ def get_dashboard(request: Request, db: Session = Depends(get_db)):
     except Exception:
         expiring_docs = []
 
-    # ── Assemble response ──────────────────────────────────────────────────────
-
-    def _to_item(d: dict) -> DashboardItem:
-        return DashboardItem(
-            kind=d["kind"],
-            id=d["id"],
-            title=d["title"],
-            date=d.get("date"),
-            time=str(d["time"]) if d.get("time") else None,
-            is_done=d["is_done"],
-            is_overdue=d["is_overdue"],
-            category_emoji=d.get("category_emoji"),
-            category_name=d.get("category_name"),
-            meta={k: (str(v) if isinstance(v, Decimal) else v) for k, v in d.get("meta", {}).items()},
-        )
-
-    today_block = TodayBlock(
-        overdue=[_to_item(x) for x in today_block_raw["overdue"]],
-        active=[_to_item(x) for x in today_block_raw["active"]],
-        done=[_to_item(x) for x in today_block_raw["done"]],
-        events=[_to_item(x) for x in today_block_raw["events"]],
-        progress=ProgressBlock(**today_block_raw["progress"]),
-        vacation=today_block_raw.get("vacation", False),
-        vacation_end=today_block_raw.get("vacation_end"),
-    )
-
-    upcoming = [
-        UpcomingPayment(
-            occurrence_id=p["occurrence_id"],
-            template_id=p["template_id"],
-            title=p["title"],
-            scheduled_date=p["scheduled_date"],
-            kind=p["kind"],
-            kind_label=p["kind_label"],
-            amount=p["amount"],
-            amount_formatted=p["amount_formatted"],
-            days_until=p["days_until"],
-            wallet_id=p.get("wallet_id"),
-            destination_wallet_id=p.get("destination_wallet_id"),
-            category_id=p.get("category_id"),
-        )
-        for p in upcoming_raw
-    ]
-
-    heatmap = [HeatmapCell(**c) for c in heatmap_raw]
-
-    fin_summary = {
-        cur: FinancialCurrencyBlock(
-            income=float(v["income"]),
-            expense=float(v["expense"]),
-            difference=float(v["difference"]),
-        )
-        for cur, v in fin_summary_raw.items()
-    }
-
-    fin_state = FinStateBlock(**fin_state_raw)
-
-    feed = []
-    for group in feed_raw:
-        events = [
-            FeedEvent(
-                icon=e["icon"],
-                title=e["title"],
-                subtitle=e["subtitle"],
-                occurred_at=e["occurred_at"],
-                time_str=e["time_str"],
-                amount_label=e.get("amount_label"),
-                amount_css=e.get("amount_css"),
-            )
-            for e in group["events"]
-        ]
-        feed.append(FeedGroup(label=group["label"], date=group["date"], events=events))
-
     # ── Shopping list widget ───────────────────────────────────────────────────
     shopping_list_id: int | None = None
     shopping_items: list[ShoppingItem] = []
@@ -528,18 +563,13 @@ def get_dashboard(request: Request, db: Session = Depends(get_db)):
     except Exception:
         pass
 
-    return DashboardResponse(
-        today=today_block,
-        upcoming_payments=upcoming,
-        habit_heatmap=heatmap,
-        financial_summary=fin_summary,
-        fin_state=fin_state,
-        feed=feed,
-        level=level_block,
+    response = DashboardResponse(
+        **blocks,
         efficiency=efficiency_block,
-        week_events=week_events,
         expiring_subs=expiring_subs,
         expiring_docs=expiring_docs,
         shopping_list_id=shopping_list_id,
         shopping_items=shopping_items,
     )
+    cache.save()
+    return response
@@ -107,3 +107,25 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     """Validate JWT and return User ORM object."""
     email = _get_email_from_token(_get_token(request))
     return _get_or_create_user(email, db)
+
+
+def consistent_read(request: Request, db: Session = Depends(get_db)) -> None:
+    """
+    Read-your-writes for asynchronous projection (router-wide dependency)
+
+    Клиент возвращает X-Event-Id ответа на запись как X-Min-Event-Id
+    (или ?min_event_id=); запрос ждёт, пока read models аккаунта догонят
+    это событие. Без токена или при PROJECTION_ASYNC=False — no-op.
+    """
+    raw = request.headers.get("x-min-event-id") or request.query_params.get("min_event_id")
+    if not raw or not raw.isdigit():
+        return
+    from app.config import get_settings
+    if not get_settings().PROJECTION_ASYNC:
+        return
+    try:
+        account_id = get_user_id(request, db)
+    except HTTPException:
+        return  # без авторизации ждать нечего — endpoint сам ответит 401
+    from app.application.projection import wait_for_projection
+    wait_for_projection(db, account_id, int(raw))
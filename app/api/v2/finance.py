@@ -4,17 +4,22 @@ GET  /api/v2/fin-categories    — list financial categories (INCOME / EXPENSE)
 GET  /api/v2/transactions      — paginated transaction feed with filters
 POST /api/v2/transactions      — create income / expense / transfer
 """
+import base64
+import hashlib
+import json
 from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
 
 from fastapi import APIRouter, Depends, Request, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 
+from app.application.dashboard_cache import DashboardCache
 from app.infrastructure.db.session import get_db
 from app.api.v2.deps import get_user_id
 from app.infrastructure.db.models import WalletBalance, CategoryInfo, TransactionFeed, MandatoryCategory
+from app.readmodels.fact_cube import set_budget_month
 
 router = APIRouter()
 
@@ -423,6 +428,25 @@ class TransactionItem(BaseModel):
     budget_month: str | None = None  # YYYY-MM-DD (1-е число), NULL = по дате
 
 
+def _encode_tx_cursor(t: TransactionFeed) -> str:
+    raw = json.dumps([t.occurred_at.isoformat(), t.transaction_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_tx_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        occurred_at, transaction_id = json.loads(raw)
+        return datetime.fromisoformat(occurred_at), int(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _tx_filter_signature(*filters) -> str:
+    """Короткий стабильный ключ набора фильтров (для кэша итогов)."""
+    return hashlib.sha1(json.dumps(filters, default=str).encode()).hexdigest()[:12]
+
+
 @router.get("/transactions", response_model=dict)
 def list_transactions(
     request: Request,
@@ -437,9 +461,11 @@ def list_transactions(
     search: str | None = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, le=200),
+    cursor: str | None = Query(None),  # next_cursor предыдущей страницы (вместо page)
     db: Session = Depends(get_db),
 ):
     user_id = get_user_id(request, db)
+    after = _decode_tx_cursor(cursor) if cursor else None
 
     q = db.query(TransactionFeed).filter(TransactionFeed.account_id == user_id)
 
@@ -509,22 +535,46 @@ def list_transactions(
     if search and search.strip():
         q = q.filter(TransactionFeed.description.ilike(f"%{search.strip()}%"))
 
-    total = q.count()
-
-    # Aggregate totals per type across all filtered rows (before pagination)
-    type_totals = (
-        q.with_entities(TransactionFeed.operation_type, func.sum(TransactionFeed.amount))
-        .group_by(TransactionFeed.operation_type)
-        .all()
+    # Count + totals per type across all filtered rows (before pagination):
+    # one GROUP BY per filter signature, cached until the account's next
+    # transaction/category event (see app/application/dashboard_cache.py)
+    signature = _tx_filter_signature(
+        operation_type, wallet_id, category_id, exclude_category_ids, list_id,
+        date_from, date_to, budget_dates, (search or "").strip(),
     )
-    totals_map = {row[0]: float(row[1] or 0) for row in type_totals}
+    cache = DashboardCache(db, user_id, date.today())
 
-    transactions = (
-        q.order_by(TransactionFeed.occurred_at.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
+    def _aggregate() -> dict:
+        rows = (
+            q.with_entities(
+                TransactionFeed.operation_type, func.count(), func.sum(TransactionFeed.amount),
+            )
+            .group_by(TransactionFeed.operation_type)
+            .all()
+        )
+        return {
+            "total": sum(row[1] for row in rows),
+            "totals": {row[0]: float(row[2] or 0) for row in rows},
+        }
+
+    aggregate = cache.get("transaction_totals", _aggregate, variant=signature)
+    cache.save()
+    total = aggregate["total"]
+    totals_map = aggregate["totals"]
+
+    # Keyset pagination on (occurred_at, transaction_id) — index range scan
+    # on ix_transactions_feed_account_occurred; page/OFFSET kept for old clients
+    page_q = q.order_by(TransactionFeed.occurred_at.desc(), TransactionFeed.transaction_id.desc())
+    if after is not None:
+        page_q = page_q.filter(
+            tuple_(TransactionFeed.occurred_at, TransactionFeed.transaction_id) < tuple_(*after)
+        )
+    elif page > 1:
+        page_q = page_q.offset((page - 1) * per_page)
+    transactions = page_q.limit(per_page + 1).all()
+    has_more = len(transactions) > per_page
+    transactions = transactions[:per_page]
+    next_cursor = _encode_tx_cursor(transactions[-1]) if has_more else None
 
     # Batch load category titles
     cat_ids = {t.category_id for t in transactions if t.category_id}
@@ -558,6 +608,7 @@ def list_transactions(
         "pages": (total + per_page - 1) // per_page,
         "totals": totals_map,
         "items": [i.model_dump() for i in items],
+        "next_cursor": next_cursor,
     }
 
 
@@ -684,117 +735,13 @@ def aggregate_transactions(
 #   3. k-NN: близость суммы × кошелёк × время суток × день месяца ×
 #      будни/выходной × свежесть. Никакого перекоса на «самую частую»:
 #      редкая, но точно совпадающая по сумме категория уверенно побеждает.
+#
+# Уровни 1–3 считаются по предрасчитанной модели аккаунта
+# (app.application.category_suggest), без скана истории на каждый вызов.
 
-import math as _math
 import re as _re
-from collections import defaultdict as _defaultdict
-
-_LOOKBACK_DAYS = 180          # ловим и помесячные платежи (≈6 повторов)
-_AMOUNT_SIGMA = 0.12          # «ширина» похожести суммы (~±12% — сильное совпадение)
-_WALLET_OTHER = 0.45         # вес операции с другого кошелька
-_TIME_OTHER = 0.80           # вес операции в другое время суток
-_DOW_OTHER = 0.90            # вес операции в другой тип дня (будни/выходной)
-_DOM_BONUS = 1.15            # бонус за близкий день месяца (повторяющиеся платежи)
-_TEXT_BONUS = 1.6            # бонус за совпадение описания внутри k-NN
-_MIN_TOTAL_WEIGHT = 0.8      # минимум «похожей истории», иначе не подсказываем
-_NEAR_EXACT = 0.90           # порог «почти точное совпадение суммы»
-_MIN_CONFIDENCE = 0.45
-
-# Служебные слова, не несущие категорию
-_STOP_TOKENS = {
-    "оплата", "покупка", "покупки", "перевод", "платеж", "платёж", "магазин",
-    "оплатить", "счет", "счёт", "карта", "карты", "рублей", "руб",
-}
-
-
-def _time_bucket(hour: int) -> int:
-    if 6 <= hour < 12: return 0
-    if 12 <= hour < 18: return 1
-    if 18 <= hour < 22: return 2
-    return 3
-
-
-def _amount_similarity(a: float, b: float) -> float:
-    """1.0 — суммы совпадают; плавно убывает с разницей (гаусс).
-
-    Для мелких сумм знаменатель прижат к 500: 120 и 180 ₽ — это «похоже»
-    (обе — кофе), хотя относительная разница 33%.
-    """
-    if a <= 0 or b <= 0:
-        return 0.0
-    d = abs(a - b) / max(a, b, 500.0)
-    return _math.exp(-(d * d) / (2 * _AMOUNT_SIGMA * _AMOUNT_SIGMA))
-
-
-def _desc_tokens(s: str | None) -> set[str]:
-    """Нормализованные токены описания: lower, ё→е, только буквы, ≥3 символов."""
-    if not s:
-        return set()
-    s = s.lower().replace("ё", "е")
-    s = _re.sub(r"[^а-яa-z ]", " ", s)
-    return {t for t in s.split() if len(t) >= 3 and t not in _STOP_TOKENS}
-
-
-def _text_match(q_tokens: set[str], row_tokens: set[str]) -> bool:
-    """Совпадение описаний: общий токен или общий префикс ≥4 (склонения)."""
-    if not q_tokens or not row_tokens:
-        return False
-    if q_tokens & row_tokens:
-        return True
-    for qt in q_tokens:
-        if len(qt) < 4:
-            continue
-        p = qt[:4]
-        for rt in row_tokens:
-            if rt.startswith(p) or (len(rt) >= 4 and qt.startswith(rt[:4])):
-                return True
-    return False
-
-
-def _dom_close(d1: int, d2: int) -> bool:
-    """Циклическая близость дня месяца (±2 дня): ипотека 1-го ≈ 30-го."""
-    diff = abs(d1 - d2)
-    return min(diff, 31 - diff) <= 2
-
-
-def _is_weekend(dt) -> bool:
-    return dt.weekday() >= 5
-
-
-def _median(xs: list) -> float:
-    ys = sorted(xs)
-    n = len(ys)
-    mid = n // 2
-    return float(ys[mid]) if n % 2 else (ys[mid - 1] + ys[mid]) / 2.0
-
-
-def _log_typicality(amount: float, amounts: list[float]) -> float | None:
-    """Насколько сумма типична для категории (лог-нормаль, [0..1]).
-
-    У «Связи» разброс нулевой, у «Продуктов» огромный — общая сигма это
-    не ловит. None, если истории мало (<4 операций).
-    """
-    vals = [x for x in amounts if x > 0]
-    if len(vals) < 4 or amount <= 0:
-        return None
-    la = [_math.log(x) for x in vals]
-    mean = sum(la) / len(la)
-    var = sum((x - mean) ** 2 for x in la) / len(la)
-    sd = max(var ** 0.5, 0.10)
-    z = abs(_math.log(amount) - mean) / sd
-    return _math.exp(-(z * z) / 2.0)
-
-
-def _roundness_class(a: float) -> str:
-    """Круглость: 5000 ровно — перевод/подарок, 4873.50 — магазинный чек."""
-    if abs(a - round(a)) > 0.004:
-        return "kop"
-    ai = int(round(a))
-    if ai % 1000 == 0:
-        return "r1000"
-    if ai % 100 == 0:
-        return "r100"
-    return "odd"
+
+from app.application import category_suggest as _category_suggest
 
 
 class SuggestCategoryRequest(BaseModel):
@@ -820,26 +767,7 @@ def suggest_category(
     db: Session = Depends(get_db),
 ):
     user_id = get_user_id(request, db)
-    since = datetime.utcnow() - timedelta(days=_LOOKBACK_DAYS)
-
-    rows = (
-        db.query(
-            TransactionFeed.category_id,
-            TransactionFeed.amount,
-            TransactionFeed.wallet_id,
-            TransactionFeed.occurred_at,
-            TransactionFeed.description,
-        )
-        .filter(
-            TransactionFeed.account_id == user_id,
-            TransactionFeed.operation_type == body.operation_type,
-            TransactionFeed.category_id.isnot(None),
-            TransactionFeed.occurred_at >= since,
-        )
-        .all()
-    )
-
-    if len(rows) < 3:
+    if body.operation_type not in _category_suggest.SUGGEST_TYPES:
         return []
 
     try:
@@ -854,27 +782,9 @@ def suggest_category(
     except ValueError:
         target_date = date.today()
 
-    # ── Обучение на исправлениях: прошлые «подсказали X → юзер выбрал Y» ─────
-    from app.infrastructure.db.models import CategorySuggestLog
-    corr_mult: dict = {}
-    for c in (
-        db.query(CategorySuggestLog)
-        .filter(
-            CategorySuggestLog.account_id == user_id,
-            CategorySuggestLog.operation_type == body.operation_type,
-            CategorySuggestLog.created_at >= since,
-        )
-        .all()
-    ):
-        if _amount_similarity(amount, float(c.amount)) < 0.5:
-            continue
-        if (body.wallet_id is not None and c.wallet_id is not None
-                and c.wallet_id != body.wallet_id):
-            continue
-        if not c.accepted and c.chosen_category_id:
-            corr_mult[c.suggested_category_id] = corr_mult.get(c.suggested_category_id, 1.0) * 0.75
-            corr_mult[c.chosen_category_id] = corr_mult.get(c.chosen_category_id, 1.0) * 1.15
-    corr_mult = {k: min(1.4, max(0.5, v)) for k, v in corr_mult.items()}
+    model = _category_suggest.load_model(db, user_id, body.operation_type)
+    if model.size < 3:
+        return []
 
     # ── Уровень 0: сумма совпадает с плановой операцией ближайших дней ───────
     from app.infrastructure.db.models import OperationOccurrence, OperationTemplateModel
@@ -903,220 +813,16 @@ def suggest_category(
                 reason=f"плановая операция «{title}»",
             )]
 
-    # ── Уровень 1: совпадение описания (текст — сильнее суммы) ───────────────
-    q_tokens = _desc_tokens(body.description)
-    row_tokens_cache: dict[int, set[str]] = {}
-    if q_tokens:
-        text_cat: dict = _defaultdict(float)
-        text_total = 0.0
-        text_hits = 0
-        for i, r in enumerate(rows):
-            rt = _desc_tokens(r.description)
-            row_tokens_cache[i] = rt
-            if _text_match(q_tokens, rt):
-                w = 1.0 if (body.wallet_id is not None and r.wallet_id == body.wallet_id) else 0.8
-                text_cat[r.category_id] += w
-                text_total += w
-                text_hits += 1
-        if text_hits >= 2 and text_total > 0:
-            best_cid = max(text_cat, key=lambda c: text_cat[c])
-            share = text_cat[best_cid] / text_total
-            if share >= 0.65:
-                return [SuggestCategoryResult(
-                    category_id=best_cid,
-                    confidence=round(max(0.85, share), 4),
-                    exact=True,
-                    reason="по описанию",
-                )]
-
-    # ── Уровень 2: точный повтор суммы (сильнейший сигнал) ──────────────────
-    # «Ровно такая же сумма уже была — почти всегда та же категория»
-    # (857 ₽ → связь, 3200 ₽ → транспорт). Узкий допуск, чтобы 850 не примешалось.
-    exact_tol = max(1.0, amount * 0.005)   # ±0.5%, минимум 1 ₽
-    exact_rows = [r for r in rows if abs(float(r.amount) - amount) <= exact_tol]
-    if len(exact_rows) >= 2:
-        exact_cat: dict = _defaultdict(float)
-        exact_total = 0.0
-        for r in exact_rows:
-            w = 1.0 if (body.wallet_id is not None and r.wallet_id == body.wallet_id) else 0.7
-            exact_cat[r.category_id] += w
-            exact_total += w
-        best_cid = max(exact_cat, key=lambda c: exact_cat[c])
-        share = exact_cat[best_cid] / exact_total
-        # не повторяем подтверждённую юзером ошибку на этой же сумме
-        if share >= 0.6 and corr_mult.get(best_cid, 1.0) >= 0.8:
-            return [SuggestCategoryResult(
-                category_id=best_cid,
-                confidence=round(max(0.85, share), 4),
-                exact=True,
-                reason="повторяющийся платёж",
-            )]
-
-    # ── Уровень 3: похожие суммы (weighted k-NN) + категорийные факторы ─────
-    now = datetime.utcnow()
-    target_weekend = _is_weekend(target_date)
-
-    # Пер-категорийная статистика всей истории: типичность суммы, круглость,
-    # профиль кошелька, периодичность, «уже было сегодня»
-    cat_amounts: dict = _defaultdict(list)
-    cat_wallets: dict = _defaultdict(dict)
-    cat_dates_all: dict = _defaultdict(set)
-    for row in rows:
-        cid = row.category_id
-        cat_amounts[cid].append(float(row.amount))
-        if row.wallet_id is not None:
-            cat_wallets[cid][row.wallet_id] = cat_wallets[cid].get(row.wallet_id, 0) + 1
-        if row.occurred_at:
-            cat_dates_all[cid].add(row.occurred_at.date())
-
-    cat_weight: dict = _defaultdict(float)
-    cat_best_sim: dict = _defaultdict(float)   # лучшая близость суммы в категории
-    cat_contrib: dict = _defaultdict(int)      # сколько заметно похожих операций
-    cat_same_wallet: dict = _defaultdict(int)
-    cat_dates_similar: dict = _defaultdict(set)
-
-    for i, row in enumerate(rows):
-        a_sim = _amount_similarity(amount, float(row.amount))
-        if a_sim < 0.05:
-            continue   # сумма совсем другая — не учитываем
-
-        same_wallet = body.wallet_id is not None and row.wallet_id == body.wallet_id
-        wallet_factor = 1.0 if same_wallet else _WALLET_OTHER
-
-        # Циклическая близость по часу (σ≈3 ч), без жёстких корзин:
-        # 11:59 и 12:01 — это одно и то же время
-        if body.hour is not None and row.occurred_at:
-            hd = abs(row.occurred_at.hour - body.hour)
-            hd = min(hd, 24 - hd)
-            time_factor = _TIME_OTHER + (1.0 - _TIME_OTHER) * _math.exp(-(hd * hd) / 18.0)
-        else:
-            time_factor = 1.0
-
-        if row.occurred_at:
-            age_days = max(0.0, (now - row.occurred_at).total_seconds() / 86400.0)
-            recency = max(0.6, 1.0 - (age_days / _LOOKBACK_DAYS) * 0.4)
-        else:
-            recency = 0.8
-
-        # День месяца: почти та же сумма в те же числа = повторяющийся платёж
-        dom_factor = 1.0
-        if row.occurred_at and a_sim >= 0.5 and _dom_close(target_date.day, row.occurred_at.day):
-            dom_factor = _DOM_BONUS
-
-        # Будни/выходной: продукты по субботам ≠ обед в будни
-        dow_factor = 1.0
-        if row.occurred_at and _is_weekend(row.occurred_at) != target_weekend:
-            dow_factor = _DOW_OTHER
-
-        # Совпадение описания — сильный буст даже без раннего выхода
-        text_factor = 1.0
-        if q_tokens:
-            rt = row_tokens_cache.get(i)
-            if rt is None:
-                rt = _desc_tokens(row.description)
-            if _text_match(q_tokens, rt):
-                text_factor = _TEXT_BONUS
-
-        w = a_sim * wallet_factor * time_factor * recency * dom_factor * dow_factor * text_factor
-        cid = row.category_id
-        cat_weight[cid] += w
-        cat_best_sim[cid] = max(cat_best_sim[cid], a_sim)
-        if a_sim >= 0.5:
-            cat_contrib[cid] += 1
-            if row.occurred_at:
-                cat_dates_similar[cid].add(row.occurred_at.date())
-        if same_wallet:
-            cat_same_wallet[cid] += 1
-
-    if sum(cat_weight.values()) < _MIN_TOTAL_WEIGHT:
-        return []   # нет осмысленно похожей истории
-
-    # ── Пост-факторы уровня категории ────────────────────────────────────────
-    round_cls = _roundness_class(amount)
-    adjusted: dict = {}
-    cat_periodic: dict = _defaultdict(bool)
-    for cid, w in cat_weight.items():
-        m = 1.0
-        amounts_c = cat_amounts[cid]
-        n = len(amounts_c)
-
-        # Типичность суммы для распределения категории (лог-нормаль)
-        typ = _log_typicality(amount, amounts_c)
-        if typ is not None:
-            m *= 0.7 + 0.6 * typ
-
-        # Круглость суммы против профиля категории
-        if n >= 4:
-            share_r = sum(1 for x in amounts_c if _roundness_class(x) == round_cls) / n
-            m *= 0.9 + 0.2 * share_r
-
-        # Профиль кошелька: категория, никогда не жившая на этом кошельке,
-        # штрафуется; «родной» кошелёк категории — буст
-        if body.wallet_id is not None and n >= 5:
-            share_w = cat_wallets[cid].get(body.wallet_id, 0) / n
-            m *= 0.75 + 0.5 * share_w
-
-        # Периодичность: похожая сумма повторяется с шагом ~N дней,
-        # и с последнего раза прошло примерно N
-        dates_sim = sorted(cat_dates_similar[cid])
-        if len(dates_sim) >= 3:
-            gaps = [(dates_sim[j + 1] - dates_sim[j]).days for j in range(len(dates_sim) - 1)]
-            gaps = [g for g in gaps if g >= 1]
-            if gaps:
-                med = _median(gaps)
-                since_last = (target_date - dates_sim[-1]).days
-                if 5 <= med <= 45 and abs(since_last - med) <= max(2.0, med * 0.2):
-                    m *= 1.2
-                    cat_periodic[cid] = True
-
-        # «Уже было сегодня» для категорий с типичным шагом ≥2 дней
-        if target_date in cat_dates_all[cid]:
-            dates_all = sorted(cat_dates_all[cid])
-            if len(dates_all) >= 3:
-                gaps_all = [(dates_all[j + 1] - dates_all[j]).days for j in range(len(dates_all) - 1)]
-                gaps_all = [g for g in gaps_all if g >= 1]
-                if gaps_all and _median(gaps_all) >= 2:
-                    m *= 0.8
-
-        # Обучение на исправлениях: не повторяем свои ошибки
-        m *= corr_mult.get(cid, 1.0)
-
-        adjusted[cid] = w * m
-
-    total_adj = sum(adjusted.values())
-    if total_adj <= 0:
-        return []
-
-    results = []
-    for cid, w in adjusted.items():
-        confidence = w / total_adj
-        near_exact = cat_best_sim[cid] >= _NEAR_EXACT
-        # нужна реальная опора: либо ≥2 похожих операции, либо одна почти точная
-        if not (cat_contrib[cid] >= 2 or near_exact):
-            continue
-        # слабые кандидаты не показываем даже чипом
-        if confidence < 0.25:
-            continue
-
-        if near_exact:
-            reason = "повторяющийся платёж"
-        elif cat_periodic[cid]:
-            reason = "регулярный платёж"
-        elif cat_same_wallet[cid] >= 2:
-            reason = "похожие траты с этого кошелька"
-        else:
-            reason = "по похожим суммам"
-
-        results.append(SuggestCategoryResult(
-            category_id=cid,
-            confidence=round(confidence, 4),
-            # exact управляет автоподстановкой — требуем и точную сумму, и уверенность
-            exact=near_exact and confidence >= _MIN_CONFIDENCE,
-            reason=reason,
-        ))
-
-    results.sort(key=lambda r: (r.exact, r.confidence), reverse=True)
-    return results[:3]
+    # ── Уровни 1–3: описание, точный повтор, k-NN по модели ──────────────────
+    return [
+        SuggestCategoryResult(**s) for s in model.suggest(
+            amount,
+            wallet_id=body.wallet_id,
+            hour=body.hour,
+            description=body.description,
+            target_date=target_date,
+        )
+    ]
 
 
 # ── Create transaction ─────────────────────────────────────────────────────
@@ -1267,7 +973,7 @@ def create_transaction(body: CreateTransactionRequest, request: Request, db: Ses
     if (body.suggested_category_id and tx_id
             and body.operation_type in ("INCOME", "EXPENSE")):
         from app.infrastructure.db.models import CategorySuggestLog
-        db.add(CategorySuggestLog(
+        log = CategorySuggestLog(
             account_id=user_id,
             operation_type=body.operation_type,
             amount=amount,
@@ -1275,7 +981,9 @@ def create_transaction(body: CreateTransactionRequest, request: Request, db: Ses
             suggested_category_id=body.suggested_category_id,
             chosen_category_id=body.category_id,
             accepted=(body.category_id == body.suggested_category_id),
-        ))
+        )
+        db.add(log)
+        _category_suggest.record_correction(db, log)
         db.commit()
 
     # Set list_id / budget_month on the read model (not event-sourced)
@@ -1285,7 +993,7 @@ def create_transaction(body: CreateTransactionRequest, request: Request, db: Ses
             if body.list_id is not None:
                 tx.list_id = body.list_id
             if body.budget_month:
-                tx.budget_month = _parse_budget_month(body.budget_month)
+                set_budget_month(db, tx, _parse_budget_month(body.budget_month))
             db.commit()
 
     return {"id": tx_id}
@@ -1362,7 +1070,7 @@ def update_transaction(
         if list_id_in_request:
             tx.list_id = body.list_id
         if budget_month_in_request:
-            tx.budget_month = _parse_budget_month(body.budget_month) if body.budget_month else None
+            set_budget_month(db, tx, _parse_budget_month(body.budget_month) if body.budget_month else None)
         db.commit()
 
     return {"ok": True}
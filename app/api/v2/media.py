@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.session import get_db
+from app.infrastructure.db.offload import run_db
 from app.api.v2.deps import get_user_id
 from app.application.app_config import get_kinopoisk_key
 
@@ -258,7 +259,7 @@ async def _lookup_steam(q: str) -> list[LookupResult]:
 @router.get("/media/lookup", response_model=list[LookupResult])
 async def lookup(media_type: str, q: str, db: Session = Depends(get_db)):
     if media_type in ("movie", "series"):
-        key = get_kinopoisk_key(db)
+        key = await run_db(get_kinopoisk_key, db)
         return await _lookup_kinopoisk(q, media_type, key or "")
     if media_type == "book":
         return await _lookup_books(q)
@@ -270,7 +271,7 @@ async def lookup(media_type: str, q: str, db: Session = Depends(get_db)):
 @router.get("/media/kp-raw/{kp_id}")
 async def kp_raw(kp_id: int, db: Session = Depends(get_db)):
     """Debug: return raw KP API response to inspect available date fields."""
-    key = get_kinopoisk_key(db)
+    key = await run_db(get_kinopoisk_key, db)
     if not key:
         return {"error": "no_key"}
     try:
@@ -348,7 +349,7 @@ async def _kp_fetch_distributions(kp_id: int, key: str) -> tuple[Optional[date],
 @router.get("/media/kp-premiere", response_model=KpPremiereResult)
 async def kp_premiere(kp_id: int, db: Session = Depends(get_db)):
     """Fetch Russian and world premiere dates for a Kinopoisk film."""
-    key = get_kinopoisk_key(db)
+    key = await run_db(get_kinopoisk_key, db)
     if not key:
         return KpPremiereResult()
 
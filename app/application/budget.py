@@ -2,24 +2,26 @@
 Budget use cases and query helpers.
 
 Use cases follow Event Sourcing pattern (domain event → EventLog → Projector → read model).
-Fact is computed on-the-fly from TransactionFeed.
+Fact is summed from the budget fact cube (app.readmodels.fact_cube).
 Plan = manual (BudgetLine) + planned operations (OperationOccurrence).
 """
 from datetime import datetime, date as date_type, timedelta
 from decimal import Decimal
 from typing import Dict, Any, List
 
-from sqlalchemy import func, cast, TIMESTAMP
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.infrastructure.eventlog.repository import EventLogRepository
+from app.infrastructure.id_allocator import IdAllocator
 from app.infrastructure.db.models import (
     BudgetMonth, BudgetLine, BudgetGoalPlan, BudgetGoalWithdrawalPlan, BudgetVariant, BudgetPlanTemplate,
     BudgetVariantHiddenCategory, BudgetVariantHiddenGoal, BudgetVariantHiddenWithdrawalGoal,
-    CategoryInfo, TransactionFeed,
+    CategoryInfo, BudgetFactCube,
     OperationTemplateModel, OperationOccurrence, GoalInfo,
 )
 from app.domain.budget import Budget
+from app.readmodels.fact_cube import sum_facts
 from app.readmodels.projectors.budget import BudgetProjector
 
 
@@ -227,8 +229,7 @@ class EnsureBudgetMonthUseCase:
         return budget_month_id
 
     def _next_id(self) -> int:
-        max_id = self.db.query(func.max(BudgetMonth.id)).scalar() or 0
-        return max_id + 1
+        return IdAllocator(self.db).next_id("budget_month")
 
 
 class SetBudgetLineUseCase:
@@ -275,8 +276,7 @@ class SetBudgetLineUseCase:
         BudgetProjector(self.db).run(account_id, event_types=["budget_line_set"])
 
     def _next_id(self) -> int:
-        max_id = self.db.query(func.max(BudgetLine.id)).scalar() or 0
-        return max_id + 1
+        return IdAllocator(self.db).next_id("budget_line")
 
 
 class SaveBudgetPlanUseCase:
@@ -317,9 +317,8 @@ class SaveBudgetPlanUseCase:
             ).all()
         }
 
-        # Collect events to append in batch
-        next_id = self.db.query(func.max(BudgetLine.id)).scalar() or 0
-        events = []
+        # Collect lines to save, then reserve their ids in one round-trip
+        accepted = []
 
         for line in lines:
             plan_amount = line.get("plan_amount", "0")
@@ -337,19 +336,23 @@ class SaveBudgetPlanUseCase:
             if amount == 0 and (category_id, kind) not in existing_lines:
                 continue
 
-            next_id += 1
-            payload = Budget.set_plan(
+            accepted.append((category_id, kind, amount, line.get("note")))
+
+        if not accepted:
+            return
+
+        line_ids = IdAllocator(self.db).allocate_block("budget_line", len(accepted))
+        events = [
+            Budget.set_plan(
                 budget_month_id=budget_month_id,
-                line_id=next_id,
+                line_id=line_id,
                 category_id=category_id,
                 kind=kind,
                 plan_amount=str(amount),
-                note=line.get("note"),
+                note=note,
             )
-            events.append(payload)
-
-        if not events:
-            return
+            for line_id, (category_id, kind, amount, note) in zip(line_ids, accepted)
+        ]
 
         # Append all events in batch
         for payload in events:
@@ -1135,33 +1138,15 @@ class BudgetViewService:
         range_start: date_type,
         range_end: date_type,
     ) -> Dict[tuple, Decimal]:
-        """Aggregate transactions by (category_id, operation_type)."""
-        dt_start = datetime(range_start.year, range_start.month, range_start.day)
-        dt_end = datetime(range_end.year, range_end.month, range_end.day)
-
-        # Эффективная дата для бюджета: budget_month-переопределение или occurred_at
-        budget_dt = func.coalesce(
-            cast(TransactionFeed.budget_month, TIMESTAMP(timezone=True)),
-            TransactionFeed.occurred_at,
-        )
-        rows = (
-            self.db.query(
-                TransactionFeed.category_id,
-                TransactionFeed.operation_type,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
-                budget_dt >= dt_start,
-                budget_dt < dt_end,
-            )
-            .group_by(TransactionFeed.category_id, TransactionFeed.operation_type)
-            .all()
+        """Aggregate transactions by (category_id, operation_type) from the fact cube."""
+        rows = sum_facts(
+            self.db, account_id, range_start, range_end,
+            [BudgetFactCube.category_id, BudgetFactCube.operation_type],
+            BudgetFactCube.operation_type.in_(["INCOME", "EXPENSE"]),
         )
         result: Dict[tuple, Decimal] = {}
         for row in rows:
-            result[(row.category_id, row.operation_type)] = row.total or Decimal("0")
+            result[(row.category_id or None, row.operation_type)] = row.total or Decimal("0")
         return result
 
 
@@ -2,7 +2,8 @@
 Budget matrix service: multi-period plan-vs-fact view.
 
 Builds a horizontal matrix of N consecutive period columns + totals.
-Uses SQL CASE WHEN bucketing for single-query aggregation per data source.
+Uses SQL CASE WHEN bucketing for single-query aggregation per data source;
+fact is read from the budget fact cube (app.readmodels.fact_cube).
 """
 from datetime import datetime, date as date_type, timedelta
 from decimal import Decimal
@@ -14,8 +15,9 @@ from sqlalchemy.orm import Session
 from app.infrastructure.db.models import (
     BudgetMonth, BudgetLine, BudgetGoalPlan, BudgetGoalWithdrawalPlan, CategoryInfo, TransactionFeed,
     OperationTemplateModel, OperationOccurrence,
-    GoalInfo, WalletBalance,
+    GoalInfo, WalletBalance, BudgetFactCube,
 )
+from app.readmodels.fact_cube import sum_facts
 from app.application.budget import MONTH_NAMES, VALID_GRAINS, DAY_NAMES_SHORT, GRANULARITY_ORDER
 from app.domain.category import SYSTEM_CREDIT_REPAYMENT_TITLE
 
@@ -421,49 +423,16 @@ class BudgetMatrixService:
     ) -> Dict[Tuple, Decimal]:
         if not periods:
             return {}
-        global_start = periods[0]["range_start"]
-        global_end = periods[-1]["range_end"]
-        dt_start = datetime(global_start.year, global_start.month, global_start.day)
-        dt_end = datetime(global_end.year, global_end.month, global_end.day)
-
-        whens = []
-        for p in periods:
-            s = p["range_start"]
-            e = p["range_end"]
-            cond = and_(
-                BUDGET_DT >= datetime(s.year, s.month, s.day),
-                BUDGET_DT < datetime(e.year, e.month, e.day),
-            )
-            whens.append((cond, literal(p["index"])))
-
-        period_col = case(*whens, else_=literal(-1)).label("period_idx")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.category_id,
-                TransactionFeed.operation_type,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(
-                TransactionFeed.category_id,
-                TransactionFeed.operation_type,
-                period_col,
-            )
-            .all()
+        rows = sum_facts(
+            self.db, account_id, periods[0]["range_start"], periods[-1]["range_end"],
+            [BudgetFactCube.category_id, BudgetFactCube.operation_type],
+            BudgetFactCube.operation_type.in_(["INCOME", "EXPENSE"]),
+            periods=periods,
         )
-
-        result: Dict[Tuple, Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.category_id, row.operation_type, row.period_idx)] = row.total or _ZERO
-        return result
+        return {
+            (row.category_id or None, row.operation_type, row.period_idx): row.total or _ZERO
+            for row in rows
+        }
 
     def _aggregate_avg_fact(
         self, account_id: int, lookback_months: int, before_date: date_type,
@@ -471,27 +440,15 @@ class BudgetMatrixService:
         """Average monthly fact per (category_id, operation_type) over the past N months."""
         total_m = before_date.year * 12 + (before_date.month - 1) - lookback_months
         start = date_type(total_m // 12, total_m % 12 + 1, 1)
-        dt_start = datetime(start.year, start.month, start.day)
-        dt_end = datetime(before_date.year, before_date.month, before_date.day)
 
-        rows = (
-            self.db.query(
-                TransactionFeed.category_id,
-                TransactionFeed.operation_type,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.category_id, TransactionFeed.operation_type)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, start, before_date,
+            [BudgetFactCube.category_id, BudgetFactCube.operation_type],
+            BudgetFactCube.operation_type.in_(["INCOME", "EXPENSE"]),
         )
         n = Decimal(lookback_months)
         return {
-            (r.category_id, r.operation_type): (r.total or _ZERO) / n
+            (r.category_id or None, r.operation_type): (r.total or _ZERO) / n
             for r in rows
         }
 
@@ -896,7 +853,8 @@ class BudgetMatrixService:
         dt_start = datetime(global_start.year, global_start.month, global_start.day)
         dt_end = datetime(global_end.year, global_end.month, global_end.day)
 
-        # Build period buckets
+        # Бакеты по ленте — для переносов цель→цель (рубеж по transaction_id,
+        # в кубе его нет)
         whens = []
         for p in periods:
             s = p["range_start"]
@@ -909,32 +867,20 @@ class BudgetMatrixService:
 
         period_col = case(*whens, else_=literal(-1)).label("period_idx")
 
-        # Alias for wallet type check
-        from_wallet = self.db.query(WalletBalance.wallet_id, WalletBalance.wallet_type).subquery("from_wallet")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.to_goal_id,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .join(from_wallet, TransactionFeed.from_wallet_id == from_wallet.c.wallet_id)
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == "TRANSFER",
-                TransactionFeed.to_goal_id.isnot(None),
-                from_wallet.c.wallet_type == "REGULAR",
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.to_goal_id, period_col)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, global_start, global_end,
+            [BudgetFactCube.to_goal_id],
+            BudgetFactCube.operation_type == "TRANSFER",
+            BudgetFactCube.to_goal_id != 0,
+            BudgetFactCube.from_wallet_type == "REGULAR",
+            periods=periods,
         )
+        result: Dict[Tuple, Decimal] = {
+            (row.to_goal_id, row.period_idx): row.total or _ZERO for row in rows
+        }
 
-        result: Dict[Tuple, Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.to_goal_id, row.period_idx)] = row.total or _ZERO
+        # Alias for wallet type check
+        from_wallet = self.db.query(WalletBalance.wallet_id, WalletBalance.wallet_type).subquery("from_wallet")
 
         # ── Переносы цель→цель (SAVINGS→SAVINGS): ПОЛУЧАТЕЛЬ +N в «Отложить» ──
         # Источник учитывается в «Взять из отложенного» (см. _aggregate_withdrawal…).
@@ -1107,54 +1053,15 @@ class BudgetMatrixService:
         if not periods:
             return {}
 
-        global_start = periods[0]["range_start"]
-        global_end = periods[-1]["range_end"]
-        dt_start = datetime(global_start.year, global_start.month, global_start.day)
-        dt_end = datetime(global_end.year, global_end.month, global_end.day)
-
-        whens = []
-        for p in periods:
-            s = p["range_start"]
-            e = p["range_end"]
-            cond = and_(
-                BUDGET_DT >= datetime(s.year, s.month, s.day),
-                BUDGET_DT < datetime(e.year, e.month, e.day),
-            )
-            whens.append((cond, literal(p["index"])))
-
-        period_col = case(*whens, else_=literal(-1)).label("period_idx")
-
-        from_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("from_w")
-        to_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("to_w")
-
-        rows = (
-            self.db.query(
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .join(from_wallet, TransactionFeed.from_wallet_id == from_wallet.c.wallet_id)
-            .join(to_wallet, TransactionFeed.to_wallet_id == to_wallet.c.wallet_id)
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == "TRANSFER",
-                from_wallet.c.wallet_type == "REGULAR",
-                to_wallet.c.wallet_type == "CREDIT",
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(period_col)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, periods[0]["range_start"], periods[-1]["range_end"],
+            [],
+            BudgetFactCube.operation_type == "TRANSFER",
+            BudgetFactCube.from_wallet_type == "REGULAR",
+            BudgetFactCube.to_wallet_type == "CREDIT",
+            periods=periods,
         )
-
-        result: Dict[int, Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[row.period_idx] = row.total or _ZERO
-        return result
+        return {row.period_idx: row.total or _ZERO for row in rows}
 
     # ------------------------------------------------------------------
     # Withdrawal (SAVINGS → REGULAR) section
@@ -1308,9 +1215,23 @@ class BudgetMatrixService:
 
         global_start = periods[0]["range_start"]
         global_end = periods[-1]["range_end"]
+        rows = sum_facts(
+            self.db, account_id, global_start, global_end,
+            [BudgetFactCube.from_goal_id],
+            BudgetFactCube.operation_type == "TRANSFER",
+            BudgetFactCube.from_goal_id != 0,
+            BudgetFactCube.from_wallet_type == "SAVINGS",
+            BudgetFactCube.to_wallet_type == "REGULAR",
+            periods=periods,
+        )
+        result: Dict[Tuple, Decimal] = {
+            (row.from_goal_id, row.period_idx): row.total or _ZERO for row in rows
+        }
+
+        # Бакеты по ленте — для переносов цель→цель (рубеж по transaction_id,
+        # в кубе его нет)
         dt_start = datetime(global_start.year, global_start.month, global_start.day)
         dt_end = datetime(global_end.year, global_end.month, global_end.day)
-
         whens = []
         for p in periods:
             s = p["range_start"]
@@ -1326,35 +1247,6 @@ class BudgetMatrixService:
         from_wallet = self.db.query(
             WalletBalance.wallet_id, WalletBalance.wallet_type,
         ).subquery("from_w")
-        to_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("to_w")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.from_goal_id,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .join(from_wallet, TransactionFeed.from_wallet_id == from_wallet.c.wallet_id)
-            .join(to_wallet, TransactionFeed.to_wallet_id == to_wallet.c.wallet_id)
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == "TRANSFER",
-                TransactionFeed.from_goal_id.isnot(None),
-                from_wallet.c.wallet_type == "SAVINGS",
-                to_wallet.c.wallet_type == "REGULAR",
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.from_goal_id, period_col)
-            .all()
-        )
-
-        result: Dict[Tuple, Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.from_goal_id, row.period_idx)] = row.total or _ZERO
 
         # ── Переносы цель→цель: ИСТОЧНИК +N в «Взять из отложенного» ──────────
         # (получатель учитывается в «Отложить»). Только новые переносы (id > рубежа).
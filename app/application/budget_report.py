@@ -9,23 +9,16 @@ from decimal import Decimal
 from math import sqrt
 from typing import Dict, Any, List, Tuple
 
-from sqlalchemy import func, case, and_, literal, cast, TIMESTAMP
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
     BudgetMonth, BudgetLine, BudgetGoalPlan, BudgetGoalWithdrawalPlan,
-    CategoryInfo, TransactionFeed, GoalInfo, WalletBalance,
+    CategoryInfo, GoalInfo, BudgetFactCube,
 )
+from app.readmodels.fact_cube import sum_facts
 
 _ZERO = Decimal("0")
 
-# Эффективная дата операции для бюджета: budget_month-переопределение
-# (зарплата 31 янв → февраль) или обычная дата операции.
-BUDGET_DT = func.coalesce(
-    cast(TransactionFeed.budget_month, TIMESTAMP(timezone=True)),
-    TransactionFeed.occurred_at,
-)
-
 _MONTH_LABELS = {
     1: "Янв", 2: "Фев", 3: "Мар", 4: "Апр", 5: "Май", 6: "Июн",
     7: "Июл", 8: "Авг", 9: "Сен", 10: "Окт", 11: "Ноя", 12: "Дек",
@@ -286,44 +279,17 @@ class BudgetReportService:
         self, account_id: int, dt_start: datetime, dt_end: datetime,
         periods: List[Dict], op_type: str,
     ) -> Dict[Tuple[int, int], Decimal]:
-        """Load fact from TransactionFeed using CASE WHEN bucketing.
+        """Load fact from the budget fact cube, bucketed by period.
         Returns {(category_id, month_idx): amount}."""
         if not periods:
             return {}
-
-        whens = []
-        for p in periods:
-            s = p["range_start"]
-            e = p["range_end"]
-            cond = and_(
-                BUDGET_DT >= datetime(s.year, s.month, s.day),
-                BUDGET_DT < datetime(e.year, e.month, e.day),
-            )
-            whens.append((cond, literal(p["index"])))
-
-        period_col = case(*whens, else_=literal(-1)).label("period_idx")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.category_id,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == op_type,
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.category_id, period_col)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, dt_start, dt_end,
+            [BudgetFactCube.category_id],
+            BudgetFactCube.operation_type == op_type,
+            periods=periods,
         )
-
-        result: Dict[Tuple[int, int], Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.category_id, row.period_idx)] = row.total or _ZERO
-        return result
+        return {(row.category_id or None, row.period_idx): row.total or _ZERO for row in rows}
 
     def _load_goal_deposits(
         self, account_id: int, dt_start: datetime, dt_end: datetime,
@@ -332,46 +298,15 @@ class BudgetReportService:
         """REGULAR -> SAVINGS transfers by (goal_id, month_idx)."""
         if not periods:
             return {}
-
-        whens = []
-        for p in periods:
-            s = p["range_start"]
-            e = p["range_end"]
-            cond = and_(
-                BUDGET_DT >= datetime(s.year, s.month, s.day),
-                BUDGET_DT < datetime(e.year, e.month, e.day),
-            )
-            whens.append((cond, literal(p["index"])))
-        period_col = case(*whens, else_=literal(-1)).label("period_idx")
-
-        from_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("from_w")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.to_goal_id,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .join(from_wallet, TransactionFeed.from_wallet_id == from_wallet.c.wallet_id)
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == "TRANSFER",
-                TransactionFeed.to_goal_id.isnot(None),
-                from_wallet.c.wallet_type == "REGULAR",
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.to_goal_id, period_col)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, dt_start, dt_end,
+            [BudgetFactCube.to_goal_id],
+            BudgetFactCube.operation_type == "TRANSFER",
+            BudgetFactCube.to_goal_id != 0,
+            BudgetFactCube.from_wallet_type == "REGULAR",
+            periods=periods,
         )
-
-        result: Dict[Tuple[int, int], Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.to_goal_id, row.period_idx)] = row.total or _ZERO
-        return result
+        return {(row.to_goal_id, row.period_idx): row.total or _ZERO for row in rows}
 
     def _load_goal_withdrawals(
         self, account_id: int, dt_start: datetime, dt_end: datetime,
@@ -380,51 +315,16 @@ class BudgetReportService:
         """SAVINGS -> REGULAR transfers by (goal_id, month_idx)."""
         if not periods:
             return {}
-
-        whens = []
-        for p in periods:
-            s = p["range_start"]
-            e = p["range_end"]
-            cond = and_(
-                BUDGET_DT >= datetime(s.year, s.month, s.day),
-                BUDGET_DT < datetime(e.year, e.month, e.day),
-            )
-            whens.append((cond, literal(p["index"])))
-        period_col = case(*whens, else_=literal(-1)).label("period_idx")
-
-        from_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("from_w")
-        to_wallet = self.db.query(
-            WalletBalance.wallet_id, WalletBalance.wallet_type,
-        ).subquery("to_w")
-
-        rows = (
-            self.db.query(
-                TransactionFeed.from_goal_id,
-                period_col,
-                func.sum(TransactionFeed.amount).label("total"),
-            )
-            .join(from_wallet, TransactionFeed.from_wallet_id == from_wallet.c.wallet_id)
-            .join(to_wallet, TransactionFeed.to_wallet_id == to_wallet.c.wallet_id)
-            .filter(
-                TransactionFeed.account_id == account_id,
-                TransactionFeed.operation_type == "TRANSFER",
-                TransactionFeed.from_goal_id.isnot(None),
-                from_wallet.c.wallet_type == "SAVINGS",
-                to_wallet.c.wallet_type == "REGULAR",
-                BUDGET_DT >= dt_start,
-                BUDGET_DT < dt_end,
-            )
-            .group_by(TransactionFeed.from_goal_id, period_col)
-            .all()
+        rows = sum_facts(
+            self.db, account_id, dt_start, dt_end,
+            [BudgetFactCube.from_goal_id],
+            BudgetFactCube.operation_type == "TRANSFER",
+            BudgetFactCube.from_goal_id != 0,
+            BudgetFactCube.from_wallet_type == "SAVINGS",
+            BudgetFactCube.to_wallet_type == "REGULAR",
+            periods=periods,
         )
-
-        result: Dict[Tuple[int, int], Decimal] = {}
-        for row in rows:
-            if row.period_idx >= 0:
-                result[(row.from_goal_id, row.period_idx)] = row.total or _ZERO
-        return result
+        return {(row.from_goal_id, row.period_idx): row.total or _ZERO for row in rows}
 
     def _load_goal_plans(
         self, account_id: int, variant_id: int | None,
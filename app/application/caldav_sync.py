@@ -0,0 +1,161 @@
+"""
+CalDAV sync state — per-account change counter + change journal.
+
+iPhone Reminders polls the tasks calendar constantly. Instead of rebuilding
+every VTODO on each poll, the collection carries a counter:
+
+  caldav_sync_state.seq  — getctag / sync-token, +1 per flush that
+                           changed the account's tasks;
+  caldav_changes         — last change per task: (task_id, seq, deleted).
+
+An unchanged calendar is one PK lookup. sync-collection (RFC 6578) with an
+old token returns only tasks with seq > token; archived/deleted tasks stay
+in the journal as tombstones and are reported as 404.
+
+Maintenance:
+- ORM flushes touching tasks or task reminders are stamped in the same
+  transaction (Session after_flush hook below) — PATCH /api/v2/tasks,
+  board moves, due-date pages etc. need no explicit call.
+- Core bulk writes bypass the hook: their writers call record_changes()
+  (TasksProjector, reminder deletes); the caller commits.
+"""
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import CalDAVChange, CalDAVSyncState, TaskModel, TaskReminderModel
+from app.infrastructure.db.upsert import dialect_insert
+
+
+def current_seq(db: Session, account_id: int) -> int:
+    """Collection version (0 — изменений ещё не было)."""
+    seq = db.query(CalDAVSyncState.seq).filter(CalDAVSyncState.account_id == account_id).scalar()
+    return seq or 0
+
+
+def record_changes(db: Session, account_id: int, task_ids: Iterable[int]) -> int | None:
+    """
+    Stamp tasks changed in the current transaction with a new seq
+
+    deleted вычисляется по текущему состоянию read model: задачи нет
+    или она в архиве — надгробие. Возвращает новый seq (None — нечего писать).
+    ORM-правки из той же сессии получают тот же seq (flush ниже).
+    """
+    task_ids = {int(t) for t in task_ids if t is not None}
+    if not task_ids:
+        return None
+    db.info.setdefault(_PENDING_KEY, {}).setdefault(account_id, set()).update(task_ids)
+    db.flush()
+    # Если flush был пустым, хук не сработал — штампуем сами
+    return _stamp_pending(db).get(account_id) or db.info.get(_SEQ_KEY, {}).get(account_id)
+
+
+def _stamp(db: Session, account_id: int, task_ids: set[int]) -> int:
+    seq = _next_seq(db, account_id)
+    live = {
+        task_id for (task_id,) in db.query(TaskModel.task_id).filter(
+            TaskModel.account_id == account_id,
+            TaskModel.task_id.in_(task_ids),
+            TaskModel.status != "ARCHIVED",
+        )
+    }
+    stmt = dialect_insert(db, CalDAVChange).values([
+        {"account_id": account_id, "task_id": task_id, "seq": seq, "deleted": task_id not in live}
+        for task_id in sorted(task_ids)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id", "task_id"],
+        set_={"seq": stmt.excluded.seq, "deleted": stmt.excluded.deleted},
+    )
+    db.execute(stmt)
+    return seq
+
+
+def changes_since(db: Session, account_id: int, seq: int) -> list[CalDAVChange]:
+    """Journal rows with seq > given token, oldest first."""
+    return (
+        db.query(CalDAVChange)
+        .filter(CalDAVChange.account_id == account_id, CalDAVChange.seq > seq)
+        .order_by(CalDAVChange.seq, CalDAVChange.task_id)
+        .all()
+    )
+
+
+def task_seqs(db: Session, account_id: int, task_ids: Iterable[int] | None = None) -> dict[int, int]:
+    """{task_id: seq} for live tasks (все задачи аккаунта, если task_ids не задан)."""
+    q = db.query(CalDAVChange.task_id, CalDAVChange.seq).filter(
+        CalDAVChange.account_id == account_id,
+        CalDAVChange.deleted.is_(False),
+    )
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+        q = q.filter(CalDAVChange.task_id.in_(task_ids))
+    return dict(q.all())
+
+
+def _next_seq(db: Session, account_id: int) -> int:
+    # UPSERT держит блокировку строки до коммита: конкурирующие писатели
+    # одного аккаунта получают seq в порядке коммитов
+    stmt = dialect_insert(db, CalDAVSyncState).values(account_id=account_id, seq=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id"],
+        set_={"seq": CalDAVSyncState.seq + 1},
+    ).returning(CalDAVSyncState.seq)
+    return db.execute(stmt).scalar_one()
+
+
+# ── Session hook ──
+
+_PENDING_KEY = "caldav_sync_pending"
+_SEQ_KEY = "caldav_sync_seq"
+
+
+def _stamp_pending(db: Session) -> dict[int, int]:
+    """Stamp collected task_ids; {account_id: seq} (также в db.info для record_changes)."""
+    pending = db.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return {}
+    orphans = pending.pop(None, set())
+    if orphans:
+        # Напоминания знают только task_id — аккаунт берём из задачи
+        for task_id, account_id in db.execute(
+            select(TaskModel.task_id, TaskModel.account_id).where(TaskModel.task_id.in_(orphans))
+        ):
+            pending.setdefault(account_id, set()).add(task_id)
+    seqs = {
+        account_id: _stamp(db, account_id, task_ids)
+        for account_id, task_ids in sorted(pending.items())
+        if task_ids
+    }
+    db.info[_SEQ_KEY] = seqs
+    return seqs
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    """Remember which tasks changed in this flush."""
+    pending = None
+    changed = [o for o in session.dirty if session.is_modified(o, include_collections=False)]
+    for obj in (*session.new, *changed, *session.deleted):
+        if isinstance(obj, TaskModel):
+            key = obj.account_id
+        elif isinstance(obj, TaskReminderModel):
+            key = None
+        else:
+            continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, {})
+        pending.setdefault(key, set()).add(obj.task_id)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _stamp_changes(session: Session, flush_context) -> None:
+    _stamp_pending(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
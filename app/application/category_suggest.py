@@ -0,0 +1,696 @@
+"""
+Category suggestion model — precomputed per (account, operation_type).
+
+POST /api/v2/transactions/suggest-category is called while the user types an
+amount; instead of scanning 180 days of transactions_feed and
+category_suggest_log on every keystroke it scores a compact model:
+
+  per category — log-amount histogram (buckets of ~0.5%, with count, mean
+    date and the last few dates per bucket), wallet / hour-of-day / weekend
+    priors, roundness profile, log-amount moments, description tokens and
+    the last distinct dates;
+  per account — correction counts (amount bucket, wallet, suggested, chosen).
+
+A suggestion is then O(categories × nearby buckets), no history scan.
+
+Maintenance:
+  TransactionsFeedProjector feeds new categorized INCOME/EXPENSE rows in
+  (observe), edits and cancellations drop the model (rebuilt lazily from the
+  feed, once); suggest-log writes add corrections (record_correction).
+  The model window is [since, ∞): it is rebuilt when `since` lags the
+  lookback window by more than MODEL_MAX_AGE_DAYS.
+
+Storage: category_suggest_models (JSON payload + version), L1 — in-process
+LRU keyed by (account_id, operation_type) and checked against the row
+version with one primary-key query per call.
+
+The scoring mirrors the k-NN of the original implementation; per-row factors
+(wallet, hour, weekday/weekend, description) become per-category priors.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.infrastructure.db.models import (
+    CategorySuggestLog,
+    CategorySuggestModel,
+    TransactionFeed,
+)
+from app.infrastructure.db.upsert import dialect_insert
+
+LOOKBACK_DAYS = 180          # ловим и помесячные платежи (≈6 повторов)
+MODEL_MAX_AGE_DAYS = 7       # окно модели «сползает» не больше чем на неделю
+SUGGEST_TYPES = ("INCOME", "EXPENSE")
+
+_AMOUNT_SIGMA = 0.12          # «ширина» похожести суммы (~±12% — сильное совпадение)
+_WALLET_OTHER = 0.45         # вес операции с другого кошелька
+_TIME_OTHER = 0.80           # вес операции в другое время суток
+_DOW_OTHER = 0.90            # вес операции в другой тип дня (будни/выходной)
+_DOM_BONUS = 1.15            # бонус за близкий день месяца (повторяющиеся платежи)
+_TEXT_BONUS = 1.6            # бонус за совпадение описания внутри k-NN
+_MIN_TOTAL_WEIGHT = 0.8      # минимум «похожей истории», иначе не подсказываем
+_NEAR_EXACT = 0.90           # порог «почти точное совпадение суммы»
+_MIN_CONFIDENCE = 0.45
+
+_BUCKET_STEP = 0.005         # ширина корзины суммы в лог-шкале (~0.5%)
+_MIN_SIMILARITY = 0.05       # дальше — сумма совсем другая
+# |a - b| / max(a, b, 500) при _amount_similarity == _MIN_SIMILARITY
+_MAX_REL_DIFF = _AMOUNT_SIGMA * math.sqrt(-2 * math.log(_MIN_SIMILARITY))
+_BUCKET_DATES = 6            # последних дат на корзину (периодичность, день месяца)
+_CATEGORY_DATES = 16         # последних различных дат на категорию («уже было сегодня»)
+_MAX_TOKENS = 48             # токенов описания на категорию
+
+_ROUND_CLASSES = ("kop", "r1000", "r100", "odd")
+
+# Служебные слова, не несущие категорию
+_STOP_TOKENS = {
+    "оплата", "покупка", "покупки", "перевод", "платеж", "платёж", "магазин",
+    "оплатить", "счет", "счёт", "карта", "карты", "рублей", "руб",
+}
+
+
+# ── Scoring primitives ──
+
+def amount_similarity(a: float, b: float) -> float:
+    """1.0 — суммы совпадают; плавно убывает с разницей (гаусс).
+
+    Для мелких сумм знаменатель прижат к 500: 120 и 180 ₽ — это «похоже»
+    (обе — кофе), хотя относительная разница 33%.
+    """
+    if a <= 0 or b <= 0:
+        return 0.0
+    d = abs(a - b) / max(a, b, 500.0)
+    return math.exp(-(d * d) / (2 * _AMOUNT_SIGMA * _AMOUNT_SIGMA))
+
+
+def desc_tokens(s: str | None) -> set[str]:
+    """Нормализованные токены описания: lower, ё→е, только буквы, ≥3 символов."""
+    if not s:
+        return set()
+    s = s.lower().replace("ё", "е")
+    s = re.sub(r"[^а-яa-z ]", " ", s)
+    return {t for t in s.split() if len(t) >= 3 and t not in _STOP_TOKENS}
+
+
+def text_match(q_tokens: set[str], row_tokens: Iterable[str]) -> bool:
+    """Совпадение описаний: общий токен или общий префикс ≥4 (склонения)."""
+    if not q_tokens:
+        return False
+    for rt in row_tokens:
+        if rt in q_tokens:
+            return True
+        for qt in q_tokens:
+            if len(qt) < 4:
+                continue
+            if rt.startswith(qt[:4]) or (len(rt) >= 4 and qt.startswith(rt[:4])):
+                return True
+    return False
+
+
+def roundness_class(a: float) -> str:
+    """Круглость: 5000 ровно — перевод/подарок, 4873.50 — магазинный чек."""
+    if abs(a - round(a)) > 0.004:
+        return "kop"
+    ai = int(round(a))
+    if ai % 1000 == 0:
+        return "r1000"
+    if ai % 100 == 0:
+        return "r100"
+    return "odd"
+
+
+def _dom_close(d1: int, d2: int) -> bool:
+    """Циклическая близость дня месяца (±2 дня): ипотека 1-го ≈ 30-го."""
+    diff = abs(d1 - d2)
+    return min(diff, 31 - diff) <= 2
+
+
+def _median(xs: list) -> float:
+    ys = sorted(xs)
+    n = len(ys)
+    mid = n // 2
+    return float(ys[mid]) if n % 2 else (ys[mid - 1] + ys[mid]) / 2.0
+
+
+def _median_gap(ordinals: Iterable[int]) -> float | None:
+    days = sorted(set(ordinals))
+    gaps = [b - a for a, b in zip(days, days[1:])]
+    return _median(gaps) if gaps else None
+
+
+def _hour_factor(h1: int, h2: int) -> float:
+    """Циклическая близость по часу (σ≈3 ч): 11:59 и 12:01 — одно и то же время."""
+    hd = abs(h1 - h2)
+    hd = min(hd, 24 - hd)
+    return _TIME_OTHER + (1.0 - _TIME_OTHER) * math.exp(-(hd * hd) / 18.0)
+
+
+def bucket_of(amount: float) -> int:
+    return round(math.log(amount) / _BUCKET_STEP)
+
+
+def bucket_center(bucket: int) -> float:
+    return math.exp(bucket * _BUCKET_STEP)
+
+
+def _push_recent(dates: list[int], ordinal: int, limit: int, distinct: bool = False) -> None:
+    """Вставить дату в отсортированный список последних `limit` дат."""
+    if distinct and ordinal in dates:
+        return
+    dates.append(ordinal)
+    dates.sort()
+    del dates[:-limit]
+
+
+# ── Model ──
+
+class _CategoryStats:
+    """Histograms and priors of one category."""
+
+    __slots__ = ("n", "log_sum", "log_sq", "rounds", "wallets", "hours",
+                 "weekend", "buckets", "tokens", "days")
+
+    def __init__(self):
+        self.n = 0
+        self.log_sum = 0.0
+        self.log_sq = 0.0
+        self.rounds = dict.fromkeys(_ROUND_CLASSES, 0)
+        self.wallets: dict[int, int] = {}
+        self.hours = [0] * 24
+        self.weekend = 0
+        # bucket -> [count, сумма ordinal'ов дат, последние даты]
+        self.buckets: dict[int, list] = {}
+        self.tokens: dict[str, int] = {}
+        self.days: list[int] = []
+
+    def add(self, amount: float, wallet_id: int | None, occurred_at: datetime,
+            description: str | None) -> None:
+        ordinal = occurred_at.toordinal()
+        la = math.log(amount)
+        self.n += 1
+        self.log_sum += la
+        self.log_sq += la * la
+        self.rounds[roundness_class(amount)] += 1
+        if wallet_id is not None:
+            self.wallets[wallet_id] = self.wallets.get(wallet_id, 0) + 1
+        self.hours[occurred_at.hour] += 1
+        if occurred_at.weekday() >= 5:
+            self.weekend += 1
+
+        entry = self.buckets.setdefault(bucket_of(amount), [0, 0, []])
+        entry[0] += 1
+        entry[1] += ordinal
+        _push_recent(entry[2], ordinal, _BUCKET_DATES)
+        _push_recent(self.days, ordinal, _CATEGORY_DATES, distinct=True)
+
+        for token in desc_tokens(description):
+            self.tokens[token] = self.tokens.get(token, 0) + 1
+        if len(self.tokens) > _MAX_TOKENS:
+            keep = sorted(self.tokens.items(), key=lambda kv: kv[1], reverse=True)[:_MAX_TOKENS]
+            self.tokens = dict(keep)
+
+    def wallet_share(self, wallet_id: int | None) -> float:
+        if wallet_id is None or not self.n:
+            return 0.0
+        return self.wallets.get(wallet_id, 0) / self.n
+
+    def near_buckets(self, amount: float):
+        """(center, entry) корзин, похожих на сумму (similarity ≥ 0.05)."""
+        lo = amount - _MAX_REL_DIFF * max(amount, 500.0)
+        hi = max(amount + _MAX_REL_DIFF * 500.0, amount / (1.0 - _MAX_REL_DIFF))
+        hi_b = bucket_of(hi) + 1
+        lo_b = bucket_of(lo) - 1 if lo > 0 else None
+        if lo_b is None or hi_b - lo_b > len(self.buckets):
+            candidates = ((b, e) for b, e in self.buckets.items()
+                          if b <= hi_b and (lo_b is None or b >= lo_b))
+        else:
+            candidates = ((b, self.buckets[b]) for b in range(lo_b, hi_b + 1) if b in self.buckets)
+        for b, entry in candidates:
+            yield bucket_center(b), entry
+
+    def to_json(self) -> list:
+        return [
+            self.n, self.log_sum, self.log_sq,
+            [self.rounds[c] for c in _ROUND_CLASSES],
+            {str(k): v for k, v in self.wallets.items()},
+            self.hours, self.weekend,
+            {str(k): v for k, v in self.buckets.items()},
+            self.tokens, self.days,
+        ]
+
+    @classmethod
+    def from_json(cls, data: list) -> "_CategoryStats":
+        s = cls()
+        (s.n, s.log_sum, s.log_sq, rounds, wallets, s.hours, s.weekend,
+         buckets, s.tokens, s.days) = data
+        s.rounds = dict(zip(_ROUND_CLASSES, rounds))
+        s.wallets = {int(k): v for k, v in wallets.items()}
+        s.buckets = {int(k): v for k, v in buckets.items()}
+        return s
+
+
+class SuggestModel:
+    """
+    Suggestion model of one (account, operation_type)
+
+    since — начало окна модели: операции раньше этой даты не учитываются.
+    """
+
+    def __init__(self, since: date):
+        self.since = since
+        self.categories: dict[int, _CategoryStats] = {}
+        # (bucket, wallet_id, suggested, chosen) -> сколько раз юзер исправил
+        self.corrections: dict[tuple[int, int | None, int, int], int] = {}
+
+    @property
+    def size(self) -> int:
+        return sum(c.n for c in self.categories.values())
+
+    def observe(self, category_id: int | None, amount, wallet_id: int | None,
+                occurred_at: datetime | None, description: str | None) -> bool:
+        """Учесть операцию; False — она вне модели (без категории/вне окна)."""
+        if category_id is None or occurred_at is None:
+            return False
+        amount = float(amount)
+        if amount <= 0 or occurred_at.date() < self.since:
+            return False
+        stats = self.categories.get(category_id)
+        if stats is None:
+            stats = self.categories[category_id] = _CategoryStats()
+        stats.add(amount, wallet_id, occurred_at, description)
+        return True
+
+    def observe_correction(self, amount, wallet_id: int | None, suggested: int,
+                           chosen: int | None, accepted: bool) -> bool:
+        """Учесть «подсказали X → юзер выбрал Y» (принятые подсказки не нужны)."""
+        amount = float(amount)
+        if accepted or not chosen or amount <= 0:
+            return False
+        key = (bucket_of(amount), wallet_id, suggested, chosen)
+        self.corrections[key] = self.corrections.get(key, 0) + 1
+        return True
+
+    # --- Storage ---
+
+    def to_json(self) -> dict:
+        return {
+            "since": self.since.isoformat(),
+            "categories": {str(cid): s.to_json() for cid, s in self.categories.items()},
+            "corrections": [[*key, n] for key, n in self.corrections.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SuggestModel":
+        model = cls(date.fromisoformat(data["since"]))
+        model.categories = {
+            int(cid): _CategoryStats.from_json(s) for cid, s in data["categories"].items()
+        }
+        model.corrections = {
+            (b, w, s, c): n for b, w, s, c, n in data["corrections"]
+        }
+        return model
+
+    # --- Scoring ---
+
+    def _correction_multipliers(self, amount: float, wallet_id: int | None) -> dict[int, float]:
+        """Обучение на исправлениях: прошлые «подсказали X → юзер выбрал Y»."""
+        corr: dict[int, float] = {}
+        for (bucket, c_wallet, suggested, chosen), n in self.corrections.items():
+            if amount_similarity(amount, bucket_center(bucket)) < 0.5:
+                continue
+            if wallet_id is not None and c_wallet is not None and c_wallet != wallet_id:
+                continue
+            corr[suggested] = corr.get(suggested, 1.0) * 0.75 ** n
+            corr[chosen] = corr.get(chosen, 1.0) * 1.15 ** n
+        return {k: min(1.4, max(0.5, v)) for k, v in corr.items()}
+
+    def suggest(
+        self,
+        amount: float,
+        wallet_id: int | None = None,
+        hour: int | None = None,
+        description: str | None = None,
+        target_date: date | None = None,
+        today: date | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Top-3 categories: [{category_id, confidence, exact, reason}]
+
+        Уровни (от сильного к слабому): описание → точный повтор суммы →
+        k-NN по корзинам сумм с категорийными факторами.
+        """
+        if self.size < 3 or amount <= 0:
+            return []
+        today = today or date.today()
+        target_date = target_date or today
+        target_ord = target_date.toordinal()
+        target_weekend = target_date.weekday() >= 5
+        corr = self._correction_multipliers(amount, wallet_id)
+
+        # ── Уровень 1: совпадение описания (текст — сильнее суммы) ──
+        q_tokens = desc_tokens(description)
+        text_hits: dict[int, int] = {}
+        if q_tokens:
+            for cid, s in self.categories.items():
+                hits = sum(n for t, n in s.tokens.items() if text_match(q_tokens, (t,)))
+                if hits:
+                    text_hits[cid] = min(hits, s.n)
+            if sum(text_hits.values()) >= 2:
+                text_cat = {}
+                for cid, hits in text_hits.items():
+                    share_w = self.categories[cid].wallet_share(wallet_id)
+                    text_cat[cid] = hits * (share_w + 0.8 * (1.0 - share_w))
+                best_cid = max(text_cat, key=lambda c: text_cat[c])
+                share = text_cat[best_cid] / sum(text_cat.values())
+                if share >= 0.65:
+                    return [{
+                        "category_id": best_cid,
+                        "confidence": round(max(0.85, share), 4),
+                        "exact": True,
+                        "reason": "по описанию",
+                    }]
+
+        # ── Уровень 2: точный повтор суммы (сильнейший сигнал) ──
+        # «Ровно такая же сумма уже была — почти всегда та же категория»
+        # (857 ₽ → связь, 3200 ₽ → транспорт). Узкий допуск, чтобы 850 не примешалось.
+        exact_tol = max(1.0, amount * 0.005)   # ±0.5%, минимум 1 ₽
+        exact_cat: dict[int, float] = {}
+        exact_rows = 0
+        for cid, s in self.categories.items():
+            n_exact = sum(e[0] for center, e in s.near_buckets(amount)
+                          if abs(center - amount) <= exact_tol)
+            if n_exact:
+                share_w = s.wallet_share(wallet_id)
+                exact_cat[cid] = n_exact * (share_w + 0.7 * (1.0 - share_w))
+                exact_rows += n_exact
+        if exact_rows >= 2:
+            best_cid = max(exact_cat, key=lambda c: exact_cat[c])
+            share = exact_cat[best_cid] / sum(exact_cat.values())
+            # не повторяем подтверждённую юзером ошибку на этой же сумме
+            if share >= 0.6 and corr.get(best_cid, 1.0) >= 0.8:
+                return [{
+                    "category_id": best_cid,
+                    "confidence": round(max(0.85, share), 4),
+                    "exact": True,
+                    "reason": "повторяющийся платёж",
+                }]
+
+        # ── Уровень 3: похожие суммы (weighted k-NN по корзинам) ──
+        today_ord = today.toordinal()
+        la = math.log(amount)
+        round_cls = roundness_class(amount)
+        # cid -> (вес k-NN, вес с пост-факторами, похожих операций, периодичная,
+        #         лучшая близость суммы, похожих с этого кошелька)
+        scored: dict[int, tuple[float, float, int, bool, float, int]] = {}
+        for cid, s in self.categories.items():
+            base = 0.0
+            best_sim = 0.0
+            contrib = 0
+            similar_dates: list[int] = []
+            for center, (count, ord_sum, recent) in s.near_buckets(amount):
+                a_sim = amount_similarity(amount, center)
+                if a_sim < _MIN_SIMILARITY:
+                    continue
+                age_days = max(0.0, today_ord - ord_sum / count)
+                recency = max(0.6, 1.0 - (age_days / LOOKBACK_DAYS) * 0.4)
+                # День месяца: почти та же сумма в те же числа = повторяющийся платёж
+                dom_factor = 1.0
+                if a_sim >= 0.5:
+                    close = sum(1 for o in recent
+                                if _dom_close(target_date.day, date.fromordinal(o).day))
+                    dom_factor += (_DOM_BONUS - 1.0) * close / len(recent)
+                    contrib += count
+                    similar_dates.extend(recent)
+                base += count * a_sim * recency * dom_factor
+                best_sim = max(best_sim, a_sim)
+            if base <= 0:
+                continue
+
+            share_w = s.wallet_share(wallet_id)
+            w = base * (share_w + _WALLET_OTHER * (1.0 - share_w))
+            if hour is not None:
+                w *= sum(n * _hour_factor(h, hour) for h, n in enumerate(s.hours) if n) / s.n
+            same_kind = s.weekend if target_weekend else s.n - s.weekend
+            w *= (same_kind + _DOW_OTHER * (s.n - same_kind)) / s.n
+            if cid in text_hits:
+                w *= 1.0 + (_TEXT_BONUS - 1.0) * text_hits[cid] / s.n
+
+            # ── Пост-факторы уровня категории ──
+            m = 1.0
+            # Типичность суммы для распределения категории (лог-нормаль)
+            if s.n >= 4:
+                mean = s.log_sum / s.n
+                sd = max(max(0.0, s.log_sq / s.n - mean * mean) ** 0.5, 0.10)
+                z = abs(la - mean) / sd
+                m *= 0.7 + 0.6 * math.exp(-(z * z) / 2.0)
+                # Круглость суммы против профиля категории
+                m *= 0.9 + 0.2 * s.rounds[round_cls] / s.n
+            # Профиль кошелька: «родной» кошелёк категории — буст, чужой — штраф
+            if wallet_id is not None and s.n >= 5:
+                m *= 0.75 + 0.5 * share_w
+            # Периодичность: похожая сумма повторяется с шагом ~N дней,
+            # и с последнего раза прошло примерно N
+            periodic = False
+            if len(set(similar_dates)) >= 3:
+                med = _median_gap(similar_dates)
+                since_last = target_ord - max(similar_dates)
+                if 5 <= med <= 45 and abs(since_last - med) <= max(2.0, med * 0.2):
+                    m *= 1.2
+                    periodic = True
+            # «Уже было сегодня» для категорий с типичным шагом ≥2 дней
+            if target_ord in s.days and len(s.days) >= 3:
+                med_all = _median_gap(s.days)
+                if med_all is not None and med_all >= 2:
+                    m *= 0.8
+            # Обучение на исправлениях: не повторяем свои ошибки
+            m *= corr.get(cid, 1.0)
+
+            same_wallet = round(contrib * share_w)
+            scored[cid] = (w, w * m, contrib, periodic, best_sim, same_wallet)
+
+        if sum(v[0] for v in scored.values()) < _MIN_TOTAL_WEIGHT:
+            return []   # нет осмысленно похожей истории
+        total_adj = sum(v[1] for v in scored.values())
+        if total_adj <= 0:
+            return []
+
+        results = []
+        for cid, (_, adjusted, contrib, periodic, best_sim, same_wallet) in scored.items():
+            confidence = adjusted / total_adj
+            near_exact = best_sim >= _NEAR_EXACT
+            # нужна реальная опора: либо ≥2 похожих операции, либо одна почти точная
+            if not (contrib >= 2 or near_exact):
+                continue
+            # слабые кандидаты не показываем даже чипом
+            if confidence < 0.25:
+                continue
+            if near_exact:
+                reason = "повторяющийся платёж"
+            elif periodic:
+                reason = "регулярный платёж"
+            elif same_wallet >= 2:
+                reason = "похожие траты с этого кошелька"
+            else:
+                reason = "по похожим суммам"
+            results.append({
+                "category_id": cid,
+                "confidence": round(confidence, 4),
+                # exact управляет автоподстановкой — требуем и точную сумму, и уверенность
+                "exact": near_exact and confidence >= _MIN_CONFIDENCE,
+                "reason": reason,
+            })
+
+        results.sort(key=lambda r: (r["exact"], r["confidence"]), reverse=True)
+        return results[:3]
+
+
+# ── L1: in-process LRU ──
+
+_lru: OrderedDict[tuple[int, str], tuple[int, SuggestModel]] = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def _lru_get(key: tuple[int, str], version: int) -> SuggestModel | None:
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        _lru.move_to_end(key)
+        return entry[1]
+
+
+def _lru_put(key: tuple[int, str], version: int, model: SuggestModel) -> None:
+    with _lru_lock:
+        _lru[key] = (version, model)
+        _lru.move_to_end(key)
+        while len(_lru) > get_settings().CATEGORY_SUGGEST_CACHE_SIZE:
+            _lru.popitem(last=False)
+
+
+def invalidate_all() -> None:
+    """Drop the in-process LRU (tests)."""
+    with _lru_lock:
+        _lru.clear()
+
+
+# ── Build & load ──
+
+def _window_start(today: date) -> date:
+    return today - timedelta(days=LOOKBACK_DAYS)
+
+
+def build_model(db: Session, account_id: int, operation_type: str,
+                today: date | None = None) -> SuggestModel:
+    """Собрать модель с нуля: одна выборка ленты + одна выборка лога подсказок."""
+    since = _window_start(today or date.today())
+    since_dt = datetime.combine(since, datetime.min.time())
+    model = SuggestModel(since)
+    rows = db.query(
+        TransactionFeed.category_id,
+        TransactionFeed.amount,
+        TransactionFeed.wallet_id,
+        TransactionFeed.occurred_at,
+        TransactionFeed.description,
+    ).filter(
+        TransactionFeed.account_id == account_id,
+        TransactionFeed.operation_type == operation_type,
+        TransactionFeed.category_id.isnot(None),
+        TransactionFeed.occurred_at >= since_dt,
+    ).order_by(TransactionFeed.occurred_at).all()
+    for row in rows:
+        model.observe(row.category_id, row.amount, row.wallet_id, row.occurred_at, row.description)
+
+    logs = db.query(
+        CategorySuggestLog.amount,
+        CategorySuggestLog.wallet_id,
+        CategorySuggestLog.suggested_category_id,
+        CategorySuggestLog.chosen_category_id,
+    ).filter(
+        CategorySuggestLog.account_id == account_id,
+        CategorySuggestLog.operation_type == operation_type,
+        CategorySuggestLog.accepted == False,  # noqa: E712
+        CategorySuggestLog.created_at >= since_dt,
+    ).all()
+    for log in logs:
+        model.observe_correction(log.amount, log.wallet_id, log.suggested_category_id,
+                                 log.chosen_category_id, accepted=False)
+    return model
+
+
+def _save(model: SuggestModel, row: CategorySuggestModel) -> None:
+    row.since = model.since
+    row.payload = model.to_json()
+    row.version += 1
+    row.updated_at = datetime.now(timezone.utc)
+
+
+def load_model(db: Session, account_id: int, operation_type: str,
+               today: date | None = None) -> SuggestModel:
+    """
+    Model for scoring: LRU hit (one version query), stored payload, or rebuild
+
+    Пересобранная модель сохраняется и коммитится — это read model,
+    вызывающий (suggest-category) ничего своего не пишет.
+    """
+    today = today or date.today()
+    key = (account_id, operation_type)
+    head = db.query(CategorySuggestModel.version, CategorySuggestModel.since).filter(
+        CategorySuggestModel.account_id == account_id,
+        CategorySuggestModel.operation_type == operation_type,
+    ).first()
+    stale = head is None or head.since < _window_start(today) - timedelta(days=MODEL_MAX_AGE_DAYS)
+
+    if not stale:
+        model = _lru_get(key, head.version)
+        if model is not None:
+            return model
+        payload = db.query(CategorySuggestModel.payload).filter(
+            CategorySuggestModel.account_id == account_id,
+            CategorySuggestModel.operation_type == operation_type,
+        ).scalar()
+        model = SuggestModel.from_json(payload)
+        _lru_put(key, head.version, model)
+        return model
+
+    # Upsert: параллельная пересборка в другом воркере не падает на PK;
+    # в LRU модель попадёт со следующим вызовом (версию знает только БД)
+    model = build_model(db, account_id, operation_type, today)
+    stmt = dialect_insert(db, CategorySuggestModel).values(
+        account_id=account_id, operation_type=operation_type, since=model.since,
+        version=1, payload=model.to_json(), updated_at=datetime.now(timezone.utc),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["account_id", "operation_type"],
+        set_={
+            "since": stmt.excluded.since,
+            "payload": stmt.excluded.payload,
+            "updated_at": stmt.excluded.updated_at,
+            "version": CategorySuggestModel.version + 1,
+        },
+    )
+    db.execute(stmt)
+    db.commit()
+    return model
+
+
+# ── Incremental maintenance ──
+
+def _locked_row(db: Session, account_id: int, operation_type: str) -> CategorySuggestModel | None:
+    return db.query(CategorySuggestModel).filter(
+        CategorySuggestModel.account_id == account_id,
+        CategorySuggestModel.operation_type == operation_type,
+    ).with_for_update().first()
+
+
+def observe_transactions(db: Session, rows: Iterable[TransactionFeed]) -> None:
+    """
+    Add new feed rows to the stored models (TransactionsFeedProjector)
+
+    Модели нет — ничего не делаем: её соберёт первый load_model().
+    Пишет в сессию вызывающего, коммит — его.
+    """
+    groups: dict[tuple[int, str], list[TransactionFeed]] = defaultdict(list)
+    for tx in rows:
+        if tx.operation_type in SUGGEST_TYPES and tx.category_id is not None:
+            groups[(tx.account_id, tx.operation_type)].append(tx)
+    for (account_id, operation_type), txs in groups.items():
+        row = _locked_row(db, account_id, operation_type)
+        if row is None:
+            continue
+        model = SuggestModel.from_json(row.payload)
+        changed = False
+        for tx in txs:
+            changed |= model.observe(tx.category_id, tx.amount, tx.wallet_id,
+                                     tx.occurred_at, tx.description)
+        if changed:
+            _save(model, row)
+
+
+def drop_models(db: Session, keys: Iterable[tuple[int, str]]) -> None:
+    """Forget models after edits/cancellations — rebuilt lazily on next use."""
+    for account_id, operation_type in set(keys):
+        db.query(CategorySuggestModel).filter(
+            CategorySuggestModel.account_id == account_id,
+            CategorySuggestModel.operation_type == operation_type,
+        ).delete(synchronize_session=False)
+
+
+def record_correction(db: Session, log: CategorySuggestLog) -> None:
+    """Add a suggest-log entry to the stored model (caller commits)."""
+    if log.accepted or not log.chosen_category_id:
+        return
+    row = _locked_row(db, log.account_id, log.operation_type)
+    if row is None:
+        return
+    model = SuggestModel.from_json(row.payload)
+    if model.observe_correction(log.amount, log.wallet_id, log.suggested_category_id,
+                                log.chosen_category_id, log.accepted):
+        _save(model, row)
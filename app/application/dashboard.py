@@ -138,6 +138,27 @@ class DashboardService:
             "vacation_end": vacation_end,
         }
 
+    # --- Query planner helpers ---
+    #
+    # Каждый источник грузится одним оконным запросом (overdue ∪ today ∪
+    # done-today) и раскладывается по спискам в памяти; связанные шаблоны,
+    # события и привычки — одним IN (...) на источник. Число round-trip'ов
+    # get_today_block не зависит от количества элементов.
+
+    def _bulk_get(self, model, key_col, ids) -> dict[int, Any]:
+        """{id: row} одним запросом WHERE key IN (...)."""
+        ids = set(ids)
+        if not ids:
+            return {}
+        return {getattr(r, key_col.key): r for r in self.db.query(model).filter(key_col.in_(ids)).all()}
+
+    def _today_window(self, model, today: date, date_col):
+        """ACTIVE с датой <= today (overdue + today) или DONE сегодня, одним запросом."""
+        return or_(
+            and_(model.status == "ACTIVE", date_col != None, date_col <= today),  # noqa: E711
+            and_(model.status == "DONE", func.date(model.completed_at) == today),
+        )
+
     # --- One-off tasks ---
 
     def _collect_oneoff_tasks(
@@ -145,35 +166,25 @@ class DashboardService:
         overdue: list, active: list, done: list,
         hidden_project_ids: set[int] | None = None,
     ):
-        def _exclude(q):
-            if hidden_project_ids:
-                q = q.filter(
-                    (TaskModel.project_id == None) |  # noqa: E711
-                    (~TaskModel.project_id.in_(hidden_project_ids))
-                )
-            return q
-
-        # Overdue: active, due_date < today
-        overdue_rows = _exclude(self.db.query(TaskModel).filter(
-            TaskModel.account_id == account_id,
-            TaskModel.status == "ACTIVE",
-            TaskModel.due_date != None,  # noqa: E711
-            TaskModel.due_date < today,
-        )).all()
-
-        # Active today
-        active_rows = _exclude(self.db.query(TaskModel).filter(
+        q = self.db.query(TaskModel).filter(
             TaskModel.account_id == account_id,
-            TaskModel.status == "ACTIVE",
-            TaskModel.due_date == today,
-        )).all()
-
-        # Done today
-        done_rows = _exclude(self.db.query(TaskModel).filter(
-            TaskModel.account_id == account_id,
-            TaskModel.status == "DONE",
-            func.date(TaskModel.completed_at) == today,
-        )).all()
+            self._today_window(TaskModel, today, TaskModel.due_date),
+        )
+        if hidden_project_ids:
+            q = q.filter(
+                (TaskModel.project_id == None) |  # noqa: E711
+                (~TaskModel.project_id.in_(hidden_project_ids))
+            )
+        overdue_rows: list[TaskModel] = []
+        active_rows: list[TaskModel] = []
+        done_rows: list[TaskModel] = []
+        for t in q.all():
+            if t.status == "DONE":
+                done_rows.append(t)
+            elif t.due_date < today:
+                overdue_rows.append(t)
+            else:
+                active_rows.append(t)
 
         # Batch-load reminders for all tasks in one query (avoid N+1)
         all_task_ids = [t.task_id for t in (*overdue_rows, *active_rows, *done_rows)]
@@ -247,48 +258,27 @@ class DashboardService:
         self, account_id: int, today: date, wc_map: dict,
         overdue: list, active: list, done: list,
     ):
-        tmpl_cache: dict[int, TaskTemplateModel] = {}
-
-        def _get_tmpl(tid: int) -> TaskTemplateModel | None:
-            if tid not in tmpl_cache:
-                tmpl_cache[tid] = self.db.query(TaskTemplateModel).filter(
-                    TaskTemplateModel.template_id == tid
-                ).first()
-            return tmpl_cache[tid]
-
-        # Overdue
         rows = self.db.query(TaskOccurrence).filter(
             TaskOccurrence.account_id == account_id,
-            TaskOccurrence.status == "ACTIVE",
-            TaskOccurrence.scheduled_date < today,
+            self._today_window(TaskOccurrence, today, TaskOccurrence.scheduled_date),
         ).all()
+        templates = self._bulk_get(
+            TaskTemplateModel, TaskTemplateModel.template_id, (o.template_id for o in rows),
+        )
         for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl and not tmpl.is_archived:
+            tmpl = templates.get(occ.template_id)
+            if not tmpl:
+                continue
+            # Done today (by actual completion date, not scheduled date)
+            if occ.status == "DONE":
+                done.append(self._task_occ_item(occ, tmpl, wc_map, is_overdue=False, is_done=True))
+            elif tmpl.is_archived:
+                continue
+            elif occ.scheduled_date < today:
                 overdue.append(self._task_occ_item(occ, tmpl, wc_map, is_overdue=True))
-
-        # Active today
-        rows = self.db.query(TaskOccurrence).filter(
-            TaskOccurrence.account_id == account_id,
-            TaskOccurrence.status == "ACTIVE",
-            TaskOccurrence.scheduled_date == today,
-        ).all()
-        for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl and not tmpl.is_archived:
+            else:
                 active.append(self._task_occ_item(occ, tmpl, wc_map, is_overdue=False))
 
-        # Done today (by actual completion date, not scheduled date)
-        rows = self.db.query(TaskOccurrence).filter(
-            TaskOccurrence.account_id == account_id,
-            TaskOccurrence.status == "DONE",
-            func.date(TaskOccurrence.completed_at) == today,
-        ).all()
-        for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl:
-                done.append(self._task_occ_item(occ, tmpl, wc_map, is_overdue=False, is_done=True))
-
     def _task_occ_item(self, occ: TaskOccurrence, tmpl: TaskTemplateModel,
                        wc_map: dict, is_overdue: bool = False, is_done: bool = False) -> dict:
         return {
@@ -309,48 +299,27 @@ class DashboardService:
         self, account_id: int, today: date, wc_map: dict, wcur_map: dict,
         overdue: list, active: list, done: list,
     ):
-        tmpl_cache: dict[int, OperationTemplateModel] = {}
-
-        def _get_tmpl(tid: int) -> OperationTemplateModel | None:
-            if tid not in tmpl_cache:
-                tmpl_cache[tid] = self.db.query(OperationTemplateModel).filter(
-                    OperationTemplateModel.template_id == tid
-                ).first()
-            return tmpl_cache[tid]
-
-        # Overdue
         rows = self.db.query(OperationOccurrence).filter(
             OperationOccurrence.account_id == account_id,
-            OperationOccurrence.status == "ACTIVE",
-            OperationOccurrence.scheduled_date < today,
+            self._today_window(OperationOccurrence, today, OperationOccurrence.scheduled_date),
         ).all()
+        templates = self._bulk_get(
+            OperationTemplateModel, OperationTemplateModel.template_id, (o.template_id for o in rows),
+        )
         for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl and not tmpl.is_archived:
+            tmpl = templates.get(occ.template_id)
+            if not tmpl:
+                continue
+            # Done today (by actual completion date, not scheduled date)
+            if occ.status == "DONE":
+                done.append(self._op_occ_item(occ, tmpl, wc_map, wcur_map, is_overdue=False, is_done=True))
+            elif tmpl.is_archived:
+                continue
+            elif occ.scheduled_date < today:
                 overdue.append(self._op_occ_item(occ, tmpl, wc_map, wcur_map, is_overdue=True))
-
-        # Active today
-        rows = self.db.query(OperationOccurrence).filter(
-            OperationOccurrence.account_id == account_id,
-            OperationOccurrence.status == "ACTIVE",
-            OperationOccurrence.scheduled_date == today,
-        ).all()
-        for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl and not tmpl.is_archived:
+            else:
                 active.append(self._op_occ_item(occ, tmpl, wc_map, wcur_map, is_overdue=False))
 
-        # Done today (by actual completion date, not scheduled date)
-        rows = self.db.query(OperationOccurrence).filter(
-            OperationOccurrence.account_id == account_id,
-            OperationOccurrence.status == "DONE",
-            func.date(OperationOccurrence.completed_at) == today,
-        ).all()
-        for occ in rows:
-            tmpl = _get_tmpl(occ.template_id)
-            if tmpl:
-                done.append(self._op_occ_item(occ, tmpl, wc_map, wcur_map, is_overdue=False, is_done=True))
-
     def _op_occ_item(self, occ: OperationOccurrence, tmpl: OperationTemplateModel,
                      wc_map: dict, wcur_map: dict,
                      is_overdue: bool = False, is_done: bool = False) -> dict:
@@ -416,13 +385,9 @@ class DashboardService:
                     continue
                 reminders_by_event.setdefault(rem.event_id, []).append(label)
 
-        ev_cache: dict[int, CalendarEventModel] = {}
+        events_by_id = self._bulk_get(CalendarEventModel, CalendarEventModel.event_id, event_ids)
         for occ in rows:
-            if occ.event_id not in ev_cache:
-                ev_cache[occ.event_id] = self.db.query(CalendarEventModel).filter(
-                    CalendarEventModel.event_id == occ.event_id
-                ).first()
-            ev = ev_cache[occ.event_id]
+            ev = events_by_id.get(occ.event_id)
             if ev and ev.is_active:
                 event_time = occ.start_time.strftime("%H:%M") if occ.start_time else None
                 person_age: int | None = None
@@ -464,13 +429,9 @@ class DashboardService:
             HabitOccurrence.scheduled_date == today,
         ).all()
 
-        habit_cache: dict[int, HabitModel] = {}
+        habits = self._bulk_get(HabitModel, HabitModel.habit_id, (o.habit_id for o in rows))
         for occ in rows:
-            if occ.habit_id not in habit_cache:
-                habit_cache[occ.habit_id] = self.db.query(HabitModel).filter(
-                    HabitModel.habit_id == occ.habit_id
-                ).first()
-            habit = habit_cache[occ.habit_id]
+            habit = habits.get(occ.habit_id)
             if not habit or habit.is_archived:
                 continue
 
@@ -0,0 +1,289 @@
+"""
+Dashboard response cache — per user, per block, versioned by the event log.
+
+Key: (account_id, today, block) + version, where version is the id of the
+last event_log entry whose type affects the block (BLOCK_DEPENDENCIES).
+A new event bumps only the blocks that depend on its type; the rest of the
+dashboard keeps being served from cache. Writes that bypass the event log
+(occurrence generation, scheduler snapshots, projects, collection) are
+bounded by DASHBOARD_CACHE_TTL.
+
+Tiers:
+  L1 — in-process LRU with TTL (always on);
+  L2 — dashboard_block_cache table shared by all workers (DASHBOARD_CACHE_SHARED).
+
+Versions:
+  EventLogRepository.append_event records (account_id, event_id, event_type)
+  in session.info[APPENDED_EVENTS_KEY]; the bump is applied after commit —
+  a concurrent reader never caches pre-commit data under the new version.
+  Events appended by other processes are picked up by account_versions():
+  one query over event_log.id > last seen id.
+
+With PROJECTION_ASYNC a block whose version is newer than the account's
+projected checkpoint (projected_up_to) is computed but neither read from nor
+stored in the cache: the read models behind it may still be stale.
+
+The same version vector serves other per-account read caches keyed by
+event types, e.g. the filtered totals of GET /api/v2/transactions
+("transaction_totals" with the filter signature as variant).
+
+Usage:
+    >>> cache = DashboardCache(db, account_id, today)
+    >>> heatmap = cache.get("habit_heatmap", lambda: compute_heatmap())
+    >>> cache.save()  # commit L2 writes, if any
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.infrastructure.db.models import DashboardBlockCache, EventLog
+from app.infrastructure.db.upsert import dialect_insert
+from app.infrastructure.eventlog.repository import APPENDED_EVENTS_KEY
+
+logger = logging.getLogger(__name__)
+
+ANY = "*"
+
+# block -> префиксы event_type, которые его меняют (ANY — любое событие)
+BLOCK_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "today": (
+        "task_", "habit_", "operation_", "calendar_event_", "event_",
+        "recurrence_rule_", "work_category_", "wallet_",
+    ),
+    "upcoming_payments": ("operation_", "recurrence_rule_", "wallet_", "work_category_"),
+    "habit_heatmap": ("habit_", "recurrence_rule_"),
+    "financial_summary": ("transaction_", "wallet_"),
+    "fin_state": ("transaction_", "wallet_"),
+    "feed": (ANY,),
+    "level": (ANY,),
+    "week_events": ("calendar_event_", "event_", "work_category_"),
+    # не блок дашборда: итоги ленты транзакций по сигнатуре фильтра
+    "transaction_totals": ("transaction_", "category_"),
+}
+
+_MISS = object()
+
+
+def affected_blocks(event_type: str) -> list[str]:
+    """Blocks whose content may change after an event of this type."""
+    return [
+        block for block, prefixes in BLOCK_DEPENDENCIES.items()
+        if any(p == ANY or event_type.startswith(p) for p in prefixes)
+    ]
+
+
+# ── Versions ──
+
+class _Versions:
+    """Per-account version vector: last seen event id + per-block versions."""
+
+    def __init__(self, seen: int):
+        self.seen = seen
+        self.blocks: dict[str, int] = dict.fromkeys(BLOCK_DEPENDENCIES, seen)
+
+    def apply(self, event_id: int, event_type: str, seen: bool = True) -> None:
+        if seen:
+            self.seen = max(self.seen, event_id)
+        for block in affected_blocks(event_type):
+            self.blocks[block] = max(self.blocks[block], event_id)
+
+
+_versions: dict[int, _Versions] = {}
+_versions_lock = threading.Lock()
+
+
+def bump(account_id: int, event_id: int, event_type: str) -> None:
+    """
+    Register a committed event in this process
+
+    `seen` не двигаем: события других воркеров с меньшими id ещё не учтены,
+    их подберёт account_versions().
+    """
+    with _versions_lock:
+        v = _versions.get(account_id)
+        if v is not None:
+            v.apply(event_id, event_type, seen=False)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_bumps(session: Session) -> None:
+    for args in session.info.pop(APPENDED_EVENTS_KEY, ()):
+        bump(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_bumps(session: Session) -> None:
+    session.info.pop(APPENDED_EVENTS_KEY, None)
+
+
+def account_versions(db: Session, account_id: int) -> dict[str, int]:
+    """
+    {block: version} for an account, refreshed from event_log
+
+    Холодный старт — один max(id): все блоки получают последнюю версию.
+    Дальше — события с id > seen, сгруппированные по типу (обычно пусто).
+    """
+    with _versions_lock:
+        v = _versions.get(account_id)
+        seen = v.seen if v is not None else None
+
+    if seen is None:
+        last = db.query(func.max(EventLog.id)).filter(EventLog.account_id == account_id).scalar() or 0
+        with _versions_lock:
+            v = _versions.setdefault(account_id, _Versions(last))
+            v.seen = max(v.seen, last)
+            return dict(v.blocks)
+
+    rows = db.query(EventLog.event_type, func.max(EventLog.id)).filter(
+        EventLog.account_id == account_id,
+        EventLog.id > seen,
+    ).group_by(EventLog.event_type).all()
+    with _versions_lock:
+        for event_type, event_id in rows:
+            v.apply(event_id, event_type)
+        return dict(v.blocks)
+
+
+# ── L1: in-process LRU with TTL ──
+
+class _LRU:
+    def __init__(self):
+        self._data: OrderedDict[tuple, tuple[int, float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISS
+            entry_version, expires_at, value = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISS
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, version: int, value: Any, ttl: float, max_size: int) -> None:
+        with self._lock:
+            self._data[key] = (version, time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_l1 = _LRU()
+
+
+def invalidate_all() -> None:
+    """Drop L1 and version vectors (tests, admin rebuilds)."""
+    _l1.clear()
+    with _versions_lock:
+        _versions.clear()
+
+
+# ── Facade ──
+
+class DashboardCache:
+    """
+    Block cache for one dashboard request
+
+    Blocks must be JSON-serializable (L2 stores them as JSONB); callers cache
+    model_dump(mode="json") of the response sub-models.
+    """
+
+    def __init__(self, db: Session, account_id: int, today: date):
+        self.db = db
+        self.account_id = account_id
+        self.today = today
+        self.versions = account_versions(db, account_id)
+        settings = get_settings()
+        self.ttl = settings.DASHBOARD_CACHE_TTL
+        self.max_size = settings.DASHBOARD_CACHE_SIZE
+        self.shared = settings.DASHBOARD_CACHE_SHARED
+        self._dirty_shared = False
+        # PROJECTION_ASYNC: версия блока растёт при commit'е события, а read
+        # model'и догоняет daemon — кэшируем только то, что уже спроецировано
+        self.projected = None
+        if settings.PROJECTION_ASYNC:
+            from app.application.projection import projected_up_to
+            self.projected = projected_up_to(db, account_id)
+
+    def get(self, block: str, compute: Callable[[], Any], variant: str = "") -> Any:
+        """
+        Cached block value, or compute() and store it under the current version
+
+        variant — параметры блока (например, хэш фильтров); версия общая на блок.
+        """
+        if self.ttl <= 0:
+            return compute()
+        version = self.versions[block]
+        if self.projected is not None and version > self.projected:
+            return compute()  # read models ещё не догнали версию — не кэшируем
+        if variant:
+            block = f"{block}:{variant}"
+        key = (self.account_id, self.today, block)
+
+        value = _l1.get(key, version)
+        if value is not _MISS:
+            return value
+        if self.shared:
+            value = self._shared_get(block, version)
+            if value is not _MISS:
+                _l1.put(key, version, value, self.ttl, self.max_size)
+                return value
+
+        value = compute()
+        _l1.put(key, version, value, self.ttl, self.max_size)
+        if self.shared:
+            self._shared_put(block, version, value)
+        return value
+
+    def save(self) -> None:
+        """Commit pending L2 writes."""
+        if self._dirty_shared:
+            self.db.commit()
+            self._dirty_shared = False
+
+    # --- L2 ---
+
+    def _shared_get(self, block: str, version: int) -> Any:
+        row = self.db.query(DashboardBlockCache).filter(
+            DashboardBlockCache.account_id == self.account_id,
+            DashboardBlockCache.block == block,
+        ).first()
+        if row is None or row.day != self.today or row.version != version:
+            return _MISS
+        computed_at = row.computed_at
+        if computed_at.tzinfo is None:
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        if computed_at <= datetime.now(timezone.utc) - timedelta(seconds=self.ttl):
+            return _MISS
+        return row.payload["value"]
+
+    def _shared_put(self, block: str, version: int, value: Any) -> None:
+        values = {
+            "account_id": self.account_id, "block": block, "day": self.today,
+            "version": version, "payload": {"value": value}, "computed_at": datetime.now(timezone.utc),
+        }
+        stmt = dialect_insert(self.db, DashboardBlockCache).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["account_id", "block"],
+            set_={k: stmt.excluded[k] for k in ("day", "version", "payload", "computed_at")},
+        )
+        try:
+            with self.db.begin_nested():
+                self.db.execute(stmt)
+            self._dirty_shared = True
+        except Exception:
+            logger.warning("dashboard_block_cache write failed", exc_info=True)
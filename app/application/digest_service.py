@@ -14,7 +14,8 @@ from sqlalchemy.orm import Session
 from app.infrastructure.db.models import User, PushSubscription, DigestDispatchLog
 from app.application.occurrence_generator import OccurrenceGenerator
 from app.application.dashboard import DashboardService
-from app.application.push_service import send_push_to_user
+from app.application.jobs import enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +50,7 @@ def _get_digest_user_ids(db: Session, morning: bool) -> list[int]:
 def send_morning_digest(db: Session) -> int:
     """
     Send morning digest to all opted-in users.
-    Returns total number of push notifications sent.
+    Returns the number of messages queued for delivery.
     """
     user_ids = sorted(set(_get_digest_user_ids(db, morning=True))
                       | set(_get_tg_digest_user_ids(db, morning=True)))
@@ -58,7 +59,7 @@ def send_morning_digest(db: Session) -> int:
         return 0
 
     today = date.today()
-    total_sent = 0
+    messages: list[OutboundMessage] = []
 
     for user_id in user_ids:
         try:
@@ -94,15 +95,7 @@ def send_morning_digest(db: Session) -> int:
                 if overdue_count > 0:
                     body += f". Просрочено: {overdue_count}"
 
-            n = send_push_to_user(db, user_id, {
-                "title": "Доброе утро!",
-                "body": body,
-                "url": "/",
-            })
-            total_sent += n
-
             # Telegram-версия — с полным списком дел
-            from app.infrastructure.telegram import send_tg
             tg_lines = ["☀️ <b>Доброе утро! План на сегодня</b>", ""]
             if not block["active"] and not block["overdue"]:
                 tg_lines.append("Дел нет — свободный день!")
@@ -116,18 +109,25 @@ def send_morning_digest(db: Session) -> int:
                 tg_lines.append(f"⚠️ Просрочено: {len(block['overdue'])}")
                 for it in block["overdue"][:5]:
                     tg_lines.append(f"• {it.get('title', '?')}")
-            send_tg(db, user_id, "\n".join(tg_lines), "digest_morning")
+            messages.append(OutboundMessage(
+                user_id=user_id, kind="digest_morning",
+                push={"title": "Доброе утро!", "body": body, "url": "/"},
+                telegram="\n".join(tg_lines),
+            ))
         except Exception:
             logger.exception("Morning digest failed for user %d", user_id)
 
-    logger.info("Morning digest: sent %d notification(s) to %d user(s)", total_sent, len(user_ids))
-    return total_sent
+    # Все пользователи одним батчем — отправляют воркеры (delivery.send)
+    queued = enqueue_delivery(db, messages)
+    db.commit()
+    logger.info("Morning digest: queued %d message(s) for %d user(s)", queued, len(user_ids))
+    return queued
 
 
 def send_evening_digest(db: Session) -> int:
     """
     Send evening digest to all opted-in users.
-    Returns total number of push notifications sent.
+    Returns the number of messages queued for delivery.
     """
     user_ids = sorted(set(_get_digest_user_ids(db, morning=False))
                       | set(_get_tg_digest_user_ids(db, morning=False)))
@@ -136,7 +136,7 @@ def send_evening_digest(db: Session) -> int:
         return 0
 
     today = date.today()
-    total_sent = 0
+    messages: list[OutboundMessage] = []
 
     for user_id in user_ids:
         try:
@@ -167,17 +167,15 @@ def send_evening_digest(db: Session) -> int:
                 if left > 0:
                     body += f". Осталось: {left}"
 
-            n = send_push_to_user(db, user_id, {
-                "title": "Итоги дня",
-                "body": body,
-                "url": "/",
-            })
-            total_sent += n
-
-            from app.infrastructure.telegram import send_tg
-            send_tg(db, user_id, f"🌙 <b>Итоги дня</b>\n{body}", "digest_evening")
+            messages.append(OutboundMessage(
+                user_id=user_id, kind="digest_evening",
+                push={"title": "Итоги дня", "body": body, "url": "/"},
+                telegram=f"🌙 <b>Итоги дня</b>\n{body}",
+            ))
         except Exception:
             logger.exception("Evening digest failed for user %d", user_id)
 
-    logger.info("Evening digest: sent %d notification(s) to %d user(s)", total_sent, len(user_ids))
-    return total_sent
+    queued = enqueue_delivery(db, messages)
+    db.commit()
+    logger.info("Evening digest: queued %d message(s) for %d user(s)", queued, len(user_ids))
+    return queued
@@ -4,7 +4,7 @@ import logging
 from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
@@ -14,6 +14,8 @@ from app.infrastructure.db.models import (
 
 logger = logging.getLogger(__name__)
 
+_UPSERT_CHUNK = 500  # дайджестов на INSERT (payload — крупный JSON)
+
 
 def iso_week_key(d: date) -> str:
     iso = d.isocalendar()
@@ -30,240 +32,315 @@ def parse_week_key(key: str) -> tuple[date, date]:
 
 
 def build_weekly_payload(db: Session, account_id: int, week_start: date) -> dict:
-    week_end = week_start + timedelta(days=6)
-    return {
-        "period": {
-            "type": "week",
-            "key": iso_week_key(week_start),
-            "from": week_start.isoformat(),
-            "to": week_end.isoformat(),
-        },
-        "tasks": _aggregate_tasks(db, account_id, week_start, week_end),
-        "habits": _aggregate_habits(db, account_id, week_start, week_end),
-        "finance": _aggregate_finance(db, account_id, week_start, week_end),
-        "efficiency": _aggregate_efficiency(db, account_id, week_end),
-        "xp": _aggregate_xp(db, account_id, week_start, week_end),
-        "highlights": _aggregate_highlights(db, account_id, week_start, week_end),
-    }
+    return build_weekly_payloads(db, [account_id], week_start)[account_id]
+
 
+def build_weekly_payloads(db: Session, account_ids: list[int], week_start: date) -> dict[int, dict]:
+    """
+    Weekly payloads for many accounts at once (account_id -> payload)
 
-def _aggregate_tasks(db: Session, account_id: int, week_start: date, week_end: date) -> dict:
+    Each aggregate is one query (or a few) over all accounts grouped by
+    account_id; the payloads are assembled in memory. Cost scales with the
+    number of queries, not users × queries.
+    """
+    week_end = week_start + timedelta(days=6)
     ws = datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc)
     we = datetime(week_end.year, week_end.month, week_end.day, 23, 59, 59, tzinfo=timezone.utc)
+    period = {
+        "type": "week",
+        "key": iso_week_key(week_start),
+        "from": week_start.isoformat(),
+        "to": week_end.isoformat(),
+    }
+    tasks = _aggregate_tasks(db, account_ids, ws, we, week_end)
+    habits = _aggregate_habits(db, account_ids, week_start, week_end)
+    finance = _aggregate_finance(db, account_ids, ws, we)
+    efficiency = _aggregate_efficiency(db, account_ids, week_end)
+    xp = _aggregate_xp(db, account_ids, ws, we)
+    highlights = _aggregate_highlights(db, account_ids, ws, we)
+    return {
+        account_id: {
+            "period": dict(period),
+            "tasks": tasks[account_id],
+            "habits": habits[account_id],
+            "finance": finance[account_id],
+            "efficiency": efficiency[account_id],
+            "xp": xp[account_id],
+            "highlights": highlights[account_id],
+        }
+        for account_id in account_ids
+    }
 
-    completed_tasks = (
-        db.query(TaskModel)
+
+def _aggregate_tasks(db: Session, account_ids: list[int], ws: datetime, we: datetime, week_end: date) -> dict:
+    completed = dict(
+        db.query(TaskModel.account_id, func.count(TaskModel.task_id))
         .filter(
-            TaskModel.account_id == account_id,
+            TaskModel.account_id.in_(account_ids),
             TaskModel.status == "DONE",
             TaskModel.completed_at >= ws,
             TaskModel.completed_at <= we,
         )
+        .group_by(TaskModel.account_id)
         .all()
     )
 
-    overdue_open = (
-        db.query(func.count(TaskModel.task_id))
+    overdue_open = dict(
+        db.query(TaskModel.account_id, func.count(TaskModel.task_id))
         .filter(
-            TaskModel.account_id == account_id,
+            TaskModel.account_id.in_(account_ids),
             TaskModel.status == "ACTIVE",
             TaskModel.due_date.isnot(None),
             TaskModel.due_date <= week_end,
         )
-        .scalar() or 0
+        .group_by(TaskModel.account_id)
+        .all()
     )
 
-    rescheduled = (
-        db.query(func.count(TaskDueChangeLog.id))
+    rescheduled = dict(
+        db.query(TaskDueChangeLog.user_id, func.count(TaskDueChangeLog.id))
         .filter(
-            TaskDueChangeLog.user_id == account_id,
+            TaskDueChangeLog.user_id.in_(account_ids),
             TaskDueChangeLog.changed_at >= ws,
             TaskDueChangeLog.changed_at <= we,
         )
-        .scalar() or 0
+        .group_by(TaskDueChangeLog.user_id)
+        .all()
     )
 
-    by_category: dict[str, int] = {}
-    for task in completed_tasks:
-        k = "Без категории"
-        by_category[k] = by_category.get(k, 0) + 1
-    top_categories = sorted(by_category.items(), key=lambda x: -x[1])[:3]
-
-    return {
-        "completed": len(completed_tasks),
-        "overdue_open": overdue_open,
-        "rescheduled": rescheduled,
-        "by_category_top": [[name, count] for name, count in top_categories],
-    }
-
-
-def _aggregate_habits(db: Session, account_id: int, week_start: date, week_end: date) -> dict:
-    active_habits = (
-        db.query(HabitModel)
+    result = {}
+    for account_id in account_ids:
+        done = completed.get(account_id, 0)
+        # Категорий у задач нет — всё выполненное идёт одной строкой
+        top_categories = [["Без категории", done]] if done else []
+        result[account_id] = {
+            "completed": done,
+            "overdue_open": overdue_open.get(account_id, 0),
+            "rescheduled": rescheduled.get(account_id, 0),
+            "by_category_top": top_categories,
+        }
+    return result
+
+
+def _aggregate_habits(db: Session, account_ids: list[int], week_start: date, week_end: date) -> dict:
+    habits_by_account: dict[int, list] = {account_id: [] for account_id in account_ids}
+    for h in (
+        db.query(
+            HabitModel.account_id, HabitModel.habit_id, HabitModel.title,
+            HabitModel.current_streak, HabitModel.best_streak,
+        )
         .filter(
-            HabitModel.account_id == account_id,
+            HabitModel.account_id.in_(account_ids),
             HabitModel.is_archived.is_(False),
         )
+        .order_by(HabitModel.account_id, HabitModel.habit_id)
         .all()
-    )
-    if not active_habits:
-        return {"longest_streak": None, "broken_streaks": [], "completion_rate": 0.0}
-
-    habit_ids = [h.habit_id for h in active_habits]
-    habit_map = {h.habit_id: h for h in active_habits}
-
-    occurrences = (
-        db.query(HabitOccurrence)
-        .filter(
-            HabitOccurrence.account_id == account_id,
-            HabitOccurrence.habit_id.in_(habit_ids),
-            HabitOccurrence.scheduled_date >= week_start,
-            HabitOccurrence.scheduled_date <= week_end,
+    ):
+        habits_by_account[h.account_id].append(h)
+
+    # habit_id -> (scheduled, done, missed) за неделю
+    occ_stats = {
+        r.habit_id: (int(r.scheduled), int(r.done or 0), int(r.missed or 0))
+        for r in (
+            db.query(
+                HabitOccurrence.habit_id,
+                func.count().label("scheduled"),
+                func.sum(case((HabitOccurrence.status == "DONE", 1), else_=0)).label("done"),
+                func.sum(case((HabitOccurrence.status == "ACTIVE", 1), else_=0)).label("missed"),
+            )
+            .join(
+                HabitModel,
+                (HabitModel.habit_id == HabitOccurrence.habit_id)
+                & (HabitModel.account_id == HabitOccurrence.account_id),
+            )
+            .filter(
+                HabitOccurrence.account_id.in_(account_ids),
+                HabitModel.is_archived.is_(False),
+                HabitOccurrence.scheduled_date >= week_start,
+                HabitOccurrence.scheduled_date <= week_end,
+            )
+            .group_by(HabitOccurrence.habit_id)
+            .all()
         )
-        .all()
-    )
-    total_scheduled = len(occurrences)
-    done_count = sum(1 for o in occurrences if o.status == "DONE")
-    completion_rate = (done_count / total_scheduled) if total_scheduled > 0 else 0.0
-
-    best_habit = max(active_habits, key=lambda h: h.current_streak, default=None)
-    longest_streak = None
-    if best_habit and best_habit.current_streak > 0:
-        longest_streak = {"name": best_habit.title, "days": best_habit.current_streak}
-
-    habits_with_miss: dict[int, int] = {}
-    for occ in occurrences:
-        if occ.status == "ACTIVE":
-            habits_with_miss[occ.habit_id] = habits_with_miss.get(occ.habit_id, 0) + 1
-
-    broken_streaks = []
-    for habit_id in habits_with_miss:
-        h = habit_map.get(habit_id)
-        if h and h.best_streak >= 3:
-            broken_streaks.append({"name": h.title, "days_before": h.best_streak})
-
-    return {
-        "longest_streak": longest_streak,
-        "broken_streaks": broken_streaks[:3],
-        "completion_rate": round(completion_rate, 2),
     }
 
-
-def _aggregate_finance(db: Session, account_id: int, week_start: date, week_end: date) -> dict:
-    ws = datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc)
-    we = datetime(week_end.year, week_end.month, week_end.day, 23, 59, 59, tzinfo=timezone.utc)
-
-    rows = (
-        db.query(TransactionFeed.operation_type, func.sum(TransactionFeed.amount))
+    result = {}
+    for account_id, active_habits in habits_by_account.items():
+        if not active_habits:
+            result[account_id] = {"longest_streak": None, "broken_streaks": [], "completion_rate": 0.0}
+            continue
+
+        total_scheduled = sum(occ_stats.get(h.habit_id, (0, 0, 0))[0] for h in active_habits)
+        done_count = sum(occ_stats.get(h.habit_id, (0, 0, 0))[1] for h in active_habits)
+        completion_rate = (done_count / total_scheduled) if total_scheduled > 0 else 0.0
+
+        best_habit = max(active_habits, key=lambda h: h.current_streak, default=None)
+        longest_streak = None
+        if best_habit and best_habit.current_streak > 0:
+            longest_streak = {"name": best_habit.title, "days": best_habit.current_streak}
+
+        broken_streaks = [
+            {"name": h.title, "days_before": h.best_streak}
+            for h in active_habits
+            if occ_stats.get(h.habit_id, (0, 0, 0))[2] > 0 and h.best_streak >= 3
+        ]
+
+        result[account_id] = {
+            "longest_streak": longest_streak,
+            "broken_streaks": broken_streaks[:3],
+            "completion_rate": round(completion_rate, 2),
+        }
+    return result
+
+
+def _aggregate_finance(db: Session, account_ids: list[int], ws: datetime, we: datetime) -> dict:
+    totals: dict[int, dict[str, float]] = {account_id: {} for account_id in account_ids}
+    for account_id, kind, amount in (
+        db.query(TransactionFeed.account_id, TransactionFeed.operation_type, func.sum(TransactionFeed.amount))
         .filter(
-            TransactionFeed.account_id == account_id,
+            TransactionFeed.account_id.in_(account_ids),
             TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
             TransactionFeed.occurred_at >= ws,
             TransactionFeed.occurred_at <= we,
         )
-        .group_by(TransactionFeed.operation_type)
+        .group_by(TransactionFeed.account_id, TransactionFeed.operation_type)
         .all()
-    )
-    totals = {kind: float(amount or 0) for kind, amount in rows}
-    income = totals.get("INCOME", 0.0)
-    expense = totals.get("EXPENSE", 0.0)
-    top_cat = _top_expense_category(db, account_id, ws, we)
-    return {
-        "income_total": income,
-        "expense_total": expense,
-        "balance_delta": income - expense,
-        "top_expense_category": top_cat,
-    }
-
-
-def _top_expense_category(db: Session, account_id: int, start_dt, end_dt):
-    rows = (
+    ):
+        totals[account_id][kind] = float(amount or 0)
+
+    top_cats = _top_expense_categories(db, account_ids, ws, we)
+    result = {}
+    for account_id in account_ids:
+        income = totals[account_id].get("INCOME", 0.0)
+        expense = totals[account_id].get("EXPENSE", 0.0)
+        result[account_id] = {
+            "income_total": income,
+            "expense_total": expense,
+            "balance_delta": income - expense,
+            "top_expense_category": top_cats.get(account_id),
+        }
+    return result
+
+
+def _top_expense_categories(db: Session, account_ids: list[int], start_dt, end_dt) -> dict:
+    """account_id -> [category name, total] of the largest expense category (absent if none)."""
+    best: dict[int, tuple[int, object]] = {}
+    for account_id, category_id, total in (
         db.query(
+            TransactionFeed.account_id,
             TransactionFeed.category_id,
             func.sum(TransactionFeed.amount).label("total"),
         )
         .filter(
-            TransactionFeed.account_id == account_id,
+            TransactionFeed.account_id.in_(account_ids),
             TransactionFeed.operation_type == "EXPENSE",
             TransactionFeed.occurred_at >= start_dt,
             TransactionFeed.occurred_at <= end_dt,
             TransactionFeed.category_id.isnot(None),
         )
-        .group_by(TransactionFeed.category_id)
-        .order_by(func.sum(TransactionFeed.amount).desc())
-        .limit(1)
+        .group_by(TransactionFeed.account_id, TransactionFeed.category_id)
+        .all()
+    ):
+        if account_id not in best or (total or 0) > (best[account_id][1] or 0):
+            best[account_id] = (category_id, total)
+    if not best:
+        return {}
+
+    titles = dict(
+        db.query(CategoryInfo.category_id, CategoryInfo.title)
+        .filter(CategoryInfo.category_id.in_({category_id for category_id, _ in best.values()}))
         .all()
     )
-    if not rows:
-        return None
-    category_id, total = rows[0]
-    cat = db.query(CategoryInfo).filter(CategoryInfo.category_id == category_id).first()
-    name = cat.title if cat else "Category #{}".format(category_id)
-    return [name, float(total or 0)]
+    return {
+        account_id: [titles.get(category_id) or "Category #{}".format(category_id), float(total or 0)]
+        for account_id, (category_id, total) in best.items()
+    }
 
 
-def _aggregate_efficiency(db: Session, account_id: int, snap_date: date) -> dict:
+def _aggregate_efficiency(db: Session, account_ids: list[int], snap_date: date) -> dict:
     try:
         from app.application.efficiency import EfficiencyService
         from app.infrastructure.db.models import EfficiencySnapshot
-        svc = EfficiencyService(db)
-        result = svc.calculate(account_id, snap_date)
-        score = int(result.get("efficiency_score", 0))
-        prior_date = snap_date - timedelta(days=7)
-        prior_snap = (
-            db.query(EfficiencySnapshot)
-            .filter(
-                EfficiencySnapshot.account_id == account_id,
-                EfficiencySnapshot.snapshot_date == prior_date,
-            )
-            .first()
-        )
-        delta = 0
-        if prior_snap:
-            delta = score - int(prior_snap.efficiency_score)
-        return {"score": score, "delta_vs_prev": delta}
+
+        def _scores(d: date) -> dict[int, int]:
+            return {
+                account_id: int(score)
+                for account_id, score in db.query(EfficiencySnapshot.account_id, EfficiencySnapshot.efficiency_score)
+                .filter(
+                    EfficiencySnapshot.account_id.in_(account_ids),
+                    EfficiencySnapshot.snapshot_date == d,
+                )
+                .all()
+            }
+
+        # Готовые ночные снимки; недостающие — одним set-based расчётом
+        scores = _scores(snap_date)
+        missing = [account_id for account_id in account_ids if account_id not in scores]
+        if missing:
+            for account_id, data in EfficiencyService(db).calculate_all(snap_date, missing).items():
+                scores[account_id] = int(data.get("efficiency_score", 0))
+        prior = _scores(snap_date - timedelta(days=7))
+
+        return {
+            account_id: {
+                "score": scores.get(account_id, 0),
+                "delta_vs_prev": scores.get(account_id, 0) - prior[account_id] if account_id in prior else 0,
+            }
+            for account_id in account_ids
+        }
     except Exception:
-        logger.exception("Efficiency aggregation failed for account_id=%s", account_id)
-        return {"score": 0, "delta_vs_prev": 0}
+        logger.exception("Efficiency aggregation failed for %d account(s)", len(account_ids))
+        return {account_id: {"score": 0, "delta_vs_prev": 0} for account_id in account_ids}
 
 
-def _aggregate_xp(db: Session, account_id: int, week_start: date, week_end: date) -> dict:
-    ws = datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc)
-    we = datetime(week_end.year, week_end.month, week_end.day, 23, 59, 59, tzinfo=timezone.utc)
-    gained = (
-        db.query(func.sum(XpEvent.xp_amount))
-        .filter(XpEvent.user_id == account_id, XpEvent.created_at >= ws, XpEvent.created_at <= we)
-        .scalar() or 0
+def _aggregate_xp(db: Session, account_ids: list[int], ws: datetime, we: datetime) -> dict:
+    gained = dict(
+        db.query(XpEvent.user_id, func.sum(XpEvent.xp_amount))
+        .filter(XpEvent.user_id.in_(account_ids), XpEvent.created_at >= ws, XpEvent.created_at <= we)
+        .group_by(XpEvent.user_id)
+        .all()
     )
-    xp_state = db.query(UserXpState).filter(UserXpState.user_id == account_id).first()
-    level = xp_state.level if xp_state else 1
-    return {"gained": int(gained), "level_before": level, "level_after": level}
-
-
-def _aggregate_highlights(db: Session, account_id: int, week_start: date, week_end: date) -> dict:
-    ws = datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc)
-    we = datetime(week_end.year, week_end.month, week_end.day, 23, 59, 59, tzinfo=timezone.utc)
-    rows = (
-        db.query(
-            func.date(TaskModel.completed_at).label("day"),
-            func.count(TaskModel.task_id).label("cnt"),
-        )
+    levels = dict(
+        db.query(UserXpState.user_id, UserXpState.level)
+        .filter(UserXpState.user_id.in_(account_ids))
+        .all()
+    )
+    result = {}
+    for account_id in account_ids:
+        level = levels.get(account_id) or 1
+        result[account_id] = {
+            "gained": int(gained.get(account_id) or 0), "level_before": level, "level_after": level,
+        }
+    return result
+
+
+def _aggregate_highlights(db: Session, account_ids: list[int], ws: datetime, we: datetime) -> dict:
+    day_expr = func.date(TaskModel.completed_at)
+    best: dict[int, tuple] = {}
+    for account_id, day, cnt in (
+        db.query(TaskModel.account_id, day_expr.label("day"), func.count(TaskModel.task_id).label("cnt"))
         .filter(
-            TaskModel.account_id == account_id,
+            TaskModel.account_id.in_(account_ids),
             TaskModel.status == "DONE",
             TaskModel.completed_at >= ws,
             TaskModel.completed_at <= we,
         )
-        .group_by(func.date(TaskModel.completed_at))
-        .order_by(func.count(TaskModel.task_id).desc())
-        .limit(1)
+        .group_by(TaskModel.account_id, day_expr)
+        .order_by(TaskModel.account_id, day_expr)
         .all()
-    )
-    if rows:
-        best_day, best_count = rows[0]
-        day_str = best_day.isoformat() if hasattr(best_day, "isoformat") else str(best_day)
-        return {"most_productive_day": day_str, "most_productive_count": int(best_count)}
-    return {"most_productive_day": None, "most_productive_count": 0}
+    ):
+        if account_id not in best or cnt > best[account_id][1]:
+            best[account_id] = (day, cnt)
+
+    result = {}
+    for account_id in account_ids:
+        if account_id in best:
+            best_day, best_count = best[account_id]
+            day_str = best_day.isoformat() if hasattr(best_day, "isoformat") else str(best_day)
+            result[account_id] = {"most_productive_day": day_str, "most_productive_count": int(best_count)}
+        else:
+            result[account_id] = {"most_productive_day": None, "most_productive_count": 0}
+    return result
 
 
 def save_digest(
@@ -305,18 +382,9 @@ def save_digest(
 
 def generate_and_save_weekly_digest(db: Session, account_id: int, week_start: date) -> DigestModel:
     period_key = iso_week_key(week_start)
-    payload = build_weekly_payload(db, account_id, week_start)
-
-    # AI commentary only if the user opted in
-    from app.infrastructure.db.models import User
-    user = db.query(User).filter(User.id == account_id).first()
-    ai_comment = None
-    if user and user.ai_digest_enabled:
-        from app.infrastructure.ai import generate_digest_comment
-        from app.application.app_config import get_openai_key
-        ai_comment = generate_digest_comment(payload, api_key=get_openai_key(db))
-
-    save_digest(db, account_id, "week", period_key, payload, ai_comment)
+    generate_weekly_digests(db, [account_id], week_start)
+    db.commit()
+
     return (
         db.query(DigestModel)
         .filter(
@@ -326,3 +394,92 @@ def generate_and_save_weekly_digest(db: Session, account_id: int, week_start: da
         )
         .first()
     )
+
+
+def generate_weekly_digests(db: Session, account_ids: list[int], week_start: date) -> int:
+    """
+    Build and upsert weekly digests for many accounts (caller commits); returns the count
+
+    Payloads come from build_weekly_payloads (queries grouped by account_id),
+    DigestModel rows are written with one multi-row upsert per chunk. AI
+    commentary for opted-in users is queued as digest.ai_comment jobs spaced
+    by DIGEST_AI_PER_MINUTE, so workers run them concurrently within the rate.
+    """
+    from app.application.job_queue import enqueue
+    from app.config import get_settings
+    from app.infrastructure.db.models import BackgroundJob, User
+    from app.infrastructure.db.upsert import dialect_insert
+
+    if not account_ids:
+        return 0
+    period_key = iso_week_key(week_start)
+    payloads = build_weekly_payloads(db, account_ids, week_start)
+
+    rows = [
+        {"account_id": account_id, "period_type": "week", "period_key": period_key, "payload": payload}
+        for account_id, payload in payloads.items()
+    ]
+    for i in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = dialect_insert(db, DigestModel).values(rows[i:i + _UPSERT_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["account_id", "period_type", "period_key"],
+            set_={"payload": stmt.excluded.payload},
+        )
+        db.execute(stmt)
+
+    # AI commentary only if the user opted in — slow LLM calls go to the job queue
+    ai_users = [
+        uid for (uid,) in db.query(User.id)
+        .filter(User.id.in_(account_ids), User.ai_digest_enabled.is_(True))
+        .order_by(User.id)
+        .all()
+    ]
+    if ai_users:
+        interval = timedelta(minutes=1) / max(get_settings().DIGEST_AI_PER_MINUTE, 1)
+        # Продолжаем после уже запланированных комментариев — лимит общий для всех батчей
+        last_queued = (
+            db.query(func.max(BackgroundJob.run_at))
+            .filter(BackgroundJob.kind == "digest.ai_comment", BackgroundJob.status == "queued")
+            .scalar()
+        )
+        run_at = datetime.now(timezone.utc)
+        if last_queued is not None:
+            if last_queued.tzinfo is None:
+                last_queued = last_queued.replace(tzinfo=timezone.utc)
+            run_at = max(run_at, last_queued + interval)
+        for uid in ai_users:
+            if enqueue(
+                db, "digest.ai_comment", {"account_id": uid, "period_key": period_key},
+                run_at=run_at,
+                idempotency_key=f"digest.ai_comment:{uid}:week:{period_key}",
+            ):
+                run_at += interval
+
+    return len(rows)
+
+
+def add_ai_comment(db: Session, account_id: int, period_type: str, period_key: str) -> Optional[str]:
+    """Generate and store AI commentary for a saved digest (job digest.ai_comment)."""
+    digest = (
+        db.query(DigestModel)
+        .filter(
+            DigestModel.account_id == account_id,
+            DigestModel.period_type == period_type,
+            DigestModel.period_key == period_key,
+        )
+        .first()
+    )
+    if digest is None:
+        return None
+    from app.infrastructure.ai import generate_digest_comment
+    from app.application.app_config import get_openai_key
+    api_key = get_openai_key(db)
+    if not api_key:
+        return None  # AI не настроен — повторять нечего
+    comment = generate_digest_comment(digest.payload, api_key=api_key)
+    if comment is None:
+        # generate_digest_comment глушит ошибки; job должен уйти на backoff
+        raise RuntimeError(f"AI digest comment failed for account {account_id}, {period_key}")
+    digest.ai_comment = comment
+    db.commit()
+    return comment
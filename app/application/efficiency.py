@@ -10,6 +10,10 @@ Computes a weighted composite score (0–100) from 6 task metrics:
   M6  velocity 7d       (tasks done / 7 days, higher-is-better)
 
 All thresholds and weights are user-configurable via EfficiencySettings.
+
+Snapshots for all users are computed nightly by the efficiency.snapshots job
+(calculate_all — a handful of queries keyed by account_id); the dashboard and
+digests read the ready snapshot via get_or_calculate.
 """
 from __future__ import annotations
 
@@ -17,15 +21,18 @@ from datetime import date, timedelta, datetime, timezone
 from decimal import Decimal
 from typing import Any
 
+from sqlalchemy import case, func, insert
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
+    User,
     TaskModel,
     TaskDueChangeLog,
     EfficiencySettings,
     EfficiencySnapshot,
     EfficiencySnapshotItem,
 )
+from app.infrastructure.db.upsert import dialect_insert
 
 
 # ── Normalisation helpers (pure, testable in isolation) ──────────────────────
@@ -48,6 +55,100 @@ def _s_penalty(actual: float, green: float, yellow: float) -> float:
     return 40.0
 
 
+# ── Scoring (shared by live calculation and stored snapshots) ─────────────────
+
+_ACCOUNT_CHUNK = 500  # аккаунтов на один набор запросов (размер IN-списков)
+
+_SNAPSHOT_COLUMNS = (
+    "ontime_rate", "overdue_open", "reschedule_count", "churn_count", "wip_count", "velocity_7d",
+    "s_ontime", "s_overdue", "s_reschedule", "s_churn", "s_wip", "s_velocity",
+    "efficiency_score",
+)
+
+
+def _score(
+    settings: EfficiencySettings,
+    snap_date: date,
+    *,
+    ontime_rate: float,
+    overdue_open: int,
+    reschedule_count: int,
+    churn_count: int,
+    wip_count: int,
+    velocity_7d: float,
+) -> dict[str, Any]:
+    """Raw metric values → sub-scores, weights and composite score (data dict)."""
+    s_ontime = _s_ratio(ontime_rate, float(settings.thr_ontime_green), float(settings.thr_ontime_yellow))
+    s_overdue = _s_penalty(overdue_open, settings.thr_overdue_green, settings.thr_overdue_yellow)
+    s_reschedule = _s_penalty(reschedule_count, settings.thr_reschedule_green, settings.thr_reschedule_yellow)
+    s_churn = _s_penalty(churn_count, settings.thr_churn_green, settings.thr_churn_yellow)
+    s_wip = _s_penalty(wip_count, settings.thr_wip_green, settings.thr_wip_yellow)
+    s_velocity = _s_ratio(velocity_7d, float(settings.thr_velocity_green), float(settings.thr_velocity_yellow))
+
+    w_ontime = float(settings.w_ontime)
+    w_overdue = float(settings.w_overdue)
+    w_reschedule = float(settings.w_reschedule)
+    w_churn = float(settings.w_churn)
+    w_wip = float(settings.w_wip)
+    w_velocity = float(settings.w_velocity)
+
+    efficiency_score = round(
+        w_ontime * s_ontime
+        + w_overdue * s_overdue
+        + w_reschedule * s_reschedule
+        + w_churn * s_churn
+        + w_wip * s_wip
+        + w_velocity * s_velocity,
+        2,
+    )
+
+    return {
+        "snapshot_date": snap_date,
+        # Raw values
+        "ontime_rate": ontime_rate,
+        "overdue_open": overdue_open,
+        "reschedule_count": reschedule_count,
+        "churn_count": churn_count,
+        "wip_count": wip_count,
+        "velocity_7d": velocity_7d,
+        # Sub-scores
+        "s_ontime": s_ontime,
+        "s_overdue": s_overdue,
+        "s_reschedule": s_reschedule,
+        "s_churn": s_churn,
+        "s_wip": s_wip,
+        "s_velocity": s_velocity,
+        # Weights (for display)
+        "w_ontime": w_ontime,
+        "w_overdue": w_overdue,
+        "w_reschedule": w_reschedule,
+        "w_churn": w_churn,
+        "w_wip": w_wip,
+        "w_velocity": w_velocity,
+        # Composite
+        "efficiency_score": efficiency_score,
+    }
+
+
+def _snapshot_data(snap: EfficiencySnapshot, settings: EfficiencySettings) -> dict[str, Any]:
+    """Stored snapshot → the data dict calculate() returns."""
+    data = _score(
+        settings,
+        snap.snapshot_date,
+        ontime_rate=float(snap.ontime_rate),
+        overdue_open=snap.overdue_open,
+        reschedule_count=snap.reschedule_count,
+        churn_count=snap.churn_count,
+        wip_count=snap.wip_count,
+        velocity_7d=float(snap.velocity_7d),
+    )
+    # Оценки — как посчитаны ночью (веса/пороги могли смениться позже)
+    for key in ("s_ontime", "s_overdue", "s_reschedule", "s_churn", "s_wip", "s_velocity", "efficiency_score"):
+        data[key] = float(getattr(snap, key))
+    data["snapshot_id"] = snap.id
+    return data
+
+
 # ── Metric labels for UI ──────────────────────────────────────────────────────
 
 METRIC_LABELS: dict[str, str] = {
@@ -141,207 +242,227 @@ class EfficiencyService:
         """
         Compute efficiency metrics, upsert snapshot + items, return full data dict.
         """
+        data = self.calculate_all(snap_date, [account_id])[account_id]
+        self._db.commit()
+        return data
+
+    def get_or_calculate(self, account_id: int, snap_date: date) -> dict[str, Any]:
+        """
+        Data dict of the ready snapshot for snap_date (nightly efficiency.snapshots job);
+        computes it only if the job has not produced one yet.
+        """
+        snap = self._db.query(EfficiencySnapshot).filter_by(
+            account_id=account_id, snapshot_date=snap_date
+        ).first()
+        if snap is None:
+            return self.calculate(account_id, snap_date)
+        return _snapshot_data(snap, self.get_or_create_settings(account_id))
+
+    def calculate_all(
+        self,
+        snap_date: date,
+        account_ids: list[int] | None = None,
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Set-based calculation for many accounts (all users by default); caller commits.
+
+        Every metric is one query over all accounts of a chunk (GROUP BY / keyed by
+        account_id), snapshots are bulk-upserted and items bulk-inserted.
+        Returns account_id -> data dict (same shape as calculate()).
+        """
+        if account_ids is None:
+            account_ids = [uid for (uid,) in self._db.query(User.id).order_by(User.id).all()]
+        results: dict[int, dict[str, Any]] = {}
+        for i in range(0, len(account_ids), _ACCOUNT_CHUNK):
+            results.update(self._calculate_chunk(account_ids[i:i + _ACCOUNT_CHUNK], snap_date))
+        return results
+
+    def _calculate_chunk(self, account_ids: list[int], snap_date: date) -> dict[int, dict[str, Any]]:
         db = self._db
-        settings = self.get_or_create_settings(account_id)
+        settings_by_account = self._settings_for(account_ids)
 
         window_30 = snap_date - timedelta(days=30)
         window_7 = snap_date - timedelta(days=7)
+        items: dict[int, dict[str, list[dict]]] = {
+            account_id: {key: [] for key in METRIC_LABELS} for account_id in account_ids
+        }
 
         # ── M1: On-time rate (last 30 days) ──────────────────────────────────
-        completed_tasks = (
-            db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == account_id,
-                TaskModel.status == "DONE",
-                TaskModel.completed_at >= window_30,
-                TaskModel.due_date.isnot(None),
+        completed_day = func.date(TaskModel.completed_at)
+        m1_filter = (
+            TaskModel.account_id.in_(account_ids),
+            TaskModel.status == "DONE",
+            TaskModel.completed_at >= window_30,
+            TaskModel.due_date.isnot(None),
+        )
+        ontime_totals = {
+            r.account_id: (int(r.total), int(r.on_time or 0))
+            for r in (
+                db.query(
+                    TaskModel.account_id,
+                    func.count().label("total"),
+                    func.sum(case((completed_day <= TaskModel.due_date, 1), else_=0)).label("on_time"),
+                )
+                .filter(*m1_filter)
+                .group_by(TaskModel.account_id)
+                .all()
             )
+        }
+        for r in (
+            db.query(TaskModel.account_id, TaskModel.task_id, TaskModel.due_date, TaskModel.completed_at)
+            .filter(*m1_filter, completed_day > TaskModel.due_date)
             .all()
-        )
-        ontime_items: list[dict] = []
-        on_time_count = 0
-        for t in completed_tasks:
-            completed_day = t.completed_at.date() if hasattr(t.completed_at, "date") else t.completed_at
-            if completed_day <= t.due_date:
-                on_time_count += 1
-            else:
-                days_late = (completed_day - t.due_date).days
-                ontime_items.append({
-                    "task_id": t.task_id,
-                    "detail": f"Сдано {days_late} дн. позже срока",
-                })
-        total_with_due = len(completed_tasks)
-        ontime_rate = (on_time_count / total_with_due * 100.0) if total_with_due > 0 else 0.0
+        ):
+            days_late = (r.completed_at.date() - r.due_date).days
+            items[r.account_id]["ontime"].append({
+                "task_id": r.task_id,
+                "detail": f"Сдано {days_late} дн. позже срока",
+            })
 
         # ── M2: Overdue open ──────────────────────────────────────────────────
-        overdue_tasks = (
-            db.query(TaskModel)
+        for r in (
+            db.query(TaskModel.account_id, TaskModel.task_id, TaskModel.due_date)
             .filter(
-                TaskModel.account_id == account_id,
+                TaskModel.account_id.in_(account_ids),
                 TaskModel.status == "ACTIVE",
                 TaskModel.due_date < snap_date,
             )
             .all()
-        )
-        overdue_open = len(overdue_tasks)
-        overdue_items = [{"task_id": t.task_id, "detail": f"Просрочено на {(snap_date - t.due_date).days} дн."} for t in overdue_tasks]
+        ):
+            items[r.account_id]["overdue"].append({
+                "task_id": r.task_id,
+                "detail": f"Просрочено на {(snap_date - r.due_date).days} дн.",
+            })
 
-        # ── M3: Reschedule count (last 7 days) ────────────────────────────────
-        reschedule_rows = (
-            db.query(TaskDueChangeLog)
+        # ── M3: Reschedule count (last 7 days, distinct tasks) ────────────────
+        seen_reschedule: set[tuple[int, int]] = set()
+        for r in (
+            db.query(
+                TaskDueChangeLog.user_id, TaskDueChangeLog.task_id,
+                TaskDueChangeLog.old_due_date, TaskDueChangeLog.new_due_date,
+            )
             .filter(
-                TaskDueChangeLog.user_id == account_id,
+                TaskDueChangeLog.user_id.in_(account_ids),
                 TaskDueChangeLog.changed_at >= window_7,
             )
             .all()
-        )
-        seen_reschedule: set[int] = set()
-        reschedule_items: list[dict] = []
-        for r in reschedule_rows:
-            if r.task_id not in seen_reschedule:
-                seen_reschedule.add(r.task_id)
-                reschedule_items.append({"task_id": r.task_id, "detail": f"{r.old_due_date} → {r.new_due_date}"})
-        reschedule_count = len(seen_reschedule)
+        ):
+            if (r.user_id, r.task_id) in seen_reschedule:
+                continue
+            seen_reschedule.add((r.user_id, r.task_id))
+            items[r.user_id]["reschedule"].append({
+                "task_id": r.task_id,
+                "detail": f"{r.old_due_date} → {r.new_due_date}",
+            })
 
         # ── M4: Churn (archived without completion, last 7 days) ──────────────
-        churn_tasks = (
-            db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == account_id,
+        # ── M5: WIP count ─────────────────────────────────────────────────────
+        # ── M6: Velocity 7d ────────────────────────────────────────────────────
+        for metric_key, detail, filters in (
+            ("churn", "Архивировано без выполнения", (
                 TaskModel.status == "ARCHIVED",
                 TaskModel.archived_at >= window_7,
-            )
-            .all()
-        )
-        churn_count = len(churn_tasks)
-        churn_items = [{"task_id": t.task_id, "detail": "Архивировано без выполнения"} for t in churn_tasks]
-
-        # ── M5: WIP count ─────────────────────────────────────────────────────
-        wip_tasks = (
-            db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == account_id,
+            )),
+            ("wip", "In progress", (
                 TaskModel.board_status == "in_progress",
                 TaskModel.status == "ACTIVE",
+            )),
+            ("velocity", "Завершено", (
+                TaskModel.status == "DONE",
+                TaskModel.completed_at >= window_7,
+            )),
+        ):
+            for r in (
+                db.query(TaskModel.account_id, TaskModel.task_id)
+                .filter(TaskModel.account_id.in_(account_ids), *filters)
+                .all()
+            ):
+                items[r.account_id][metric_key].append({"task_id": r.task_id, "detail": detail})
+
+        # ── Normalise, score ───────────────────────────────────────────────────
+        results: dict[int, dict[str, Any]] = {}
+        for account_id in account_ids:
+            total_with_due, on_time_count = ontime_totals.get(account_id, (0, 0))
+            acc_items = items[account_id]
+            results[account_id] = _score(
+                settings_by_account[account_id],
+                snap_date,
+                ontime_rate=(on_time_count / total_with_due * 100.0) if total_with_due > 0 else 0.0,
+                overdue_open=len(acc_items["overdue"]),
+                reschedule_count=len(acc_items["reschedule"]),
+                churn_count=len(acc_items["churn"]),
+                wip_count=len(acc_items["wip"]),
+                velocity_7d=round(len(acc_items["velocity"]) / 7.0, 2),
             )
-            .all()
-        )
-        wip_count = len(wip_tasks)
-        wip_items = [{"task_id": t.task_id, "detail": "In progress"} for t in wip_tasks]
 
-        # ── M6: Velocity 7d ────────────────────────────────────────────────────
-        velocity_tasks = (
-            db.query(TaskModel)
+        # ── Bulk upsert snapshots ──────────────────────────────────────────────
+        now = datetime.now(tz=timezone.utc)
+        snap_rows = [
+            {
+                "account_id": account_id,
+                "snapshot_date": snap_date,
+                **{col: data[col] for col in _SNAPSHOT_COLUMNS},
+                "calculated_at": now,
+            }
+            for account_id, data in results.items()
+        ]
+        t = EfficiencySnapshot.__table__.c
+        stmt = dialect_insert(db, EfficiencySnapshot).values(snap_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.account_id, t.snapshot_date],
+            set_={col: getattr(stmt.excluded, col) for col in (*_SNAPSHOT_COLUMNS, "calculated_at")},
+        )
+        db.execute(stmt)
+        snapshot_ids = dict(
+            db.query(EfficiencySnapshot.account_id, EfficiencySnapshot.id)
             .filter(
-                TaskModel.account_id == account_id,
-                TaskModel.status == "DONE",
-                TaskModel.completed_at >= window_7,
+                EfficiencySnapshot.account_id.in_(account_ids),
+                EfficiencySnapshot.snapshot_date == snap_date,
             )
             .all()
         )
-        velocity_7d_count = len(velocity_tasks)
-        velocity_7d = round(velocity_7d_count / 7.0, 2)
-        velocity_items = [{"task_id": t.task_id, "detail": f"Завершено"} for t in velocity_tasks]
-
-        # ── Normalise to sub-scores ────────────────────────────────────────────
-        s_ontime = _s_ratio(ontime_rate, float(settings.thr_ontime_green), float(settings.thr_ontime_yellow))
-        s_overdue = _s_penalty(overdue_open, settings.thr_overdue_green, settings.thr_overdue_yellow)
-        s_reschedule = _s_penalty(reschedule_count, settings.thr_reschedule_green, settings.thr_reschedule_yellow)
-        s_churn = _s_penalty(churn_count, settings.thr_churn_green, settings.thr_churn_yellow)
-        s_wip = _s_penalty(wip_count, settings.thr_wip_green, settings.thr_wip_yellow)
-        s_velocity = _s_ratio(velocity_7d, float(settings.thr_velocity_green), float(settings.thr_velocity_yellow))
-
-        # ── Composite score ────────────────────────────────────────────────────
-        w_ontime = float(settings.w_ontime)
-        w_overdue = float(settings.w_overdue)
-        w_reschedule = float(settings.w_reschedule)
-        w_churn = float(settings.w_churn)
-        w_wip = float(settings.w_wip)
-        w_velocity = float(settings.w_velocity)
-
-        efficiency_score = round(
-            w_ontime * s_ontime
-            + w_overdue * s_overdue
-            + w_reschedule * s_reschedule
-            + w_churn * s_churn
-            + w_wip * s_wip
-            + w_velocity * s_velocity,
-            2,
-        )
-
-        # ── Upsert snapshot ────────────────────────────────────────────────────
-        snap = db.query(EfficiencySnapshot).filter_by(
-            account_id=account_id, snapshot_date=snap_date
-        ).first()
-        if snap is None:
-            snap = EfficiencySnapshot(account_id=account_id, snapshot_date=snap_date)
-            db.add(snap)
-            db.flush()
-
-        snap.ontime_rate = ontime_rate
-        snap.overdue_open = overdue_open
-        snap.reschedule_count = reschedule_count
-        snap.churn_count = churn_count
-        snap.wip_count = wip_count
-        snap.velocity_7d = velocity_7d
-        snap.s_ontime = s_ontime
-        snap.s_overdue = s_overdue
-        snap.s_reschedule = s_reschedule
-        snap.s_churn = s_churn
-        snap.s_wip = s_wip
-        snap.s_velocity = s_velocity
-        snap.efficiency_score = efficiency_score
-        snap.calculated_at = datetime.now(tz=timezone.utc)
-        db.flush()
 
         # Delete old items and re-insert
-        db.query(EfficiencySnapshotItem).filter_by(snapshot_id=snap.id).delete()
-
-        all_items: list[tuple[str, list[dict]]] = [
-            ("ontime", ontime_items),
-            ("overdue", overdue_items),
-            ("reschedule", reschedule_items),
-            ("churn", churn_items),
-            ("wip", wip_items),
-            ("velocity", velocity_items),
+        db.query(EfficiencySnapshotItem).filter(
+            EfficiencySnapshotItem.snapshot_id.in_(snapshot_ids.values())
+        ).delete(synchronize_session=False)
+        item_rows = [
+            {
+                "snapshot_id": snapshot_ids[account_id],
+                "metric_key": metric_key,
+                "task_id": item["task_id"],
+                "detail": item.get("detail"),
+            }
+            for account_id, by_metric in items.items()
+            for metric_key, metric_items in by_metric.items()
+            for item in metric_items
         ]
-        for metric_key, items in all_items:
-            for item in items:
-                db.add(EfficiencySnapshotItem(
-                    snapshot_id=snap.id,
-                    metric_key=metric_key,
-                    task_id=item["task_id"],
-                    detail=item.get("detail"),
-                ))
-        db.commit()
-
-        return {
-            "snapshot_id": snap.id,
-            "snapshot_date": snap_date,
-            # Raw values
-            "ontime_rate": ontime_rate,
-            "overdue_open": overdue_open,
-            "reschedule_count": reschedule_count,
-            "churn_count": churn_count,
-            "wip_count": wip_count,
-            "velocity_7d": velocity_7d,
-            # Sub-scores
-            "s_ontime": s_ontime,
-            "s_overdue": s_overdue,
-            "s_reschedule": s_reschedule,
-            "s_churn": s_churn,
-            "s_wip": s_wip,
-            "s_velocity": s_velocity,
-            # Weights (for display)
-            "w_ontime": w_ontime,
-            "w_overdue": w_overdue,
-            "w_reschedule": w_reschedule,
-            "w_churn": w_churn,
-            "w_wip": w_wip,
-            "w_velocity": w_velocity,
-            # Composite
-            "efficiency_score": efficiency_score,
+        if item_rows:
+            db.execute(insert(EfficiencySnapshotItem), item_rows)
+
+        for account_id, data in results.items():
+            data["snapshot_id"] = snapshot_ids[account_id]
+        return results
+
+    def _settings_for(self, account_ids: list[int]) -> dict[int, EfficiencySettings]:
+        """Settings for every account; missing rows are created with defaults in one insert."""
+        db = self._db
+        existing = {
+            s.account_id: s
+            for s in db.query(EfficiencySettings).filter(EfficiencySettings.account_id.in_(account_ids))
         }
+        missing = [a for a in account_ids if a not in existing]
+        if missing:
+            db.execute(
+                dialect_insert(db, EfficiencySettings)
+                .values([{"account_id": a} for a in missing])
+                .on_conflict_do_nothing(index_elements=["account_id"])
+            )
+            existing.update(
+                (s.account_id, s)
+                for s in db.query(EfficiencySettings).filter(EfficiencySettings.account_id.in_(missing))
+            )
+        return existing
 
     def get_metric_items(self, snapshot_id: int, metric_key: str) -> list[dict]:
         """Return per-task drill-down items for a given metric, with task titles."""
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, or_, and_, Integer
 
 from app.infrastructure.eventlog.repository import EventLogRepository
+from app.infrastructure.id_allocator import IdAllocator
 from app.infrastructure.db.models import (
     CalendarEventModel, EventOccurrenceModel,
     EventReminderModel, EventDefaultReminderModel,
@@ -102,7 +103,9 @@ def rebuild_event_occurrences(db: Session, event_id: int, account_id: int, today
         db.commit()
 
     # Regenerate via OccurrenceGenerator
-    OccurrenceGenerator(db).generate_event_occurrences(account_id)
+    generator = OccurrenceGenerator(db)
+    generator.invalidate(account_id, "event", event_id)
+    generator.generate_event_occurrences(account_id)
 
     return deleted
 
@@ -212,16 +215,8 @@ class CreateEventUseCase:
         return event_id
 
     def _generate_id(self) -> int:
-        """Generate a unique event ID from both event_log and events table."""
-        max_from_log = self.db.query(
-            func.max(func.cast(EventLog.payload_json['event_id'], CalendarEventModel.event_id.type))
-        ).filter(EventLog.event_type == 'calendar_event_created').scalar() or 0
-
-        max_from_table = self.db.query(
-            func.max(CalendarEventModel.event_id)
-        ).scalar() or 0
-
-        return max(max_from_log, max_from_table) + 1
+        """Generate a unique event ID (calendar_event_id_seq, seeded from event_log and events table)."""
+        return IdAllocator(self.db).next_id("calendar_event")
 
 
 class UpdateEventUseCase:
@@ -9,44 +9,63 @@ from datetime import date
 
 from sqlalchemy.orm import Session
 
-from app.application.push_service import send_push_to_user
 from app.infrastructure.db.models import HabitModel, HabitOccurrence, User
+from app.application.jobs import REMINDER_PRIORITY, enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
 
 
-def dispatch_habit_streak_reminders(db: Session) -> None:
-    """Find users with at-risk streaks and push a reminder to each."""
-    today = date.today()
-    users = db.query(User).filter(User.is_active == True).all()  # noqa: E712
-    for user in users:
-        try:
-            _remind_user(db, user.id, today)
-        except Exception:
-            logger.exception("habit_streak_reminder failed for user_id=%s", user.id)
+def dispatch_habit_streak_reminders(db: Session, today: date | None = None) -> int:
+    """Find users with at-risk streaks and queue a push reminder to each; returns pushes queued.
 
-
-def _remind_user(db: Session, user_id: int, today: date) -> None:
-    # Pending habit occurrences for today
+    Today's pending occurrences of all active users and their habits are loaded
+    in one query each; the pushes are queued together as delivery.send jobs.
+    """
+    today = today or date.today()
     pending = (
         db.query(HabitOccurrence)
+        .join(User, User.id == HabitOccurrence.account_id)
         .filter(
-            HabitOccurrence.account_id == user_id,
+            User.is_active == True,  # noqa: E712
             HabitOccurrence.scheduled_date == today,
             HabitOccurrence.status != "DONE",
         )
+        .order_by(HabitOccurrence.account_id, HabitOccurrence.id)
         .all()
     )
     if not pending:
-        return
+        return 0
 
     # Load habit models to check current_streak
-    habit_ids = [occ.habit_id for occ in pending]
     habit_map: dict[int, HabitModel] = {
         h.habit_id: h
-        for h in db.query(HabitModel).filter(HabitModel.habit_id.in_(habit_ids)).all()
+        for h in db.query(HabitModel).filter(
+            HabitModel.habit_id.in_({occ.habit_id for occ in pending}),
+        ).all()
     }
+    by_user: dict[int, list[HabitOccurrence]] = {}
+    for occ in pending:
+        by_user.setdefault(occ.account_id, []).append(occ)
+
+    messages = []
+    for user_id, occurrences in by_user.items():
+        try:
+            message = _reminder(user_id, occurrences, habit_map)
+        except Exception:
+            logger.exception("habit_streak_reminder failed for user_id=%s", user_id)
+            continue
+        if message is not None:
+            messages.append(message)
+    queued = enqueue_delivery(db, messages, priority=REMINDER_PRIORITY)
+    db.commit()
+    logger.info("Habit streak reminders: queued for %d user(s)", queued)
+    return queued
 
+
+def _reminder(
+    user_id: int, pending: list[HabitOccurrence], habit_map: dict[int, HabitModel],
+) -> OutboundMessage | None:
     at_risk = [
         (habit_map[occ.habit_id].title, habit_map[occ.habit_id].current_streak)
         for occ in pending
@@ -54,7 +73,7 @@ def _remind_user(db: Session, user_id: int, today: date) -> None:
     ]
 
     if not at_risk:
-        return
+        return None
 
     if len(at_risk) == 1:
         title_text, streak = at_risk[0]
@@ -66,5 +85,7 @@ def _remind_user(db: Session, user_id: int, today: date) -> None:
         title = f"{len(at_risk)} привычки под угрозой"
         body = f"{names}{suffix} — серии прервутся"
 
-    send_push_to_user(db, user_id, {"title": title, "body": body, "url": "/dashboard"})
-    logger.info("Habit streak reminder sent to user_id=%s (%d at-risk)", user_id, len(at_risk))
+    return OutboundMessage(
+        user_id=user_id, kind="habit_reminder",
+        push={"title": title, "body": body, "url": "/dashboard"},
+    )
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.infrastructure.eventlog.repository import EventLogRepository
+from app.infrastructure.id_allocator import IdAllocator
 from app.infrastructure.db.models import HabitModel, HabitOccurrence, RecurrenceRuleModel, EventLog
 from app.domain.habit import Habit
 from app.domain.habit_occurrence import HabitOccurrenceEvent
@@ -103,10 +104,7 @@ class CreateHabitUseCase:
         return habit_id
 
     def _generate_id(self) -> int:
-        max_id = self.db.query(
-            func.max(func.cast(EventLog.payload_json['habit_id'], HabitModel.habit_id.type))
-        ).filter(EventLog.event_type == 'habit_created').scalar() or 0
-        return max_id + 1
+        return IdAllocator(self.db).next_id("habit")
 
 
 class ArchiveHabitUseCase:
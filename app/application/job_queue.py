@@ -0,0 +1,218 @@
+"""
+Durable background job queue — table background_jobs, worker processes.
+
+Slow side effects (AI digest comments, weekly digests, Kinopoisk/football
+refreshes, batched push/Telegram sends) leave the request path and the
+scheduler thread:
+
+    >>> enqueue(db, "digest.ai_comment", {"account_id": 1, "period_key": "2026-W16"},
+    ...         idempotency_key="digest.ai_comment:1:week:2026-W16")
+    >>> db.commit()  # job becomes visible together with the caller's writes
+
+Workers (python -m app.worker, or the in-process drain when
+JOB_QUEUE_INPROCESS=True) take ready rows with FOR UPDATE SKIP LOCKED,
+highest priority first. A failed job goes back to the queue with
+exponential backoff until max_attempts, then stays as 'failed'.
+
+Handlers are registered with @job_handler("kind") in app.application.jobs.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import BackgroundJob
+from app.infrastructure.db.upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+_HANDLERS: dict[str, Callable[[Session, dict], None]] = {}
+
+
+def job_handler(kind: str):
+    """Register fn(db, payload) as the handler for jobs of this kind."""
+    def decorator(fn):
+        _HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def _load_handlers() -> None:
+    import app.application.jobs  # noqa: F401 — registers handlers
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before retry number `attempts` (30s, 1m, 2m, … up to 1h)."""
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+
+
+# ── Producer API ─────────────────────────────────────────────────────────────
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict | None = None,
+    *,
+    priority: int = 0,
+    run_at: datetime | None = None,
+    idempotency_key: str | None = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> int | None:
+    """
+    Add a job in the caller's transaction (caller commits)
+
+    Args:
+        priority: больше — раньше
+        run_at: не раньше этого момента (None — сразу)
+        idempotency_key: задача с таким ключом уже есть — ничего не добавляется
+
+    Returns:
+        id новой задачи или None, если ключ уже занят
+    """
+    values = {
+        "kind": kind,
+        "payload": payload or {},
+        "priority": priority,
+        "run_at": run_at or datetime.now(timezone.utc),
+        "max_attempts": max_attempts,
+        "idempotency_key": idempotency_key,
+    }
+    stmt = dialect_insert(db, BackgroundJob).values(**values)
+    if idempotency_key is not None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["idempotency_key"])
+    return db.execute(stmt.returning(BackgroundJob.id)).scalar()
+
+
+# ── Consumer API ─────────────────────────────────────────────────────────────
+
+def dequeue(db: Session, worker_id: str, kinds: list[str] | None = None) -> BackgroundJob | None:
+    """Lock the next ready job (SKIP LOCKED), mark it running and commit."""
+    now = datetime.now(timezone.utc)
+    q = db.query(BackgroundJob).filter(
+        BackgroundJob.status == "queued",
+        BackgroundJob.run_at <= now,
+    )
+    if kinds:
+        q = q.filter(BackgroundJob.kind.in_(kinds))
+    job = (
+        q.order_by(BackgroundJob.priority.desc(), BackgroundJob.run_at, BackgroundJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+    job.status = "running"
+    job.locked_by = worker_id
+    job.locked_at = now
+    job.attempts += 1
+    db.commit()
+    return job
+
+
+def execute(db: Session, job: BackgroundJob) -> bool:
+    """Run the job's handler; record done, retry or failed. True — succeeded."""
+    job_id, kind, payload = job.id, job.kind, dict(job.payload or {})
+    handler = _HANDLERS.get(kind)
+    error = None
+    if handler is None:
+        error = f"no handler for job kind {kind!r}"
+    else:
+        try:
+            handler(db, payload)
+            db.commit()
+        except Exception:
+            db.rollback()
+            error = traceback.format_exc(limit=5)
+            logger.exception("Job %s (%s) failed", job_id, kind)
+
+    job = db.get(BackgroundJob, job_id)
+    now = datetime.now(timezone.utc)
+    job.locked_by = None
+    job.locked_at = None
+    if error is None:
+        job.status = "done"
+        job.finished_at = now
+        job.last_error = None
+    elif handler is None or job.attempts >= job.max_attempts:
+        job.status = "failed"
+        job.finished_at = now
+        job.last_error = error
+    else:
+        job.status = "queued"
+        job.run_at = now + backoff(job.attempts)
+        job.last_error = error
+    db.commit()
+    return error is None
+
+
+def run_pending(db: Session, worker_id: str | None = None, limit: int = 100,
+                kinds: list[str] | None = None) -> int:
+    """Execute up to `limit` ready jobs; returns how many were taken."""
+    _load_handlers()
+    worker_id = worker_id or default_worker_id()
+    taken = 0
+    while taken < limit:
+        job = dequeue(db, worker_id, kinds)
+        if job is None:
+            break
+        execute(db, job)
+        taken += 1
+    return taken
+
+
+# ── Maintenance ──────────────────────────────────────────────────────────────
+
+def requeue_stale(db: Session, timeout: timedelta) -> int:
+    """
+    Return jobs of crashed workers (running longer than timeout) to the queue
+
+    Попытка уже засчитана в dequeue: задача, исчерпавшая max_attempts,
+    помечается failed, как после обычной ошибки. Returns requeued count.
+    """
+    now = datetime.now(timezone.utc)
+    stale = (BackgroundJob.status == "running", BackgroundJob.locked_at < now - timeout)
+    failed = db.execute(
+        update(BackgroundJob)
+        .where(*stale, BackgroundJob.attempts >= BackgroundJob.max_attempts)
+        .values(status="failed", locked_by=None, locked_at=None, finished_at=now,
+                last_error=f"worker lost: running longer than {timeout}")
+        .execution_options(synchronize_session=False)
+    )
+    result = db.execute(
+        update(BackgroundJob)
+        .where(*stale)
+        .values(status="queued", locked_by=None, locked_at=None, run_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if failed.rowcount:
+        logger.error("Failed %d stale background job(s) with no attempts left", failed.rowcount)
+    if result.rowcount:
+        logger.warning("Requeued %d stale background job(s)", result.rowcount)
+    return result.rowcount
+
+
+def purge_finished(db: Session, older_than: timedelta) -> int:
+    """Delete done/failed jobs older than the retention (frees idempotency keys)."""
+    cutoff = datetime.now(timezone.utc) - older_than
+    deleted = (
+        db.query(BackgroundJob)
+        .filter(BackgroundJob.status.in_(("done", "failed")), BackgroundJob.finished_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
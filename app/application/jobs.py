@@ -0,0 +1,119 @@
+"""
+Background job handlers (see app.application.job_queue).
+
+Kinds:
+  digest.weekly          {account_id, week_start}  — build and save a weekly digest
+  digest.weekly_batch    {account_ids, week_start} — weekly digests for a chunk of accounts
+  digest.ai_comment      {account_id, period_key}  — AI commentary for a saved digest
+  media.release_refresh  {}                        — Kinopoisk release dates
+  football.refresh       {}                        — Zenit fixtures
+  delivery.send          {messages: [...]}         — batched push/Telegram sends
+  projector.snapshots    {}                        — nightly read-model snapshots + retention
+  efficiency.snapshots   {snapshot_date}           — nightly efficiency snapshots for all users
+
+Handlers run in a worker with their own Session; the queue commits after a
+handler returns and rolls back + retries if it raises.
+"""
+import dataclasses
+import logging
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from app.application.job_queue import enqueue, job_handler
+from app.infrastructure.delivery import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_JOB_SIZE = 500  # messages per delivery.send job
+# Напоминания привязаны ко времени — обгоняют дайджесты и рассылки в очереди
+REMINDER_PRIORITY = 10
+
+
+@job_handler("digest.weekly")
+def _digest_weekly(db: Session, payload: dict) -> None:
+    from app.application.digests import generate_and_save_weekly_digest
+
+    generate_and_save_weekly_digest(db, payload["account_id"], date.fromisoformat(payload["week_start"]))
+
+
+@job_handler("digest.weekly_batch")
+def _digest_weekly_batch(db: Session, payload: dict) -> None:
+    from app.application.digests import generate_weekly_digests
+
+    count = generate_weekly_digests(db, payload["account_ids"], date.fromisoformat(payload["week_start"]))
+    logger.info("digest.weekly_batch %s: %d digest(s)", payload["week_start"], count)
+
+
+@job_handler("digest.ai_comment")
+def _digest_ai_comment(db: Session, payload: dict) -> None:
+    from app.application.digests import add_ai_comment
+
+    add_ai_comment(db, payload["account_id"], "week", payload["period_key"])
+
+
+@job_handler("media.release_refresh")
+def _media_release_refresh(db: Session, payload: dict) -> None:
+    from app.application.media_release_refresh import refresh_media_release_dates
+
+    refresh_media_release_dates(db)
+
+
+@job_handler("football.refresh")
+def _football_refresh(db: Session, payload: dict) -> None:
+    from app.application.football_refresh import refresh_football_matches
+
+    refresh_football_matches(db)
+
+
+@job_handler("delivery.send")
+def _delivery_send(db: Session, payload: dict) -> None:
+    from app.infrastructure.delivery import enqueue_many
+
+    report = enqueue_many(db, [OutboundMessage(**m) for m in payload["messages"]])
+    logger.info(
+        "delivery.send: push=%d telegram=%d telegram_failed=%d",
+        report.push_sent, report.telegram_sent, report.telegram_failed,
+    )
+
+
+@job_handler("projector.snapshots")
+def _projector_snapshots(db: Session, payload: dict) -> None:
+    from app.config import get_settings
+    from app.readmodels.snapshots import take_due_snapshots
+
+    settings = get_settings()
+    take_due_snapshots(db, settings.PROJECTOR_SNAPSHOT_MIN_EVENTS, settings.PROJECTOR_SNAPSHOT_KEEP)
+
+
+@job_handler("efficiency.snapshots")
+def _efficiency_snapshots(db: Session, payload: dict) -> None:
+    from app.application.efficiency import EfficiencyService
+
+    results = EfficiencyService(db).calculate_all(date.fromisoformat(payload["snapshot_date"]))
+    logger.info("efficiency.snapshots: %d account(s)", len(results))
+
+
+def enqueue_delivery(
+    db: Session,
+    messages: list[OutboundMessage],
+    *,
+    priority: int = 0,
+    idempotency_key: str | None = None,
+) -> int:
+    """
+    Send a batch of messages from a worker instead of the caller's thread (caller commits)
+
+    Split into delivery.send jobs of DELIVERY_JOB_SIZE messages so that several
+    workers share a large batch; idempotency_key gets the chunk offset appended.
+    Returns the number of messages queued (chunks whose key is taken don't count).
+    """
+    queued = 0
+    for i in range(0, len(messages), DELIVERY_JOB_SIZE):
+        chunk = messages[i:i + DELIVERY_JOB_SIZE]
+        if enqueue(
+            db, "delivery.send", {"messages": [dataclasses.asdict(m) for m in chunk]},
+            priority=priority, idempotency_key=f"{idempotency_key}:{i}" if idempotency_key else None,
+        ):
+            queued += len(chunk)
+    return queued
@@ -31,6 +31,8 @@ from app.infrastructure.db.models import (
     TelegramSettings,
     DigestModel,
 )
+from app.application.jobs import enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
 
@@ -451,9 +453,13 @@ def _in_quiet_hours(now_time, settings: UserNotificationSettings | None) -> bool
 _TELEGRAM_RETRY = object()  # sentinel compared by identity; leaves delivery as pending
 
 
-def _send_telegram(db: Session, notif: NotificationModel):
+def _send_telegram(
+    notif: NotificationModel, us: UserNotificationSettings | None, tg: TelegramSettings | None,
+):
     """Send a Telegram message using the user's own bot token.
 
+    us/tg — the user's settings and connected bot, preloaded by the dispatcher.
+
     Returns:
         True  — message delivered successfully.
         False — permanent failure (4xx other than 429); mark delivery failed.
@@ -463,12 +469,10 @@ def _send_telegram(db: Session, notif: NotificationModel):
     from app.infrastructure.telegram import tg_api, get_pref
 
     # Пер-видовые настройки: выключено — считаем доставленным (пропуск по воле юзера)
-    us = db.query(UserNotificationSettings).filter_by(user_id=notif.user_id).first()
     enabled, silent = get_pref(us.rule_prefs_json if us else None, notif.rule_code)
     if not enabled:
         return True
 
-    tg = db.query(TelegramSettings).filter_by(user_id=notif.user_id, connected=True).first()
     if not tg or not tg.chat_id or not tg.bot_token:
         return False
     bot_token = decrypt(tg.bot_token)
@@ -516,7 +520,11 @@ def _send_email(db: Session, notif: NotificationModel) -> bool:
 
 
 def dispatch_pending_deliveries(db: Session) -> None:
-    """Process all pending deliveries, respecting quiet hours for external channels."""
+    """Process all pending deliveries, respecting quiet hours for external channels.
+
+    Notifications, settings and bots of the batch are loaded in one query each;
+    in-app pushes are queued as delivery.send jobs.
+    """
     now = datetime.now(tz=ZoneInfo("Europe/Moscow"))
     pending = (
         db.query(NotificationDelivery)
@@ -525,34 +533,41 @@ def dispatch_pending_deliveries(db: Session) -> None:
         .limit(500)
         .all()
     )
+    if not pending:
+        return
+    notifs = {
+        n.id: n for n in db.query(NotificationModel).filter(
+            NotificationModel.id.in_({d.notification_id for d in pending}),
+        ).all()
+    }
+    user_ids = {n.user_id for n in notifs.values()}
+    settings_map = {
+        s.user_id: s for s in db.query(UserNotificationSettings).filter(
+            UserNotificationSettings.user_id.in_(user_ids),
+        ).all()
+    }
+    bots = {
+        tg.user_id: tg for tg in db.query(TelegramSettings).filter(
+            TelegramSettings.user_id.in_(user_ids), TelegramSettings.connected == True,  # noqa: E712
+        ).all()
+    }
+
+    inapp: list[tuple[NotificationDelivery, NotificationModel]] = []
     for delivery in pending:
         try:
-            notif = db.get(NotificationModel, delivery.notification_id)
+            notif = notifs.get(delivery.notification_id)
             if notif is None:
                 continue
-            settings = db.query(UserNotificationSettings).filter_by(user_id=notif.user_id).first()
+            settings = settings_map.get(notif.user_id)
 
             if delivery.channel == "inapp":
-                delivery.status = "sending"
-                delivery.sent_at = now
-                db.commit()
-                try:
-                    from app.application.push_service import send_push_to_user
-                    send_push_to_user(db, notif.user_id, {
-                        "title": notif.title,
-                        "body": notif.body_inapp,
-                        "url": "/notifications",
-                    })
-                except Exception:
-                    pass  # push is best-effort, don't fail the delivery
-                delivery.status = "sent"
-                db.commit()
+                inapp.append((delivery, notif))
             elif delivery.channel == "telegram":
                 if _in_quiet_hours(now.time(), settings):
                     continue
                 delivery.status = "sending"
                 db.commit()
-                result = _send_telegram(db, notif)
+                result = _send_telegram(notif, settings, bots.get(notif.user_id))
                 if result is _TELEGRAM_RETRY:
                     # Transient failure — revert to pending so next cycle retries
                     delivery.status = "pending"
@@ -572,3 +587,21 @@ def dispatch_pending_deliveries(db: Session) -> None:
                 db.commit()
         except Exception:
             logger.exception("dispatch_pending_deliveries failed for delivery_id=%s", delivery.id)
+
+    if inapp:
+        # Пуши шлёт воркер; статусы и задача доставки фиксируются одним commit'ом
+        try:
+            enqueue_delivery(db, [
+                OutboundMessage(
+                    user_id=notif.user_id, kind=notif.rule_code,
+                    push={"title": notif.title, "body": notif.body_inapp, "url": "/notifications"},
+                )
+                for _, notif in inapp
+            ])
+            for delivery, _ in inapp:
+                delivery.status = "sent"
+                delivery.sent_at = now
+            db.commit()
+        except Exception:
+            db.rollback()  # остаются pending — следующий цикл повторит
+            logger.exception("Queueing in-app pushes failed")
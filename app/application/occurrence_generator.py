@@ -1,17 +1,30 @@
 """
 Occurrence Generator - lazily generates occurrences for habits, task templates, operation templates.
 
-Called when loading pages. Uses recurrence engine to compute dates,
-then inserts missing occurrences into the DB (idempotent - checks before insert).
+Called when loading pages. Uses recurrence engine (expand_rules, one pass per clipped window) to compute dates,
+then inserts missing occurrences into the DB (idempotent - INSERT ... ON CONFLICT DO NOTHING).
+
+Incremental: every entity has an OccurrenceWatermark (rule hash + materialized_until).
+While the rule is unchanged and the watermark covers the window, the entity is skipped,
+so repeated page loads cost three queries per kind and no recurrence expansion.
+When only the window moved forward, just the new tail is inserted.
+
+This is the only bulk consumer of the recurrence engine: the plan view and
+budget forecasts read the materialized task/operation/habit occurrences and
+never expand rules themselves.
 """
+import hashlib
 import logging
 from datetime import date, timedelta
-from sqlalchemy.exc import IntegrityError
+from typing import Callable
+
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
-from app.domain.recurrence import rule_spec_from_db, generate_occurrence_dates
+from app.domain.recurrence import rule_spec_from_db, expand_rules
+from app.infrastructure.db.upsert import dialect_insert
+from app.application.reminder_index import ReminderIndex
 from app.infrastructure.db.models import (
     RecurrenceRuleModel,
     HabitModel, HabitOccurrence,
@@ -19,6 +32,17 @@ from app.infrastructure.db.models import (
     OperationTemplateModel, OperationOccurrence,
     CalendarEventModel, EventOccurrenceModel,
     EventDefaultReminderModel, EventReminderModel,
+    OccurrenceWatermark,
+)
+
+# Rows per INSERT statement (keeps bind parameters well below driver limits)
+_INSERT_CHUNK = 1000
+
+# RecurrenceRuleModel fields that define the generated dates
+_RULE_FIELDS = (
+    "freq", "interval", "start_date", "until_date", "count", "by_weekday",
+    "by_monthday", "monthday_clip_to_last_day", "by_month", "by_monthday_for_year",
+    "dates_json",
 )
 
 
@@ -30,6 +54,13 @@ def _get_window() -> tuple[date, date]:
     return window_start, window_end
 
 
+def rule_version_hash(rule: RecurrenceRuleModel, *bounds) -> str:
+    """Stable hash of the rule definition plus entity bounds (active_from/active_until)."""
+    raw = "|".join(str(getattr(rule, f)) for f in _RULE_FIELDS)
+    raw += "|" + "|".join(str(b) for b in bounds)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
 class OccurrenceGenerator:
     def __init__(self, db: Session):
         self.db = db
@@ -42,59 +73,22 @@ class OccurrenceGenerator:
         ).all()
 
         window_start, window_end = _get_window()
-        count = 0
-
-        for habit in habits:
-            rule = self.db.query(RecurrenceRuleModel).filter(
-                RecurrenceRuleModel.rule_id == habit.rule_id
-            ).first()
-            if not rule:
-                continue
-
-            ws = max(window_start, habit.active_from)
-            we = window_end
-            if habit.active_until:
-                we = min(we, habit.active_until)
-            if ws > we:
-                continue
-
-            spec = rule_spec_from_db(rule)
-            try:
-                dates = generate_occurrence_dates(spec, ws, we)
-            except ValueError:
-                continue
-
-            # Get existing dates for this habit in one query
-            existing_dates = {
-                row.scheduled_date for row in
-                self.db.query(HabitOccurrence.scheduled_date).filter(
-                    HabitOccurrence.account_id == account_id,
-                    HabitOccurrence.habit_id == habit.habit_id,
-                    HabitOccurrence.scheduled_date >= ws,
-                    HabitOccurrence.scheduled_date <= we,
-                ).all()
-            }
-
-            for d in dates:
-                if d in existing_dates:
-                    continue
-                occurrence = HabitOccurrence(
-                    account_id=account_id,
-                    habit_id=habit.habit_id,
-                    scheduled_date=d,
-                    status="ACTIVE",
-                )
-                try:
-                    with self.db.begin_nested():  # SAVEPOINT
-                        self.db.add(occurrence)
-                        self.db.flush()
-                    count += 1
-                except IntegrityError:
-                    pass  # race: another request already inserted this occurrence
-
-        if count > 0:
-            self.db.commit()
-        return count
+        plan, changed = self._plan(
+            account_id, "habit", habits, window_start, window_end,
+            entity_id=lambda h: h.habit_id,
+            rule_id=lambda h: h.rule_id,
+            bounds=lambda h: (h.active_from, h.active_until),
+        )
+        rows = [
+            {"account_id": account_id, "habit_id": habit.habit_id,
+             "scheduled_date": d, "status": "ACTIVE"}
+            for habit, dates in plan for d in dates
+        ]
+        count = self._insert_missing(HabitOccurrence, rows)
+        if count:
+            # Core insert bypasses the ORM hook that maintains the reminder index
+            ReminderIndex(self.db).sync(habits={h.habit_id for h, dates in plan if dates})
+        return self._finish(count, changed)
 
     def generate_task_occurrences(self, account_id: int) -> int:
         """Generate missing task template occurrences. Returns count of new rows."""
@@ -104,58 +98,18 @@ class OccurrenceGenerator:
         ).all()
 
         window_start, window_end = _get_window()
-        count = 0
-
-        for tmpl in templates:
-            rule = self.db.query(RecurrenceRuleModel).filter(
-                RecurrenceRuleModel.rule_id == tmpl.rule_id
-            ).first()
-            if not rule:
-                continue
-
-            ws = max(window_start, tmpl.active_from)
-            we = window_end
-            if tmpl.active_until:
-                we = min(we, tmpl.active_until)
-            if ws > we:
-                continue
-
-            spec = rule_spec_from_db(rule)
-            try:
-                dates = generate_occurrence_dates(spec, ws, we)
-            except ValueError:
-                continue
-
-            existing_dates = {
-                row.scheduled_date for row in
-                self.db.query(TaskOccurrence.scheduled_date).filter(
-                    TaskOccurrence.account_id == account_id,
-                    TaskOccurrence.template_id == tmpl.template_id,
-                    TaskOccurrence.scheduled_date >= ws,
-                    TaskOccurrence.scheduled_date <= we,
-                ).all()
-            }
-
-            for d in dates:
-                if d in existing_dates:
-                    continue
-                occurrence = TaskOccurrence(
-                    account_id=account_id,
-                    template_id=tmpl.template_id,
-                    scheduled_date=d,
-                    status="ACTIVE",
-                )
-                try:
-                    with self.db.begin_nested():  # SAVEPOINT
-                        self.db.add(occurrence)
-                        self.db.flush()
-                    count += 1
-                except IntegrityError:
-                    pass  # race: another request already inserted this occurrence
-
-        if count > 0:
-            self.db.commit()
-        return count
+        plan, changed = self._plan(
+            account_id, "task", templates, window_start, window_end,
+            entity_id=lambda t: t.template_id,
+            rule_id=lambda t: t.rule_id,
+            bounds=lambda t: (t.active_from, t.active_until),
+        )
+        rows = [
+            {"account_id": account_id, "template_id": tmpl.template_id,
+             "scheduled_date": d, "status": "ACTIVE"}
+            for tmpl, dates in plan for d in dates
+        ]
+        return self._finish(self._insert_missing(TaskOccurrence, rows), changed)
 
     def generate_operation_occurrences(self, account_id: int, until: date | None = None) -> int:
         """Generate missing operation template occurrences. Returns count of new rows.
@@ -172,58 +126,18 @@ class OccurrenceGenerator:
         window_start, window_end = _get_window()
         if until is not None and until > window_end:
             window_end = until
-        count = 0
-
-        for tmpl in templates:
-            rule = self.db.query(RecurrenceRuleModel).filter(
-                RecurrenceRuleModel.rule_id == tmpl.rule_id
-            ).first()
-            if not rule:
-                continue
-
-            ws = max(window_start, tmpl.active_from)
-            we = window_end
-            if tmpl.active_until:
-                we = min(we, tmpl.active_until)
-            if ws > we:
-                continue
-
-            spec = rule_spec_from_db(rule)
-            try:
-                dates = generate_occurrence_dates(spec, ws, we)
-            except ValueError:
-                continue
-
-            existing_dates = {
-                row.scheduled_date for row in
-                self.db.query(OperationOccurrence.scheduled_date).filter(
-                    OperationOccurrence.account_id == account_id,
-                    OperationOccurrence.template_id == tmpl.template_id,
-                    OperationOccurrence.scheduled_date >= ws,
-                    OperationOccurrence.scheduled_date <= we,
-                ).all()
-            }
-
-            for d in dates:
-                if d in existing_dates:
-                    continue
-                occurrence = OperationOccurrence(
-                    account_id=account_id,
-                    template_id=tmpl.template_id,
-                    scheduled_date=d,
-                    status="ACTIVE",
-                )
-                try:
-                    with self.db.begin_nested():  # SAVEPOINT
-                        self.db.add(occurrence)
-                        self.db.flush()
-                    count += 1
-                except IntegrityError:
-                    pass  # race: another request already inserted this occurrence
-
-        if count > 0:
-            self.db.commit()
-        return count
+        plan, changed = self._plan(
+            account_id, "operation", templates, window_start, window_end,
+            entity_id=lambda t: t.template_id,
+            rule_id=lambda t: t.rule_id,
+            bounds=lambda t: (t.active_from, t.active_until),
+        )
+        rows = [
+            {"account_id": account_id, "template_id": tmpl.template_id,
+             "scheduled_date": d, "status": "ACTIVE"}
+            for tmpl, dates in plan for d in dates
+        ]
+        return self._finish(self._insert_missing(OperationOccurrence, rows), changed)
 
     def generate_event_occurrences(self, account_id: int) -> int:
         """Generate missing event occurrences for repeating calendar events. Returns count of new rows."""
@@ -236,80 +150,199 @@ class OccurrenceGenerator:
         today = date.today()
         window_start = today
         window_end = today + timedelta(days=90)
-        count = 0
+        plan, changed = self._plan(
+            account_id, "event", events, window_start, window_end,
+            entity_id=lambda e: e.event_id,
+            rule_id=lambda e: e.repeat_rule_id,
+            bounds=lambda e: (None, None),
+        )
+        rows = [
+            {"account_id": account_id, "event_id": ev.event_id, "start_date": d,
+             "start_time": ev.default_start_time, "end_time": ev.default_end_time,
+             "is_cancelled": False, "source": "rule"}
+            for ev, dates in plan for d in dates
+        ]
+        if not rows:
+            return self._finish(0, changed)
+
+        inserted = self._insert_missing(
+            EventOccurrenceModel, rows,
+            returning=(EventOccurrenceModel.id, EventOccurrenceModel.event_id),
+        )
+
+        # Copy default reminders onto the new occurrences (one query for all events)
+        reminders_by_event: dict[int, list[EventDefaultReminderModel]] = {}
+        for dr in self.db.query(EventDefaultReminderModel).filter(
+            EventDefaultReminderModel.event_id.in_({ev.event_id for ev, dates in plan if dates}),
+            EventDefaultReminderModel.is_enabled == True,
+        ).all():
+            reminders_by_event.setdefault(dr.event_id, []).append(dr)
+
+        reminder_rows = [
+            {"occurrence_id": occ_id, "channel": dr.channel, "mode": dr.mode,
+             "offset_minutes": dr.offset_minutes, "fixed_time": dr.fixed_time,
+             "is_enabled": dr.is_enabled}
+            for occ_id, event_id in inserted
+            for dr in reminders_by_event.get(event_id, ())
+        ]
+        if reminder_rows:
+            self.db.execute(EventReminderModel.__table__.insert(), reminder_rows)
+        if inserted:
+            ReminderIndex(self.db).sync(events={event_id for _, event_id in inserted})
+
+        return self._finish(len(inserted), changed)
 
-        for ev in events:
-            rule = self.db.query(RecurrenceRuleModel).filter(
-                RecurrenceRuleModel.rule_id == ev.repeat_rule_id
-            ).first()
+    def generate_all(self, account_id: int) -> dict[str, int]:
+        """Generate all types of occurrences. Returns dict of counts."""
+        return {
+            "habits": self.generate_habit_occurrences(account_id),
+            "tasks": self.generate_task_occurrences(account_id),
+            "operations": self.generate_operation_occurrences(account_id),
+            "events": self.generate_event_occurrences(account_id),
+        }
+
+    def invalidate(self, account_id: int, kind: str, entity_id: int) -> None:
+        """Drop the watermark so the next generate_* call re-materializes the window.
+
+        Needed when occurrences were deleted on purpose to be regenerated
+        (e.g. rebuild_event_occurrences) — otherwise the watermark would skip them.
+        """
+        self.db.query(OccurrenceWatermark).filter(
+            OccurrenceWatermark.account_id == account_id,
+            OccurrenceWatermark.kind == kind,
+            OccurrenceWatermark.entity_id == entity_id,
+        ).delete(synchronize_session=False)
+
+    # ------------------------------------------------------------------
+    # Watermarks & bulk insert
+    # ------------------------------------------------------------------
+
+    def _plan(
+        self,
+        account_id: int,
+        kind: str,
+        entities: list,
+        window_start: date,
+        window_end: date,
+        entity_id: Callable,
+        rule_id: Callable,
+        bounds: Callable,
+    ) -> tuple[list[tuple[object, list[date]]], bool]:
+        """
+        Decide which dates to materialize per entity and advance watermarks.
+
+        Returns ([(entity, dates)], watermarks_changed). The plan lists only
+        entities whose rule changed or whose watermark is behind window_end.
+        Watermarks of entities that are no longer active are dropped, so
+        reactivation regenerates the window.
+        """
+        rules = {}
+        if entities:
+            rules = {
+                r.rule_id: r for r in self.db.query(RecurrenceRuleModel).filter(
+                    RecurrenceRuleModel.rule_id.in_({rule_id(e) for e in entities})
+                ).all()
+            }
+        marks = {
+            m.entity_id: m for m in self.db.query(OccurrenceWatermark).filter(
+                OccurrenceWatermark.account_id == account_id,
+                OccurrenceWatermark.kind == kind,
+            ).all()
+        }
+
+        pending = []  # (entity, mark, rule_hash, spec)
+        advanced = []
+        for entity in entities:
+            rule = rules.get(rule_id(entity))
             if not rule:
                 continue
+            eid = entity_id(entity)
+            rule_hash = rule_version_hash(rule, *bounds(entity))
+
+            mark = marks.pop(eid, None)
+            if mark and mark.rule_hash == rule_hash and mark.materialized_until >= window_end:
+                continue  # up to date
 
-            spec = rule_spec_from_db(rule)
             try:
-                dates = generate_occurrence_dates(spec, window_start, window_end)
+                spec = rule_spec_from_db(rule)
             except ValueError as e:
-                logger.warning("Skipping event %s: invalid recurrence rule: %s", ev.event_id, e)
+                logger.warning("Skipping %s %s: invalid recurrence rule: %s", kind, eid, e)
+                spec = None
+            pending.append((entity, mark, rule_hash, spec))
+            advanced.append({
+                "account_id": account_id, "kind": kind, "entity_id": eid,
+                "rule_hash": rule_hash, "materialized_until": window_end,
+            })
+
+        # Окно режется по active_from/active_until до разворота (COUNT считается
+        # внутри окна); правила с одинаковым окном — одним вызовом expand_rules
+        groups: dict[tuple[date, date], list[int]] = {}
+        for i, (entity, _mark, _hash, spec) in enumerate(pending):
+            if spec is None:
                 continue
+            active_from, active_until = bounds(entity)
+            ws = max(window_start, active_from) if active_from else window_start
+            we = min(window_end, active_until) if active_until else window_end
+            if ws <= we:
+                groups.setdefault((ws, we), []).append(i)
+        expanded: dict[int, list[date]] = {}
+        for (ws, we), members in groups.items():
+            batch = expand_rules([pending[i][3] for i in members], ws, we)
+            for j, i in enumerate(members):
+                if j in batch.errors:
+                    logger.warning(
+                        "Skipping %s %s: invalid recurrence rule: %s",
+                        kind, entity_id(pending[i][0]), batch.errors[j],
+                    )
+                expanded[i] = batch.dates_for(j)
+
+        plan = []
+        for i, (entity, mark, rule_hash, _spec) in enumerate(pending):
+            dates = expanded.get(i, [])
+            if mark and mark.rule_hash == rule_hash:
+                # Same rule, window moved forward: only the new tail
+                dates = [d for d in dates if d > mark.materialized_until]
+            plan.append((entity, dates))
+
+        if advanced:
+            stmt = dialect_insert(self.db, OccurrenceWatermark).values(advanced)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["account_id", "kind", "entity_id"],
+                set_={
+                    "rule_hash": stmt.excluded.rule_hash,
+                    "materialized_until": stmt.excluded.materialized_until,
+                },
+            ))
+        if marks:
+            self.db.query(OccurrenceWatermark).filter(
+                OccurrenceWatermark.account_id == account_id,
+                OccurrenceWatermark.kind == kind,
+                OccurrenceWatermark.entity_id.in_(marks.keys()),
+            ).delete(synchronize_session=False)
+        return plan, bool(advanced or marks)
+
+    def _insert_missing(self, model, rows: list[dict], returning=None):
+        """
+        One INSERT ... ON CONFLICT DO NOTHING for all rows.
 
-            # Get existing dates for this event with source='rule'
-            existing_dates = {
-                row.start_date for row in
-                self.db.query(EventOccurrenceModel.start_date).filter(
-                    EventOccurrenceModel.account_id == account_id,
-                    EventOccurrenceModel.event_id == ev.event_id,
-                    EventOccurrenceModel.source == "rule",
-                    EventOccurrenceModel.start_date >= window_start,
-                    EventOccurrenceModel.start_date <= window_end,
-                ).all()
-            }
-
-            # Load default reminders once per event
-            default_reminders = self.db.query(EventDefaultReminderModel).filter(
-                EventDefaultReminderModel.event_id == ev.event_id,
-                EventDefaultReminderModel.is_enabled == True,
-            ).all()
+        Concurrent requests may race to insert the same occurrence; the unique
+        constraint turns the loser's rows into no-ops.
 
-            for d in dates:
-                if d in existing_dates:
-                    continue
-                occ = EventOccurrenceModel(
-                    account_id=account_id,
-                    event_id=ev.event_id,
-                    start_date=d,
-                    start_time=ev.default_start_time,
-                    end_time=ev.default_end_time,
-                    is_cancelled=False,
-                    source="rule",
-                )
-                try:
-                    with self.db.begin_nested():  # SAVEPOINT
-                        self.db.add(occ)
-                        self.db.flush()  # get occ.id for reminders
-
-                        # Copy default reminders
-                        for dr in default_reminders:
-                            self.db.add(EventReminderModel(
-                                occurrence_id=occ.id,
-                                channel=dr.channel,
-                                mode=dr.mode,
-                                offset_minutes=dr.offset_minutes,
-                                fixed_time=dr.fixed_time,
-                                is_enabled=dr.is_enabled,
-                            ))
-                    count += 1
-                except IntegrityError:
-                    pass  # race: another request already inserted this occurrence
-
-        if count > 0:
+        Returns inserted row count, or the inserted rows when `returning` is given.
+        """
+        inserted: list[tuple] = []
+        count = 0
+        for i in range(0, len(rows), _INSERT_CHUNK):
+            stmt = dialect_insert(self.db, model).values(
+                rows[i:i + _INSERT_CHUNK]
+            ).on_conflict_do_nothing()
+            if returning is not None:
+                inserted += [tuple(r) for r in self.db.execute(stmt.returning(*returning)).all()]
+            else:
+                count += self.db.execute(stmt).rowcount
+        return inserted if returning is not None else count
+
+    def _finish(self, count: int, changed: bool) -> int:
+        if count > 0 or changed:
             self.db.commit()
         return count
-
-    def generate_all(self, account_id: int) -> dict[str, int]:
-        """Generate all types of occurrences. Returns dict of counts."""
-        return {
-            "habits": self.generate_habit_occurrences(account_id),
-            "tasks": self.generate_task_occurrences(account_id),
-            "operations": self.generate_operation_occurrences(account_id),
-            "events": self.generate_event_occurrences(account_id),
-        }
@@ -12,13 +12,14 @@
 """
 from datetime import date, datetime
 
-from sqlalchemy import func, and_, or_, extract, cast, TIMESTAMP
+from sqlalchemy import func, and_, or_, extract
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
-    TransactionFeed, BudgetMonth, BudgetLine,
+    BudgetFactCube, BudgetMonth, BudgetLine,
     OperationOccurrence, OperationTemplateModel, PlanAccuracyVerdict,
 )
+from app.readmodels.fact_cube import sum_facts
 
 CORRIDOR = 0.15
 
@@ -81,37 +82,25 @@ def build_fact_plan_maps(
 
     Ключи map: (year, month, category_id, kind). monthly_totals: (year, month, kind).
     План месяца = строка бюджета + плановые операции (SKIPPED не считаем).
-    Факт бакетится по budget_month-переопределению или дате операции.
+    Факт — из куба (budget_fact_cube) по бюджетному дню: budget_month или дата операции.
     Логика 1-в-1 с budget_stats, чтобы точность считалась по тем же цифрам.
     """
     # ── Факт ──────────────────────────────────────────────────────────────────
-    _bdt = func.coalesce(
-        cast(TransactionFeed.budget_month, TIMESTAMP(timezone=True)),
-        TransactionFeed.occurred_at,
-    )
-    _yr = extract("year", _bdt)
-    _mo = extract("month", _bdt)
-    fact_rows = (
-        db.query(
-            _yr.label("yr"), _mo.label("mo"),
-            TransactionFeed.category_id, TransactionFeed.operation_type,
-            func.sum(TransactionFeed.amount).label("total"),
-        )
-        .filter(
-            TransactionFeed.account_id == user_id,
-            TransactionFeed.operation_type.in_(["INCOME", "EXPENSE"]),
-            _bdt >= d_start, _bdt < d_end,
-        )
-        .group_by(_yr, _mo, TransactionFeed.category_id, TransactionFeed.operation_type)
-        .all()
+    _yr = extract("year", BudgetFactCube.day)
+    _mo = extract("month", BudgetFactCube.day)
+    fact_rows = sum_facts(
+        db, user_id, d_start, d_end,
+        [_yr.label("yr"), _mo.label("mo"), BudgetFactCube.category_id, BudgetFactCube.operation_type],
+        BudgetFactCube.operation_type.in_(["INCOME", "EXPENSE"]),
     )
     fact_map: dict = {}
     monthly_totals: dict = {}
     for r in fact_rows:
         y, m = int(r.yr), int(r.mo)
         val = float(r.total)
-        fact_map[(y, m, r.category_id, r.operation_type)] = \
-            fact_map.get((y, m, r.category_id, r.operation_type), 0.0) + val
+        cat_id = r.category_id or None
+        fact_map[(y, m, cat_id, r.operation_type)] = \
+            fact_map.get((y, m, cat_id, r.operation_type), 0.0) + val
         monthly_totals[(y, m, r.operation_type)] = \
             monthly_totals.get((y, m, r.operation_type), 0.0) + val
 
@@ -14,8 +14,8 @@ from app.infrastructure.db.models import User, CategoryInfo
 from app.application.plan_accuracy import (
     classify, load_verdicts, load_closures, build_fact_plan_maps,
 )
-from app.application.push_service import send_push_to_user
-from app.infrastructure.telegram import send_tg
+from app.application.jobs import enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
 
@@ -54,24 +54,27 @@ def send_plan_accuracy_reminders(db: Session, today: date | None = None) -> int:
     py = today.year - 1 if today.month == 1 else today.year
     pm = 12 if today.month == 1 else today.month - 1
 
-    sent = 0
+    month_name = _MONTHS_RU[pm - 1]
+    messages: list[OutboundMessage] = []
     for user in db.query(User).all():
         try:
             n = _pending_count(db, user.id, py, pm)
-            if n <= 0:
-                continue
-            month_name = _MONTHS_RU[pm - 1]
-            send_push_to_user(db, user.id, {
+        except Exception:
+            logger.exception("Plan accuracy reminder failed for user_id=%s", user.id)
+            continue
+        if n <= 0:
+            continue
+        messages.append(OutboundMessage(
+            user_id=user.id, kind="plan_accuracy_review",
+            push={
                 "title": "Оцени точность плана",
                 "body": f"{month_name.capitalize()}: {n} статей ждут оценки",
                 "url": "/plan-accuracy",
-            })
-            send_tg(
-                db, user.id,
-                f"🎯 <b>Точность плана</b>\nЗа {month_name} ждут оценки: {n} статей.\nОткрой «Точность плана» и разметь.",
-                "plan_accuracy_review",
-            )
-            sent += 1
-        except Exception:
-            logger.exception("Plan accuracy reminder failed for user_id=%s", user.id)
-    return sent
+            },
+            telegram=f"🎯 <b>Точность плана</b>\nЗа {month_name} ждут оценки: {n} статей.\nОткрой «Точность плана» и разметь.",
+        ))
+    # Пуш и телеграм всех юзеров — одним батчем в очередь; ключ не даст
+    # повторному запуску за тот же месяц разослать напоминания дважды
+    queued = enqueue_delivery(db, messages, idempotency_key=f"plan_accuracy_review:{py}-{pm:02d}")
+    db.commit()
+    return queued
@@ -7,11 +7,12 @@ caches results in ProjectAnalyticsSnapshot.
 from __future__ import annotations
 
 import json
+from collections import defaultdict
 from datetime import date, datetime, timezone
 from decimal import Decimal
 from typing import Any
 
-from sqlalchemy import func as sa_func
+from sqlalchemy import and_, case, func as sa_func
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
@@ -38,84 +39,134 @@ class ProjectAnalyticsService:
         month: int,
     ) -> dict[str, Any]:
         """Compute full analytics for a project/month and cache in snapshot."""
-        tasks = self._project_tasks(project_id, account_id)
-        if not tasks:
-            return self._empty(project_id, year, month)
+        result = self.compute_many([project_id], account_id, year, month).get(project_id)
+        return result or self._empty(project_id, year, month)
 
-        month_start, month_end = _month_range(year, month)
-        today = date.today()
+    def compute_many(
+        self,
+        project_ids: list[int],
+        account_id: int,
+        year: int,
+        month: int,
+    ) -> dict[int, dict[str, Any]]:
+        """Compute analytics for several projects at once and cache snapshots.
 
-        completed_in_month = [
-            t for t in tasks
-            if t.completed_at is not None
-            and month_start <= t.completed_at.date() < month_end
-        ]
+        Three queries regardless of project count: task/overdue counts grouped
+        by project, tasks completed in the month, reschedules grouped by project.
+        Projects without tasks are omitted (compute() returns _empty for them).
+        """
+        if not project_ids:
+            return {}
 
-        # ── Discipline ──
-        on_time = 0
-        late = 0
-        for t in completed_in_month:
-            if t.due_date is None:
-                continue
-            if t.completed_at.date() <= t.due_date:
-                on_time += 1
-            else:
-                late += 1
-
-        total_with_due = on_time + late
-        discipline_pct = round(on_time / total_with_due * 100, 2) if total_with_due else Decimal(0)
+        month_start, month_end = _month_range(year, month)
+        today = date.today()
 
-        # ── Overdue open ──
-        overdue_open = sum(
-            1 for t in tasks
-            if t.due_date is not None
-            and t.due_date < today
-            and t.completed_at is None
-            and t.status == "ACTIVE"
+        # ── Overdue open (grouped) ──
+        overdue_expr = case(
+            (
+                and_(
+                    TaskModel.due_date.isnot(None),
+                    TaskModel.due_date < today,
+                    TaskModel.completed_at.is_(None),
+                    TaskModel.status == "ACTIVE",
+                ),
+                1,
+            ),
+            else_=0,
         )
+        overdue_by_project = {
+            row.project_id: int(row.overdue or 0)
+            for row in (
+                self.db.query(TaskModel.project_id, sa_func.sum(overdue_expr).label("overdue"))
+                .filter(
+                    TaskModel.account_id == account_id,
+                    TaskModel.project_id.in_(project_ids),
+                )
+                .group_by(TaskModel.project_id)
+                .all()
+            )
+        }
+        if not overdue_by_project:
+            return {}
 
-        # ── Velocity by week ──
-        weeks = [0, 0, 0, 0, 0]
-        for t in completed_in_month:
-            day = t.completed_at.day
-            idx = min((day - 1) // 7, 4)
-            weeks[idx] += 1
-
-        # ── Cycle time ──
-        cycle_days: list[float] = []
-        for t in completed_in_month:
-            if t.created_at is not None:
-                delta = t.completed_at - t.created_at
-                cycle_days.append(delta.total_seconds() / 86400)
-        avg_cycle = round(sum(cycle_days) / len(cycle_days), 2) if cycle_days else Decimal(0)
+        # ── Completed in month (only the columns the metrics need) ──
+        month_start_dt = datetime(month_start.year, month_start.month, month_start.day, tzinfo=timezone.utc)
+        month_end_dt = datetime(month_end.year, month_end.month, month_end.day, tzinfo=timezone.utc)
+        completed_by_project: dict[int, list] = defaultdict(list)
+        for row in (
+            self.db.query(
+                TaskModel.project_id, TaskModel.due_date, TaskModel.completed_at, TaskModel.created_at,
+            )
+            .filter(
+                TaskModel.account_id == account_id,
+                TaskModel.project_id.in_(list(overdue_by_project)),
+                TaskModel.completed_at >= month_start_dt,
+                TaskModel.completed_at < month_end_dt,
+            )
+            .all()
+        ):
+            if month_start <= row.completed_at.date() < month_end:
+                completed_by_project[row.project_id].append(row)
 
-        # ── Reschedule count ──
-        task_ids = [t.task_id for t in tasks]
-        reschedule_count = self._count_reschedules(
-            account_id, task_ids, month_start, month_end,
+        reschedules = self._count_reschedules_by_project(
+            account_id, list(overdue_by_project), month_start_dt, month_end_dt,
         )
 
-        result = {
-            "project_id": project_id,
-            "year": year,
-            "month": month,
-            "tasks_completed_total": len(completed_in_month),
-            "tasks_completed_on_time": on_time,
-            "tasks_completed_late": late,
-            "discipline_percent": float(discipline_pct),
-            "overdue_open_count": overdue_open,
-            "reschedule_count": reschedule_count,
-            "velocity_week1": weeks[0],
-            "velocity_week2": weeks[1],
-            "velocity_week3": weeks[2],
-            "velocity_week4": weeks[3],
-            "velocity_week5": weeks[4],
-            "velocity_total": sum(weeks),
-            "avg_cycle_time_days": float(avg_cycle),
-        }
-
-        self._upsert_snapshot(result)
-        return result
+        results: dict[int, dict[str, Any]] = {}
+        for project_id, overdue_open in overdue_by_project.items():
+            completed_in_month = completed_by_project.get(project_id, [])
+
+            # ── Discipline ──
+            on_time = 0
+            late = 0
+            for t in completed_in_month:
+                if t.due_date is None:
+                    continue
+                if t.completed_at.date() <= t.due_date:
+                    on_time += 1
+                else:
+                    late += 1
+
+            total_with_due = on_time + late
+            discipline_pct = round(on_time / total_with_due * 100, 2) if total_with_due else Decimal(0)
+
+            # ── Velocity by week ──
+            weeks = [0, 0, 0, 0, 0]
+            for t in completed_in_month:
+                day = t.completed_at.day
+                idx = min((day - 1) // 7, 4)
+                weeks[idx] += 1
+
+            # ── Cycle time ──
+            cycle_days: list[float] = []
+            for t in completed_in_month:
+                if t.created_at is not None:
+                    delta = t.completed_at - t.created_at
+                    cycle_days.append(delta.total_seconds() / 86400)
+            avg_cycle = round(sum(cycle_days) / len(cycle_days), 2) if cycle_days else Decimal(0)
+
+            result = {
+                "project_id": project_id,
+                "year": year,
+                "month": month,
+                "tasks_completed_total": len(completed_in_month),
+                "tasks_completed_on_time": on_time,
+                "tasks_completed_late": late,
+                "discipline_percent": float(discipline_pct),
+                "overdue_open_count": overdue_open,
+                "reschedule_count": reschedules.get(project_id, 0),
+                "velocity_week1": weeks[0],
+                "velocity_week2": weeks[1],
+                "velocity_week3": weeks[2],
+                "velocity_week4": weeks[3],
+                "velocity_week5": weeks[4],
+                "velocity_total": sum(weeks),
+                "avg_cycle_time_days": float(avg_cycle),
+            }
+            self._upsert_snapshot(result)
+            results[project_id] = result
+
+        return results
 
     def get_mini_summary(
         self,
@@ -185,36 +236,44 @@ class ProjectAnalyticsService:
             .all()
         )
 
-    def _count_reschedules(
+    def _count_reschedules_by_project(
         self,
         account_id: int,
-        task_ids: list[int],
-        month_start: date,
-        month_end: date,
-    ) -> int:
-        if not task_ids:
-            return 0
-
-        month_start_dt = datetime(month_start.year, month_start.month, month_start.day, tzinfo=timezone.utc)
-        month_end_dt = datetime(month_end.year, month_end.month, month_end.day, tzinfo=timezone.utc)
+        project_ids: list[int],
+        month_start_dt: datetime,
+        month_end_dt: datetime,
+    ) -> dict[int, int]:
+        if not project_ids:
+            return {}
 
         try:
-            # PostgreSQL path: use JSONB operators
-            count = (
-                self.db.query(sa_func.count(EventLog.id))
+            # PostgreSQL path: use JSONB operators, join to tasks for project_id
+            rows = (
+                self.db.query(TaskModel.project_id, sa_func.count(EventLog.id))
+                .join(TaskModel, TaskModel.task_id == EventLog.payload_json["task_id"].as_integer())
                 .filter(
                     EventLog.event_type == "task_updated",
                     EventLog.account_id == account_id,
                     EventLog.payload_json.has_key("due_date"),  # noqa: W601
-                    EventLog.payload_json["task_id"].as_integer().in_(task_ids),
                     EventLog.occurred_at >= month_start_dt,
                     EventLog.occurred_at < month_end_dt,
+                    TaskModel.account_id == account_id,
+                    TaskModel.project_id.in_(project_ids),
                 )
-                .scalar()
+                .group_by(TaskModel.project_id)
+                .all()
             )
-            return count or 0
+            return {project_id: count for project_id, count in rows}
         except Exception:
             # SQLite fallback for tests: load events and filter in Python
+            task_projects = dict(
+                self.db.query(TaskModel.task_id, TaskModel.project_id)
+                .filter(
+                    TaskModel.account_id == account_id,
+                    TaskModel.project_id.in_(project_ids),
+                )
+                .all()
+            )
             events = (
                 self.db.query(EventLog)
                 .filter(
@@ -225,14 +284,15 @@ class ProjectAnalyticsService:
                 )
                 .all()
             )
-            count = 0
+            counts: dict[int, int] = defaultdict(int)
             for ev in events:
                 payload = ev.payload_json
                 if isinstance(payload, str):
                     payload = json.loads(payload)
-                if "due_date" in payload and payload.get("task_id") in task_ids:
-                    count += 1
-            return count
+                project_id = task_projects.get(payload.get("task_id"))
+                if "due_date" in payload and project_id is not None:
+                    counts[project_id] += 1
+            return dict(counts)
 
     def _upsert_snapshot(self, data: dict[str, Any]) -> None:
         snap = (
@@ -0,0 +1,135 @@
+"""
+Projection entry point for use cases — inline or via app.projection_daemon.
+
+Use cases append events, commit and call
+
+    >>> project(db, account_id, (TasksProjector, ["task_completed"]),
+    ...                         (XpProjector, ["task_completed"]))
+
+PROJECTION_ASYNC=False (default): projectors run right here, as before.
+PROJECTION_ASYNC=True: nothing runs in the request — the commit delivers
+NOTIFY event_log and the projection daemon brings every read model of the
+account up to date. Clients that must see their own write send the
+X-Event-Id of the write response back as X-Min-Event-Id (or
+?min_event_id=); the read waits until the account is projected that far
+(wait_for_projection) and projects inline if the daemon is late.
+"""
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.infrastructure.db.models import EventLog, ProjectorCheckpoint
+from app.readmodels.projectors.registry import build_orchestrator, projector_names
+
+ProjectorRun = Tuple[type, Optional[List[str]]]
+
+_POLL_FIRST = 0.01  # seconds; doubles up to _POLL_MAX
+_POLL_MAX = 0.1
+
+
+def project(db: Session, account_id: int, *runs: ProjectorRun) -> None:
+    """
+    Run (ProjectorClass, event_types) pairs for the account, unless projection is async
+
+    Вызывается после commit'а use case'а (projector.run коммитит сам).
+    """
+    if get_settings().PROJECTION_ASYNC:
+        return
+    for projector_cls, event_types in runs:
+        projector_cls(db).run(account_id, event_types=event_types)
+
+
+def catch_up(db: Session, account_id: int) -> dict:
+    """Apply all pending events of the account to every read model (commits)."""
+    return build_orchestrator(db).run_all(account_id)
+
+
+def projected_up_to(db: Session, account_id: int) -> int:
+    """Event id up to which all read models of the account are built (0 — not all started)."""
+    names = projector_names()
+    count, low = db.execute(
+        select(func.count(), func.min(ProjectorCheckpoint.last_event_id)).where(
+            ProjectorCheckpoint.account_id == account_id,
+            ProjectorCheckpoint.projector_name.in_(names),
+        )
+    ).one()
+    return low if count == len(names) else 0
+
+
+def wait_for_projection(
+    db: Session,
+    account_id: int,
+    min_event_id: int,
+    timeout: Optional[float] = None,
+) -> bool:
+    """
+    Block until the account is projected up to min_event_id
+
+    Опрашивает checkpoints с нарастающей паузой; по истечении timeout
+    (PROJECTION_WAIT_MS) догоняет проекцию сам. Returns True, если успел
+    daemon, False — если пришлось проецировать inline.
+    """
+    if timeout is None:
+        timeout = get_settings().PROJECTION_WAIT_MS / 1000
+    deadline = time.monotonic() + timeout
+    pause = _POLL_FIRST
+    while True:
+        if projected_up_to(db, account_id) >= min_event_id:
+            return True
+        db.rollback()  # новый snapshot для следующего опроса
+        if time.monotonic() + pause > deadline:
+            break
+        time.sleep(pause)
+        pause = min(pause * 2, _POLL_MAX)
+    catch_up(db, account_id)
+    return False
+
+
+def accounts_behind(db: Session, after_event_id: int = 0) -> List[int]:
+    """
+    Accounts with events not yet applied by every projector
+
+    after_event_id: смотреть только события новее (high-water mark daemon'а),
+    чтобы периодический обход не сканировал весь event_log.
+    """
+    names = projector_names()
+    last = (
+        select(EventLog.account_id, func.max(EventLog.id).label("last_id"))
+        .where(EventLog.id > after_event_id)
+        .group_by(EventLog.account_id)
+        .subquery()
+    )
+    done = (
+        select(
+            ProjectorCheckpoint.account_id,
+            func.min(ProjectorCheckpoint.last_event_id).label("done_id"),
+            func.count().label("n"),
+        )
+        .where(ProjectorCheckpoint.projector_name.in_(names))
+        .group_by(ProjectorCheckpoint.account_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(last.c.account_id)
+        .outerjoin(done, done.c.account_id == last.c.account_id)
+        .where(or_(done.c.done_id.is_(None), done.c.n < len(names), done.c.done_id < last.c.last_id))
+        .order_by(last.c.account_id)
+    ).scalars().all()
+    return list(rows)
+
+
+def max_event_id(db: Session) -> int:
+    return db.execute(select(func.max(EventLog.id))).scalar() or 0
+
+
+def parse_notify(payloads: Iterable[str]) -> set[int]:
+    """NOTIFY payloads "<account_id>:<event_id>" → account ids (malformed ignored)."""
+    accounts = set()
+    for payload in payloads:
+        head, _, _ = payload.partition(":")
+        if head.isdigit():
+            accounts.add(int(head))
+    return accounts
@@ -2,15 +2,17 @@
 Web Push notification service.
 
 Sends push notifications via pywebpush and manages stale subscriptions.
+Sending itself (shared session, cached VAPID key) lives in
+app.infrastructure.delivery; scheduled batches are queued with
+app.application.jobs.enqueue_delivery().
 """
-import json
 import logging
 
-from pywebpush import webpush, WebPushException
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.infrastructure.db.models import PushSubscription
+from app.infrastructure.delivery import OutboundMessage, decrypt_cached, enqueue_many, webpush_send
 
 logger = logging.getLogger(__name__)
 
@@ -30,60 +32,27 @@ def send_web_push(db: Session, subscription: PushSubscription, payload: dict) ->
         logger.warning("VAPID keys not configured, skipping push")
         return False
 
-    from app.infrastructure.crypto import decrypt
-    subscription_info = {
-        "endpoint": subscription.endpoint,
-        "keys": {
-            "p256dh": decrypt(subscription.p256dh) or subscription.p256dh,
-            "auth": decrypt(subscription.auth) or subscription.auth,
-        },
-    }
-
-    # .env may store PEM with literal \n (two chars: backslash + n) or real newlines
-    raw_key = settings.VAPID_PRIVATE_KEY
-    # Replace literal two-char sequence \n with real newline
-    if r"\n" in raw_key:
-        raw_key = raw_key.replace(r"\n", "\n")
-
-    # pywebpush accepts either a PEM string or a raw base64url key.
-    # Extract raw key from PEM if present.
-    if "BEGIN" in raw_key:
-        import base64
-        lines = [l.strip() for l in raw_key.strip().splitlines()
-                 if l.strip() and not l.strip().startswith("-----")]
-        raw_key = "".join(lines)
-
-    try:
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload, ensure_ascii=False),
-            vapid_private_key=raw_key,
-            vapid_claims={"sub": settings.VAPID_MAILTO},
-        )
-        return True
-    except WebPushException as e:
-        status_code = e.response.status_code if e.response is not None else 0
-        if status_code in (404, 410):
-            logger.info("Subscription expired (HTTP %d), removing: %s", status_code, subscription.endpoint[:60])
-            db.query(PushSubscription).filter(PushSubscription.id == subscription.id).delete()
-            db.commit()
-        else:
-            logger.error("WebPush error (HTTP %d): %s", status_code, e)
+    status_code = webpush_send(
+        subscription.endpoint,
+        decrypt_cached(subscription.p256dh) or subscription.p256dh,
+        decrypt_cached(subscription.auth) or subscription.auth,
+        payload,
+    )
+    if status_code in (404, 410):
+        logger.info("Subscription expired (HTTP %d), removing: %s", status_code, subscription.endpoint[:60])
+        db.query(PushSubscription).filter(PushSubscription.id == subscription.id).delete()
+        db.commit()
         return False
+    return bool(status_code)
 
 
 def send_push_to_user(db: Session, user_id: int, payload: dict) -> int:
     """
     Send push notification to all subscriptions of a user.
 
+    Inline, for the API's test push; subscriptions are sent concurrently
+    through delivery.enqueue_many. Batches go through jobs.enqueue_delivery.
+
     Returns the number of successful deliveries.
     """
-    subs = db.query(PushSubscription).filter(PushSubscription.user_id == user_id).all()
-    if not subs:
-        return 0
-
-    sent = 0
-    for sub in subs:
-        if send_web_push(db, sub, payload):
-            sent += 1
-    return sent
+    return enqueue_many(db, [OutboundMessage(user_id=user_id, kind="push", push=payload)]).push_sent
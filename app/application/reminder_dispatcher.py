@@ -7,294 +7,143 @@ Usage (cron / systemd timer / manual):
 Or call dispatch_due_reminders(db) from your own scheduler.
 """
 import logging
-import requests
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 
 from sqlalchemy.orm import Session
 
 from datetime import time as _time
 
 from app.infrastructure.db.models import (
-    TaskModel, TaskReminderModel,
-    EventOccurrenceModel, EventReminderModel, EventDefaultReminderModel,
-    CalendarEventModel, PushSubscription, User,
+    TaskModel,
+    EventOccurrenceModel,
+    CalendarEventModel,
     HabitModel, HabitOccurrence,
     TelegramSettings, UserNotificationSettings,
 )
-from app.application.push_service import send_push_to_user
-from app.infrastructure.telegram import send_tg
+from app.application.reminder_index import ReminderIndex, MSK
+from app.application.jobs import REMINDER_PRIORITY, enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
-MSK = timezone(timedelta(hours=3))
 
 
-def dispatch_due_reminders(db: Session) -> int:
+def dispatch_due_reminders(db: Session, now_msk: datetime | None = None) -> int:
     """
-    Find all reminders that should fire now and send push notifications.
+    Find all reminders that should fire now and queue their notifications.
 
-    Returns the number of push notifications successfully sent.
-    """
-    now_msk = datetime.now(MSK)
-    total_sent = 0
-
-    total_sent += _dispatch_task_reminders(db, now_msk)
-    total_sent += _dispatch_event_reminders(db, now_msk)
-    total_sent += _dispatch_habit_reminders(db, now_msk)
-    total_sent += _dispatch_hourly_summary(db, now_msk)
-
-    return total_sent
-
-
-def _dispatch_task_reminders(db: Session, now_msk: datetime) -> int:
-    """Send push for task reminders that are due."""
-    sent = 0
-    from sqlalchemy import or_
-
-    # Find active tasks with a due_date (any kind)
-    tasks = (
-        db.query(TaskModel)
-        .filter(
-            TaskModel.due_date.isnot(None),
-            TaskModel.status == "ACTIVE",
-        )
-        .all()
-    )
+    Task / event / habit reminders come from the scheduled_notifications index
+    (fire_at in the last 2 minutes) — see app.application.reminder_index — and
+    are queued together with the hourly Telegram summaries as delivery.send
+    jobs (app.application.jobs); workers send them through the delivery pool.
 
-    if not tasks:
-        return 0
+    Returns the number of messages queued.
+    now_msk is injectable for tests.
+    """
+    now_msk = now_msk or datetime.now(MSK)
 
-    task_ids = [t.task_id for t in tasks]
-    all_reminders = (
-        db.query(TaskReminderModel)
-        .filter(TaskReminderModel.task_id.in_(task_ids))
-        .all()
+    messages = (
+        _collect_task_reminders(db, now_msk)
+        + _collect_event_reminders(db, now_msk)
+        + _collect_habit_reminders(db, now_msk)
+        + _collect_hourly_summary(db, now_msk)
     )
-    reminders_by_task: dict[int, list[TaskReminderModel]] = {}
-    for rem in all_reminders:
-        reminders_by_task.setdefault(rem.task_id, []).append(rem)
-
-    for task in tasks:
-        reminders = reminders_by_task.get(task.task_id, [])
-
-        # Время задано, явных напоминаний нет → авто-напоминание в само время
-        if not reminders:
-            ref_time = task.due_time or task.due_start_time
-            if ref_time:
-                fire_at = datetime.combine(task.due_date, ref_time, tzinfo=MSK)
-                if fire_at <= now_msk and fire_at > now_msk - timedelta(minutes=2):
-                    n = send_push_to_user(db, task.account_id, {
-                        "title": f"⏰ {task.title}",
-                        "body": f"Запланировано на {ref_time.strftime('%H:%M')}",
-                        "url": "/tasks",
-                    })
-                    sent += n
-                    send_tg(db, task.account_id,
-                            f"⏰ <b>{task.title}</b>\nЗапланировано на {ref_time.strftime('%H:%M')}",
-                            "task_reminder")
-            continue
+    queued = enqueue_delivery(db, messages, priority=REMINDER_PRIORITY)
 
-        for rem in reminders:
-            kind = getattr(rem, "reminder_kind", "OFFSET")
-
-            if kind == "DAY_TIME":
-                # offset_minutes = minutes since midnight
-                hour, minute = divmod(rem.offset_minutes, 60)
-                fire_at = datetime.combine(
-                    task.due_date, _time(hour, minute), tzinfo=MSK
-                )
-                if fire_at <= now_msk and fire_at > now_msk - timedelta(minutes=2):
-                    n = send_push_to_user(db, task.account_id, {
-                        "title": f"⏰ {task.title}",
-                        "body": f"Напоминание ({hour:02d}:{minute:02d})",
-                        "url": "/tasks",
-                    })
-                    sent += n
-                    send_tg(db, task.account_id,
-                            f"⏰ <b>{task.title}</b>\nНапоминание ({hour:02d}:{minute:02d})",
-                            "task_reminder")
-            else:
-                # OFFSET kind — fire relative to due datetime, or midnight for date-only tasks
-                ref_time = task.due_time or task.due_start_time
-                if ref_time:
-                    due_dt = datetime.combine(task.due_date, ref_time, tzinfo=MSK)
-                else:
-                    # Date-only task: treat midnight of due date as reference
-                    due_dt = datetime.combine(task.due_date, _time(0, 0), tzinfo=MSK)
-                fire_at = due_dt + timedelta(minutes=rem.offset_minutes)  # offset is <= 0
-                if fire_at <= now_msk and fire_at > now_msk - timedelta(minutes=2):
-                    n = send_push_to_user(db, task.account_id, {
-                        "title": f"⏰ {task.title}",
-                        "body": _format_task_time(due_dt, rem.offset_minutes),
-                        "url": "/tasks",
-                    })
-                    sent += n
-                    send_tg(db, task.account_id,
-                            f"⏰ <b>{task.title}</b>\n{_format_task_time(due_dt, rem.offset_minutes)}",
-                            "task_reminder")
-
-    return sent
-
-
-def _dispatch_event_reminders(db: Session, now_msk: datetime) -> int:
-    """Send push for calendar event reminders that are due."""
-    sent = 0
-    today = now_msk.date()
-    tomorrow = today + timedelta(days=1)
+    # Fired rows are dropped in the same transaction as the jobs are queued,
+    # so an overlapping run cannot send them twice
+    ReminderIndex(db, now=now_msk).purge_fired()
+    db.commit()
 
-    occs = (
-        db.query(EventOccurrenceModel)
-        .filter(
-            EventOccurrenceModel.is_cancelled == False,
-            EventOccurrenceModel.start_date >= today,
-            EventOccurrenceModel.start_date <= tomorrow,
-        )
-        .all()
-    )
+    return queued
 
-    if not occs:
-        return 0
 
-    occ_map = {o.id: o for o in occs}
-    occ_ids = list(occ_map.keys())
-    event_ids = {o.event_id for o in occs}
+def _collect_task_reminders(db: Session, now_msk: datetime) -> list[OutboundMessage]:
+    due = ReminderIndex(db, now=now_msk).due("task")
+    if not due:
+        return []
 
-    # Per-occurrence reminders (materialised) ...
-    per_occ_reminders: dict[int, list] = {}
-    for rem in (
-        db.query(EventReminderModel)
-        .filter(
-            EventReminderModel.occurrence_id.in_(occ_ids),
-            EventReminderModel.is_enabled == True,
-        )
-        .all()
-    ):
-        per_occ_reminders.setdefault(rem.occurrence_id, []).append(rem)
-
-    # ... plus event default reminders (the templates the user actually edits).
-    # Per-occurrence rows are materialised only when an occurrence is generated
-    # AFTER the reminder was added, so they're unreliable — fall back to the
-    # defaults so notifications fire regardless of materialisation timing.
-    defaults_by_event: dict[int, list] = {}
-    for dr in (
-        db.query(EventDefaultReminderModel)
-        .filter(
-            EventDefaultReminderModel.event_id.in_(event_ids),
-            EventDefaultReminderModel.is_enabled == True,
-        )
-        .all()
-    ):
-        defaults_by_event.setdefault(dr.event_id, []).append(dr)
-
-    # Load event titles
-    events = db.query(CalendarEventModel).filter(CalendarEventModel.event_id.in_(event_ids)).all()
-    event_map = {e.event_id: e for e in events}
-
-    for occ in occs:
-        start_dt = _compute_start_dt(occ.start_date, occ.start_time)
-
-        # Union of per-occurrence + default reminders, deduped by (mode, offset, fixed_time).
-        combined = per_occ_reminders.get(occ.id, []) + defaults_by_event.get(occ.event_id, [])
-        seen: set = set()
-
-        # Время начала есть, напоминаний нет → авто-напоминание в момент начала
-        if not combined and occ.start_time and not occ.is_completed:
-            if start_dt <= now_msk and start_dt > now_msk - timedelta(minutes=2):
-                event = event_map.get(occ.event_id)
-                title = event.title if event else "Событие"
-                time_str = occ.start_time.strftime("%H:%M")
-                n = send_push_to_user(db, occ.account_id, {
-                    "title": f"📅 {title}",
-                    "body": f"Начало в {time_str}",
-                    "url": "/events",
-                })
-                sent += n
-                send_tg(db, occ.account_id,
-                        f"📅 <b>{title}</b>\nНачало в {time_str}",
-                        "event_reminder")
+    tasks = {
+        t.task_id: t for t in db.query(TaskModel).filter(
+            TaskModel.task_id.in_({n.entity_id for n in due}),
+            TaskModel.status == "ACTIVE",
+        ).all()
+    }
+
+    messages = []
+    for n in due:
+        task = tasks.get(n.entity_id)
+        if not task:
+            continue  # completed/archived after the index row was written
+        messages.append(OutboundMessage(
+            user_id=task.account_id, kind="task_reminder",
+            push={"title": f"⏰ {task.title}", "body": n.body, "url": "/tasks"},
+            telegram=f"⏰ <b>{task.title}</b>\n{n.body}",
+        ))
+    return messages
+
+
+def _collect_event_reminders(db: Session, now_msk: datetime) -> list[OutboundMessage]:
+    due = ReminderIndex(db, now=now_msk).due("event")
+    if not due:
+        return []
+
+    occ_map = {
+        o.id: o for o in db.query(EventOccurrenceModel).filter(
+            EventOccurrenceModel.id.in_({n.occurrence_id for n in due}),
+            EventOccurrenceModel.is_cancelled == False,
+        ).all()
+    }
+    event_map = {
+        e.event_id: e for e in db.query(CalendarEventModel).filter(
+            CalendarEventModel.event_id.in_({n.entity_id for n in due}),
+        ).all()
+    }
+
+    messages = []
+    for n in due:
+        occ = occ_map.get(n.occurrence_id)
+        if not occ or (n.trigger == "auto" and occ.is_completed):
             continue
-
-        for rem in combined:
-            key = (rem.mode, rem.offset_minutes, rem.fixed_time)
-            if key in seen:
-                continue
-            seen.add(key)
-
-            if rem.mode == "offset" and rem.offset_minutes is not None:
-                fire_at = start_dt - timedelta(minutes=rem.offset_minutes)
-            elif rem.mode == "fixed_time" and rem.fixed_time is not None:
-                if not occ.start_date:
-                    continue
-                fire_at = datetime.combine(occ.start_date, rem.fixed_time, tzinfo=MSK)
-            else:
-                continue
-
-            if fire_at <= now_msk and fire_at > now_msk - timedelta(minutes=2):
-                event = event_map.get(occ.event_id)
-                title = event.title if event else "Событие"
-                time_str = occ.start_time.strftime("%H:%M") if occ.start_time else ""
-
-                n = send_push_to_user(db, occ.account_id, {
-                    "title": f"📅 {title}",
-                    "body": f"Сегодня в {time_str}" if time_str else "Сегодня",
-                    "url": "/events",
-                })
-                sent += n
-                send_tg(db, occ.account_id,
-                        f"📅 <b>{title}</b>\n" + (f"Сегодня в {time_str}" if time_str else "Сегодня"),
-                        "event_reminder")
-
-    return sent
-
-
-def _dispatch_habit_reminders(db: Session, now_msk: datetime) -> int:
-    """Send push for habit reminders that are due today."""
-    sent = 0
-    today = now_msk.date()
-
-    # Find active habits with a reminder_time set
-    habits = (
-        db.query(HabitModel)
-        .filter(
-            HabitModel.is_archived == False,
-            HabitModel.reminder_time.isnot(None),
-        )
-        .all()
-    )
-
-    if not habits:
-        return 0
-
-    habit_ids = [h.habit_id for h in habits]
-
-    # Find today's ACTIVE occurrences for these habits (not yet done)
-    active_occs = (
-        db.query(HabitOccurrence)
-        .filter(
-            HabitOccurrence.habit_id.in_(habit_ids),
-            HabitOccurrence.scheduled_date == today,
+        event = event_map.get(occ.event_id)
+        title = event.title if event else "Событие"
+        messages.append(OutboundMessage(
+            user_id=occ.account_id, kind="event_reminder",
+            push={"title": f"📅 {title}", "body": n.body, "url": "/events"},
+            telegram=f"📅 <b>{title}</b>\n{n.body}",
+        ))
+    return messages
+
+
+def _collect_habit_reminders(db: Session, now_msk: datetime) -> list[OutboundMessage]:
+    due = ReminderIndex(db, now=now_msk).due("habit")
+    if not due:
+        return []
+
+    # Occurrence must still be ACTIVE (not yet done) and the habit not archived
+    active_occ_ids = {
+        occ_id for (occ_id,) in db.query(HabitOccurrence.id).filter(
+            HabitOccurrence.id.in_({n.occurrence_id for n in due}),
             HabitOccurrence.status == "ACTIVE",
-        )
-        .all()
-    )
-    active_habit_ids = {occ.habit_id for occ in active_occs}
+        ).all()
+    }
+    habits = {
+        h.habit_id: h for h in db.query(HabitModel).filter(
+            HabitModel.habit_id.in_({n.entity_id for n in due}),
+            HabitModel.is_archived == False,
+        ).all()
+    }
 
-    for habit in habits:
-        if habit.habit_id not in active_habit_ids:
+    messages = []
+    for n in due:
+        habit = habits.get(n.entity_id)
+        if not habit or n.occurrence_id not in active_occ_ids:
             continue
-
-        fire_at = datetime.combine(today, habit.reminder_time, tzinfo=MSK)
-        if fire_at <= now_msk and fire_at > now_msk - timedelta(minutes=2):
-            n = send_push_to_user(db, habit.account_id, {
-                "title": f"\U0001f504 {habit.title}",
-                "body": "Пора выполнить привычку",
-                "url": "/habits",
-            })
-            sent += n
-            send_tg(db, habit.account_id,
-                    f"🔄 <b>{habit.title}</b>\nПора выполнить привычку",
-                    "habit_reminder")
-
-    return sent
+        messages.append(OutboundMessage(
+            user_id=habit.account_id, kind="habit_reminder",
+            push={"title": f"\U0001f504 {habit.title}", "body": n.body, "url": "/habits"},
+            telegram=f"🔄 <b>{habit.title}</b>\n{n.body}",
+        ))
+    return messages
 
 
 def _in_quiet_hours(now_time: _time, settings: UserNotificationSettings | None) -> bool:
@@ -308,115 +157,106 @@ def _in_quiet_hours(now_time: _time, settings: UserNotificationSettings | None)
     return now_time >= s or now_time <= e
 
 
-def _dispatch_hourly_summary(db: Session, now_msk: datetime) -> int:
+def _collect_hourly_summary(db: Session, now_msk: datetime) -> list[OutboundMessage]:
     """
-    Every hour, collect all unfinished items for each user and send ONE grouped
+    Every hour, collect all unfinished items for each user into ONE grouped
     Telegram message listing:
 
     • Tasks overdue (due_date < today) or past their due_time today
     • Habits with deadline_time whose today's occurrence is still ACTIVE
       and whose nudge window [reminder_time, deadline_time) includes the current hour
 
-    Respects each user's quiet-hours setting.
-    Returns the number of messages successfully sent.
+    Respects each user's quiet-hours setting. Recipients, settings, habits,
+    occurrences and tasks are loaded in one query each for all users.
     """
     # Only fire at exact hour boundaries (within the 2-minute dispatcher window)
     hour_boundary = now_msk.replace(minute=0, second=0, microsecond=0)
     if not (hour_boundary <= now_msk < hour_boundary + timedelta(minutes=2)):
-        return 0
+        return []
 
     today = now_msk.date()
     current_hour = hour_boundary.time()
 
-    # Iterate every user that has Telegram connected
-    tg_list = db.query(TelegramSettings).filter_by(connected=True).all()
-    if not tg_list:
-        return 0
-
-    from app.infrastructure.crypto import decrypt
-    sent = 0
-    for tg in tg_list:
-        if not tg.chat_id or not tg.bot_token:
-            continue
-        bot_token = decrypt(tg.bot_token)
-        chat_id = decrypt(tg.chat_id)
-        if not bot_token or not chat_id:
-            continue
-
-        notif_settings = db.query(UserNotificationSettings).filter_by(user_id=tg.user_id).first()
-        if _in_quiet_hours(current_hour, notif_settings):
-            continue
-
-        user_id = tg.user_id
-
-        # ── Pending habits ─────────────────────────────────────────────────
-        pending_habits: list[HabitModel] = []
-        habits = (
-            db.query(HabitModel)
-            .filter(
-                HabitModel.account_id == user_id,
-                HabitModel.is_archived == False,
-                HabitModel.deadline_time.isnot(None),
-            )
-            .all()
-        )
-        if habits:
-            active_occ_ids = {
-                occ.habit_id
-                for occ in db.query(HabitOccurrence).filter(
-                    HabitOccurrence.habit_id.in_([h.habit_id for h in habits]),
-                    HabitOccurrence.scheduled_date == today,
-                    HabitOccurrence.status == "ACTIVE",
-                ).all()
-            }
-            for h in habits:
-                if h.habit_id not in active_occ_ids:
-                    continue
-                window_start = h.reminder_time if h.reminder_time is not None else _time(0, 0)
-                if window_start <= current_hour < h.deadline_time:
-                    pending_habits.append(h)
-
-        # ── Pending tasks ──────────────────────────────────────────────────
-        pending_tasks: list[TaskModel] = []
-
-        # Overdue — strictly before today
-        overdue = (
-            db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == user_id,
-                TaskModel.status == "ACTIVE",
-                TaskModel.due_date.isnot(None),
-                TaskModel.due_date < today,
-            )
-            .all()
+    # Every user that has Telegram connected (credentials are checked on delivery)
+    user_ids = {
+        tg.user_id for tg in db.query(TelegramSettings).filter_by(connected=True).all()
+        if tg.chat_id and tg.bot_token
+    }
+    if not user_ids:
+        return []
+    settings_map = {
+        s.user_id: s for s in db.query(UserNotificationSettings).filter(
+            UserNotificationSettings.user_id.in_(user_ids),
+        ).all()
+    }
+    user_ids = {uid for uid in user_ids if not _in_quiet_hours(current_hour, settings_map.get(uid))}
+    if not user_ids:
+        return []
+
+    # ── Pending habits ─────────────────────────────────────────────────────
+    pending_habits: dict[int, list[HabitModel]] = {}
+    habits = (
+        db.query(HabitModel)
+        .filter(
+            HabitModel.account_id.in_(user_ids),
+            HabitModel.is_archived == False,
+            HabitModel.deadline_time.isnot(None),
         )
-        pending_tasks.extend(overdue)
-
-        # Due today — include once their due_time (or window start) has passed
-        today_tasks = (
-            db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == user_id,
-                TaskModel.status == "ACTIVE",
-                TaskModel.due_date == today,
-            )
-            .all()
+        .order_by(HabitModel.habit_id)
+        .all()
+    )
+    if habits:
+        active_occ_ids = {
+            occ.habit_id
+            for occ in db.query(HabitOccurrence).filter(
+                HabitOccurrence.habit_id.in_([h.habit_id for h in habits]),
+                HabitOccurrence.scheduled_date == today,
+                HabitOccurrence.status == "ACTIVE",
+            ).all()
+        }
+        for h in habits:
+            if h.habit_id not in active_occ_ids:
+                continue
+            window_start = h.reminder_time if h.reminder_time is not None else _time(0, 0)
+            if window_start <= current_hour < h.deadline_time:
+                pending_habits.setdefault(h.account_id, []).append(h)
+
+    # ── Pending tasks ──────────────────────────────────────────────────────
+    # Overdue (strictly before today) first, then due today — once their
+    # due_time (or window start) has passed
+    pending_tasks: dict[int, list[TaskModel]] = {}
+    tasks = (
+        db.query(TaskModel)
+        .filter(
+            TaskModel.account_id.in_(user_ids),
+            TaskModel.status == "ACTIVE",
+            TaskModel.due_date.isnot(None),
+            TaskModel.due_date <= today,
         )
-        for t in today_tasks:
+        .order_by(TaskModel.due_date, TaskModel.task_id)
+        .all()
+    )
+    for t in tasks:
+        if t.due_date == today:
             task_time = t.due_time or t.due_start_time
-            if task_time is None or task_time <= current_hour:
-                pending_tasks.append(t)
+            if task_time is not None and task_time > current_hour:
+                continue
+        pending_tasks.setdefault(t.account_id, []).append(t)
 
-        if not pending_habits and not pending_tasks:
+    messages = []
+    for user_id in sorted(user_ids):
+        user_tasks = pending_tasks.get(user_id, [])
+        user_habits = pending_habits.get(user_id, [])
+        if not user_habits and not user_tasks:
             continue
 
         # ── Build grouped message ──────────────────────────────────────────
         lines = [f"⏰ <b>Не выполнено ({current_hour.strftime('%H:%M')})</b>"]
 
-        if pending_tasks:
+        if user_tasks:
             lines.append("")
             lines.append("📋 <b>Задачи:</b>")
-            for t in pending_tasks:
+            for t in user_tasks:
                 if t.due_date < today:
                     days = (today - t.due_date).days
                     lines.append(f"• {t.title} <i>(просрочена {days} дн.)</i>")
@@ -425,38 +265,14 @@ def _dispatch_hourly_summary(db: Session, now_msk: datetime) -> int:
                     suffix = f" <i>(до {task_time.strftime('%H:%M')})</i>" if task_time else ""
                     lines.append(f"• {t.title}{suffix}")
 
-        if pending_habits:
+        if user_habits:
             lines.append("")
             lines.append("🔄 <b>Привычки:</b>")
-            for h in pending_habits:
+            for h in user_habits:
                 lines.append(f"• {h.title} <i>(до {h.deadline_time.strftime('%H:%M')})</i>")
 
-        text = "\n".join(lines)
-        if send_tg(db, user_id, text, "hourly_pending"):
-            sent += 1
-
-    return sent
-
-
-def _format_task_time(due_dt: datetime, offset_minutes: int) -> str:
-    time_str = due_dt.strftime("%H:%M")
-    if offset_minutes == 0:
-        return f"Сейчас ({time_str})"
-    mins = abs(offset_minutes)
-    if mins < 60:
-        return f"Через {mins} мин ({time_str})"
-    hours = mins // 60
-    return f"Через {hours} ч ({time_str})"
-
-
-def _compute_start_dt(start_date, start_time) -> datetime:
-    if start_time:
-        return datetime(
-            start_date.year, start_date.month, start_date.day,
-            start_time.hour, start_time.minute, 0,
-            tzinfo=MSK,
-        )
-    return datetime(start_date.year, start_date.month, start_date.day, 0, 0, 0, tzinfo=MSK)
+        messages.append(OutboundMessage(user_id=user_id, kind="hourly_pending", telegram="\n".join(lines)))
+    return messages
 
 
 # ── CLI entry point ──
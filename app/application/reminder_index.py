@@ -0,0 +1,327 @@
+"""
+Reminder index — precomputed fire_at for task, event and habit reminders.
+
+The table scheduled_notifications holds one row per future reminder firing.
+reminder_dispatcher reads only rows with fire_at inside its 2-minute window,
+so its cost scales with due reminders rather than with all tasks/habits.
+
+Maintenance:
+- ORM flushes touching tasks, task reminders, event occurrences/reminders,
+  habits or habit occurrences re-sync the affected entities in the same
+  transaction (Session after_flush hook below).
+- Core bulk inserts bypass the hook: their writers call sync_* explicitly
+  (OccurrenceGenerator).
+- rebuild() recomputes everything; the scheduler runs it at start and nightly
+  to pick up anything written around the ORM (bulk deletes, migrations).
+
+The dispatcher re-checks the source row before sending, so a stale index row
+can at worst be dropped, never sent for a completed/cancelled item.
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import (
+    ScheduledNotification,
+    TaskModel, TaskReminderModel,
+    EventOccurrenceModel, EventReminderModel, EventDefaultReminderModel,
+    HabitModel, HabitOccurrence,
+)
+
+logger = logging.getLogger(__name__)
+MSK = timezone(timedelta(hours=3))
+
+# Dispatcher runs every 2 minutes and fires reminders with fire_at in (now - window, now]
+DISPATCH_WINDOW = timedelta(minutes=2)
+
+
+def _format_task_time(due_dt: datetime, offset_minutes: int) -> str:
+    time_str = due_dt.strftime("%H:%M")
+    if offset_minutes == 0:
+        return f"Сейчас ({time_str})"
+    mins = abs(offset_minutes)
+    if mins < 60:
+        return f"Через {mins} мин ({time_str})"
+    hours = mins // 60
+    return f"Через {hours} ч ({time_str})"
+
+
+def _format_event_day(start_date: date, start_time, fire_at: datetime) -> str:
+    # День события относительно момента напоминания: "Сегодня", "Завтра" или дата
+    days = (start_date - fire_at.astimezone(MSK).date()).days
+    if days == 0:
+        day = "Сегодня"
+    elif days == 1:
+        day = "Завтра"
+    else:
+        day = start_date.strftime("%d.%m")
+    return f"{day} в {start_time.strftime('%H:%M')}" if start_time else day
+
+
+def _compute_start_dt(start_date, start_time) -> datetime:
+    if start_time:
+        return datetime(
+            start_date.year, start_date.month, start_date.day,
+            start_time.hour, start_time.minute, 0,
+            tzinfo=MSK,
+        )
+    return datetime(start_date.year, start_date.month, start_date.day, 0, 0, 0, tzinfo=MSK)
+
+
+# ── Fire time rules (pure) ──
+
+def task_fire_times(task, reminders) -> list[tuple[datetime, str, str]]:
+    """[(fire_at, trigger, body)] for one task and its reminder rows."""
+    ref_time = task.due_time or task.due_start_time
+
+    # Время задано, явных напоминаний нет → авто-напоминание в само время
+    if not reminders:
+        if not ref_time:
+            return []
+        fire_at = datetime.combine(task.due_date, ref_time, tzinfo=MSK)
+        return [(fire_at, "auto", f"Запланировано на {ref_time.strftime('%H:%M')}")]
+
+    out = []
+    for rem in reminders:
+        if rem.reminder_kind == "DAY_TIME":
+            # offset_minutes = minutes since midnight
+            hour, minute = divmod(rem.offset_minutes, 60)
+            fire_at = datetime.combine(task.due_date, time(hour, minute), tzinfo=MSK)
+            out.append((fire_at, "reminder", f"Напоминание ({hour:02d}:{minute:02d})"))
+        else:
+            # OFFSET kind — relative to due datetime, or midnight for date-only tasks
+            due_dt = datetime.combine(task.due_date, ref_time or time(0, 0), tzinfo=MSK)
+            fire_at = due_dt + timedelta(minutes=rem.offset_minutes)  # offset is <= 0
+            out.append((fire_at, "reminder", _format_task_time(due_dt, rem.offset_minutes)))
+    return out
+
+
+def event_fire_times(occ, reminders) -> list[tuple[datetime, str, str]]:
+    """[(fire_at, trigger, body)] for one occurrence; reminders = per-occurrence + defaults."""
+    start_dt = _compute_start_dt(occ.start_date, occ.start_time)
+
+    # Время начала есть, напоминаний нет → авто-напоминание в момент начала
+    if not reminders:
+        if not occ.start_time or occ.is_completed:
+            return []
+        return [(start_dt, "auto", f"Начало в {occ.start_time.strftime('%H:%M')}")]
+
+    out = []
+    seen: set = set()
+    # Union of per-occurrence + default reminders, deduped by (mode, offset, fixed_time)
+    for rem in reminders:
+        key = (rem.mode, rem.offset_minutes, rem.fixed_time)
+        if key in seen:
+            continue
+        seen.add(key)
+        if rem.mode == "offset" and rem.offset_minutes is not None:
+            fire_at = start_dt - timedelta(minutes=rem.offset_minutes)
+        elif rem.mode == "fixed_time" and rem.fixed_time is not None:
+            fire_at = datetime.combine(occ.start_date, rem.fixed_time, tzinfo=MSK)
+        else:
+            continue
+        out.append((fire_at, "reminder", _format_event_day(occ.start_date, occ.start_time, fire_at)))
+    return out
+
+
+# ── Index maintenance ──
+
+class ReminderIndex:
+    """
+    Keeps scheduled_notifications in sync with the source read models
+
+    Works on the session's connection with Core statements, so it is safe to
+    run from inside a flush hook. now is injectable for tests.
+    """
+
+    def __init__(self, db: Session, now: datetime | None = None):
+        self.db = db
+        self.now = now or datetime.now(MSK)
+
+    @property
+    def _today(self) -> date:
+        return self.now.astimezone(MSK).date()
+
+    def sync(self, tasks: Iterable[int] = (), events: Iterable[int] = (),
+             habits: Iterable[int] = (), event_occurrences: Iterable[int] = ()) -> None:
+        """Recompute rows of the given entities (event_occurrences resolve to their events)."""
+        conn = self.db.connection()
+        events = set(events)
+        if event_occurrences:
+            events |= set(conn.execute(
+                select(EventOccurrenceModel.event_id)
+                .where(EventOccurrenceModel.id.in_(set(event_occurrences)))
+            ).scalars())
+        if tasks:
+            self.sync_tasks(tasks)
+        if events:
+            self.sync_events(events)
+        if habits:
+            self.sync_habits(habits)
+
+    def rebuild(self) -> None:
+        """Recompute the whole index."""
+        self.db.connection().execute(delete(ScheduledNotification))
+        self.sync_tasks(None)
+        self.sync_events(None)
+        self.sync_habits(None)
+
+    def sync_tasks(self, task_ids: Iterable[int] | None) -> None:
+        conn = self.db.connection()
+        q = select(TaskModel).where(
+            TaskModel.status == "ACTIVE",
+            TaskModel.due_date >= self._today,
+        )
+        if task_ids is not None:
+            task_ids = set(task_ids)
+            self._delete("task", task_ids)
+            q = q.where(TaskModel.task_id.in_(task_ids))
+        tasks = conn.execute(q).all()
+        if not tasks:
+            return
+
+        reminders: dict[int, list] = {}
+        for rem in conn.execute(select(TaskReminderModel).where(
+            TaskReminderModel.task_id.in_([t.task_id for t in tasks])
+        )):
+            reminders.setdefault(rem.task_id, []).append(rem)
+
+        self._insert([
+            {"account_id": t.account_id, "source": "task", "entity_id": t.task_id,
+             "occurrence_id": None, "fire_at": fire_at, "trigger": trigger, "body": body}
+            for t in tasks
+            for fire_at, trigger, body in task_fire_times(t, reminders.get(t.task_id, []))
+        ])
+
+    def sync_events(self, event_ids: Iterable[int] | None) -> None:
+        conn = self.db.connection()
+        q = select(EventOccurrenceModel).where(
+            EventOccurrenceModel.is_cancelled == False,
+            EventOccurrenceModel.start_date >= self._today,
+        )
+        if event_ids is not None:
+            event_ids = set(event_ids)
+            self._delete("event", event_ids)
+            q = q.where(EventOccurrenceModel.event_id.in_(event_ids))
+        occs = conn.execute(q).all()
+        if not occs:
+            return
+
+        per_occ: dict[int, list] = {}
+        for rem in conn.execute(select(EventReminderModel).where(
+            EventReminderModel.occurrence_id.in_([o.id for o in occs]),
+            EventReminderModel.is_enabled == True,
+        )):
+            per_occ.setdefault(rem.occurrence_id, []).append(rem)
+        # Defaults are what the user actually edits; per-occurrence rows exist only
+        # for occurrences generated after the reminder was added
+        defaults: dict[int, list] = {}
+        for dr in conn.execute(select(EventDefaultReminderModel).where(
+            EventDefaultReminderModel.event_id.in_({o.event_id for o in occs}),
+            EventDefaultReminderModel.is_enabled == True,
+        )):
+            defaults.setdefault(dr.event_id, []).append(dr)
+
+        self._insert([
+            {"account_id": o.account_id, "source": "event", "entity_id": o.event_id,
+             "occurrence_id": o.id, "fire_at": fire_at, "trigger": trigger, "body": body}
+            for o in occs
+            for fire_at, trigger, body in event_fire_times(
+                o, per_occ.get(o.id, []) + defaults.get(o.event_id, [])
+            )
+        ])
+
+    def sync_habits(self, habit_ids: Iterable[int] | None) -> None:
+        conn = self.db.connection()
+        q = select(HabitModel).where(
+            HabitModel.is_archived == False,
+            HabitModel.reminder_time.isnot(None),
+        )
+        if habit_ids is not None:
+            habit_ids = set(habit_ids)
+            self._delete("habit", habit_ids)
+            q = q.where(HabitModel.habit_id.in_(habit_ids))
+        habits = {h.habit_id: h for h in conn.execute(q).all()}
+        if not habits:
+            return
+
+        occs = conn.execute(select(HabitOccurrence).where(
+            HabitOccurrence.habit_id.in_(habits.keys()),
+            HabitOccurrence.scheduled_date >= self._today,
+            HabitOccurrence.status == "ACTIVE",
+        )).all()
+        self._insert([
+            {"account_id": o.account_id, "source": "habit", "entity_id": o.habit_id,
+             "occurrence_id": o.id, "trigger": "reminder", "body": "Пора выполнить привычку",
+             "fire_at": datetime.combine(o.scheduled_date, habits[o.habit_id].reminder_time, tzinfo=MSK)}
+            for o in occs
+        ])
+
+    def due(self, source: str) -> list[ScheduledNotification]:
+        """Rows of source with fire_at in (now - DISPATCH_WINDOW, now]."""
+        return self.db.query(ScheduledNotification).filter(
+            ScheduledNotification.source == source,
+            ScheduledNotification.fire_at > _utc(self.now - DISPATCH_WINDOW),
+            ScheduledNotification.fire_at <= _utc(self.now),
+        ).order_by(ScheduledNotification.fire_at).all()
+
+    def purge_fired(self) -> None:
+        """Drop rows that are due or past — they have been dispatched (or missed)."""
+        self.db.query(ScheduledNotification).filter(
+            ScheduledNotification.fire_at <= _utc(self.now),
+        ).delete(synchronize_session=False)
+
+    def _delete(self, source: str, entity_ids: set[int]) -> None:
+        if entity_ids:
+            self.db.connection().execute(delete(ScheduledNotification).where(
+                ScheduledNotification.source == source,
+                ScheduledNotification.entity_id.in_(entity_ids),
+            ))
+
+    def _insert(self, rows: list[dict]) -> None:
+        # Rows that can never fire again are not worth storing
+        horizon = self.now - DISPATCH_WINDOW
+        rows = [dict(r, fire_at=_utc(r["fire_at"])) for r in rows if r["fire_at"] > horizon]
+        if rows:
+            self.db.connection().execute(insert(ScheduledNotification), rows)
+
+
+def _utc(dt: datetime) -> datetime:
+    # Stored in UTC so naive storage (SQLite in tests) compares consistently
+    return dt.astimezone(timezone.utc)
+
+
+# ── Session hook ──
+
+_DIRTY_KEY = "reminder_index_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    """Remember which entities' reminders changed in this flush."""
+    dirty = None
+    changed = [o for o in session.dirty if session.is_modified(o, include_collections=False)]
+    for obj in (*session.new, *changed, *session.deleted):
+        if isinstance(obj, (TaskModel, TaskReminderModel)):
+            key, value = "tasks", obj.task_id
+        elif isinstance(obj, (EventOccurrenceModel, EventDefaultReminderModel)):
+            key, value = "events", obj.event_id
+        elif isinstance(obj, EventReminderModel):
+            key, value = "event_occurrences", obj.occurrence_id
+        elif isinstance(obj, (HabitModel, HabitOccurrence)):
+            key, value = "habits", obj.habit_id
+        else:
+            continue
+        if dirty is None:
+            dirty = session.info.setdefault(_DIRTY_KEY, {})
+        dirty.setdefault(key, set()).add(value)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _sync_changes(session: Session, flush_context) -> None:
+    dirty = session.info.pop(_DIRTY_KEY, None)
+    if dirty:
+        ReminderIndex(session).sync(**dirty)
@@ -5,18 +5,77 @@ Jobs:
   - Morning digest (08:00 MSK / 05:00 UTC)
   - Evening digest (21:00 MSK / 18:00 UTC)
   - Reminder dispatcher (every 2 minutes)
+  - Reminder index rebuild (at start, 03:30 MSK / 00:30 UTC)
   - Subscription notifications (09:00 MSK / 06:00 UTC)
   - Notification engine (09:30 MSK / 06:30 UTC)
+
+Every uvicorn worker runs this scheduler; each tick goes through a lease in
+scheduler_job_leases (app.application.scheduler_leases), so only one worker
+executes it. Cron ticks missed while all workers were down run once at startup.
 """
 import logging
+from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.application.scheduler_leases import dedupe_window, missed_fire_time, run_leased, trigger_period
 
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler(daemon=True)
 
+# job_id -> (func, CronTrigger, dedupe) — для догоняющих запусков при старте
+_cron_jobs: dict = {}
+
+_DIGEST_BATCH = 500  # пользователей на один digest.weekly_batch
+
+
+def _add_job(func, trigger, job_id: str, **kwargs) -> None:
+    """Register a job whose every tick runs on one worker only (see scheduler_leases)."""
+    dedupe = dedupe_window(trigger_period(trigger))
+    scheduler.add_job(
+        run_leased,
+        trigger,
+        args=[job_id, func, dedupe],
+        id=job_id,
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        **kwargs,
+    )
+    if isinstance(trigger, CronTrigger):
+        _cron_jobs[job_id] = (func, trigger, dedupe)
+
+
+def _catch_up_missed_runs() -> None:
+    """Queue one immediate run for each cron tick that no worker executed."""
+    from app.config import get_settings
+    from app.infrastructure.db.session import get_session_factory
+
+    horizon = timedelta(hours=get_settings().SCHEDULER_CATCHUP_HOURS)
+    now = datetime.now(timezone.utc)
+    Session = get_session_factory()
+    db = Session()
+    try:
+        for job_id, (func, trigger, dedupe) in _cron_jobs.items():
+            fire = missed_fire_time(db, job_id, trigger, now, horizon)
+            if fire is None:
+                continue
+            logger.warning("Job %s missed its %s tick — running now", job_id, fire.isoformat())
+            scheduler.add_job(
+                run_leased,
+                args=[job_id, func, dedupe],
+                id=f"{job_id}:catchup",
+                next_run_time=now,
+                replace_existing=True,
+            )
+    except Exception:
+        logger.exception("Missed-run catch-up failed")
+    finally:
+        db.close()
+
 
 def _run_morning_digest():
     from app.infrastructure.db.session import get_session_factory
@@ -60,6 +119,21 @@ def _run_reminders():
         db.close()
 
 
+def _run_reminder_index_rebuild():
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.reminder_index import ReminderIndex
+
+    Session = get_session_factory()
+    db = Session()
+    try:
+        ReminderIndex(db).rebuild()
+        db.commit()
+    except Exception:
+        logger.exception("Reminder index rebuild failed")
+    finally:
+        db.close()
+
+
 def _run_subscription_notifications():
     from app.infrastructure.db.session import get_session_factory
     from app.application.subscription_notifications import check_subscription_notifications
@@ -94,16 +168,16 @@ def _run_notification_engine():
 
 
 def _run_weekly_digest_job():
-    """Sunday 18:00 MSK (15:00 UTC) — generate weekly digests for all users."""
+    """Sunday 18:00 MSK (15:00 UTC) — enqueue weekly digests for all users."""
     from app.infrastructure.db.session import get_session_factory
-    from app.application.digests import generate_and_save_weekly_digest, iso_week_key
+    from app.application.digests import iso_week_key
+    from app.application.job_queue import enqueue
     from datetime import date, timedelta
 
     Session = get_session_factory()
     db = Session()
     try:
-        from app.infrastructure.db.models import User
-        users = db.query(User).all()
+        from app.infrastructure.db.models import DigestModel, User
         # The week that just ended is the previous Monday-Sunday.
         # Snap to last Sunday regardless of which weekday the job actually fires
         # (guards against container restart drift into Monday).
@@ -112,23 +186,23 @@ def _run_weekly_digest_job():
         last_sunday = today - timedelta(days=days_since_last_sunday)
         week_start = last_sunday - timedelta(days=6)
         week_key = iso_week_key(week_start)
-        for user in users:
-            try:
-                from app.infrastructure.db.models import DigestModel
-                existing = (
-                    db.query(DigestModel)
-                    .filter(
-                        DigestModel.account_id == user.id,
-                        DigestModel.period_type == "week",
-                        DigestModel.period_key == week_key,
-                    )
-                    .first()
-                )
-                if not existing:
-                    generate_and_save_weekly_digest(db, user.id, week_start)
-                    logger.info("Generated weekly digest %s for user_id=%s", week_key, user.id)
-            except Exception:
-                logger.exception("Weekly digest generation failed for user_id=%s", user.id)
+        done = {
+            account_id for (account_id,) in db.query(DigestModel.account_id).filter(
+                DigestModel.period_type == "week", DigestModel.period_key == week_key,
+            )
+        }
+        pending = [user_id for (user_id,) in db.query(User.id).order_by(User.id).all() if user_id not in done]
+        # Пачками: один job строит дайджесты сотен пользователей grouped-запросами
+        queued = 0
+        for i in range(0, len(pending), _DIGEST_BATCH):
+            chunk = pending[i:i + _DIGEST_BATCH]
+            if enqueue(
+                db, "digest.weekly_batch", {"account_ids": chunk, "week_start": week_start.isoformat()},
+                idempotency_key=f"digest.weekly_batch:{week_key}:{chunk[0]}-{chunk[-1]}:{len(chunk)}",
+            ):
+                queued += len(chunk)
+        db.commit()
+        logger.info("Weekly digest %s: queued for %d user(s)", week_key, queued)
     except Exception:
         logger.exception("Weekly digest job failed")
     finally:
@@ -182,31 +256,92 @@ def _run_calendar_refresh():
 
 
 def _run_media_release_refresh():
-    """Daily: refresh Kinopoisk release dates for tracked upcoming movies/series."""
+    """Daily: queue the Kinopoisk release-date refresh for tracked upcoming movies/series."""
     from app.infrastructure.db.session import get_session_factory
-    from app.application.media_release_refresh import refresh_media_release_dates
+    from app.application.job_queue import enqueue
 
     Session = get_session_factory()
     db = Session()
     try:
-        refresh_media_release_dates(db)
+        today = datetime.now(timezone.utc).date()
+        enqueue(db, "media.release_refresh", idempotency_key=f"media.release_refresh:{today}")
+        db.commit()
     except Exception:
-        logger.exception("media_release_refresh job failed")
+        logger.exception("media.release_refresh enqueue failed")
     finally:
         db.close()
 
 
 def _run_football_refresh():
-    """Daily: fetch Zenit fixtures, notify on new matches and reschedules."""
+    """Daily: queue the Zenit fixtures refresh (notifies on new matches and reschedules)."""
     from app.infrastructure.db.session import get_session_factory
-    from app.application.football_refresh import refresh_football_matches
+    from app.application.job_queue import enqueue
 
     Session = get_session_factory()
     db = Session()
     try:
-        refresh_football_matches(db)
+        today = datetime.now(timezone.utc).date()
+        enqueue(db, "football.refresh", idempotency_key=f"football.refresh:{today}")
+        db.commit()
     except Exception:
-        logger.exception("football_refresh job failed")
+        logger.exception("football.refresh enqueue failed")
+    finally:
+        db.close()
+
+
+def _run_projector_snapshots():
+    """Nightly: queue read-model snapshots so rebuilds replay only the tail of event_log."""
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.job_queue import enqueue
+
+    Session = get_session_factory()
+    db = Session()
+    try:
+        today = datetime.now(timezone.utc).date()
+        enqueue(db, "projector.snapshots", idempotency_key=f"projector.snapshots:{today}")
+        db.commit()
+    except Exception:
+        logger.exception("projector.snapshots enqueue failed")
+    finally:
+        db.close()
+
+
+def _run_efficiency_snapshots():
+    """Nightly: queue efficiency snapshots for all users (dashboard/digests read them)."""
+    from datetime import date
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.job_queue import enqueue
+
+    Session = get_session_factory()
+    db = Session()
+    try:
+        today = date.today()
+        enqueue(
+            db, "efficiency.snapshots", {"snapshot_date": today.isoformat()},
+            idempotency_key=f"efficiency.snapshots:{today}",
+        )
+        db.commit()
+    except Exception:
+        logger.exception("efficiency.snapshots enqueue failed")
+    finally:
+        db.close()
+
+
+def _run_job_queue():
+    """Drain background jobs in-process (JOB_QUEUE_INPROCESS, no app.worker running)."""
+    from app.config import get_settings
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.job_queue import purge_finished, requeue_stale, run_pending
+
+    settings = get_settings()
+    Session = get_session_factory()
+    db = Session()
+    try:
+        requeue_stale(db, timedelta(seconds=settings.JOB_STALE_SECONDS))
+        run_pending(db, limit=50)
+        purge_finished(db, timedelta(days=settings.JOB_RETENTION_DAYS))
+    except Exception:
+        logger.exception("Job queue drain failed")
     finally:
         db.close()
 
@@ -246,142 +381,69 @@ def start_scheduler():
         scheduler.start()
         return
     # Morning digest — 08:00 MSK (05:00 UTC)
-    scheduler.add_job(
-        _run_morning_digest,
-        CronTrigger(hour=5, minute=0, timezone="UTC"),
-        id="morning_digest",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_morning_digest, CronTrigger(hour=5, minute=0, timezone="UTC"), "morning_digest")
 
     # Evening digest — 21:00 MSK (18:00 UTC)
-    scheduler.add_job(
-        _run_evening_digest,
-        CronTrigger(hour=18, minute=0, timezone="UTC"),
-        id="evening_digest",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_evening_digest, CronTrigger(hour=18, minute=0, timezone="UTC"), "evening_digest")
 
     # Reminder dispatcher — every 2 minutes
-    scheduler.add_job(
-        _run_reminders,
-        "interval",
-        minutes=2,
-        id="reminders",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
+    _add_job(_run_reminders, IntervalTrigger(minutes=2), "reminders")
+
+    # Reminder index rebuild — at start and nightly 03:30 MSK (00:30 UTC); catches
+    # writes that bypass the ORM hook (bulk deletes, other processes)
+    _add_job(
+        _run_reminder_index_rebuild,
+        CronTrigger(hour=0, minute=30, timezone="UTC"),
+        "reminder_index_rebuild",
+        next_run_time=datetime.now(timezone.utc),
     )
 
     # Subscription expiration notifications — 09:00 MSK (06:00 UTC)
-    scheduler.add_job(
-        _run_subscription_notifications,
-        CronTrigger(hour=6, minute=0, timezone="UTC"),
-        id="subscription_notifications",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_subscription_notifications, CronTrigger(hour=6, minute=0, timezone="UTC"), "subscription_notifications")
 
     # Notification engine — 09:30 MSK (06:30 UTC)
-    scheduler.add_job(
-        _run_notification_engine,
-        CronTrigger(hour=6, minute=30, timezone="UTC"),
-        id="notification_engine",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_notification_engine, CronTrigger(hour=6, minute=30, timezone="UTC"), "notification_engine")
 
     # Weekly digest — Sunday 18:00 MSK (15:00 UTC)
-    scheduler.add_job(
-        _run_weekly_digest_job,
-        CronTrigger(day_of_week="sun", hour=15, minute=0, timezone="UTC"),  # 18:00 MSK
-        id="weekly_digest",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_weekly_digest_job, CronTrigger(day_of_week="sun", hour=15, minute=0, timezone="UTC"), "weekly_digest")
 
     # Habit streak reminders — hourly 18:00–23:00 MSK (15:00–20:00 UTC)
-    scheduler.add_job(
-        _run_habit_streak_reminders,
-        CronTrigger(hour="15,16,17,18,19,20", minute=0, timezone="UTC"),
-        id="habit_streak_reminders",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_habit_streak_reminders, CronTrigger(hour="15,16,17,18,19,20", minute=0, timezone="UTC"), "habit_streak_reminders")
 
     # Event task templates — daily 07:00 MSK (04:00 UTC)
-    scheduler.add_job(
-        _run_event_task_templates,
-        CronTrigger(hour=4, minute=0, timezone="UTC"),
-        id="event_task_templates",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_event_task_templates, CronTrigger(hour=4, minute=0, timezone="UTC"), "event_task_templates")
 
     # Production calendar refresh — Monday 03:00 UTC
     # Refreshes xmlcalendar.ru data for current + next year so request path
     # stays instant and survives if xmlcalendar.ru goes down later in the week.
-    scheduler.add_job(
-        _run_calendar_refresh,
-        CronTrigger(day_of_week="mon", hour=3, minute=0, timezone="UTC"),
-        id="calendar_refresh",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_calendar_refresh, CronTrigger(day_of_week="mon", hour=3, minute=0, timezone="UTC"), "calendar_refresh")
 
     # Media release dates refresh — daily 10:00 UTC (13:00 MSK)
-    scheduler.add_job(
-        _run_media_release_refresh,
-        CronTrigger(hour=10, minute=0, timezone="UTC"),
-        id="media_release_refresh",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_media_release_refresh, CronTrigger(hour=10, minute=0, timezone="UTC"), "media_release_refresh")
 
     # Football fixtures refresh — daily 09:00 UTC (12:00 MSK)
-    scheduler.add_job(
-        _run_football_refresh,
-        CronTrigger(hour=9, minute=0, timezone="UTC"),
-        id="football_refresh",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_football_refresh, CronTrigger(hour=9, minute=0, timezone="UTC"), "football_refresh")
+
+    # Snapshots read models — ежедневно 01:30 UTC (04:30 МСК)
+    _add_job(_run_projector_snapshots, CronTrigger(hour=1, minute=30, timezone="UTC"), "projector_snapshots")
+
+    # Efficiency snapshots всех пользователей — ежедневно 00:05 UTC (03:05 МСК)
+    _add_job(_run_efficiency_snapshots, CronTrigger(hour=0, minute=5, timezone="UTC"), "efficiency_snapshots")
 
     # Оценить точность плана — 1-го числа 09:00 МСК (06:00 UTC)
-    scheduler.add_job(
-        _run_plan_accuracy_reminder,
-        CronTrigger(day=1, hour=6, minute=0, timezone="UTC"),
-        id="plan_accuracy_reminder",
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-    )
+    _add_job(_run_plan_accuracy_reminder, CronTrigger(day=1, hour=6, minute=0, timezone="UTC"), "plan_accuracy_reminder")
 
     # Telegram long-polling — каждые 30 сек (основной режим получения команд;
     # вебхук Telegram->сервер из РФ может не проходить). TELEGRAM_POLLING=0 выключает.
     import os
     if os.getenv("TELEGRAM_POLLING", "1") != "0":
-        scheduler.add_job(
-            _run_telegram_polling,
-            "interval",
-            seconds=30,
-            id="telegram_polling",
-            replace_existing=True,
-            max_instances=1,
-            coalesce=True,
-        )
+        _add_job(_run_telegram_polling, IntervalTrigger(seconds=30), "telegram_polling")
+
+    # Фоновые задачи — каждые 10 сек, если отдельные воркеры (python -m app.worker) не запущены
+    if get_settings().JOB_QUEUE_INPROCESS:
+        _add_job(_run_job_queue, IntervalTrigger(seconds=10), "job_queue")
 
+    _catch_up_missed_runs()
     scheduler.start()
     logger.info(
         "Scheduler started: morning_digest (05:00 UTC), evening_digest (18:00 UTC), "
@@ -0,0 +1,200 @@
+"""
+Scheduler job leases — one worker per job tick across uvicorn workers.
+
+Every worker starts the same APScheduler jobs; each tick is wrapped in
+run_leased(), which claims the job's row in scheduler_job_leases with one
+UPDATE:
+
+  lease_until < now                     — never two runs of a job at once;
+  last_started_at <= now - dedupe       — the same tick fired on another
+                                          worker a few seconds ago is skipped.
+
+dedupe = min(period / 2, MAX_DEDUPE): ticks of one job on different workers
+fire within seconds of each other, consecutive ticks are a period apart.
+A worker that dies mid-run blocks the job until lease_until (SCHEDULER_LEASE_SECONDS).
+
+Run stats (duration, status, counts) are written to the same row on finish;
+job_stats() returns them for the admin page.
+
+Missed-run catch-up: missed_fire_time() finds a cron tick that nobody ran
+(all workers were down, e.g. during a deploy); start_scheduler() queues one
+immediate run for it through the same lease.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.infrastructure.db.models import SchedulerJobLease
+from app.infrastructure.db.upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+MAX_DEDUPE = timedelta(minutes=10)
+
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_id() -> str:
+    return _WORKER_ID
+
+
+def dedupe_window(period: timedelta | None) -> timedelta:
+    """Window in which a second start of the same job counts as the same tick."""
+    if not period:
+        return MAX_DEDUPE
+    return min(period / 2, MAX_DEDUPE)
+
+
+def trigger_period(trigger, now: datetime | None = None) -> timedelta | None:
+    """Shortest gap between consecutive fire times (None — one-shot trigger)."""
+    interval = getattr(trigger, "interval", None)
+    if isinstance(interval, timedelta):
+        return interval
+    now = now or datetime.now(timezone.utc)
+    fires = []
+    t = trigger.get_next_fire_time(None, now)
+    while t is not None and len(fires) < 8:
+        fires.append(t)
+        t = trigger.get_next_fire_time(t, t + timedelta(microseconds=1))
+    if len(fires) < 2:
+        return None
+    return min(b - a for a, b in zip(fires, fires[1:]))
+
+
+def last_fire_time(trigger, now: datetime, horizon: timedelta) -> datetime | None:
+    """Most recent scheduled fire time in (now - horizon, now]."""
+    last = None
+    t = trigger.get_next_fire_time(None, now - horizon)
+    while t is not None and t <= now:
+        last = t
+        t = trigger.get_next_fire_time(t, t + timedelta(microseconds=1))
+    return last
+
+
+def missed_fire_time(db: Session, job_id: str, trigger, now: datetime, horizon: timedelta) -> datetime | None:
+    """
+    Cron tick within horizon that no worker started, else None
+
+    Задание, которое ещё ни разу не запускалось (новая БД/новое задание),
+    не догоняется — иначе первый деплой разослал бы все дайджесты сразу.
+    """
+    fire = last_fire_time(trigger, now, horizon)
+    if fire is None:
+        return None
+    last_started = (
+        db.query(SchedulerJobLease.last_started_at)
+        .filter(SchedulerJobLease.job_id == job_id)
+        .scalar()
+    )
+    if last_started is None:
+        return None
+    if last_started.tzinfo is None:
+        last_started = last_started.replace(tzinfo=timezone.utc)
+    # Тик считается выполненным, если старт был не раньше, чем за окно дедупликации до него
+    if last_started >= fire - dedupe_window(trigger_period(trigger, now)):
+        return None
+    return fire
+
+
+def claim(db: Session, job_id: str, now: datetime, dedupe: timedelta, lease: timedelta) -> bool:
+    """Atomically take the job's tick; True — this worker runs it. Caller commits."""
+    stmt = dialect_insert(db, SchedulerJobLease).values(job_id=job_id)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["job_id"]))
+    result = db.execute(
+        update(SchedulerJobLease)
+        .where(
+            SchedulerJobLease.job_id == job_id,
+            or_(SchedulerJobLease.lease_until.is_(None), SchedulerJobLease.lease_until < now),
+            or_(SchedulerJobLease.last_started_at.is_(None), SchedulerJobLease.last_started_at <= now - dedupe),
+        )
+        .values(owner=worker_id(), lease_until=now + lease, last_started_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def finish(db: Session, job_id: str, duration_ms: int, error: str | None) -> None:
+    """Release the lease and record run stats. Caller commits."""
+    db.execute(
+        update(SchedulerJobLease)
+        .where(SchedulerJobLease.job_id == job_id, SchedulerJobLease.owner == worker_id())
+        .values(
+            lease_until=None,
+            last_finished_at=datetime.now(timezone.utc),
+            last_duration_ms=duration_ms,
+            last_status="failed" if error else "ok",
+            last_error=error,
+            run_count=SchedulerJobLease.run_count + 1,
+            failure_count=SchedulerJobLease.failure_count + (1 if error else 0),
+            total_duration_ms=SchedulerJobLease.total_duration_ms + duration_ms,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_leased(job_id: str, func: Callable[[], None], dedupe: timedelta) -> bool:
+    """
+    Run one job tick if this worker wins the lease
+
+    Returns:
+        True — тик выполнен этим воркером, False — его взял другой
+    """
+    from app.infrastructure.db.session import get_session_factory
+
+    lease = timedelta(seconds=get_settings().SCHEDULER_LEASE_SECONDS)
+    Session = get_session_factory()
+    db = Session()
+    try:
+        won = claim(db, job_id, datetime.now(timezone.utc), dedupe, lease)
+        db.commit()
+        if not won:
+            logger.debug("Job %s: tick taken by another worker", job_id)
+            return False
+
+        started = time.monotonic()
+        error = None
+        try:
+            func()
+        except Exception:
+            error = traceback.format_exc(limit=5)
+            logger.exception("Job %s failed", job_id)
+        duration_ms = int((time.monotonic() - started) * 1000)
+        logger.info("Job %s finished in %d ms on %s", job_id, duration_ms, worker_id())
+
+        finish(db, job_id, duration_ms, error)
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        logger.exception("Job %s: lease bookkeeping failed", job_id)
+        return False
+    finally:
+        db.close()
+
+
+def job_stats(db: Session) -> list[dict]:
+    """Per-job run stats for the admin page."""
+    rows = db.query(SchedulerJobLease).order_by(SchedulerJobLease.job_id).all()
+    return [
+        {
+            "job_id": r.job_id,
+            "owner": r.owner,
+            "lease_until": r.lease_until,
+            "last_started_at": r.last_started_at,
+            "last_finished_at": r.last_finished_at,
+            "last_duration_ms": r.last_duration_ms,
+            "avg_duration_ms": r.total_duration_ms // r.run_count if r.run_count else None,
+            "last_status": r.last_status,
+            "run_count": r.run_count,
+            "failure_count": r.failure_count,
+        }
+        for r in rows
+    ]
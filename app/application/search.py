@@ -1,12 +1,27 @@
 """
-Global search service — dialect-aware (PostgreSQL FTS / SQLite Python-filter fallback).
+Global search service — dialect-aware.
+
+PostgreSQL: every searchable table has a stored generated `search_vector`
+(tsvector, GIN-indexed, migration m5e6f7a8b9c0). One UNION ALL query ranks
+hits across all entity types — active and archived at once — and keeps the
+top `per_type` per (type, archived) bucket; the archive fallback needs no
+second pass.
+
+SQLite (tests/dev): per-engine in-memory bigram inverted index per
+(type, account), built on first use and dropped by a Session flush hook
+when a row of that type changes; the hooks are installed with the first
+index, so PostgreSQL processes never run them. Candidates from the index are verified
+with a case-insensitive substring match, so results equal a full scan.
 """
 from __future__ import annotations
 
+import threading
+import weakref
+from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Any
+from typing import Any, Callable
 
-from sqlalchemy import text
+from sqlalchemy import event, func, select, text
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
@@ -37,12 +52,170 @@ _EMPTY: dict[str, Any] = {
 }
 
 
-def _matches(query_lower: str, *fields: str | None) -> bool:
-    """Case-insensitive substring match for SQLite fallback."""
-    for f in fields:
-        if f and query_lower in f.lower():
-            return True
-    return False
+@dataclass(frozen=True)
+class _Source:
+    """
+    Searchable entity type
+
+    fields — текстовые колонки (порядок = выражение search_vector в миграции);
+    archived — SQL-выражение «запись в архиве» (None — архива нет);
+    where — дополнительный фильтр.
+    """
+    kind: str
+    model: Any
+    id_col: str
+    fields: tuple[str, ...]
+    archived: str | None
+    where: str | None = None
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+
+_SOURCES: tuple[_Source, ...] = (
+    _Source("tasks", TaskModel, "task_id", ("title", "note"), "status = 'ARCHIVED'"),
+    # Event is "live" if it is active and has at least one non-cancelled
+    # occurrence; inactive or active-but-empty events go to the archive bucket.
+    _Source(
+        "events", CalendarEventModel, "event_id", ("title", "description"),
+        "NOT (events.is_active AND EXISTS ("
+        "SELECT 1 FROM event_occurrences o"
+        " WHERE o.event_id = events.event_id AND o.is_cancelled IS NOT TRUE))",
+    ),
+    _Source("operations", OperationTemplateModel, "template_id", ("title", "note"), "is_archived"),
+    _Source("transactions", TransactionFeed, "transaction_id", ("description",), None),
+    _Source("habits", HabitModel, "habit_id", ("title", "note"), "is_archived"),
+    _Source("goals", GoalInfo, "goal_id", ("title",), "is_archived", where="is_system IS NOT TRUE"),
+    _Source("subscriptions", SubscriptionModel, "id", ("name",), "is_archived"),
+    _Source("contacts", ContactModel, "id", ("name", "note"), "is_archived"),
+    _Source("articles", ArticleModel, "id", ("title", "content_md"), "status = 'archived'"),
+)
+
+_SOURCE_BY_MODEL: dict[type, _Source] = {src.model: src for src in _SOURCES}
+
+
+def _hits_sql() -> str:
+    """UNION ALL over all sources, top :per_type per (kind, archived) by ts_rank_cd."""
+    branches = []
+    for src in _SOURCES:
+        where = f" AND ({src.where})" if src.where else ""
+        branches.append(
+            f"SELECT '{src.kind}' AS kind, {src.table}.{src.id_col} AS id,"
+            f" ({src.archived or 'FALSE'}) AS archived,"
+            f" ts_rank_cd({src.table}.search_vector, q.q) AS rank"
+            f" FROM {src.table}, q"
+            f" WHERE {src.table}.account_id = :uid AND {src.table}.search_vector @@ q.q{where}"
+        )
+    return (
+        "WITH q AS (SELECT plainto_tsquery('russian', :q) AS q),"
+        " hits AS (" + " UNION ALL ".join(branches) + ")"
+        " SELECT kind, id, archived FROM ("
+        "  SELECT kind, id, archived, row_number() OVER"
+        "   (PARTITION BY kind, archived ORDER BY rank DESC, id DESC) AS rn FROM hits"
+        " ) ranked WHERE rn <= :per_type ORDER BY kind, archived, rn"
+    )
+
+
+_HITS_SQL = _hits_sql()
+
+
+# ── SQLite: in-memory inverted index ─────────────────────────────────────────
+
+_SEP = "\x00"  # между полями: запрос не может «склеить» соседние поля
+
+
+def _ngrams(s: str) -> set[str]:
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+class _NgramIndex:
+    """Bigram → ids posting lists over one (type, account); docs in id-desc order."""
+
+    def __init__(self, rows: list[tuple[int, str, bool]]):
+        self.docs: dict[int, tuple[str, bool]] = {}
+        self.postings: dict[str, set[int]] = {}
+        for doc_id, doc_text, archived in sorted(rows, key=lambda r: r[0], reverse=True):
+            self.docs[doc_id] = (doc_text, archived)
+            for gram in _ngrams(doc_text):
+                self.postings.setdefault(gram, set()).add(doc_id)
+
+    def search(self, q_lower: str) -> list[tuple[int, bool]]:
+        grams = sorted(_ngrams(q_lower), key=lambda g: len(self.postings.get(g, ())))
+        if grams:
+            candidates = set(self.postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self.postings.get(gram, set())
+        else:
+            candidates = set(self.docs)
+        return [
+            (doc_id, archived) for doc_id, (doc_text, archived) in self.docs.items()
+            if doc_id in candidates and q_lower in doc_text
+        ]
+
+
+# engine -> {(kind, account_id): _NgramIndex}
+_indexes: "weakref.WeakKeyDictionary[Any, dict[tuple[str, int], _NgramIndex]]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+_TOUCHED_KEY = "search_index_touched"
+
+
+def _invalidate(bind, keys) -> None:
+    with _indexes_lock:
+        per_engine = _indexes.get(bind)
+        if per_engine:
+            for key in keys:
+                per_engine.pop(key, None)
+
+
+def _drop_changed_indexes(session: Session, flush_context) -> None:
+    keys = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, EventOccurrenceModel):
+            keys.add(("events", obj.account_id))  # влияет на «живость» события
+            continue
+        src = _SOURCE_BY_MODEL.get(type(obj))
+        if src is not None:
+            keys.add((src.kind, obj.account_id))
+    if not keys:
+        return
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        return
+    # Индекс мог быть построен по незакоммиченным строкам: при rollback сбросить ещё раз
+    session.info.setdefault(_TOUCHED_KEY, set()).update(keys)
+    _invalidate(bind.engine if hasattr(bind, "engine") else bind, keys)
+
+
+def _drop_rolled_back_indexes(session: Session) -> None:
+    keys = session.info.pop(_TOUCHED_KEY, None)
+    if keys:
+        bind = session.get_bind()
+        _invalidate(bind.engine if hasattr(bind, "engine") else bind, keys)
+
+
+def _forget_touched(session: Session) -> None:
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+_listeners_registered = False
+
+
+def _register_listeners() -> None:
+    """Install the invalidation hooks when the first SQLite index is built.
+
+    PostgreSQL never builds an index, so production flushes don't pay for them.
+    """
+    global _listeners_registered
+    with _indexes_lock:
+        if _listeners_registered:
+            return
+        event.listen(Session, "after_flush", _drop_changed_indexes)
+        event.listen(Session, "after_rollback", _drop_rolled_back_indexes)
+        event.listen(Session, "after_commit", _forget_touched)
+        _listeners_registered = True
 
 
 class SearchService:
@@ -55,94 +228,125 @@ class SearchService:
         if len(query.strip()) < 2:
             return dict(_EMPTY)
 
-        dialect = self._dialect()
         per_type = max(1, min(10, limit // 9)) if limit < 90 else 10
 
-        # Primary pass — only active records.
-        tasks = self._search_tasks(user_id, query, dialect, per_type, archived=False)
-        events = self._search_events(user_id, query, dialect, per_type, archived=False)
-        operations = self._search_operations(user_id, query, dialect, per_type, archived=False)
-        transactions = self._search_transactions(user_id, query, dialect, per_type)
-        habits = self._search_habits(user_id, query, dialect, per_type, archived=False)
-        goals = self._search_goals(user_id, query, dialect, per_type, archived=False)
-        subscriptions = self._search_subscriptions(user_id, query, dialect, per_type, archived=False)
-        contacts = self._search_contacts(user_id, query, dialect, per_type, archived=False)
-        articles = self._search_articles(user_id, query, dialect, per_type, archived=False)
-
-        total = (
-            len(tasks) + len(events) + len(operations) + len(transactions)
-            + len(habits) + len(goals) + len(subscriptions) + len(contacts)
-            + len(articles)
-        )
-
-        # Fallback — if nothing was found, look inside the archive and mark
-        # each result with is_archived so the UI can label them.
-        if total == 0:
-            tasks = self._search_tasks(user_id, query, dialect, per_type, archived=True)
-            events = self._search_events(user_id, query, dialect, per_type, archived=True)
-            operations = self._search_operations(user_id, query, dialect, per_type, archived=True)
-            habits = self._search_habits(user_id, query, dialect, per_type, archived=True)
-            goals = self._search_goals(user_id, query, dialect, per_type, archived=True)
-            subscriptions = self._search_subscriptions(user_id, query, dialect, per_type, archived=True)
-            contacts = self._search_contacts(user_id, query, dialect, per_type, archived=True)
-            articles = self._search_articles(user_id, query, dialect, per_type, archived=True)
-            total = (
-                len(tasks) + len(events) + len(operations)
-                + len(habits) + len(goals) + len(subscriptions)
-                + len(contacts) + len(articles)
-            )
-
-        return {
-            "tasks": tasks,
-            "events": events,
-            "operations": operations,
-            "transactions": transactions,
-            "habits": habits,
-            "goals": goals,
-            "subscriptions": subscriptions,
-            "contacts": contacts,
-            "articles": articles,
-            "total": total,
-        }
+        if self._dialect() == "postgresql":
+            hits = self._hits_postgres(user_id, query, per_type)
+        else:
+            hits = self._hits_index(user_id, query, per_type)
+
+        # Primary pass — only active records. Fallback — if nothing was found,
+        # look inside the archive and mark each result with is_archived so the
+        # UI can label them (transactions have no archive).
+        archived = not any(ids for (kind, arch), ids in hits.items() if not arch)
+
+        result: dict[str, Any] = {}
+        total = 0
+        for src in _SOURCES:
+            ids = hits.get((src.kind, archived), [])
+            items = self._hydrate(src, ids, archived)
+            result[src.kind] = items
+            total += len(items)
+        result["total"] = total
+        return result
 
     # ── dialect helper ───────────────────────────────────────────────────────
 
     def _dialect(self) -> str:
-        try:
-            return self.db.bind.dialect.name  # type: ignore[union-attr]
-        except Exception:
-            return "sqlite"
-
-    # ── tasks ────────────────────────────────────────────────────────────────
-
-    def _search_tasks(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = self.db.query(TaskModel).filter(TaskModel.account_id == user_id)
-        if archived:
-            base = base.filter(TaskModel.status == "ARCHIVED")
-        else:
-            base = base.filter(TaskModel.status != "ARCHIVED")
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(TaskModel.task_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title, r.note)][:limit]
+        return self.db.get_bind().dialect.name
+
+    # ── hit lookup ───────────────────────────────────────────────────────────
+
+    def _hits_postgres(self, user_id: int, query: str, per_type: int) -> dict[tuple[str, bool], list[int]]:
+        """{(kind, archived): [id, ...] by rank} — один round-trip на все типы."""
+        rows = self.db.execute(text(_HITS_SQL), {"uid": user_id, "q": query, "per_type": per_type}).all()
+        hits: dict[tuple[str, bool], list[int]] = {}
+        for kind, doc_id, archived in rows:
+            hits.setdefault((kind, bool(archived)), []).append(doc_id)
+        return hits
+
+    def _hits_index(self, user_id: int, query: str, per_type: int) -> dict[tuple[str, bool], list[int]]:
+        q_lower = query.lower()
+        hits: dict[tuple[str, bool], list[int]] = {}
+        for src in _SOURCES:
+            for doc_id, archived in self._index(src, user_id).search(q_lower):
+                bucket = hits.setdefault((src.kind, archived), [])
+                if len(bucket) < per_type:
+                    bucket.append(doc_id)
+        return hits
+
+    def _index(self, src: _Source, user_id: int) -> _NgramIndex:
+        engine = self.db.get_bind()
+        engine = getattr(engine, "engine", engine)
+        key = (src.kind, user_id)
+        with _indexes_lock:
+            idx = _indexes.get(engine, {}).get(key)
+        if idx is not None:
+            return idx
+
+        _register_listeners()
+        where = f" AND ({src.where})" if src.where else ""
+        cols = ", ".join(f"coalesce({f}, '')" for f in src.fields)
+        rows = self.db.execute(text(
+            f"SELECT {src.table}.{src.id_col}, {cols}, ({src.archived or 'FALSE'})"
+            f" FROM {src.table} WHERE {src.table}.account_id = :uid{where}"
+        ), {"uid": user_id}).all()
+        idx = _NgramIndex([
+            (row[0], _SEP.join(f.lower() for f in row[1:-1]), bool(row[-1])) for row in rows
+        ])
+        with _indexes_lock:
+            _indexes.setdefault(engine, {})[key] = idx
+        return idx
+
+    # ── hydration ────────────────────────────────────────────────────────────
+
+    def _hydrate(self, src: _Source, ids: list[int], archived: bool) -> list[dict[str, Any]]:
+        if not ids:
+            return []
+        id_attr = getattr(src.model, src.id_col)
+        rows = {getattr(r, src.id_col): r for r in self.db.query(src.model).filter(id_attr.in_(ids)).all()}
+        if src.kind == "events":
+            occs = self._first_event_occurrences(list(rows))
+            return [self._event_item(rows[i], occs.get(i), archived) for i in ids if i in rows]
+        if src.kind == "operations":
+            occs = self._next_operation_occurrences(list(rows))
+            return [self._operation_item(rows[i], occs.get(i), archived) for i in ids if i in rows]
+        build: Callable[[Any], dict[str, Any]] = {
+            "tasks": lambda r: self._task_item(r, archived),
+            "transactions": self._transaction_item,
+            "habits": lambda r: self._habit_item(r, archived),
+            "goals": lambda r: self._goal_item(r, archived),
+            "subscriptions": lambda r: self._subscription_item(r, archived),
+            "contacts": lambda r: self._contact_item(r, archived),
+            "articles": lambda r: self._article_item(r, archived),
+        }[src.kind]
+        return [build(rows[i]) for i in ids if i in rows]
+
+    def _first_rows(self, model: Any, key_col: Any, order_by: tuple, ids: list[int], *where) -> dict[int, Any]:
+        """{key: first row by order_by} for all ids in one query (row_number per key)."""
+        if not ids:
+            return {}
+        rn = func.row_number().over(partition_by=key_col, order_by=order_by).label("rn")
+        ranked = select(model.id.label("row_id"), rn).where(key_col.in_(ids), *where).subquery()
+        rows = (
+            self.db.query(model)
+            .join(ranked, ranked.c.row_id == model.id)
+            .filter(ranked.c.rn == 1)
+            .all()
+        )
+        return {getattr(r, key_col.key): r for r in rows}
+
+    def _first_event_occurrences(self, event_ids: list[int]) -> dict[int, EventOccurrenceModel]:
+        o = EventOccurrenceModel
+        return self._first_rows(o, o.event_id, (o.start_date.asc(), o.id.asc()), event_ids)
 
-        return [self._task_item(t, archived) for t in rows]
+    def _next_operation_occurrences(self, template_ids: list[int]) -> dict[int, OperationOccurrence]:
+        o = OperationOccurrence
+        return self._first_rows(
+            o, o.template_id, (o.scheduled_date.asc(), o.id.asc()), template_ids, o.status == "ACTIVE",
+        )
+
+    # ── item builders ────────────────────────────────────────────────────────
 
     def _task_item(self, t: TaskModel, archived: bool) -> dict[str, Any]:
         subtitle = (
@@ -157,78 +361,8 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── events ───────────────────────────────────────────────────────────────
-
-    def _search_events(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        # Event is "live" if it has at least one non-cancelled occurrence.
-        # Resolve to a concrete Python set — works across dialects without
-        # subquery/exists quirks.
-        live_event_ids: set[int] = {
-            row[0]
-            for row in (
-                self.db.query(EventOccurrenceModel.event_id)
-                .filter(
-                    EventOccurrenceModel.account_id == user_id,
-                    EventOccurrenceModel.is_cancelled.isnot(True),
-                )
-                .distinct()
-                .all()
-            )
-        }
-
-        base = (
-            self.db.query(CalendarEventModel)
-            .filter(CalendarEventModel.account_id == user_id)
-        )
-        if archived:
-            # Archived bucket: is_active=False OR active-but-empty (no live
-            # occurrence). Both are effectively dead from the user's POV.
-            if live_event_ids:
-                base = base.filter(
-                    (CalendarEventModel.is_active.is_(False))
-                    | (~CalendarEventModel.event_id.in_(live_event_ids))
-                )
-            # else: everything the user owns has no live occurrence → anything
-            # active-but-empty or inactive qualifies, so no id filter needed.
-        else:
-            # Primary pass: active AND has at least one non-cancelled occurrence.
-            # If nothing is live for this user, the primary pass is empty.
-            if not live_event_ids:
-                return []
-            base = base.filter(
-                CalendarEventModel.is_active.is_(True),
-                CalendarEventModel.event_id.in_(live_event_ids),
-            )
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(description,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(description,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(CalendarEventModel.event_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title, r.description)][:limit]
-
-        return [self._event_item(e, archived) for e in rows]
-
-    def _event_item(self, e: CalendarEventModel, archived: bool) -> dict[str, Any]:
-        occ = (
-            self.db.query(EventOccurrenceModel)
-            .filter(EventOccurrenceModel.event_id == e.event_id)
-            .order_by(EventOccurrenceModel.start_date.asc())
-            .first()
-        )
+    def _event_item(self, e: CalendarEventModel, occ: EventOccurrenceModel | None,
+                    archived: bool) -> dict[str, Any]:
         if occ:
             subtitle = occ.start_date.strftime("%d.%m.%Y")
             if occ.end_date and occ.end_date != occ.start_date:
@@ -245,50 +379,8 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── operation templates ──────────────────────────────────────────────────
-
-    def _search_operations(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(OperationTemplateModel)
-            .filter(OperationTemplateModel.account_id == user_id)
-        )
-        if archived:
-            base = base.filter(OperationTemplateModel.is_archived.is_(True))
-        else:
-            base = base.filter(OperationTemplateModel.is_archived.is_(False))
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(OperationTemplateModel.template_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title, r.note)][:limit]
-
-        return [self._operation_item(t, archived) for t in rows]
-
-    def _operation_item(self, t: OperationTemplateModel, archived: bool) -> dict[str, Any]:
-        occ = (
-            self.db.query(OperationOccurrence)
-            .filter(
-                OperationOccurrence.template_id == t.template_id,
-                OperationOccurrence.status == "ACTIVE",
-            )
-            .order_by(OperationOccurrence.scheduled_date.asc())
-            .first()
-        )
+    def _operation_item(self, t: OperationTemplateModel, occ: OperationOccurrence | None,
+                        archived: bool) -> dict[str, Any]:
         if occ:
             subtitle = f"{t.kind} · {occ.scheduled_date.strftime('%d.%m.%Y')}"
             nearest_date: date | None = occ.scheduled_date
@@ -305,36 +397,6 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── transactions ─────────────────────────────────────────────────────────
-
-    def _search_transactions(
-        self, user_id: int, query: str, dialect: str, limit: int
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(TransactionFeed)
-            .filter(TransactionFeed.account_id == user_id)
-        )
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(description,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(description,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(TransactionFeed.transaction_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.description)][:limit]
-
-        return [self._transaction_item(tx) for tx in rows]
-
     def _transaction_item(self, tx: TransactionFeed) -> dict[str, Any]:
         subtitle = f"{tx.operation_type} · {tx.amount}"
         return {
@@ -346,37 +408,6 @@ class SearchService:
             "is_archived": False,
         }
 
-    # ── habits ───────────────────────────────────────────────────────────────
-
-    def _search_habits(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = self.db.query(HabitModel).filter(HabitModel.account_id == user_id)
-        if archived:
-            base = base.filter(HabitModel.is_archived.is_(True))
-        else:
-            base = base.filter(HabitModel.is_archived.is_(False))
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(note,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(HabitModel.habit_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title, r.note)][:limit]
-
-        return [self._habit_item(h, archived) for h in rows]
-
     def _habit_item(self, h: HabitModel, archived: bool) -> dict[str, Any]:
         if h.reminder_time is not None:
             subtitle = h.reminder_time.strftime("%H:%M")
@@ -391,41 +422,6 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── goals ────────────────────────────────────────────────────────────────
-
-    def _search_goals(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(GoalInfo)
-            .filter(GoalInfo.account_id == user_id)
-            .filter(GoalInfo.is_system.is_(False))
-        )
-        if archived:
-            base = base.filter(GoalInfo.is_archived.is_(True))
-        else:
-            base = base.filter(GoalInfo.is_archived.is_(False))
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(GoalInfo.goal_id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title)][:limit]
-
-        return [self._goal_item(g, archived) for g in rows]
-
     def _goal_item(self, g: GoalInfo, archived: bool) -> dict[str, Any]:
         if g.target_amount is not None:
             subtitle = f"Цель {g.target_amount} {g.currency}"
@@ -440,40 +436,6 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── subscriptions ─────────────────────────────────────────────────────────
-
-    def _search_subscriptions(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(SubscriptionModel)
-            .filter(SubscriptionModel.account_id == user_id)
-        )
-        if archived:
-            base = base.filter(SubscriptionModel.is_archived.is_(True))
-        else:
-            base = base.filter(SubscriptionModel.is_archived.is_(False))
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(name,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(name,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(SubscriptionModel.id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.name)][:limit]
-
-        return [self._subscription_item(s, archived) for s in rows]
-
     def _subscription_item(self, s: SubscriptionModel, archived: bool) -> dict[str, Any]:
         if s.paid_until_self is not None:
             subtitle = f"Оплачено до {s.paid_until_self.strftime('%d.%m.%Y')}"
@@ -488,40 +450,6 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── contacts ─────────────────────────────────────────────────────────────
-
-    def _search_contacts(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(ContactModel)
-            .filter(ContactModel.account_id == user_id)
-        )
-        if archived:
-            base = base.filter(ContactModel.is_archived.is_(True))
-        else:
-            base = base.filter(ContactModel.is_archived.is_(False))
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(name,'') || ' ' || coalesce(note,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(name,'') || ' ' || coalesce(note,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(ContactModel.id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.name, r.note)][:limit]
-
-        return [self._contact_item(c, archived) for c in rows]
-
     def _contact_item(self, c: ContactModel, archived: bool) -> dict[str, Any]:
         if c.note:
             subtitle = c.note[:50]
@@ -536,40 +464,6 @@ class SearchService:
             "is_archived": archived,
         }
 
-    # ── articles ─────────────────────────────────────────────────────────────
-
-    def _search_articles(
-        self, user_id: int, query: str, dialect: str, limit: int, *, archived: bool
-    ) -> list[dict[str, Any]]:
-        base = (
-            self.db.query(ArticleModel)
-            .filter(ArticleModel.account_id == user_id)
-        )
-        if archived:
-            base = base.filter(ArticleModel.status == "archived")
-        else:
-            base = base.filter(ArticleModel.status != "archived")
-
-        if dialect == "postgresql":
-            base = base.filter(
-                text(
-                    "to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(content_md,''))"
-                    " @@ plainto_tsquery('russian', :q)"
-                )
-            ).params(q=query).order_by(
-                text(
-                    "ts_rank_cd(to_tsvector('russian', coalesce(title,'') || ' ' || coalesce(content_md,'')),"
-                    " plainto_tsquery('russian', :q)) DESC"
-                )
-            )
-            rows = base.limit(limit).all()
-        else:
-            q_lower = query.lower()
-            candidates = base.order_by(ArticleModel.id.desc()).all()
-            rows = [r for r in candidates if _matches(q_lower, r.title, r.content_md)][:limit]
-
-        return [self._article_item(a, archived) for a in rows]
-
     def _article_item(self, a: ArticleModel, archived: bool) -> dict[str, Any]:
         type_labels = {
             "note": "Заметка",
@@ -0,0 +1,16 @@
+"""
+Global Session hooks — imported by every entrypoint.
+
+Importing this module registers the listeners on sqlalchemy.orm.Session that
+keep derived tables in step with ORM writes, wherever the writes happen
+(web app, projection daemon, job worker, rebuild CLI):
+
+- reminder_index  — scheduled_notifications for tasks, events and habits;
+- caldav_sync     — CalDAV ctag / change journal for tasks;
+- dashboard_cache — in-process dashboard versions after commit.
+
+search.py installs its SQLite-only hooks itself when it builds its first index.
+"""
+import app.application.caldav_sync  # noqa: F401
+import app.application.dashboard_cache  # noqa: F401
+import app.application.reminder_index  # noqa: F401
@@ -5,11 +5,11 @@ Aggregates finances, projects, and discipline into a single 0-100 score.
 """
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime, timezone
 from decimal import Decimal
 from typing import Any
 
-from sqlalchemy import func as sa_func
+from sqlalchemy import case, extract, func as sa_func
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import (
@@ -19,6 +19,7 @@ from app.infrastructure.db.models import (
     StrategicScoreBreakdown,
     StrategicDailySnapshot,
     StrategicWeeklyReview,
+    TaskCompletionMonthly,
 )
 from app.application.dashboard import DashboardService
 from app.application.project_analytics import ProjectAnalyticsService, _month_range
@@ -105,7 +106,15 @@ class StrategyService:
     # ------------------------------------------------------------------
 
     def compute(self, account_id: int, year: int, month: int) -> dict[str, Any]:
-        """Compute full strategy for a month, upsert snapshot + breakdown."""
+        """Compute full strategy for a month, upsert snapshot + breakdown.
+
+        A closed month whose snapshot was calculated after the month ended is
+        frozen: its stored values are returned without recomputation.
+        """
+        frozen = self._frozen_snapshot(account_id, year, month)
+        if frozen is not None:
+            return _snapshot_data(frozen)
+
         today = date(year, month, 1)
         dash = DashboardService(self.db)
 
@@ -140,10 +149,11 @@ class StrategyService:
         )
 
         pa_svc = ProjectAnalyticsService(self.db)
+        project_analytics = pa_svc.compute_many([p.id for p in active_projects], account_id, year, month)
         disc_values: list[float] = []
         overdue_total = 0
         for proj in active_projects:
-            pa = pa_svc.compute(proj.id, account_id, year, month)
+            pa = project_analytics.get(proj.id) or pa_svc._empty(proj.id, year, month)
             disc_values.append(float(pa["discipline_percent"]))
             overdue_total += pa["overdue_open_count"]
 
@@ -151,30 +161,7 @@ class StrategyService:
         p_score = project_score_from(avg_disc, overdue_total)
 
         # ── 3. Global discipline ──
-        month_start, month_end = _month_range(year, month)
-
-        all_completed = (
-            self.db.query(TaskModel)
-            .filter(
-                TaskModel.account_id == account_id,
-                TaskModel.status == "DONE",
-                TaskModel.completed_at.isnot(None),
-                TaskModel.due_date.isnot(None),
-            )
-            .all()
-        )
-
-        global_on_time = 0
-        global_late = 0
-        for t in all_completed:
-            if t.completed_at is None or t.due_date is None:
-                continue
-            if not (month_start <= t.completed_at.date() < month_end):
-                continue
-            if t.completed_at.date() <= t.due_date:
-                global_on_time += 1
-            else:
-                global_late += 1
+        global_on_time, global_late = self._completion_counts(account_id, [(year, month)])[(year, month)]
 
         global_total = global_on_time + global_late
         global_discipline = round(global_on_time / global_total * 100, 1) if global_total else 0.0
@@ -235,22 +222,36 @@ class StrategyService:
     def get_history(self, account_id: int, year: int, month: int) -> list[dict]:
         """Return 12-month history ending at (year, month).
 
-        Backfills missing months via compute (idempotent — skips existing).
+        Backfills missing months via compute; a closed month is recomputed
+        once after it ends and frozen from then on.
         """
         months = _last_12_months(year, month)
+        snaps = {
+            (s.year, s.month): s
+            for s in self.db.query(StrategicMonthSnapshot).filter(
+                StrategicMonthSnapshot.account_id == account_id,
+                StrategicMonthSnapshot.year.in_({y for y, _ in months}),
+            )
+            if (s.year, s.month) in months
+        }
+        today = date.today()
+        # Нет снимка, либо месяц закрыт, а снимок считался до закрытия
+        stale = {
+            ym for ym in months
+            if ym not in snaps
+            or (
+                _month_range(*ym)[1] <= today
+                and not _calculated_after_close(snaps[ym].calculated_at, *ym)
+            )
+        }
+        if stale:
+            # Один grouped-запрос заполняет rollup за все эти месяцы
+            self._completion_counts(account_id, sorted(stale))
         history: list[dict] = []
 
         for y, m in months:
-            snap = (
-                self.db.query(StrategicMonthSnapshot)
-                .filter(
-                    StrategicMonthSnapshot.account_id == account_id,
-                    StrategicMonthSnapshot.year == y,
-                    StrategicMonthSnapshot.month == m,
-                )
-                .first()
-            )
-            if snap is None:
+            snap = snaps.get((y, m))
+            if (y, m) in stale:
                 self.compute(account_id, y, m)
                 snap = (
                     self.db.query(StrategicMonthSnapshot)
@@ -660,6 +661,81 @@ class StrategyService:
     # Internal
     # ------------------------------------------------------------------
 
+    def _frozen_snapshot(self, account_id: int, year: int, month: int) -> StrategicMonthSnapshot | None:
+        snap = (
+            self.db.query(StrategicMonthSnapshot)
+            .filter(
+                StrategicMonthSnapshot.account_id == account_id,
+                StrategicMonthSnapshot.year == year,
+                StrategicMonthSnapshot.month == month,
+            )
+            .first()
+        )
+        if snap is not None and _calculated_after_close(snap.calculated_at, year, month):
+            return snap
+        return None
+
+    def _completion_counts(
+        self, account_id: int, months: list[tuple[int, int]],
+    ) -> dict[tuple[int, int], tuple[int, int]]:
+        """(on_time, late) per month from task_completion_monthly.
+
+        Frozen rows are read as is; the rest (open months, months without a
+        row) are recomputed with one grouped query over tasks and upserted.
+        """
+        rows = {
+            (r.year, r.month): r
+            for r in self.db.query(TaskCompletionMonthly).filter(
+                TaskCompletionMonthly.account_id == account_id,
+                TaskCompletionMonthly.year.in_({y for y, _ in months}),
+            )
+        }
+        stale = [
+            ym for ym in months
+            if ym not in rows or not _calculated_after_close(rows[ym].calculated_at, *ym)
+        ]
+        if stale:
+            start = min(_month_range(y, m)[0] for y, m in stale)
+            end = max(_month_range(y, m)[1] for y, m in stale)
+            completed_day = sa_func.date(TaskModel.completed_at)
+            yr = extract("year", TaskModel.completed_at)
+            mo = extract("month", TaskModel.completed_at)
+            fresh = {
+                (int(r.yr), int(r.mo)): (int(r.on_time or 0), int(r.late or 0))
+                for r in (
+                    self.db.query(
+                        yr.label("yr"),
+                        mo.label("mo"),
+                        sa_func.sum(case((completed_day <= TaskModel.due_date, 1), else_=0)).label("on_time"),
+                        sa_func.sum(case((completed_day > TaskModel.due_date, 1), else_=0)).label("late"),
+                    )
+                    .filter(
+                        TaskModel.account_id == account_id,
+                        TaskModel.status == "DONE",
+                        TaskModel.completed_at.isnot(None),
+                        TaskModel.due_date.isnot(None),
+                        TaskModel.completed_at >= datetime(start.year, start.month, 1, tzinfo=timezone.utc),
+                        TaskModel.completed_at < datetime(end.year, end.month, 1, tzinfo=timezone.utc),
+                    )
+                    .group_by(yr, mo)
+                    .all()
+                )
+            }
+            now = datetime.now(timezone.utc)
+            for y, m in stale:
+                on_time, late = fresh.get((y, m), (0, 0))
+                row = rows.get((y, m))
+                if row is None:
+                    row = TaskCompletionMonthly(account_id=account_id, year=y, month=m)
+                    self.db.add(row)
+                    rows[(y, m)] = row
+                row.on_time = on_time
+                row.late = late
+                row.calculated_at = now
+            self.db.flush()
+
+        return {ym: (rows[ym].on_time, rows[ym].late) for ym in months}
+
     def _upsert_snapshot(self, data: dict[str, Any]) -> StrategicMonthSnapshot:
         snap = (
             self.db.query(StrategicMonthSnapshot)
@@ -823,6 +899,31 @@ _MONTH_NAMES_SHORT = {
 }
 
 
+def _calculated_after_close(calculated_at: datetime | None, year: int, month: int) -> bool:
+    """True if a month's row was calculated after the month ended (frozen)."""
+    if calculated_at is None:
+        return False
+    return calculated_at.date() >= _month_range(year, month)[1]
+
+
+def _snapshot_data(snap: StrategicMonthSnapshot) -> dict[str, Any]:
+    """Snapshot row → the dict compute() returns."""
+    data: dict[str, Any] = {"account_id": snap.account_id, "year": snap.year, "month": snap.month}
+    for key in (
+        "active_projects_count", "projects_overdue_total", "in_progress_total",
+    ):
+        data[key] = getattr(snap, key)
+    for key in (
+        "assets_total", "debt_total", "debt_ratio", "savings_total",
+        "income_mtd", "expense_mtd", "savings_rate",
+        "projects_avg_discipline", "global_discipline_percent", "focus_score",
+        "finance_score", "discipline_score", "project_score",
+        "life_score", "life_score_projection",
+    ):
+        data[key] = float(getattr(snap, key))
+    return data
+
+
 def _last_12_months(year: int, month: int) -> list[tuple[int, int]]:
     """Return list of (year, month) for the 12 months ending at (year, month)."""
     result = []
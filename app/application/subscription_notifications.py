@@ -16,7 +16,8 @@ from app.infrastructure.db.models import (
     SubscriptionModel, SubscriptionMemberModel, SubscriptionNotificationLog,
     ContactModel, PushSubscription, User,
 )
-from app.application.push_service import send_push_to_user
+from app.application.jobs import enqueue_delivery
+from app.infrastructure.delivery import OutboundMessage
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +27,10 @@ def check_subscription_notifications(db: Session, today: date | None = None) ->
     Check all subscriptions with notifications enabled and send push
     notifications N days before expiration.
 
-    Returns total number of push notifications sent.
+    Recipients, members and contacts are loaded in one query each; the pushes
+    of the whole run are queued together as delivery.send jobs.
+
+    Returns the number of push notifications queued.
     """
     if today is None:
         today = date.today()
@@ -41,24 +45,50 @@ def check_subscription_notifications(db: Session, today: date | None = None) ->
     if not subs:
         return 0
 
-    total_sent = 0
+    recipients = _get_push_user_ids(db, {sub.account_id for sub in subs})
+    members_by_sub: dict[int, list[SubscriptionMemberModel]] = {}
+    for member in db.query(SubscriptionMemberModel).filter(
+        SubscriptionMemberModel.subscription_id.in_([sub.id for sub in subs]),
+        SubscriptionMemberModel.is_archived == False,  # noqa: E712
+        SubscriptionMemberModel.paid_until.isnot(None),
+    ).all():
+        members_by_sub.setdefault(member.subscription_id, []).append(member)
 
+    # Preload contact names
+    contact_ids = {m.contact_id for members in members_by_sub.values() for m in members}
+    contact_map = {}
+    if contact_ids:
+        contacts = db.query(ContactModel).filter(ContactModel.id.in_(contact_ids)).all()
+        contact_map = {c.id: c for c in contacts}
+
+    messages: list[OutboundMessage] = []
     for sub in subs:
         try:
-            total_sent += _check_subscription(db, sub, today)
+            messages += _check_subscription(
+                db, sub, today, recipients, members_by_sub.get(sub.id, []), contact_map,
+            )
         except Exception:
             logger.exception("Subscription notification check failed for sub_id=%d", sub.id)
 
-    return total_sent
-
-
-def _check_subscription(db: Session, sub: SubscriptionModel, today: date) -> int:
-    """Check a single subscription for expiring coverage. Returns notifications sent."""
-    sent = 0
+    queued = enqueue_delivery(db, messages)
+    db.commit()
+    return queued
+
+
+def _check_subscription(
+    db: Session,
+    sub: SubscriptionModel,
+    today: date,
+    recipients: dict[int, list[int]],
+    members: list[SubscriptionMemberModel],
+    contact_map: dict[int, ContactModel],
+) -> list[OutboundMessage]:
+    """Check a single subscription for expiring coverage. Returns the pushes to queue."""
+    messages: list[OutboundMessage] = []
     notify_date_offset = timedelta(days=sub.notify_days_before)
 
-    # Get user_ids for push delivery (may be empty if no push subscriptions)
-    user_ids = _get_account_user_ids(db, sub.account_id)
+    # user_ids for push delivery (may be empty if no push subscriptions)
+    user_ids = recipients.get(sub.account_id, [])
 
     # Check SELF paid_until
     if sub.paid_until_self:
@@ -66,71 +96,59 @@ def _check_subscription(db: Session, sub: SubscriptionModel, today: date) -> int
         if today == trigger_date:
             if not _already_notified(db, sub.id, None, sub.paid_until_self):
                 try:
-                    # Send push if possible
-                    if user_ids:
-                        payload = {
-                            "title": "\u23f0 \u041f\u043e\u0434\u043f\u0438\u0441\u043a\u0430 \u0441\u043a\u043e\u0440\u043e \u0437\u0430\u043a\u043e\u043d\u0447\u0438\u0442\u0441\u044f",
-                            "body": f"{sub.name}\n\u041e\u043f\u043b\u0430\u0447\u0435\u043d\u043e \u0434\u043e {sub.paid_until_self.strftime('%d.%m.%Y')}",
-                            "url": f"/subscriptions/{sub.id}",
-                        }
-                        for uid in user_ids:
-                            sent += send_push_to_user(db, uid, payload)
+                    payload = {
+                        "title": "\u23f0 \u041f\u043e\u0434\u043f\u0438\u0441\u043a\u0430 \u0441\u043a\u043e\u0440\u043e \u0437\u0430\u043a\u043e\u043d\u0447\u0438\u0442\u0441\u044f",
+                        "body": f"{sub.name}\n\u041e\u043f\u043b\u0430\u0447\u0435\u043d\u043e \u0434\u043e {sub.paid_until_self.strftime('%d.%m.%Y')}",
+                        "url": f"/subscriptions/{sub.id}",
+                    }
                     # Always log to prevent duplicate checks
                     _log_notification(db, sub.id, None, sub.paid_until_self)
+                    messages += [
+                        OutboundMessage(user_id=uid, kind="SUB_MEMBER_EXPIRES_SOON", push=payload)
+                        for uid in user_ids
+                    ]
                 except Exception:
                     db.rollback()
                     logger.exception("Subscription self-notification failed for sub_id=%s", sub.id)
 
     # Check each member's paid_until
-    members = db.query(SubscriptionMemberModel).filter(
-        SubscriptionMemberModel.subscription_id == sub.id,
-        SubscriptionMemberModel.is_archived == False,  # noqa: E712
-        SubscriptionMemberModel.paid_until.isnot(None),
-    ).all()
-
-    # Preload contact names
-    contact_ids = [m.contact_id for m in members]
-    contact_map = {}
-    if contact_ids:
-        contacts = db.query(ContactModel).filter(ContactModel.id.in_(contact_ids)).all()
-        contact_map = {c.id: c for c in contacts}
-
     for member in members:
         trigger_date = member.paid_until - notify_date_offset
         if today == trigger_date:
             if not _already_notified(db, sub.id, member.id, member.paid_until):
                 try:
-                    if user_ids:
-                        contact = contact_map.get(member.contact_id)
-                        contact_name = contact.name if contact else "?"
-                        payload = {
-                            "title": "\u23f0 \u041f\u043e\u0434\u043f\u0438\u0441\u043a\u0430 \u0441\u043a\u043e\u0440\u043e \u0437\u0430\u043a\u043e\u043d\u0447\u0438\u0442\u0441\u044f",
-                            "body": f"{sub.name} ({contact_name})\n\u041e\u043f\u043b\u0430\u0447\u0435\u043d\u043e \u0434\u043e {member.paid_until.strftime('%d.%m.%Y')}",
-                            "url": f"/subscriptions/{sub.id}",
-                        }
-                        for uid in user_ids:
-                            sent += send_push_to_user(db, uid, payload)
+                    contact = contact_map.get(member.contact_id)
+                    contact_name = contact.name if contact else "?"
+                    payload = {
+                        "title": "\u23f0 \u041f\u043e\u0434\u043f\u0438\u0441\u043a\u0430 \u0441\u043a\u043e\u0440\u043e \u0437\u0430\u043a\u043e\u043d\u0447\u0438\u0442\u0441\u044f",
+                        "body": f"{sub.name} ({contact_name})\n\u041e\u043f\u043b\u0430\u0447\u0435\u043d\u043e \u0434\u043e {member.paid_until.strftime('%d.%m.%Y')}",
+                        "url": f"/subscriptions/{sub.id}",
+                    }
                     _log_notification(db, sub.id, member.id, member.paid_until)
+                    messages += [
+                        OutboundMessage(user_id=uid, kind="SUB_MEMBER_EXPIRES_SOON", push=payload)
+                        for uid in user_ids
+                    ]
                 except Exception:
                     db.rollback()
                     logger.exception("Subscription notification failed for member_id=%s", member.id)
                     continue
 
     db.commit()
-    return sent
+    return messages
 
 
-def _get_account_user_ids(db: Session, account_id: int) -> list[int]:
-    """Get user IDs for an account that have push subscriptions.
+def _get_push_user_ids(db: Session, account_ids: set[int]) -> dict[int, list[int]]:
+    """account_id → user IDs of the account that have push subscriptions.
 
     In the current single-user-per-account model, account_id == user_id.
     """
     rows = (
         db.query(distinct(PushSubscription.user_id))
-        .filter(PushSubscription.user_id == account_id)
+        .filter(PushSubscription.user_id.in_(account_ids))
         .all()
     )
-    return [r[0] for r in rows]
+    return {r[0]: [r[0]] for r in rows}
 
 
 def _already_notified(
@@ -1,9 +1,10 @@
 """Task use cases - one-off tasks"""
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
 
+from app.application.projection import project
 from app.infrastructure.eventlog.repository import EventLogRepository
-from app.infrastructure.db.models import TaskModel, EventLog
+from app.infrastructure.id_allocator import IdAllocator
+from app.infrastructure.db.models import TaskModel
 from app.domain.task import Task
 from app.readmodels.projectors.tasks import TasksProjector
 from app.readmodels.projectors.xp import XpProjector
@@ -71,18 +72,12 @@ class CreateTaskUseCase:
             event_types.append("task_reminders_changed")
 
         self.db.commit()
-        TasksProjector(self.db).run(account_id, event_types=event_types)
+        project(self.db, account_id, (TasksProjector, event_types))
 
         return task_id
 
     def _generate_id(self) -> int:
-        if self.db.bind.dialect.name == "postgresql":
-            return self.db.execute(text("SELECT nextval('task_id_seq')")).scalar()
-        # SQLite test fallback — MAX-based (no sequence support)
-        max_id = self.db.query(
-            func.max(func.cast(EventLog.payload_json['task_id'], TaskModel.task_id.type))
-        ).filter(EventLog.event_type == 'task_created').scalar() or 0
-        return max_id + 1
+        return IdAllocator(self.db).next_id("task")
 
 
 class UpdateTaskUseCase:
@@ -152,7 +147,7 @@ class UpdateTaskUseCase:
 
         if event_types:
             self.db.commit()
-            TasksProjector(self.db).run(account_id, event_types=event_types)
+            project(self.db, account_id, (TasksProjector, event_types))
 
 
 class DeleteTaskUseCase:
@@ -175,7 +170,7 @@ class DeleteTaskUseCase:
             actor_user_id=actor_user_id,
         )
         self.db.commit()
-        TasksProjector(self.db).run(account_id, event_types=["task_deleted"])
+        project(self.db, account_id, (TasksProjector, ["task_deleted"]))
 
 
 class CompleteTaskUseCase:
@@ -201,9 +196,12 @@ class CompleteTaskUseCase:
             actor_user_id=actor_user_id,
         )
         self.db.commit()
-        TasksProjector(self.db).run(account_id, event_types=["task_completed"])
-        XpProjector(self.db).run(account_id, event_types=["task_completed"])
-        ActivityProjector(self.db).run(account_id, event_types=["task_completed"])
+        project(
+            self.db, account_id,
+            (TasksProjector, ["task_completed"]),
+            (XpProjector, ["task_completed"]),
+            (ActivityProjector, ["task_completed"]),
+        )
 
 
 class ArchiveTaskUseCase:
@@ -227,7 +225,7 @@ class ArchiveTaskUseCase:
             actor_user_id=actor_user_id,
         )
         self.db.commit()
-        TasksProjector(self.db).run(account_id, event_types=["task_archived"])
+        project(self.db, account_id, (TasksProjector, ["task_archived"]))
 
 
 class UncompleteTaskUseCase:
@@ -253,4 +251,4 @@ class UncompleteTaskUseCase:
             actor_user_id=actor_user_id,
         )
         self.db.commit()
-        TasksProjector(self.db).run(account_id, event_types=["task_uncompleted"])
+        project(self.db, account_id, (TasksProjector, ["task_uncompleted"]))
@@ -6,10 +6,11 @@ from decimal import Decimal
 
 MSK = timezone(timedelta(hours=3))
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Integer
 
+from app.application.projection import project
 from app.infrastructure.eventlog.repository import EventLogRepository
-from app.infrastructure.db.models import TransactionFeed, WalletBalance, GoalInfo, GoalWalletBalance, CategoryInfo, EventLog
+from app.infrastructure.id_allocator import IdAllocator
+from app.infrastructure.db.models import TransactionFeed, WalletBalance, GoalInfo, GoalWalletBalance, CategoryInfo
 from app.domain.transaction import Transaction
 from app.domain.wallet import WALLET_TYPE_SAVINGS, WALLET_TYPE_REGULAR, WALLET_TYPE_CREDIT
 from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
@@ -34,6 +35,7 @@ class CreateTransactionUseCase:
     def __init__(self, db: Session):
         self.db = db
         self.event_repo = EventLogRepository(db)
+        self.id_allocator = IdAllocator(db)
 
     def execute_income(
         self,
@@ -429,42 +431,21 @@ class CreateTransactionUseCase:
             return {"action": "expense", "delta": abs(delta), "transaction_id": tx_id}
 
     def _generate_transaction_id(self) -> int:
-        # Лента (transactions_feed) — это read-model и может отставать от event_log
-        # (например, если проектор упал уже после коммита события). Тогда id из
-        # ленты столкнётся с уже существующим событием (ix_event_log_idempotency_key)
-        # и любое создание операции падало бы. Берём максимум и из журнала событий.
-        max_feed = self.db.query(func.max(TransactionFeed.transaction_id)).scalar() or 0
-        max_event = (
-            self.db.query(
-                func.max(cast(EventLog.payload_json["transaction_id"].astext, Integer))
-            )
-            .filter(EventLog.event_type == "transaction_created")
-            .scalar()
-        ) or 0
-        return max(int(max_feed), int(max_event)) + 1
+        # transaction_id_seq засеян максимумом и ленты, и журнала событий: лента
+        # (read-model) может отставать от event_log, и id из неё столкнулся бы
+        # с уже существующим событием (ix_event_log_idempotency_key).
+        return self.id_allocator.next_id("transaction")
 
     def _run_projectors(self, account_id: int):
         """Запустить projector'ы: балансы + лента + цели"""
         _TX_EVENTS = ["transaction_created", "transaction_updated"]
-        WalletBalancesProjector(self.db).run(
-            account_id,
-            event_types=_TX_EVENTS,
-        )
-        TransactionsFeedProjector(self.db).run(
-            account_id,
-            event_types=_TX_EVENTS,
-        )
-        GoalWalletBalancesProjector(self.db).run(
-            account_id,
-            event_types=_TX_EVENTS + ["transaction_cancelled", "wallet_created"],
-        )
-        XpProjector(self.db).run(
-            account_id,
-            event_types=["transaction_created"],
-        )
-        ActivityProjector(self.db).run(
-            account_id,
-            event_types=["transaction_created"],
+        project(
+            self.db, account_id,
+            (WalletBalancesProjector, _TX_EVENTS),
+            (TransactionsFeedProjector, _TX_EVENTS),
+            (GoalWalletBalancesProjector, _TX_EVENTS + ["transaction_cancelled", "wallet_created"]),
+            (XpProjector, ["transaction_created"]),
+            (ActivityProjector, ["transaction_created"]),
         )
 
 
@@ -546,6 +527,7 @@ class UpdateTransactionUseCase:
             "from_goal_id": tx.from_goal_id,
             "to_goal_id": tx.to_goal_id,
             "category_id": tx.category_id,
+            "occurred_at": tx.occurred_at.isoformat() if tx.occurred_at else None,
         }
 
         # Serialise amount for event payload
@@ -571,10 +553,11 @@ class UpdateTransactionUseCase:
 
     def _run_projectors(self, account_id: int):
         _TX_EVENTS = ["transaction_created", "transaction_updated"]
-        WalletBalancesProjector(self.db).run(account_id, event_types=_TX_EVENTS)
-        TransactionsFeedProjector(self.db).run(account_id, event_types=_TX_EVENTS)
-        GoalWalletBalancesProjector(self.db).run(
-            account_id, event_types=_TX_EVENTS + ["transaction_cancelled", "wallet_created"],
+        project(
+            self.db, account_id,
+            (WalletBalancesProjector, _TX_EVENTS),
+            (TransactionsFeedProjector, _TX_EVENTS),
+            (GoalWalletBalancesProjector, _TX_EVENTS + ["transaction_cancelled", "wallet_created"]),
         )
 
 
@@ -604,6 +587,7 @@ class CancelTransactionUseCase:
             "to_wallet_id": tx.to_wallet_id,
             "from_goal_id": tx.from_goal_id,
             "to_goal_id": tx.to_goal_id,
+            "occurred_at": tx.occurred_at.isoformat() if tx.occurred_at else None,
         }
 
         self.event_repo.append_event(
@@ -618,8 +602,9 @@ class CancelTransactionUseCase:
 
     def _run_projectors(self, account_id: int):
         _TX_EVENTS = ["transaction_created", "transaction_updated", "transaction_cancelled"]
-        WalletBalancesProjector(self.db).run(account_id, event_types=_TX_EVENTS)
-        TransactionsFeedProjector(self.db).run(account_id, event_types=_TX_EVENTS)
-        GoalWalletBalancesProjector(self.db).run(
-            account_id, event_types=_TX_EVENTS + ["wallet_created"],
+        project(
+            self.db, account_id,
+            (WalletBalancesProjector, _TX_EVENTS),
+            (TransactionsFeedProjector, _TX_EVENTS),
+            (GoalWalletBalancesProjector, _TX_EVENTS + ["wallet_created"]),
         )
@@ -33,6 +33,40 @@ class Settings(BaseSettings):
     # Telegram Bot (for notification delivery)
     TELEGRAM_BOT_TOKEN: str = ""
 
+    # Outbound delivery pool (push + Telegram), see app/infrastructure/delivery.py
+    DELIVERY_WORKERS: int = 8
+
+    # Sync DB work from async handlers, see app/infrastructure/db/offload.py
+    DB_THREADS: int = 10  # <= engine pool_size + max_overflow (5 + 10)
+
+    # Scheduler leases (several uvicorn workers), see app/application/scheduler_leases.py
+    SCHEDULER_LEASE_SECONDS: int = 1800  # a crashed worker holds a job at most this long
+    SCHEDULER_CATCHUP_HOURS: int = 6  # missed cron ticks younger than this run at startup
+
+    # Background job queue, see app/application/job_queue.py and app/worker.py
+    JOB_QUEUE_INPROCESS: bool = True  # drain the queue from the scheduler; False when app.worker runs
+    JOB_WORKERS: int = 2  # processes started by python -m app.worker
+    JOB_POLL_SECONDS: float = 2.0  # idle worker poll interval
+    JOB_STALE_SECONDS: int = 900  # running longer than this — worker is considered dead
+    JOB_RETENTION_DAYS: int = 7  # done/failed rows (and their idempotency keys) kept this long
+
+    # Asynchronous projection, see app/application/projection.py and app/projection_daemon.py
+    PROJECTION_ASYNC: bool = False  # True: use cases only append events, app.projection_daemon projects
+    PROJECTION_WAIT_MS: int = 500  # X-Min-Event-Id read waits this long, then projects inline
+    PROJECTION_SWEEP_SECONDS: int = 30  # daemon re-checks all accounts (missed NOTIFY, restarts)
+
+    # Projector snapshots, see app/readmodels/snapshots.py
+    PROJECTOR_SNAPSHOT_MIN_EVENTS: int = 1000  # snapshot an account once it is this far past the last one
+    PROJECTOR_SNAPSHOT_KEEP: int = 2  # newest snapshots kept per projector and account
+
+    # Dashboard response cache, see app/application/dashboard_cache.py
+    DASHBOARD_CACHE_TTL: int = 60  # seconds; 0 disables the cache
+    DASHBOARD_CACHE_SIZE: int = 2048  # L1 entries (account x block)
+    DASHBOARD_CACHE_SHARED: bool = False  # L2 tier in dashboard_block_cache (multi-worker)
+
+    # Category suggestion models in memory, see app/application/category_suggest.py
+    CATEGORY_SUGGEST_CACHE_SIZE: int = 1024  # (account x operation_type) entries
+
     # Email (SMTP stub — configure to activate)
     EMAIL_SMTP_HOST: str = ""
     EMAIL_SMTP_PORT: int = 587
@@ -55,6 +89,7 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_BASE_URL: str = "https://api.aitunnel.ru/v1/"
+    DIGEST_AI_PER_MINUTE: int = 30  # digest.ai_comment jobs are spaced to stay under this rate
     # Future-proof: Anthropic key placeholder (not used yet)
     ANTHROPIC_API_KEY: str = ""
 
@@ -13,9 +13,10 @@ Frequencies:
 """
 import json
 import calendar
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
 from datetime import date, timedelta
-from typing import Set
+from typing import Sequence, Set
 
 
 WEEKDAY_MAP = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
@@ -72,106 +73,103 @@ def _validate_rule(rule: RuleSpec, window_start: date, window_end: date) -> None
         raise ValueError("MULTI_DATE requires dates")
 
 
-def _apply_until_count(dates: list[date], rule: RuleSpec) -> list[date]:
-    out = dates
-    if rule.until_date is not None:
-        out = [d for d in out if d <= rule.until_date]
-    if rule.count is not None:
-        out = out[:rule.count]
-    return out
+def _first_period(start: date, window_start: date, period_days: int) -> int:
+    """Index of the period that contains window_start (0 if the window starts earlier)."""
+    return max(0, (window_start - start).days // period_days)
 
 
 def _daily_or_interval(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
-    out: list[date] = []
-    d = rule.start_date
-    while d <= window_end:
-        if d >= window_start:
-            out.append(d)
-        if rule.count is not None and len(out) >= rule.count:
-            break
-        if rule.until_date is not None and d >= rule.until_date:
-            break
-        d += timedelta(days=rule.interval)
-    return _apply_until_count(out, rule)
+    # Occurrence n is start + n*interval: jump straight to the first one in the window
+    step = rule.interval
+    n = -(-(window_start - rule.start_date).days // step) if window_start > rule.start_date else 0
+    end = window_end if rule.until_date is None else min(window_end, rule.until_date)
+    n_stop = (end - rule.start_date).days // step + 1 if end >= rule.start_date else 0
+    if rule.count is not None:
+        n_stop = min(n_stop, n + rule.count)
+    return [rule.start_date + timedelta(days=i * step) for i in range(n, n_stop)]
 
 
 def _weekly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
-    wd = rule.start_date.weekday()
-    monday0 = rule.start_date - timedelta(days=wd)
+    dows = sorted(rule.by_weekday or ())
+    monday0 = rule.start_date - timedelta(days=rule.start_date.weekday())
+    k = _first_period(monday0, window_start, 7 * rule.interval)
+
+    end = window_end if rule.until_date is None else min(window_end, rule.until_date)
     out: list[date] = []
-    k = 0
     while True:
         week_monday = monday0 + timedelta(days=k * 7 * rule.interval)
-        if week_monday > window_end:
+        if week_monday > end:
             break
-        for dow in rule.by_weekday or set():
+        for dow in dows:
             d = week_monday + timedelta(days=dow)
-            if d < rule.start_date:
-                continue
-            if d > window_end:
+            if d < rule.start_date or d < window_start or d > end:
                 continue
-            if d >= window_start:
-                out.append(d)
-        if rule.count is not None and len(out) >= rule.count:
-            break
+            out.append(d)
+            if rule.count is not None and len(out) >= rule.count:
+                return out
         k += 1
-    out.sort()
-    return _apply_until_count(out, rule)
+    return out
+
+
+def _month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
 
 
 def _monthly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
     by_md = rule.by_monthday or 0
+    m0 = _month_index(rule.start_date)
+
+    def day_in(m: int) -> int | None:
+        """Day of the occurrence in absolute month m (None - month skipped)."""
+        last = last_day_of_month(m // 12, m % 12 + 1)
+        if rule.monthday_clip_to_last_day:
+            return min(by_md, last)
+        return by_md if by_md <= last else None
+
+    k = max(0, (_month_index(window_start) - m0) // rule.interval)
+    end = window_end if rule.until_date is None else min(window_end, rule.until_date)
     out: list[date] = []
-    k = 0
     while True:
-        base = add_months(rule.start_date.replace(day=1), k * rule.interval)
-        last = last_day_of_month(base.year, base.month)
-        if rule.monthday_clip_to_last_day:
-            day = min(by_md, last)
-        else:
-            if by_md > last:
-                k += 1
-                continue
-            day = by_md
-        d = date(base.year, base.month, day)
-        if d < rule.start_date:
-            k += 1
+        m = m0 + k * rule.interval
+        k += 1
+        day = day_in(m)
+        if day is None:
+            if m // 12 > end.year:
+                break
+            continue
+        d = date(m // 12, m % 12 + 1, day)
+        if d < rule.start_date or d < window_start:
             continue
-        if d > window_end:
+        if d > end:
             break
-        if d >= window_start:
-            out.append(d)
+        out.append(d)
         if rule.count is not None and len(out) >= rule.count:
             break
-        if rule.until_date is not None and d >= rule.until_date:
-            break
-        k += 1
-    return _apply_until_count(out, rule)
+    return out
 
 
 def _yearly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
     by_m = rule.by_month or 1
     by_md = rule.by_monthday_for_year or 1
+
+    def occurrence(k: int) -> date:
+        y = rule.start_date.year + k * rule.interval
+        return date(y, by_m, min(by_md, last_day_of_month(y, by_m)))
+
+    k = max(0, (window_start.year - rule.start_date.year) // rule.interval)
+    end = window_end if rule.until_date is None else min(window_end, rule.until_date)
     out: list[date] = []
-    k = 0
     while True:
-        y = rule.start_date.year + k * rule.interval
-        last = last_day_of_month(y, by_m)
-        day = min(by_md, last)
-        d = date(y, by_m, day)
-        if d < rule.start_date:
-            k += 1
+        d = occurrence(k)
+        k += 1
+        if d < rule.start_date or d < window_start:
             continue
-        if d > window_end:
+        if d > end:
             break
-        if d >= window_start:
-            out.append(d)
+        out.append(d)
         if rule.count is not None and len(out) >= rule.count:
             break
-        if rule.until_date is not None and d >= rule.until_date:
-            break
-        k += 1
-    return _apply_until_count(out, rule)
+    return out
 
 
 def _multi_date(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
@@ -191,7 +189,11 @@ def generate_occurrence_dates(
     window_end: date,
 ) -> list[date]:
     """Generate occurrence dates in [window_start, window_end] (inclusive).
-    Deterministic, sorted ascending."""
+    Deterministic, sorted ascending.
+
+    Expansion seeks arithmetically to the first period that can hit the window,
+    so cost depends on the window size, not on how long ago the rule started.
+    COUNT caps the occurrences returned for the window, UNTIL is inclusive."""
     _validate_rule(rule, window_start, window_end)
 
     if rule.freq == "ONETIME":
@@ -212,6 +214,97 @@ def generate_occurrence_dates(
     raise ValueError(f"unhandled freq: {rule.freq}")
 
 
+# --- Batch expansion ---
+
+@dataclass(frozen=True)
+class OccurrenceBatch:
+    """
+    Columnar result of expand_rules: occurrences of many rules in one window.
+
+    ordinals: date.toordinal() of every occurrence, grouped by rule, ascending within a rule
+    owners: index of the owning rule in the input sequence, parallel to ordinals
+    offsets: occurrences of rule i are ordinals[offsets[i]:offsets[i + 1]]
+    errors: rule index -> validation message (such rules have no occurrences)
+    """
+    ordinals: array
+    owners: array
+    offsets: array
+    errors: dict[int, str] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def dates_for(self, i: int) -> list[date]:
+        return [date.fromordinal(o) for o in self.ordinals[self.offsets[i]:self.offsets[i + 1]]]
+
+
+def _daily_ordinals(rule: RuleSpec, lo: int, hi: int) -> range:
+    """DAILY/INTERVAL_DAYS as a range of ordinals - no date objects at all."""
+    start = rule.start_date.toordinal()
+    step = rule.interval
+    first = start + max(0, -(-(lo - start) // step)) * step
+    if rule.until_date is not None:
+        hi = min(hi, rule.until_date.toordinal())
+    if rule.count is not None:
+        hi = min(hi, first + (rule.count - 1) * step)
+    return range(first, hi + 1, step)
+
+
+def _weekly_ordinals(rule: RuleSpec, lo: int, hi: int) -> list[int]:
+    """WEEKLY without COUNT: one arithmetic progression per weekday, merged."""
+    start = rule.start_date.toordinal()
+    monday0 = start - rule.start_date.weekday()
+    step = 7 * rule.interval
+    if rule.until_date is not None:
+        hi = min(hi, rule.until_date.toordinal())
+    lo = max(lo, start)
+    out: list[int] = []
+    for dow in rule.by_weekday or ():
+        first = monday0 + dow
+        if first < lo:
+            first += -(-(lo - first) // step) * step
+        out.extend(range(first, hi + 1, step))
+    out.sort()
+    return out
+
+
+def expand_rules(
+    rules: Sequence[RuleSpec],
+    window_start: date,
+    window_end: date,
+) -> OccurrenceBatch:
+    """Expand many rules over one window into one columnar batch.
+
+    Still a Python loop over the rules: DAILY/INTERVAL_DAYS and WEEKLY without
+    COUNT produce ordinal ranges that array.extend copies without per-date
+    objects; other frequencies go through generate_occurrence_dates. An invalid
+    rule lands in `errors` instead of failing the whole batch.
+    """
+    ordinals = array("i")
+    owners = array("i")
+    offsets = array("i", [0])
+    errors: dict[int, str] = {}
+    lo, hi = window_start.toordinal(), window_end.toordinal()
+
+    for i, rule in enumerate(rules):
+        try:
+            _validate_rule(rule, window_start, window_end)
+            if rule.freq in ("DAILY", "INTERVAL_DAYS"):
+                chunk = _daily_ordinals(rule, lo, hi)
+            elif rule.freq == "WEEKLY" and rule.count is None:
+                chunk = _weekly_ordinals(rule, lo, hi)
+            else:
+                chunk = [d.toordinal() for d in generate_occurrence_dates(rule, window_start, window_end)]
+        except ValueError as e:
+            errors[i] = str(e)
+            chunk = ()
+        ordinals.extend(chunk)
+        owners.extend(array("i", [i]) * len(chunk))
+        offsets.append(len(ordinals))
+
+    return OccurrenceBatch(ordinals, owners, offsets, errors)
+
+
 # --- Helpers for converting DB rows to RuleSpec ---
 
 def parse_by_weekday(s: str | None) -> Set[int] | None:
@@ -190,6 +190,7 @@ class Transaction:
             "old_to_wallet_id": old_snapshot.get("to_wallet_id"),
             "old_from_goal_id": old_snapshot.get("from_goal_id"),
             "old_to_goal_id": old_snapshot.get("to_goal_id"),
+            "old_occurred_at": old_snapshot.get("occurred_at"),
             # Carry over operation_type and currency (not editable)
             "operation_type": old_snapshot["operation_type"],
             "currency": old_snapshot["currency"],
@@ -3,7 +3,7 @@ SQLAlchemy ORM models (domain tables + readmodels)
 """
 from decimal import Decimal
 from datetime import date as date_type, time as time_type
-from sqlalchemy import String, DateTime, Integer, SmallInteger, BigInteger, Text, TIMESTAMP, Date, Time, func, Boolean, Numeric, UniqueConstraint, Index, ForeignKey
+from sqlalchemy import String, DateTime, Integer, SmallInteger, BigInteger, Text, TIMESTAMP, Date, Time, func, text, Boolean, Numeric, UniqueConstraint, Index, ForeignKey, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 
@@ -154,6 +154,23 @@ class WalletBalance(Base):
     )
 
 
+class WalletBalanceDaily(Base):
+    """
+    Read model: end-of-day wallet balance, one row per wallet per day with movement
+    (built by WalletBalancesProjector)
+
+    day — дата операции в UTC; delta — нетто-движение за день.
+    Баланс на любую дату — последняя строка с day < даты (carry-forward).
+    """
+    __tablename__ = "wallet_balance_daily"
+
+    wallet_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date_type] = mapped_column(Date, primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    delta: Mapped[Decimal] = mapped_column(Numeric(precision=20, scale=2), nullable=False)
+    balance: Mapped[Decimal] = mapped_column(Numeric(precision=20, scale=2), nullable=False)
+
+
 class WalletFolder(Base):
     """Simple organisational folders for grouping wallets (plain CRUD, not event-sourced)."""
     __tablename__ = "wallet_folders"
@@ -244,6 +261,39 @@ class TransactionFeed(Base):
         nullable=False
     )
 
+    __table_args__ = (
+        # Keyset-пагинация ленты: WHERE account_id = ? AND (occurred_at, id) < (?, ?)
+        Index("ix_transactions_feed_account_occurred", "account_id", text("occurred_at DESC"), text("transaction_id DESC")),
+    )
+
+
+class BudgetFactCube(Base):
+    """
+    Read model: суммы ленты по бюджетному дню (TransactionsFeedProjector)
+
+    Один ряд на (аккаунт, день, тип, категория, цели, типы кошельков, валюта).
+    day — эффективная бюджетная дата: budget_month-переопределение или дата
+    occurred_at (UTC). Бюджет, матрица, отчёт и budget-stats суммируют ячейки
+    куба вместо сканов transactions_feed (см. app.readmodels.fact_cube).
+    0 / "" в ключевых колонках — «нет» (NULL не совпадает в ON CONFLICT).
+    from_wallet_type — кошелёк списания (EXPENSE / TRANSFER),
+    to_wallet_type — кошелёк зачисления (INCOME / TRANSFER).
+    """
+    __tablename__ = "budget_fact_cube"
+
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    day: Mapped[date_type] = mapped_column(Date, nullable=False, primary_key=True)
+    operation_type: Mapped[str] = mapped_column(String(20), nullable=False, primary_key=True)
+    category_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    from_goal_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    to_goal_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    from_wallet_type: Mapped[str] = mapped_column(String(20), nullable=False, primary_key=True)
+    to_wallet_type: Mapped[str] = mapped_column(String(20), nullable=False, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False, primary_key=True)
+
+    amount_sum: Mapped[Decimal] = mapped_column(Numeric(precision=20, scale=2), nullable=False)
+    tx_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
 
 # ============================================================================
 # Tasks, Habits & Planned Operations Read Models
@@ -607,6 +657,27 @@ class OperationOccurrence(Base):
     )
 
 
+class OccurrenceWatermark(Base):
+    """Materialization progress of one recurring entity (used by OccurrenceGenerator).
+
+    kind: habit | task | operation | event. rule_hash covers the recurrence rule
+    and the entity's active bounds; while it matches and materialized_until
+    covers the window, generation for the entity is a no-op.
+    """
+    __tablename__ = "occurrence_watermarks"
+
+    account_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    entity_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    rule_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    materialized_until: Mapped[date_type] = mapped_column(Date, nullable=False)
+
+    updated_at: Mapped[DateTime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
 # ============================================================================
 # Calendar Events Read Models
 # ============================================================================
@@ -726,6 +797,148 @@ class EventFilterPresetModel(Base):
     )
 
 
+class ScheduledNotification(Base):
+    """Read model: precomputed reminder fire times (maintained by app.application.reminder_index).
+
+    source: task | event | habit; entity_id - task_id / event_id / habit_id,
+    occurrence_id - event/habit occurrence (NULL for tasks).
+    trigger: 'reminder' (explicit reminder row) | 'auto' (at start time, no reminders set).
+    Dispatcher reads only rows with fire_at in its window and deletes them once due.
+    """
+    __tablename__ = "scheduled_notifications"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    source: Mapped[str] = mapped_column(String(16), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    occurrence_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    fire_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    trigger: Mapped[str] = mapped_column(String(16), nullable=False, server_default="reminder")
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_scheduled_notifications_fire_at", "fire_at"),
+        Index("ix_scheduled_notifications_entity", "source", "entity_id"),
+    )
+
+
+# ============================================================================
+# Dashboard block cache (shared tier)
+# ============================================================================
+
+class DashboardBlockCache(Base):
+    """
+    L2 dashboard response cache: one row per (account, block)
+
+    version — id последнего события event_log, влияющего на блок;
+    строка валидна только для своего day/version и в пределах TTL.
+    """
+    __tablename__ = "dashboard_block_cache"
+
+    account_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    block: Mapped[str] = mapped_column(String(32), primary_key=True)
+    day: Mapped[date_type] = mapped_column(Date, nullable=False)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    computed_at: Mapped[DateTime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+# ============================================================================
+# Scheduler job leases (multi-worker)
+# ============================================================================
+
+class SchedulerJobLease(Base):
+    """
+    Lease + run stats for one scheduler job, shared by all uvicorn workers
+
+    Тик запускает тот воркер, который атомарно захватил строку: lease_until
+    в прошлом и last_started_at старше половины периода задания.
+    """
+    __tablename__ = "scheduler_job_leases"
+
+    job_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    owner: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    lease_until: Mapped[DateTime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    last_started_at: Mapped[DateTime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    last_finished_at: Mapped[DateTime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    last_duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_status: Mapped[str | None] = mapped_column(String(16), nullable=True)  # ok | failed
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    run_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    failure_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    total_duration_ms: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+
+
+# ============================================================================
+# Background job queue
+# ============================================================================
+
+class BackgroundJob(Base):
+    """
+    Durable background job (app.application.job_queue)
+
+    status: queued → running → done | failed (попытки исчерпаны).
+    Воркеры забирают строки через FOR UPDATE SKIP LOCKED по
+    (priority DESC, run_at); при ошибке — снова queued с backoff в run_at.
+    idempotency_key — повторный enqueue с тем же ключом ничего не добавляет.
+    """
+    __tablename__ = "background_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+    priority: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default="0")
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="queued")
+    run_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    attempts: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default="5")
+    idempotency_key: Mapped[str | None] = mapped_column(String(200), nullable=True, unique=True)
+    locked_by: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    locked_at: Mapped[DateTime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    finished_at: Mapped[DateTime | None] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_background_jobs_ready", text("priority DESC"), "run_at",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index("ix_background_jobs_running", "locked_at", postgresql_where=text("status = 'running'")),
+    )
+
+
+# ============================================================================
+# Projector snapshots
+# ============================================================================
+
+class ProjectorSnapshot(Base):
+    """
+    Rows of one projector's read model for one account at a checkpoint
+
+    app.readmodels.snapshots: пересборка восстанавливает последний snapshot
+    и проигрывает только хвост event_log после last_event_id.
+    data — zlib(JSON {table: {columns, rows}}); version — snapshot_version
+    projector'а на момент снятия (другая версия не восстанавливается).
+    """
+    __tablename__ = "projector_snapshots"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    projector_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    last_event_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_projector_snapshots_lookup", "projector_name", "account_id", "last_event_id"),
+    )
+
+
 # ============================================================================
 # Event Task Templates
 # ============================================================================
@@ -1034,6 +1247,26 @@ class CategorySuggestLog(Base):
     )
 
 
+class CategorySuggestModel(Base):
+    """
+    Precomputed category-suggestion model per (account, operation_type)
+
+    payload — гистограммы сумм и приоры категорий + счётчики исправлений
+    (см. app.application.category_suggest); version растёт при каждой
+    записи и проверяется in-process LRU.
+    """
+    __tablename__ = "category_suggest_models"
+
+    account_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    operation_type: Mapped[str] = mapped_column(String(16), primary_key=True)
+    since: Mapped[date_type] = mapped_column(Date, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 class CheckModel(Base):
     """Проверка: да/нет-вопрос перед событием или на конкретную дату."""
     __tablename__ = "checks"
@@ -1551,6 +1784,27 @@ class UserActivityDaily(Base):
     )
 
 
+class AdminActivityDaily(Base):
+    """
+    Read model: activity events per account and MSK day (AdminActivityProjector)
+
+    Источник DAU/WAU/MAU, retention и счётчиков /admin вместо сканов
+    event_log. type_mask — битовая маска типов событий за день
+    (бит = индекс в projectors.admin_activity.ACTIVITY_EVENT_TYPES).
+    """
+    __tablename__ = "admin_activity_daily"
+
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    day: Mapped[date_type] = mapped_column(Date, nullable=False, primary_key=True)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    type_mask: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    last_event_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_admin_activity_daily_day", "day"),
+    )
+
+
 class ProjectModel(Base):
     """Projects — containers for tasks with board statuses."""
     __tablename__ = "projects"
@@ -1716,6 +1970,24 @@ class StrategicWeeklyReview(Base):
     )
 
 
+class TaskCompletionMonthly(Base):
+    """
+    Rollup: выполненные (DONE) задачи со сроком по месяцу выполнения
+
+    Источник глобальной дисциплины Life Score. Строку открытого месяца
+    StrategyService пересчитывает одним grouped-запросом; строка, посчитанная
+    после закрытия месяца (calculated_at >= начала следующего), заморожена.
+    """
+    __tablename__ = "task_completion_monthly"
+
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    year: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, nullable=False, primary_key=True)
+    on_time: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    late: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    calculated_at = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
 class EfficiencySettings(Base):
     """Per-user settings for Efficiency Score weights and thresholds."""
     __tablename__ = "efficiency_settings"
@@ -2223,6 +2495,38 @@ class CalDAVTokenModel(Base):
     created_at: Mapped[DateTime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
 
 
+class CalDAVSyncState(Base):
+    """
+    Per-account CalDAV change counter (getctag / sync-token)
+
+    seq растёт на 1 за транзакцию, изменившую задачи аккаунта; строка
+    блокируется на время транзакции — токены выдаются в порядке коммитов.
+    """
+    __tablename__ = "caldav_sync_state"
+
+    account_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default="0")
+
+
+class CalDAVChange(Base):
+    """
+    CalDAV change journal: last change per task (RFC 6578 sync-collection)
+
+    deleted — задача пропала из календаря (архив/удаление); строка остаётся
+    надгробием, чтобы клиент со старым токеном получил 404 по href.
+    """
+    __tablename__ = "caldav_changes"
+
+    account_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    task_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    deleted: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default="false")
+
+    __table_args__ = (
+        Index("ix_caldav_changes_account_seq", "account_id", "seq"),
+    )
+
+
 # ── Collection ────────────────────────────────────────────────────────────────
 
 class CollectionCategory(Base):
@@ -0,0 +1,38 @@
+"""
+Offload of sync SQLAlchemy work from async route handlers
+
+Сессия и драйвер синхронные: запрос в `async def` блокирует event loop,
+и один медленный REPORT от iPhone останавливает все остальные запросы
+воркера. Async-хендлеры (CalDAV, media lookup) выполняют работу с БД
+через run_db() — в пуле потоков с ограничением DB_THREADS, чтобы потоки
+не ждали свободного соединения из пула engine.
+
+    >>> user = await run_db(authenticate_caldav, request, db)
+
+Session не потокобезопасна, но использование по очереди из разных
+потоков допустимо: хендлер не трогает db, пока run_db не вернул управление.
+"""
+from functools import partial
+from typing import Callable, TypeVar
+
+import anyio
+import anyio.to_thread
+
+from app.config import get_settings
+
+T = TypeVar("T")
+
+_limiter: anyio.CapacityLimiter | None = None
+
+
+def db_limiter() -> anyio.CapacityLimiter:
+    """Process-wide limiter for DB threads (создаётся внутри event loop)."""
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(get_settings().DB_THREADS)
+    return _limiter
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run fn(*args, **kwargs) in a DB worker thread and await the result."""
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs), limiter=db_limiter())
@@ -0,0 +1,22 @@
+"""
+Dialect-aware INSERT ... ON CONFLICT helper
+
+PostgreSQL (prod) и SQLite (тесты) оба поддерживают ON CONFLICT, но
+конструкции insert() у SQLAlchemy для них разные.
+"""
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model):
+    """
+    insert() текущего диалекта с .on_conflict_do_nothing/.on_conflict_do_update
+
+    Args:
+        db: SQLAlchemy session
+        model: ORM-модель или Table
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(getattr(model, "__table__", model))
@@ -0,0 +1,290 @@
+"""
+Outbound delivery — pooled, concurrent sending of Web Push and Telegram messages.
+
+Per process:
+- one keep-alive httpx.Client (Telegram) and requests.Session (pywebpush);
+- VAPID key parsed once, decrypted credentials memoized by ciphertext;
+- a bounded thread pool (DELIVERY_WORKERS) for the network calls;
+- per-bot rate limiting under Telegram's 30 msg/s.
+
+Batch API (scheduled senders queue their batches as delivery.send jobs via
+app.application.jobs.enqueue_delivery; the worker calls enqueue_many):
+    >>> report = enqueue_many(db, [
+    ...     OutboundMessage(user_id=1, kind="task_reminder",
+    ...                     push={"title": "⏰ Задача", "body": "...", "url": "/tasks"},
+    ...                     telegram="⏰ <b>Задача</b>"),
+    ... ])
+    >>> report.push_sent
+
+Settings/subscriptions for the whole batch are loaded in three queries on the
+caller's thread (the Session is not thread-safe); worker threads only do I/O.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.infrastructure.crypto import decrypt
+from app.infrastructure.db.models import PushSubscription, TelegramSettings, UserNotificationSettings
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_RATE = 30  # messages per second per bot (Bot API limit)
+
+_lock = threading.Lock()
+_http_client: httpx.Client | None = None
+_push_session: requests.Session | None = None
+_executor: ThreadPoolExecutor | None = None
+
+
+# ── Shared clients ──
+
+def http_client() -> httpx.Client:
+    """Process-wide keep-alive client for Telegram (env TELEGRAM_PROXY honoured)."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    proxy=os.getenv("TELEGRAM_PROXY") or None,
+                    timeout=8.0,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                )
+    return _http_client
+
+
+def push_session() -> requests.Session:
+    """Process-wide requests.Session for pywebpush (connection reuse per push service)."""
+    global _push_session
+    if _push_session is None:
+        with _lock:
+            if _push_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+                session.mount("https://", adapter)
+                _push_session = session
+    return _push_session
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_settings().DELIVERY_WORKERS, thread_name_prefix="delivery",
+                )
+    return _executor
+
+
+# ── Per-process caches ──
+
+@lru_cache(maxsize=4096)
+def decrypt_cached(stored: str | None) -> str | None:
+    """decrypt() memoized by ciphertext — a changed credential has a new ciphertext."""
+    return decrypt(stored)
+
+
+@lru_cache(maxsize=1)
+def vapid_key(raw_key: str):
+    """Parsed VAPID private key (py_vapid.Vapid) for the configured PEM/base64 string."""
+    from py_vapid import Vapid
+
+    # .env may store PEM with literal \n (two chars: backslash + n) or real newlines
+    if r"\n" in raw_key:
+        raw_key = raw_key.replace(r"\n", "\n")
+    # Extract raw key from PEM if present
+    if "BEGIN" in raw_key:
+        lines = [l.strip() for l in raw_key.strip().splitlines()
+                 if l.strip() and not l.strip().startswith("-----")]
+        raw_key = "".join(lines)
+    return Vapid.from_string(private_key=raw_key)
+
+
+# ── Rate limiting ──
+
+class RateLimiter:
+    """
+    Token bucket per destination key (thread-safe)
+
+    acquire(key) blocks until the key has a free slot: at most `rate`
+    messages per `per` seconds, bursts up to `rate`.
+    """
+
+    def __init__(self, rate: int, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(key, (float(self.rate), now))
+                tokens = min(float(self.rate), tokens + (now - updated) * self.rate / self.per)
+                if tokens >= 1:
+                    self._buckets[key] = (tokens - 1, now)
+                    return
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) * self.per / self.rate
+            time.sleep(wait)
+
+
+telegram_limiter = RateLimiter(TELEGRAM_RATE)
+
+
+# ── Single sends (thread-safe, no DB access) ──
+
+def webpush_send(endpoint: str, p256dh: str, auth: str, payload: dict) -> int:
+    """
+    Send one Web Push. Returns HTTP status: 201/200 ok, 404/410 subscription gone,
+    0 on other errors or when VAPID is not configured.
+    """
+    from pywebpush import webpush, WebPushException
+
+    settings = get_settings()
+    if not settings.VAPID_PRIVATE_KEY or not settings.VAPID_PUBLIC_KEY:
+        logger.warning("VAPID keys not configured, skipping push")
+        return 0
+    try:
+        resp = webpush(
+            subscription_info={"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}},
+            data=json.dumps(payload, ensure_ascii=False),
+            vapid_private_key=vapid_key(settings.VAPID_PRIVATE_KEY),
+            vapid_claims={"sub": settings.VAPID_MAILTO},  # fresh dict: webpush mutates it
+            requests_session=push_session(),
+        )
+        return getattr(resp, "status_code", 201)
+    except WebPushException as e:
+        status_code = e.response.status_code if e.response is not None else 0
+        if status_code not in (404, 410):
+            logger.error("WebPush error (HTTP %d): %s", status_code, e)
+        return status_code if status_code in (404, 410) else 0
+    except Exception:
+        logger.warning("WebPush network failure: %s", endpoint[:60], exc_info=True)
+        return 0
+
+
+def telegram_send(bot_token: str, payload: dict) -> bool:
+    """sendMessage through the shared client under the per-bot rate limit."""
+    from app.infrastructure.telegram import tg_api
+
+    telegram_limiter.acquire(bot_token)
+    resp = tg_api(bot_token, "sendMessage", payload)
+    return resp is not None and resp.status_code == 200
+
+
+# ── Batch API ──
+
+@dataclass(frozen=True)
+class OutboundMessage:
+    """
+    One notification for one user
+
+    push: Web Push payload {"title", "body", "url"} (None - no push)
+    telegram: message text (None - no Telegram); kind selects the user's
+        per-kind Telegram preferences (see telegram.NOTIF_KINDS)
+    """
+    user_id: int
+    kind: str
+    push: dict | None = None
+    telegram: str | None = None
+    html: bool = True
+
+
+@dataclass
+class DeliveryReport:
+    push_sent: int = 0
+    telegram_sent: int = 0
+    telegram_failed: int = 0
+    expired_subscriptions: list[int] = field(default_factory=list)
+
+
+def enqueue_many(db: Session, messages: list[OutboundMessage]) -> DeliveryReport:
+    """
+    Fan a batch of messages out over the worker pool and wait for it
+
+    Expired push subscriptions (404/410) are deleted afterwards in one query.
+    """
+    from app.infrastructure.telegram import telegram_mode
+
+    report = DeliveryReport()
+    if not messages:
+        return report
+    user_ids = {m.user_id for m in messages}
+
+    subs: dict[int, list[PushSubscription]] = {}
+    if any(m.push for m in messages):
+        for sub in db.query(PushSubscription).filter(PushSubscription.user_id.in_(user_ids)).all():
+            subs.setdefault(sub.user_id, []).append(sub)
+
+    notif_settings: dict[int, UserNotificationSettings] = {}
+    bots: dict[int, tuple[str, str]] = {}
+    if any(m.telegram for m in messages):
+        notif_settings = {
+            s.user_id: s for s in db.query(UserNotificationSettings).filter(
+                UserNotificationSettings.user_id.in_(user_ids),
+            ).all()
+        }
+        for tg in db.query(TelegramSettings).filter(
+            TelegramSettings.user_id.in_(user_ids), TelegramSettings.connected == True,
+        ).all():
+            token, chat_id = decrypt_cached(tg.bot_token), decrypt_cached(tg.chat_id)
+            if token and chat_id:
+                bots[tg.user_id] = (token, chat_id)
+
+    pool = _pool()
+    push_jobs = []
+    tg_jobs = []
+    for m in messages:
+        if m.push:
+            for sub in subs.get(m.user_id, []):
+                push_jobs.append((sub.id, pool.submit(
+                    webpush_send, sub.endpoint,
+                    decrypt_cached(sub.p256dh) or sub.p256dh,
+                    decrypt_cached(sub.auth) or sub.auth,
+                    m.push,
+                )))
+        if m.telegram and m.user_id in bots:
+            send, silent = telegram_mode(notif_settings.get(m.user_id), m.kind)
+            if not send:
+                continue
+            token, chat_id = bots[m.user_id]
+            payload: dict = {"chat_id": chat_id, "text": m.telegram}
+            if m.html:
+                payload["parse_mode"] = "HTML"
+            if silent:
+                payload["disable_notification"] = True
+            tg_jobs.append((m, pool.submit(telegram_send, token, payload)))
+
+    for sub_id, fut in push_jobs:
+        status = fut.result()
+        if status in (404, 410):
+            report.expired_subscriptions.append(sub_id)
+        elif status:
+            report.push_sent += 1
+    for m, fut in tg_jobs:
+        if fut.result():
+            report.telegram_sent += 1
+        else:
+            report.telegram_failed += 1
+            logger.warning("Telegram send failed for user_id=%s kind=%s", m.user_id, m.kind)
+
+    if report.expired_subscriptions:
+        logger.info("Removing %d expired push subscription(s)", len(report.expired_subscriptions))
+        db.query(PushSubscription).filter(
+            PushSubscription.id.in_(report.expired_subscriptions),
+        ).delete(synchronize_session=False)
+        db.commit()
+    return report
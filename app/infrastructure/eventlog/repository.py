@@ -3,13 +3,45 @@ Event Log Repository - source of truth для Event Sourcing
 
 Все изменения в системе записываются как неизменяемые события.
 """
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, text
 
 from app.infrastructure.db.models import EventLog
 
+# session.info: [(account_id, event_id, event_type)] добавленных в транзакции событий
+APPENDED_EVENTS_KEY = "event_log_appended"
+
+# NOTIFY-канал для projection daemon: payload "<account_id>:<event_id>", доставка при commit
+EVENT_CHANNEL = "event_log"
+
+# Ключ advisory lock'а проекции аккаунта (второй ключ — account_id)
+_PROJECTION_LOCK = 0x50524A
+
+# Текущий HTTP-запрос: {"last_event_id": ...} для заголовка X-Event-Id
+_request_events: ContextVar[Optional[dict]] = ContextVar("event_log_request_events", default=None)
+
+
+def track_request_events() -> dict:
+    """Start collecting appended event ids for the current request (middleware)."""
+    holder: dict = {}
+    _request_events.set(holder)
+    return holder
+
+
+def lock_account(db: Session, account_id: int) -> None:
+    """
+    Serialize appends and projection of one account until commit
+
+    pg_advisory_xact_lock: пока транзакция с новым событием не закоммичена,
+    projector не прочитает события аккаунта и не сдвинет checkpoint через
+    незакоммиченный id. SQLite (тесты) — no-op.
+    """
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:k, :a)"), {"k": _PROJECTION_LOCK, "a": account_id})
+
 
 class EventLogRepository:
     """
@@ -68,9 +100,23 @@ class EventLogRepository:
             idempotency_key=idempotency_key,
         )
 
+        lock_account(self.db, account_id)
         self.db.add(event)
         self.db.flush()  # Получить ID без commit
 
+        # Версия аккаунта для кэшей чтения (dashboard_cache применяет после commit)
+        self.db.info.setdefault(APPENDED_EVENTS_KEY, []).append((account_id, event.id, event_type))
+
+        # Токен read-your-writes для ответа (X-Event-Id) и сигнал projection daemon'у
+        holder = _request_events.get()
+        if holder is not None:
+            holder["last_event_id"] = max(holder.get("last_event_id", 0), event.id)
+        if self.db.bind.dialect.name == "postgresql":
+            self.db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": EVENT_CHANNEL, "payload": f"{account_id}:{event.id}"},
+            )
+
         return event.id
 
     def get_event(self, event_id: int) -> Optional[EventLog]:
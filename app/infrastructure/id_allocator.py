@@ -0,0 +1,124 @@
+"""
+IdAllocator - выдача id агрегатов из per-aggregate PostgreSQL sequences
+
+Раньше каждый use case вычислял следующий id как
+``MAX(CAST(payload_json->>'x_id' AS INT)) + 1`` по всему event_log:
+полный скан, растущий с историей всех пользователей, и гонка при
+параллельных create. Здесь это обобщение пути ``task_id_seq``:
+
+- PostgreSQL: ``nextval('<aggregate>_id_seq')`` - атомарно и O(1);
+  sequences создаются и засеваются текущими максимумами миграцией.
+- SQLite (тесты): MAX() по тем же источникам, что засевают sequence
+  (event_log + read model), с запоминанием уже выданных id.
+
+Блочная выдача (allocate_block) нужна для массовых импортов: один
+round-trip на N id вместо N.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, func, text
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import (
+    EventLog, TaskModel, TransactionFeed, CalendarEventModel, HabitModel,
+    BudgetMonth, BudgetLine,
+)
+
+
+@dataclass(frozen=True)
+class IdSequence:
+    """
+    Описание sequence агрегата
+
+    sequence: Имя PostgreSQL sequence
+    column: PK read model (источник максимума)
+    event_type / payload_key: Событие создания и ключ id в payload
+        (None - агрегат не хранит id в event_log)
+    """
+    sequence: str
+    column: object
+    event_type: Optional[str] = None
+    payload_key: Optional[str] = None
+
+
+# Зарегистрированные агрегаты. Миграция засевает те же sequences
+# из тех же источников - держать списки синхронными.
+SEQUENCES: Dict[str, IdSequence] = {
+    "task": IdSequence("task_id_seq", TaskModel.task_id, "task_created", "task_id"),
+    "transaction": IdSequence(
+        "transaction_id_seq", TransactionFeed.transaction_id,
+        "transaction_created", "transaction_id",
+    ),
+    "calendar_event": IdSequence(
+        "calendar_event_id_seq", CalendarEventModel.event_id,
+        "calendar_event_created", "event_id",
+    ),
+    "habit": IdSequence("habit_id_seq", HabitModel.habit_id, "habit_created", "habit_id"),
+    "budget_month": IdSequence("budget_month_id_seq", BudgetMonth.id),
+    "budget_line": IdSequence("budget_line_id_seq", BudgetLine.id),
+}
+
+
+class IdAllocator:
+    """
+    Выдаёт уникальные id агрегатов
+
+    Example:
+        >>> ids = IdAllocator(db)
+        >>> tx_id = ids.next_id("transaction")
+        >>> line_ids = ids.allocate_block("budget_line", 40)
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        # SQLite fallback: последний выданный id по агрегату - чтобы повторные
+        # вызовы до flush/commit событий не возвращали один и тот же id
+        self._issued: Dict[str, int] = {}
+
+    def next_id(self, aggregate: str) -> int:
+        """
+        Следующий id агрегата
+
+        Raises:
+            KeyError: если агрегат не зарегистрирован в SEQUENCES
+        """
+        return self.allocate_block(aggregate, 1)[0]
+
+    def allocate_block(self, aggregate: str, count: int) -> List[int]:
+        """
+        Зарезервировать count id одним round-trip
+
+        На PostgreSQL id уникальны, но не обязательно подряд (параллельные
+        сессии могут чередоваться) - полагаться только на уникальность.
+
+        Returns:
+            Список из count возрастающих id
+        """
+        spec = SEQUENCES[aggregate]
+        if count <= 0:
+            return []
+
+        if self._dialect() == "postgresql":
+            rows = self.db.execute(
+                text(f"SELECT nextval('{spec.sequence}') FROM generate_series(1, :n)"),
+                {"n": count},
+            ).scalars().all()
+            return sorted(int(r) for r in rows)
+
+        start = max(self._current_max(spec), self._issued.get(aggregate, 0)) + 1
+        self._issued[aggregate] = start + count - 1
+        return list(range(start, start + count))
+
+    def _current_max(self, spec: IdSequence) -> int:
+        """MAX по read model и event_log (SQLite fallback)"""
+        max_id = self.db.query(func.max(spec.column)).scalar() or 0
+        if spec.event_type:
+            max_from_log = self.db.query(
+                func.max(func.cast(EventLog.payload_json[spec.payload_key], Integer))
+            ).filter(EventLog.event_type == spec.event_type).scalar() or 0
+            max_id = max(int(max_id), int(max_from_log))
+        return int(max_id)
+
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
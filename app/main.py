@@ -13,6 +13,7 @@ from app.config import get_settings
 from app.infrastructure.db.session import check_db_connection
 from app.api.v1 import auth, wallets, categories, transactions, pages, push, admin
 from app.api.v2 import router as v2_router
+import app.application.session_hooks  # noqa: F401 — registers the global Session hooks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -64,6 +65,19 @@ def create_app() -> FastAPI:
 
     app.add_middleware(ErrorLoggingMiddleware)
 
+    # Read-your-writes token: id последнего события, записанного запросом
+    from app.infrastructure.eventlog.repository import track_request_events
+
+    class EventIdMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            holder = track_request_events()
+            response = await call_next(request)
+            if holder.get("last_event_id"):
+                response.headers["X-Event-Id"] = str(holder["last_event_id"])
+            return response
+
+    app.add_middleware(EventIdMiddleware)
+
     # CORS — allow Next.js frontend in development (localhost:3000)
     # In production, replace with the actual frontend origin.
     from fastapi.middleware.cors import CORSMiddleware
@@ -76,6 +90,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,   # required for session cookie
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Event-Id"],
     )
 
     # Session middleware (must come after CORS)
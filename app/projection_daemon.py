@@ -0,0 +1,126 @@
+"""
+Projection daemon — python -m app.projection_daemon
+
+Applies new events to the read models outside of HTTP requests when
+PROJECTION_ASYNC=true (see app.application.projection). Listens on the
+Postgres channel event_log (NOTIFY is sent by EventLogRepository.append_event
+and delivered on commit), collects the accounts of a short burst and runs
+all projectors for each of them. Every PROJECTION_SWEEP_SECONDS it also
+looks for accounts that are behind — notifications sent while the daemon
+was down are not queued by Postgres.
+
+Several daemons may run: the per-account advisory lock taken by the
+projectors keeps them from applying the same events twice.
+
+SIGTERM/SIGINT: finishes the current account and exits.
+"""
+import logging
+import signal
+import threading
+import time
+
+import app.application.session_hooks  # noqa: F401 — registers the global Session hooks
+
+logger = logging.getLogger("app.projection_daemon")
+
+DEBOUNCE = 0.05  # seconds to gather a burst of notifications
+
+
+def project_accounts(account_ids) -> None:
+    """Catch up every account in its own session; one failing account doesn't stop the rest."""
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.projection import catch_up
+
+    Session = get_session_factory()
+    for account_id in sorted(account_ids):
+        db = Session()
+        try:
+            applied = catch_up(db, account_id)
+            if any(applied.values()):
+                logger.debug("Account %s projected: %s", account_id, applied)
+        except Exception:
+            logger.exception("Projection failed for account %s", account_id)
+            db.rollback()
+        finally:
+            db.close()
+
+
+def sweep(after_event_id: int) -> int:
+    """Project all lagging accounts; returns the new high-water event id."""
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.projection import accounts_behind, max_event_id
+
+    db = get_session_factory()()
+    try:
+        high = max_event_id(db)
+        behind = accounts_behind(db, after_event_id)
+    finally:
+        db.close()
+    if behind:
+        logger.info("Sweep: %d account(s) behind", len(behind))
+        project_accounts(behind)
+    return high
+
+
+def _sweep_logged(after_event_id: int, keep: int | None = None) -> int:
+    """sweep(), но ошибка только логируется: high-water mark остаётся прежним (keep)."""
+    try:
+        return sweep(after_event_id)
+    except Exception:
+        logger.exception("Sweep failed")
+        return after_event_id if keep is None else keep
+
+
+def run(stop: threading.Event) -> None:
+    import psycopg
+
+    from app.config import get_settings
+    from app.application.projection import parse_notify
+    from app.infrastructure.eventlog.repository import EVENT_CHANNEL
+
+    settings = get_settings()
+    # psycopg.connect нужен чистый postgresql://, а не SQLAlchemy-формат postgresql+psycopg://
+    raw_url = settings.DATABASE_URL.replace("postgresql+psycopg://", "postgresql://", 1)
+
+    # Первый обход — полный: события могли появиться, пока daemon не работал
+    high_water = 0
+    while not stop.is_set():
+        try:
+            with psycopg.connect(raw_url, autocommit=True) as conn:
+                conn.execute(f"LISTEN {EVENT_CHANNEL}")
+                logger.info("Listening on %s", EVENT_CHANNEL)
+                high_water = _sweep_logged(high_water)
+                next_sweep = time.monotonic() + settings.PROJECTION_SWEEP_SECONDS
+
+                while not stop.is_set():
+                    wait = max(min(next_sweep - time.monotonic(), 1.0), 0.0)
+                    payloads = [n.payload for n in conn.notifies(timeout=wait, stop_after=1)]
+                    if payloads:
+                        # Добираем хвост пачки, чтобы не проецировать аккаунт на каждое событие
+                        payloads += [n.payload for n in conn.notifies(timeout=DEBOUNCE)]
+                        project_accounts(parse_notify(payloads))
+                    if time.monotonic() >= next_sweep:
+                        # Старый high-water mark: запас на транзакции, закоммиченные не по порядку id
+                        high_water = _sweep_logged(max(high_water - 1000, 0), high_water)
+                        next_sweep = time.monotonic() + settings.PROJECTION_SWEEP_SECONDS
+        except psycopg.OperationalError:
+            logger.exception("Lost connection, reconnecting in 5s")
+            stop.wait(5)
+        except Exception:
+            # Любая другая ошибка не должна останавливать проекцию — перезапуск цикла
+            logger.exception("Projection loop failed, restarting in 5s")
+            stop.wait(5)
+
+    logger.info("Projection daemon stopped")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    run(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,78 @@
 """
-Admin statistics readmodel — queries event_log + users for admin panel.
+Admin statistics readmodel — queries admin_activity_daily + users for admin panel.
+
+Activity (DAU/WAU/MAU, retention, per-user counts, last seen) comes from the
+admin_activity_daily rollup maintained by AdminActivityProjector; with
+inline projection every entry point first catches up accounts whose
+checkpoint is behind (refresh_activity_rollup).
 
 All functions accept a SQLAlchemy Session and return plain dicts/lists.
 Timezone: MSK (UTC+3), consistent with the rest of the project.
 """
 from datetime import date, datetime, timedelta, timezone
 
-from sqlalchemy import func, distinct, text, case, literal_column
+from sqlalchemy import func, distinct, select
 from sqlalchemy.orm import Session
 
-from app.infrastructure.db.models import User, EventLog
+from app.config import get_settings
+from app.infrastructure.db.models import AdminActivityDaily, EventLog, ProjectorCheckpoint, User
+from app.readmodels.projectors.admin_activity import AdminActivityProjector, event_types_of
 
 MSK = timezone(timedelta(hours=3))
 
-# Event types that count as "user activity" for DAU/WAU/MAU
-_ACTIVITY_EVENT_TYPES = (
-    "transaction_created",
-    "task_created",
-    "task_completed",
-    "task_occurrence_completed",
-    "habit_occurrence_completed",
-    "calendar_event_created",
-    "wallet_created",
-    "category_created",
-    "wish_created",
-    "goal_created",
-    "budget_month_created",
-    "user_logged_in",
-)
+
+def refresh_activity_rollup(db: Session) -> int:
+    """
+    Project new events into admin_activity_daily; returns events applied
+
+    Обычно таблицу ведёт AdminActivityProjector в общем цикле проекций
+    (daemon при PROJECTION_ASYNC). Inline-проекция use case'ов его не
+    запускает, поэтому здесь догоняем аккаунты, у которых есть события
+    новее их checkpoint'а: EXISTS по event_log.id > checkpoint — короткий
+    range scan по PK, без прохода по всему журналу.
+    """
+    if get_settings().PROJECTION_ASYNC:
+        return 0
+    projector = AdminActivityProjector(db)
+    checkpoint = (
+        select(ProjectorCheckpoint.last_event_id)
+        .where(
+            ProjectorCheckpoint.projector_name == projector.projector_name,
+            ProjectorCheckpoint.account_id == User.id,
+        )
+        .scalar_subquery()
+    )
+    pending = (
+        select(EventLog.id)
+        .where(EventLog.account_id == User.id, EventLog.id > func.coalesce(checkpoint, 0))
+        .exists()
+    )
+    account_ids = db.execute(select(User.id).where(pending).order_by(User.id)).scalars().all()
+    applied = 0
+    for account_id in account_ids:
+        applied += projector.run(account_id)
+        db.commit()
+    return applied
+
+
+def _active_users(db: Session, since: date) -> int:
+    return db.query(func.count(distinct(AdminActivityDaily.account_id))).filter(
+        AdminActivityDaily.day >= since,
+    ).scalar() or 0
+
+
+def _events_per_user(db: Session, since: date, user_ids=None) -> dict:
+    q = db.query(AdminActivityDaily.account_id, func.sum(AdminActivityDaily.event_count)).filter(
+        AdminActivityDaily.day >= since,
+    )
+    if user_ids is not None:
+        q = q.filter(AdminActivityDaily.account_id.in_(user_ids))
+    return {uid: int(cnt) for uid, cnt in q.group_by(AdminActivityDaily.account_id).all()}
 
 
 def get_overview_stats(db: Session, now_msk: datetime) -> dict:
     """Aggregate stats for /admin/overview."""
+    refresh_activity_rollup(db)
     today = now_msk.date()
     d7 = today - timedelta(days=7)
     d14 = today - timedelta(days=14)
@@ -40,61 +81,34 @@ def get_overview_stats(db: Session, now_msk: datetime) -> dict:
     # ── User counts ──
     total_users = db.query(func.count(User.id)).scalar() or 0
     new_7d = db.query(func.count(User.id)).filter(
-        func.date(User.created_at) >= d7
+        User.created_at >= datetime.combine(d7, datetime.min.time(), MSK)
     ).scalar() or 0
     new_30d = db.query(func.count(User.id)).filter(
-        func.date(User.created_at) >= d30
+        User.created_at >= datetime.combine(d30, datetime.min.time(), MSK)
     ).scalar() or 0
 
-    # ── DAU / WAU / MAU (distinct users with activity events) ──
-    activity_base = db.query(
-        EventLog.account_id, func.date(EventLog.occurred_at).label("d")
-    ).filter(
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-    )
-
-    dau = db.query(func.count(distinct(EventLog.account_id))).filter(
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) == today,
-    ).scalar() or 0
-
-    wau = db.query(func.count(distinct(EventLog.account_id))).filter(
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) >= d7,
-    ).scalar() or 0
-
-    mau = db.query(func.count(distinct(EventLog.account_id))).filter(
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) >= d30,
-    ).scalar() or 0
+    # ── DAU / WAU / MAU: одна строка на активный (аккаунт, день) ──
+    dau = _active_users(db, today)
+    wau = _active_users(db, d7)
+    mau = _active_users(db, d30)
 
     # ── Retention 14d: users active on 2+ distinct days in last 14 days ──
     sub = (
-        db.query(
-            EventLog.account_id,
-            func.count(distinct(func.date(EventLog.occurred_at))).label("days_active"),
-        )
-        .filter(
-            EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-            func.date(EventLog.occurred_at) >= d14,
-        )
-        .group_by(EventLog.account_id)
+        select(AdminActivityDaily.account_id)
+        .where(AdminActivityDaily.day >= d14)
+        .group_by(AdminActivityDaily.account_id)
+        .having(func.count() >= 2)
         .subquery()
     )
-    retention_14d = db.query(func.count()).filter(sub.c.days_active >= 2).scalar() or 0
+    retention_14d = db.query(func.count()).select_from(sub).scalar() or 0
 
     # ── Top 10 active users (by event count, 30d) ──
+    total = func.sum(AdminActivityDaily.event_count)
     top_active = (
-        db.query(
-            EventLog.account_id,
-            func.count(EventLog.id).label("cnt"),
-        )
-        .filter(
-            EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-            func.date(EventLog.occurred_at) >= d30,
-        )
-        .group_by(EventLog.account_id)
-        .order_by(func.count(EventLog.id).desc())
+        db.query(AdminActivityDaily.account_id, total)
+        .filter(AdminActivityDaily.day >= d30)
+        .group_by(AdminActivityDaily.account_id)
+        .order_by(total.desc())
         .limit(10)
         .all()
     )
@@ -107,7 +121,7 @@ def get_overview_stats(db: Session, now_msk: datetime) -> dict:
         emails = {r[0]: r[1] for r in rows}
 
     top_active_list = [
-        {"user_id": uid, "email": emails.get(uid, f"#{uid}"), "events_30d": cnt}
+        {"user_id": uid, "email": emails.get(uid, f"#{uid}"), "events_30d": int(cnt)}
         for uid, cnt in top_active
     ]
 
@@ -125,6 +139,7 @@ def get_overview_stats(db: Session, now_msk: datetime) -> dict:
 
 def get_users_list(db: Session, now_msk: datetime) -> list[dict]:
     """User list with per-user activity counts for /admin/users."""
+    refresh_activity_rollup(db)
     today = now_msk.date()
     d7 = today - timedelta(days=7)
     d30 = today - timedelta(days=30)
@@ -133,45 +148,16 @@ def get_users_list(db: Session, now_msk: datetime) -> list[dict]:
     if not users:
         return []
 
-    user_ids = [u.id for u in users]
+    # Активность по всем пользователям одним запросом по rollup'у
+    act_7d = _events_per_user(db, d7)
+    act_30d = _events_per_user(db, d30)
 
-    # Activity 7d per user
-    act_7d_rows = (
-        db.query(EventLog.account_id, func.count(EventLog.id))
-        .filter(
-            EventLog.account_id.in_(user_ids),
-            EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-            func.date(EventLog.occurred_at) >= d7,
-        )
-        .group_by(EventLog.account_id)
-        .all()
-    )
-    act_7d = dict(act_7d_rows)
-
-    # Activity 30d per user
-    act_30d_rows = (
-        db.query(EventLog.account_id, func.count(EventLog.id))
-        .filter(
-            EventLog.account_id.in_(user_ids),
-            EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-            func.date(EventLog.occurred_at) >= d30,
-        )
-        .group_by(EventLog.account_id)
-        .all()
-    )
-    act_30d = dict(act_30d_rows)
-
-    # Last seen per user (max occurred_at from activity events)
-    last_seen_rows = (
-        db.query(EventLog.account_id, func.max(EventLog.occurred_at))
-        .filter(
-            EventLog.account_id.in_(user_ids),
-            EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        )
-        .group_by(EventLog.account_id)
+    # Last seen per user (latest activity event)
+    last_seen_map = dict(
+        db.query(AdminActivityDaily.account_id, func.max(AdminActivityDaily.last_event_at))
+        .group_by(AdminActivityDaily.account_id)
         .all()
     )
-    last_seen_map = dict(last_seen_rows)
 
     result = []
     for u in users:
@@ -200,48 +186,36 @@ def get_user_detail(db: Session, user_id: int, now_msk: datetime) -> dict | None
     if not user:
         return None
 
+    refresh_activity_rollup(db)
     today = now_msk.date()
     d7 = today - timedelta(days=7)
     d14 = today - timedelta(days=14)
     d30 = today - timedelta(days=30)
 
-    activity_7d = db.query(func.count(EventLog.id)).filter(
-        EventLog.account_id == user_id,
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) >= d7,
-    ).scalar() or 0
-
-    activity_30d = db.query(func.count(EventLog.id)).filter(
-        EventLog.account_id == user_id,
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) >= d30,
-    ).scalar() or 0
-
-    # Days with activity in last 14d
-    days_14d = db.query(
-        func.count(distinct(func.date(EventLog.occurred_at)))
-    ).filter(
-        EventLog.account_id == user_id,
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
-        func.date(EventLog.occurred_at) >= d14,
-    ).scalar() or 0
-
-    # Last seen
-    last_seen_event = db.query(func.max(EventLog.occurred_at)).filter(
-        EventLog.account_id == user_id,
-        EventLog.event_type.in_(_ACTIVITY_EVENT_TYPES),
+    days = (
+        db.query(AdminActivityDaily)
+        .filter(AdminActivityDaily.account_id == user_id, AdminActivityDaily.day >= d30)
+        .all()
+    )
+    last_seen_event = db.query(func.max(AdminActivityDaily.last_event_at)).filter(
+        AdminActivityDaily.account_id == user_id,
     ).scalar()
     last_seen = user.last_seen_at or last_seen_event
 
+    mask_30d = 0
+    for d in days:
+        mask_30d |= d.type_mask
+
     return {
         "user_id": user.id,
         "email": user.email,
         "is_admin": user.is_admin,
         "created_at": user.created_at,
         "last_seen": last_seen,
-        "activity_7d": activity_7d,
-        "activity_30d": activity_30d,
-        "active_days_14d": days_14d,
+        "activity_7d": sum(d.event_count for d in days if d.day >= d7),
+        "activity_30d": sum(d.event_count for d in days),
+        "active_days_14d": sum(1 for d in days if d.day >= d14),
+        "event_types_30d": event_types_of(mask_30d),
     }
 
 
@@ -0,0 +1,188 @@
+"""
+Budget fact cube — transactions_feed summed per budget day (budget_fact_cube)
+
+Maintained incrementally: every change of a feed row is recorded as the old
+row with sign −1 and the new row with sign +1, and the batch is written with
+one additive upsert (TransactionsFeedProjector; budget_month edits in the API
+go through set_budget_month). Readers sum cells instead of scanning the feed:
+
+    >>> sum_facts(db, account_id, start, end, [BudgetFactCube.category_id],
+    ...           BudgetFactCube.operation_type == "EXPENSE", periods=periods)
+
+so a multi-year matrix costs O(cells), not O(transactions).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, func, literal
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import BudgetFactCube, TransactionFeed, WalletBalance
+from app.infrastructure.db.upsert import dialect_insert
+from app.infrastructure.eventlog.repository import lock_account
+
+_UPSERT_CHUNK = 1000  # строк на INSERT (лимит параметров PostgreSQL)
+
+_KEY = (
+    "account_id", "day", "operation_type", "category_id", "from_goal_id", "to_goal_id",
+    "from_wallet_type", "to_wallet_type", "currency",
+)
+
+
+def budget_day(tx: TransactionFeed) -> date:
+    """Эффективная бюджетная дата: budget_month-переопределение или дата операции (UTC)."""
+    if tx.budget_month is not None:
+        return tx.budget_month
+    occurred = tx.occurred_at
+    if occurred.tzinfo is None:
+        return occurred.date()
+    return occurred.astimezone(timezone.utc).date()
+
+
+class FactCubeDelta:
+    """Изменения куба за батч: строки ленты со знаком ±1, запись — apply()."""
+
+    def __init__(self):
+        self._items: List[tuple] = []
+
+    def add(self, tx: TransactionFeed, sign: int) -> None:
+        """Учесть строку ленты (+1) или снять её вклад (−1) — значения берутся сейчас."""
+        from_wallet = tx.wallet_id if tx.operation_type == "EXPENSE" else tx.from_wallet_id
+        to_wallet = tx.wallet_id if tx.operation_type == "INCOME" else tx.to_wallet_id
+        self._items.append((
+            tx.account_id, budget_day(tx), tx.operation_type, tx.category_id or 0,
+            tx.from_goal_id or 0, tx.to_goal_id or 0, from_wallet, to_wallet, tx.currency,
+            Decimal(tx.amount) * sign, sign,
+        ))
+
+    def apply(self, db: Session) -> None:
+        """Одним upsert'ом прибавить накопленное к ячейкам; опустевшие ячейки удаляются."""
+        if not self._items:
+            return
+        wallet_ids = {w for item in self._items for w in (item[6], item[7]) if w}
+        wallet_types = dict(
+            db.query(WalletBalance.wallet_id, WalletBalance.wallet_type)
+            .filter(WalletBalance.wallet_id.in_(wallet_ids))
+            .all()
+        ) if wallet_ids else {}
+
+        acc: Dict[tuple, list] = defaultdict(lambda: [Decimal("0"), 0])
+        for account_id, day, op, cat, from_goal, to_goal, from_w, to_w, currency, amount, sign in self._items:
+            key = (
+                account_id, day, op, cat, from_goal, to_goal,
+                wallet_types.get(from_w, ""), wallet_types.get(to_w, ""), currency,
+            )
+            acc[key][0] += amount
+            acc[key][1] += sign
+        self._items = []
+
+        rows = [
+            {**dict(zip(_KEY, key)), "amount_sum": total, "tx_count": count}
+            for key, (total, count) in acc.items()
+            if total or count
+        ]
+        if not rows:
+            return
+        t = BudgetFactCube.__table__.c
+        db.flush()
+        for i in range(0, len(rows), _UPSERT_CHUNK):
+            stmt = dialect_insert(db, BudgetFactCube).values(rows[i:i + _UPSERT_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_KEY),
+                set_={
+                    "amount_sum": t.amount_sum + stmt.excluded.amount_sum,
+                    "tx_count": t.tx_count + stmt.excluded.tx_count,
+                },
+            )
+            db.execute(stmt)
+        db.query(BudgetFactCube).filter(
+            BudgetFactCube.account_id.in_({r["account_id"] for r in rows}),
+            BudgetFactCube.tx_count == 0,
+        ).delete(synchronize_session=False)
+
+
+def set_budget_month(db: Session, tx: TransactionFeed, budget_month: Optional[date]) -> None:
+    """
+    Сменить budget_month строки ленты и перенести её сумму в кубе (caller commits)
+
+    budget_month не event-sourced — правится прямо в read model'е, поэтому
+    куб двигаем здесь же, под блокировкой аккаунта (как projection).
+    """
+    if tx.budget_month == budget_month:
+        return
+    lock_account(db, tx.account_id)
+    delta = FactCubeDelta()
+    delta.add(tx, -1)
+    tx.budget_month = budget_month
+    delta.add(tx, +1)
+    delta.apply(db)
+
+
+def rebuild_fact_cube(db: Session, account_id: int) -> int:
+    """
+    Пересчитать куб аккаунта из текущей ленты (caller commits); returns feed rows
+
+    Ремонт для строк ленты, записанных мимо projector'а (импорт, тесты).
+    """
+    lock_account(db, account_id)
+    db.query(BudgetFactCube).filter(BudgetFactCube.account_id == account_id).delete(synchronize_session=False)
+    delta = FactCubeDelta()
+    count = 0
+    for tx in db.query(TransactionFeed).filter(TransactionFeed.account_id == account_id).yield_per(1000):
+        delta.add(tx, +1)
+        count += 1
+    delta.apply(db)
+    return count
+
+
+# ── Reading ──────────────────────────────────────────────────────────────────
+
+def _as_date(value) -> date:
+    # datetime — подкласс date: Date-колонку сравниваем только с date
+    return value.date() if isinstance(value, datetime) else value
+
+
+def period_column(periods: List[Dict]):
+    """CASE: индекс периода ({range_start, range_end, index}) для дня ячейки, −1 — вне периодов."""
+    whens = [
+        (
+            and_(BudgetFactCube.day >= _as_date(p["range_start"]), BudgetFactCube.day < _as_date(p["range_end"])),
+            literal(p["index"]),
+        )
+        for p in periods
+    ]
+    return case(*whens, else_=literal(-1)).label("period_idx")
+
+
+def sum_facts(
+    db: Session,
+    account_id: int,
+    start,
+    end,
+    group_by: Sequence[Any],
+    *filters,
+    periods: Optional[List[Dict]] = None,
+) -> list:
+    """
+    Суммы куба за [start, end) по колонкам group_by
+
+    Строки: (*group_by, [period_idx,] total); с periods — только ячейки,
+    попавшие в какой-нибудь период. category_id / goal_id без значения — 0.
+    """
+    columns = list(group_by)
+    if periods is not None:
+        columns.append(period_column(periods))
+    q = db.query(*columns, func.sum(BudgetFactCube.amount_sum).label("total")).filter(
+        BudgetFactCube.account_id == account_id,
+        BudgetFactCube.day >= _as_date(start),
+        BudgetFactCube.day < _as_date(end),
+        *filters,
+    )
+    if columns:
+        q = q.group_by(*columns)
+    rows = q.all()
+    if periods is not None:
+        rows = [r for r in rows if r.period_idx >= 0]
+    return rows
@@ -10,7 +10,11 @@ Activity weight rules (per event):
 
 day_points = 2*ops + 1*tasks + 1*habits + 5*goals
 """
+from collections import defaultdict
 from datetime import datetime, timezone, timedelta
+from typing import List
+
+from sqlalchemy import func
 
 from app.readmodels.projectors.base import BaseProjector
 from app.infrastructure.db.models import EventLog, UserActivityDaily
@@ -34,6 +38,9 @@ class ActivityProjector(BaseProjector):
     are cleared and the checkpoint is zeroed, enabling full replay.
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (UserActivityDaily,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="activity")
 
@@ -83,6 +90,48 @@ class ActivityProjector(BaseProjector):
         )
         self.db.flush()
 
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """
+        Set-based path: aggregate counter deltas per (user, day) in memory
+        and apply them with a single additive upsert for the whole batch.
+        """
+        deltas: dict[tuple, dict[str, int]] = defaultdict(
+            lambda: {"ops": 0, "tasks": 0, "habits": 0, "goals": 0}
+        )
+        for event in events:
+            counter = _COUNTER_MAP.get(event.event_type)
+            if counter is None:
+                continue
+            key = (event.account_id, self._to_msk_date(event.occurred_at))
+            deltas[key][counter] += 1
+
+        rows = [
+            {
+                "user_id": user_id,
+                "day_date": day_date,
+                "ops_count": d["ops"],
+                "tasks_count": d["tasks"],
+                "habits_count": d["habits"],
+                "goals_count": d["goals"],
+                "points": 2 * d["ops"] + d["tasks"] + d["habits"] + 5 * d["goals"],
+            }
+            for (user_id, day_date), d in deltas.items()
+        ]
+        t = UserActivityDaily.__table__.c
+        self.bulk_upsert(
+            UserActivityDaily,
+            rows,
+            index_elements=["user_id", "day_date"],
+            update=lambda excluded: {
+                "ops_count": t.ops_count + excluded.ops_count,
+                "tasks_count": t.tasks_count + excluded.tasks_count,
+                "habits_count": t.habits_count + excluded.habits_count,
+                "goals_count": t.goals_count + excluded.goals_count,
+                "points": t.points + excluded.points,
+                "updated_at": func.now(),
+            },
+        )
+
     def reset(self, account_id: int) -> None:
         """Delete all activity rows for this user and reset the checkpoint."""
         self.db.query(UserActivityDaily).filter(
@@ -0,0 +1,89 @@
+"""
+AdminActivityProjector — activity events per account and MSK day (admin_activity_daily).
+
+Rollup for /admin (app.readmodels.admin_stats): DAU/WAU/MAU, retention,
+per-user counts and last-seen are read from one small row per active
+(account, day) instead of range scans over event_log.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import func
+
+from app.readmodels.projectors.base import BaseProjector
+from app.infrastructure.db.models import AdminActivityDaily, EventLog
+
+MSK = timezone(timedelta(hours=3))
+
+# Event types that count as "user activity" for DAU/WAU/MAU.
+# Порядок = номер бита в type_mask: только дописывать в конец.
+ACTIVITY_EVENT_TYPES = (
+    "transaction_created",
+    "task_created",
+    "task_completed",
+    "task_occurrence_completed",
+    "habit_occurrence_completed",
+    "calendar_event_created",
+    "wallet_created",
+    "category_created",
+    "wish_created",
+    "goal_created",
+    "budget_month_created",
+    "user_logged_in",
+)
+_TYPE_BIT = {t: 1 << i for i, t in enumerate(ACTIVITY_EVENT_TYPES)}
+
+
+def event_types_of(mask: int) -> List[str]:
+    """Event types set in a type_mask."""
+    return [t for t in ACTIVITY_EVENT_TYPES if mask & _TYPE_BIT[t]]
+
+
+class AdminActivityProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (AdminActivityDaily,)
+
+    def __init__(self, db):
+        super().__init__(db, projector_name="admin_activity")
+
+    def handle_event(self, event: EventLog) -> None:
+        self.handle_batch([event])
+
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """Aggregate the batch per (account, day) and apply one additive upsert."""
+        acc: dict[tuple, dict] = defaultdict(lambda: {"event_count": 0, "type_mask": 0, "last_event_at": None})
+        for event in events:
+            bit = _TYPE_BIT.get(event.event_type)
+            if bit is None:
+                continue
+            occurred = event.occurred_at
+            if occurred.tzinfo is None:
+                occurred = occurred.replace(tzinfo=timezone.utc)
+            d = acc[(event.account_id, occurred.astimezone(MSK).date())]
+            d["event_count"] += 1
+            d["type_mask"] |= bit
+            if d["last_event_at"] is None or occurred > d["last_event_at"]:
+                d["last_event_at"] = occurred
+
+        rows = [{"account_id": a, "day": day, **d} for (a, day), d in acc.items()]
+        t = AdminActivityDaily.__table__.c
+        latest = self._greatest()
+        self.bulk_upsert(
+            AdminActivityDaily,
+            rows,
+            index_elements=["account_id", "day"],
+            update=lambda excluded: {
+                "event_count": t.event_count + excluded.event_count,
+                "type_mask": t.type_mask.op("|")(excluded.type_mask),
+                "last_event_at": latest(t.last_event_at, excluded.last_event_at),
+            },
+        )
+
+    def _greatest(self):
+        # GREATEST в PostgreSQL, скалярный max(a, b) в SQLite (тесты)
+        return func.greatest if self.db.bind.dialect.name == "postgresql" else func.max
+
+    def reset(self, account_id: int) -> None:
+        self.db.query(AdminActivityDaily).filter(AdminActivityDaily.account_id == account_id).delete()
+        super().reset(account_id)
@@ -3,13 +3,20 @@ Base Projector - базовый класс для всех projectors (CQRS read
 
 Projectors строят read models из событий event log.
 Используют checkpoint для идемпотентности и инкрементальных обновлений.
+
+Батч-режим: run() передаёт projector'у целый батч событий (handle_batch).
+По умолчанию это цикл по handle_event; projectors с тяжёлыми lookup'ами
+переопределяют handle_batch: предзагружают все затронутые строки read model
+одним IN-запросом, применяют события в памяти и пишут результат разом.
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models import EventLog
-from app.infrastructure.eventlog.repository import EventLogRepository
+from app.infrastructure.db.upsert import dialect_insert
+from app.infrastructure.eventlog.repository import EventLogRepository, lock_account
 
 
 class BaseProjector(ABC):
@@ -25,6 +32,19 @@ class BaseProjector(ABC):
     Source: Извлечено из OLD/apps/projector/*.py
     """
 
+    # ORM-модели read model'а, которые очищает reset(); пусто — reset() не
+    # переопределён и полная пересборка projector'а небезопасна
+    read_models: tuple = ()
+
+    # Строки read model'а пишутся и в обход event log (прямые правки из API):
+    # пересборка и восстановление snapshot'а откатили бы эти правки, поэтому
+    # rebuild берёт такой projector только явно с --force, snapshots не снимаются
+    direct_writes: bool = False
+
+    # Версия логики handle_event для snapshot'ов (app.readmodels.snapshots):
+    # увеличить при исправлении projector'а — старые snapshots не восстанавливаются
+    snapshot_version: int = 1
+
     def __init__(self, db: Session, projector_name: str):
         """
         Args:
@@ -52,6 +72,98 @@ class BaseProjector(ABC):
         """
         pass
 
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """
+        Обработать батч событий (по возрастанию id)
+
+        Реализация по умолчанию - per-event fallback через handle_event.
+        Подклассы переопределяют метод для set-based обработки: одна
+        предзагрузка строк read model на батч вместо query().first() и
+        flush() на каждое событие.
+
+        Args:
+            events: События батча, отсортированные по id (ASC)
+        """
+        for event in events:
+            self.handle_event(event)
+
+    def preload(self, model, key_column, keys: Iterable[Any]) -> Dict[Any, Any]:
+        """
+        Загрузить строки read model одним запросом ``WHERE key IN (...)``
+
+        Args:
+            model: ORM-модель read model
+            key_column: Колонка-ключ (например, WalletBalance.wallet_id)
+            keys: Значения ключа (None игнорируются)
+
+        Returns:
+            Словарь {key: row}
+        """
+        keys = {k for k in keys if k is not None}
+        if not keys:
+            return {}
+        # Flush чтобы увидеть объекты, добавленные в этой же транзакции
+        self.db.flush()
+        rows = self.db.query(model).filter(key_column.in_(keys)).all()
+        return {getattr(row, key_column.key): row for row in rows}
+
+    def bulk_insert(self, model, objects: List[Any]) -> None:
+        """
+        Вставить новые строки read model одним executemany-INSERT'ом
+
+        ORM-flush вставляет строки с server_default по одной (нужен RETURNING),
+        поэтому в батч-режиме новые строки собираются как transient-объекты
+        (без db.add) и пишутся здесь разом.
+
+        Args:
+            model: ORM-модель read model
+            objects: Transient ORM-объекты этой модели
+
+        Note:
+            Колонки, не заполненные ни в одном объекте, опускаются - для них
+            срабатывают default/server_default.
+        """
+        if not objects:
+            return
+        columns = [
+            c.key for c in model.__table__.columns
+            if any(getattr(o, c.key) is not None for o in objects)
+        ]
+        rows = [{key: getattr(o, key) for key in columns} for o in objects]
+        self.db.flush()
+        self.db.execute(insert(model.__table__), rows)
+
+    def bulk_upsert(
+        self,
+        model,
+        rows: List[Dict[str, Any]],
+        index_elements: List[str],
+        update: Callable[[Any], Dict[str, Any]],
+    ) -> None:
+        """
+        Записать строки одним ``INSERT ... ON CONFLICT DO UPDATE``
+
+        Args:
+            model: ORM-модель read model
+            rows: Значения для вставки
+            index_elements: Колонки уникального ключа (conflict target)
+            update: Функция ``excluded -> {column: expression}`` для
+                    DO UPDATE SET (excluded - вставляемая строка)
+
+        Note:
+            Поддерживаются PostgreSQL и SQLite (тесты) - оба диалекта
+            понимают ON CONFLICT.
+        """
+        if not rows:
+            return
+        stmt = dialect_insert(self.db, model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements, set_=update(stmt.excluded)
+        )
+        # Flush чтобы ORM-изменения не перетёрли результат upsert'а позже
+        self.db.flush()
+        self.db.execute(stmt)
+
     def get_checkpoint(self, account_id: int) -> int:
         """
         Получить текущий checkpoint (last processed event_id) из БД
@@ -103,7 +215,8 @@ class BaseProjector(ABC):
         self,
         account_id: int,
         event_types: Optional[List[str]] = None,
-        batch_size: int = 200
+        batch_size: int = 200,
+        batch: bool = True,
     ) -> int:
         """
         Запустить projector - обработать все новые события
@@ -112,6 +225,8 @@ class BaseProjector(ABC):
             account_id: ID аккаунта
             event_types: Фильтр по типам событий (если None - все события)
             batch_size: Размер батча для обработки (default: 200)
+            batch: True - обрабатывать батч через handle_batch,
+                   False - принудительный per-event путь (handle_event)
 
         Returns:
             Количество обработанных событий
@@ -126,10 +241,14 @@ class BaseProjector(ABC):
         want those changes committed as part of this run(). Do not call inside
         an enclosing transaction you plan to roll back.
         """
-        checkpoint = self.get_checkpoint(account_id)
         processed_count = 0
 
         while True:
+            # Checkpoint перечитывается под блокировкой аккаунта: его мог
+            # сдвинуть projection daemon или другой запрос
+            lock_account(self.db, account_id)
+            checkpoint = self.get_checkpoint(account_id)
+
             # Читаем батч событий после checkpoint
             events = self.event_repo.list_events_since(
                 account_id=account_id,
@@ -141,11 +260,9 @@ class BaseProjector(ABC):
             if not events:
                 break  # Нет новых событий
 
-            # Обрабатываем каждое событие
-            for event in events:
-                self.handle_event(event)
-                checkpoint = event.id
-                processed_count += 1
+            self._apply(events, batch)
+            checkpoint = events[-1].id
+            processed_count += len(events)
 
             # Сохраняем checkpoint после батча
             self.save_checkpoint(account_id, checkpoint)
@@ -157,6 +274,26 @@ class BaseProjector(ABC):
 
         return processed_count
 
+    def _apply(self, events: List[EventLog], batch: bool) -> None:
+        """Применить события батча (set-based или per-event)"""
+        if batch:
+            self.handle_batch(events)
+        else:
+            for event in events:
+                self.handle_event(event)
+
+    def read_model_filter(self, model, account_id: int):
+        """
+        WHERE для строк read model'а аккаунта (snapshot, сверка при rebuild)
+
+        По умолчанию — колонка account_id / user_id. Projectors с общими
+        таблицами или строками без account_id переопределяют.
+        """
+        for name in ("account_id", "user_id"):
+            if name in model.__table__.c:
+                return model.__table__.c[name] == account_id
+        raise ValueError(f"{model.__tablename__}: no account column, override read_model_filter")
+
     def reset(self, account_id: int) -> None:
         """
         Сбросить projector - удалить read model и checkpoint
@@ -194,12 +331,27 @@ class ProjectorOrchestrator:
         """
         self.projectors.append(projector)
 
-    def run_all(self, account_id: int) -> dict[str, int]:
+    def run_all(
+        self,
+        account_id: int,
+        batch_size: int = 200,
+        batch: bool = True,
+    ) -> dict[str, int]:
         """
         Запустить все зарегистрированные projectors
 
+        События читаются из event_log один раз на батч (начиная с минимального
+        checkpoint среди projectors) и раздаются всем projectors по порядку
+        регистрации. Каждый projector получает только события после своего
+        checkpoint. Checkpoints сохраняются и коммитятся один раз на батч,
+        так что полная пересборка стоит O(батчей) round-trips, а не O(событий).
+        В начале батча берётся блокировка аккаунта (lock_account) и checkpoints
+        перечитываются — параллельно с projection daemon'ом безопасно.
+
         Args:
             account_id: ID аккаунта
+            batch_size: Размер батча (default: 200)
+            batch: False - per-event путь для всех projectors
 
         Returns:
             Словарь {projector_name: processed_count}
@@ -212,10 +364,36 @@ class ProjectorOrchestrator:
             >>> print(results)
             {'wallet_balances': 150, 'budget_fact': 80}
         """
-        results = {}
+        results = {p.projector_name: 0 for p in self.projectors}
+        if not self.projectors:
+            return results
 
-        for projector in self.projectors:
-            count = projector.run(account_id)
-            results[projector.projector_name] = count
+        event_repo = self.projectors[0].event_repo
+
+        while True:
+            lock_account(self.db, account_id)
+            checkpoints = [p.get_checkpoint(account_id) for p in self.projectors]
+            cursor = min(checkpoints)
+            events = event_repo.list_events_since(
+                account_id=account_id,
+                after_id=cursor,
+                limit=batch_size,
+            )
+            if not events:
+                break
+
+            for i, projector in enumerate(self.projectors):
+                pending = [e for e in events if e.id > checkpoints[i]]
+                if not pending:
+                    continue
+                projector._apply(pending, batch)
+                checkpoints[i] = pending[-1].id
+                results[projector.projector_name] += len(pending)
+                projector.save_checkpoint(account_id, checkpoints[i])
+
+            self.db.commit()
+
+            if len(events) < batch_size:
+                break
 
         return results
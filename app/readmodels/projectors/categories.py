@@ -19,6 +19,9 @@ class CategoriesProjector(BaseProjector):
     - category_deleted: удалить категорию
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (CategoryInfo,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="categories")
 
@@ -25,6 +25,9 @@ class GoalWalletBalancesProjector(BaseProjector):
       в системную цель 'Без цели'
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (GoalWalletBalance,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="goal_wallet_balances")
 
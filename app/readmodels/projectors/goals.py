@@ -18,6 +18,9 @@ class GoalsProjector(BaseProjector):
     - goal_archived: пометить цель как архивированную
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (GoalInfo,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="goals")
 
@@ -1,9 +1,11 @@
 """HabitsProjector - builds habits read model from events, including streak calculation.
 Ported from FinLife OS apps/projector/habits.py."""
 from datetime import date, datetime, time, timedelta
+from typing import List
+from sqlalchemy import and_
 from app.readmodels.projectors.base import BaseProjector
 from app.infrastructure.db.models import (
-    HabitModel, HabitOccurrence, RecurrenceRuleModel, EventLog
+    HabitModel, HabitOccurrence, RecurrenceRuleModel, OccurrenceWatermark, EventLog
 )
 
 STREAK_LOOKBACK_DAYS = 365
@@ -11,8 +13,45 @@ MAX_OCCURRENCES_FOR_STREAK = 500
 
 
 class HabitsProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (HabitModel, HabitOccurrence, OccurrenceWatermark)
+
     def __init__(self, db):
         super().__init__(db, projector_name="habits")
+        # Batch mode: prefetched rows and habits whose streaks need recomputing
+        self._habits: dict[int, HabitModel] | None = None
+        self._occurrences: dict[int, HabitOccurrence] | None = None
+        self._dirty_habits: set[int] | None = None
+
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """Prefetch habits/occurrences once; recompute streaks once per habit."""
+        self._habits = self.preload(
+            HabitModel, HabitModel.habit_id,
+            (e.payload_json.get("habit_id") for e in events if e.event_type.startswith("habit_")),
+        )
+        self._occurrences = self.preload(
+            HabitOccurrence, HabitOccurrence.id,
+            (e.payload_json.get("occurrence_id") for e in events if e.event_type.startswith("habit_occurrence_")),
+        )
+        self._dirty_habits = set()
+        try:
+            for event in events:
+                self.handle_event(event)
+            self.db.flush()
+            for habit_id in sorted(self._dirty_habits):
+                self._refresh_streaks(self._habits.get(habit_id))
+        finally:
+            self._habits = self._occurrences = self._dirty_habits = None
+
+    def _get_habit(self, habit_id: int) -> HabitModel | None:
+        if self._habits is not None:
+            return self._habits.get(habit_id)
+        return self.db.query(HabitModel).filter(HabitModel.habit_id == habit_id).first()
+
+    def _get_occurrence(self, occurrence_id: int) -> HabitOccurrence | None:
+        if self._occurrences is not None:
+            return self._occurrences.get(occurrence_id)
+        return self.db.query(HabitOccurrence).filter(HabitOccurrence.id == occurrence_id).first()
 
     def handle_event(self, event: EventLog) -> None:
         if event.event_type == "habit_created":
@@ -30,11 +69,9 @@ class HabitsProjector(BaseProjector):
 
     def _handle_created(self, event: EventLog) -> None:
         payload = event.payload_json
-        self.db.flush()
-        existing = self.db.query(HabitModel).filter(
-            HabitModel.habit_id == payload["habit_id"]
-        ).first()
-        if existing:
+        if self._habits is None:
+            self.db.flush()
+        if self._get_habit(payload["habit_id"]):
             return
         rt = payload.get("reminder_time")
         habit = HabitModel(
@@ -57,13 +94,14 @@ class HabitsProjector(BaseProjector):
             unit_label=payload.get("unit_label"),
         )
         self.db.add(habit)
-        self.db.flush()
+        if self._habits is not None:
+            self._habits[habit.habit_id] = habit
+        else:
+            self.db.flush()
 
     def _handle_updated(self, event: EventLog) -> None:
         payload = event.payload_json
-        habit = self.db.query(HabitModel).filter(
-            HabitModel.habit_id == payload["habit_id"]
-        ).first()
+        habit = self._get_habit(payload["habit_id"])
         if not habit:
             return
         if "title" in payload:
@@ -84,17 +122,13 @@ class HabitsProjector(BaseProjector):
 
     def _handle_archived(self, event: EventLog) -> None:
         payload = event.payload_json
-        habit = self.db.query(HabitModel).filter(
-            HabitModel.habit_id == payload["habit_id"]
-        ).first()
+        habit = self._get_habit(payload["habit_id"])
         if habit:
             habit.is_archived = True
 
     def _handle_unarchived(self, event: EventLog) -> None:
         payload = event.payload_json
-        habit = self.db.query(HabitModel).filter(
-            HabitModel.habit_id == payload["habit_id"]
-        ).first()
+        habit = self._get_habit(payload["habit_id"])
         if habit:
             habit.is_archived = False
 
@@ -109,28 +143,12 @@ class HabitsProjector(BaseProjector):
         elif status == "DONE":
             completed_at = datetime.utcnow()
 
-        occ = self.db.query(HabitOccurrence).filter(
-            HabitOccurrence.id == occurrence_id
-        ).first()
+        occ = self._get_occurrence(occurrence_id)
         if occ:
             occ.status = status
             occ.completed_at = completed_at if status == "DONE" else None
 
-        # Recompute streaks
-        habit_id = payload["habit_id"]
-        habit = self.db.query(HabitModel).filter(
-            HabitModel.habit_id == habit_id
-        ).first()
-        if habit:
-            today = date.today()
-            cs, bs, d30 = self._compute_streaks(habit.account_id, habit_id, habit.rule_id, today)
-            habit.current_streak = cs
-            habit.best_streak = bs
-            habit.done_count_30d = d30
-
-            # Emit milestone events if streak crossed thresholds
-            from app.application.habits import check_and_emit_milestones
-            check_and_emit_milestones(self.db, habit.account_id, habit_id, cs)
+        self._streaks_changed(payload["habit_id"])
 
     def _handle_count_changed(self, event: EventLog) -> None:
         payload = event.payload_json
@@ -138,7 +156,7 @@ class HabitsProjector(BaseProjector):
         new_count = payload["completion_count"]
         new_status = payload["status"]
 
-        occ = self.db.query(HabitOccurrence).filter(HabitOccurrence.id == occurrence_id).first()
+        occ = self._get_occurrence(occurrence_id)
         if occ:
             occ.completion_count = new_count
             occ.status = new_status
@@ -148,17 +166,27 @@ class HabitsProjector(BaseProjector):
             elif new_status == "ACTIVE":
                 occ.completed_at = None
 
-        habit_id = payload["habit_id"]
-        habit = self.db.query(HabitModel).filter(HabitModel.habit_id == habit_id).first()
-        if habit:
-            today = date.today()
-            cs, bs, d30 = self._compute_streaks(habit.account_id, habit_id, habit.rule_id, today)
-            habit.current_streak = cs
-            habit.best_streak = bs
-            habit.done_count_30d = d30
+        self._streaks_changed(payload["habit_id"])
+
+    def _streaks_changed(self, habit_id: int) -> None:
+        """Recompute streaks now, or once at the end of the batch in batch mode."""
+        if self._dirty_habits is not None:
+            self._dirty_habits.add(habit_id)
+            return
+        self._refresh_streaks(self._get_habit(habit_id))
 
-            from app.application.habits import check_and_emit_milestones
-            check_and_emit_milestones(self.db, habit.account_id, habit_id, cs)
+    def _refresh_streaks(self, habit: HabitModel | None) -> None:
+        if not habit:
+            return
+        today = date.today()
+        cs, bs, d30 = self._compute_streaks(habit.account_id, habit.habit_id, habit.rule_id, today)
+        habit.current_streak = cs
+        habit.best_streak = bs
+        habit.done_count_30d = d30
+
+        # Emit milestone events if streak crossed thresholds
+        from app.application.habits import check_and_emit_milestones
+        check_and_emit_milestones(self.db, habit.account_id, habit.habit_id, cs)
 
     def _compute_streaks(self, account_id: int, habit_id: int, rule_id: int, today: date) -> tuple[int, int, int]:
         """Compute (current_streak, best_streak, done_count_30d)."""
@@ -247,7 +275,15 @@ class HabitsProjector(BaseProjector):
 
         return cur, best, done_count_30d
 
+    def read_model_filter(self, model, account_id: int):
+        if model is OccurrenceWatermark:
+            return and_(OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "habit")
+        return super().read_model_filter(model, account_id)
+
     def reset(self, account_id: int) -> None:
         self.db.query(HabitOccurrence).filter(HabitOccurrence.account_id == account_id).delete()
+        self.db.query(OccurrenceWatermark).filter(
+            OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "habit"
+        ).delete()
         self.db.query(HabitModel).filter(HabitModel.account_id == account_id).delete()
         super().reset(account_id)
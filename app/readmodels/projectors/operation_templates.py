@@ -1,11 +1,15 @@
 """OperationTemplatesProjector - builds operation_templates read model from events"""
 from datetime import date, datetime
 from decimal import Decimal
+from sqlalchemy import and_
 from app.readmodels.projectors.base import BaseProjector
-from app.infrastructure.db.models import OperationTemplateModel, OperationOccurrence, EventLog
+from app.infrastructure.db.models import OperationTemplateModel, OperationOccurrence, OccurrenceWatermark, EventLog
 
 
 class OperationTemplatesProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (OperationTemplateModel, OperationOccurrence, OccurrenceWatermark)
+
     def __init__(self, db):
         super().__init__(db, projector_name="operation_templates")
 
@@ -104,7 +108,15 @@ class OperationTemplatesProjector(BaseProjector):
                 occ.completed_at = None
                 occ.transaction_id = None
 
+    def read_model_filter(self, model, account_id: int):
+        if model is OccurrenceWatermark:
+            return and_(OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "operation")
+        return super().read_model_filter(model, account_id)
+
     def reset(self, account_id: int) -> None:
         self.db.query(OperationOccurrence).filter(OperationOccurrence.account_id == account_id).delete()
+        self.db.query(OccurrenceWatermark).filter(
+            OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "operation"
+        ).delete()
         self.db.query(OperationTemplateModel).filter(OperationTemplateModel.account_id == account_id).delete()
         super().reset(account_id)
@@ -5,6 +5,9 @@ from app.infrastructure.db.models import RecurrenceRuleModel, EventLog
 
 
 class RecurrenceRulesProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (RecurrenceRuleModel,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="recurrence_rules")
 
@@ -0,0 +1,72 @@
+"""
+Registry of all projectors in dependency order.
+
+Used wherever every read model of an account has to be brought up to date
+at once (projection daemon, read-your-writes catch-up).
+"""
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.readmodels.projectors.base import BaseProjector, ProjectorOrchestrator
+from app.readmodels.projectors.categories import CategoriesProjector
+from app.readmodels.projectors.work_categories import WorkCategoriesProjector
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+from app.readmodels.projectors.transactions_feed import TransactionsFeedProjector
+from app.readmodels.projectors.goals import GoalsProjector
+from app.readmodels.projectors.goal_wallet_balances import GoalWalletBalancesProjector
+from app.readmodels.projectors.budget import BudgetProjector
+from app.readmodels.projectors.recurrence_rules import RecurrenceRulesProjector
+from app.readmodels.projectors.operation_templates import OperationTemplatesProjector
+from app.readmodels.projectors.task_templates import TaskTemplatesProjector
+from app.readmodels.projectors.tasks import TasksProjector
+from app.readmodels.projectors.habits import HabitsProjector
+from app.readmodels.projectors.events import EventsProjector
+from app.readmodels.projectors.wishes import WishesProjector
+from app.readmodels.projectors.xp import XpProjector
+from app.readmodels.projectors.activity import ActivityProjector
+from app.readmodels.projectors.admin_activity import AdminActivityProjector
+
+# Порядок = порядок применения: справочники → деньги → задачи → XP/активность
+PROJECTORS: List[type] = [
+    CategoriesProjector,
+    WorkCategoriesProjector,
+    WalletBalancesProjector,
+    TransactionsFeedProjector,
+    GoalsProjector,
+    GoalWalletBalancesProjector,
+    BudgetProjector,
+    RecurrenceRulesProjector,
+    OperationTemplatesProjector,
+    TaskTemplatesProjector,
+    TasksProjector,
+    HabitsProjector,
+    EventsProjector,
+    WishesProjector,
+    XpProjector,
+    ActivityProjector,
+    AdminActivityProjector,
+]
+
+
+def all_projectors(db: Session, names: Optional[List[str]] = None) -> List[BaseProjector]:
+    """Instances of all (or the named) projectors, in registry order."""
+    projectors = [cls(db) for cls in PROJECTORS]
+    if names is not None:
+        unknown = set(names) - {p.projector_name for p in projectors}
+        if unknown:
+            raise ValueError(f"Unknown projectors: {', '.join(sorted(unknown))}")
+        projectors = [p for p in projectors if p.projector_name in names]
+    return projectors
+
+
+def projector_names() -> List[str]:
+    return [p.projector_name for p in all_projectors(None)]
+
+
+def build_orchestrator(db: Session, names: Optional[List[str]] = None) -> ProjectorOrchestrator:
+    """ProjectorOrchestrator with all (or the named) projectors registered."""
+    orchestrator = ProjectorOrchestrator(db)
+    for projector in all_projectors(db, names):
+        orchestrator.register(projector)
+    return orchestrator
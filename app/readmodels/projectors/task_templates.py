@@ -1,10 +1,14 @@
 """TaskTemplatesProjector - builds task_templates read model from events"""
 from datetime import date, datetime
+from sqlalchemy import and_
 from app.readmodels.projectors.base import BaseProjector
-from app.infrastructure.db.models import TaskTemplateModel, TaskOccurrence, EventLog
+from app.infrastructure.db.models import TaskTemplateModel, TaskOccurrence, OccurrenceWatermark, EventLog
 
 
 class TaskTemplatesProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (TaskTemplateModel, TaskOccurrence, OccurrenceWatermark)
+
     def __init__(self, db):
         super().__init__(db, projector_name="task_templates")
 
@@ -79,7 +83,15 @@ class TaskTemplatesProjector(BaseProjector):
             elif payload["status"] != "DONE":
                 occ.completed_at = None
 
+    def read_model_filter(self, model, account_id: int):
+        if model is OccurrenceWatermark:
+            return and_(OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "task")
+        return super().read_model_filter(model, account_id)
+
     def reset(self, account_id: int) -> None:
         self.db.query(TaskOccurrence).filter(TaskOccurrence.account_id == account_id).delete()
+        self.db.query(OccurrenceWatermark).filter(
+            OccurrenceWatermark.account_id == account_id, OccurrenceWatermark.kind == "task"
+        ).delete()
         self.db.query(TaskTemplateModel).filter(TaskTemplateModel.account_id == account_id).delete()
         super().reset(account_id)
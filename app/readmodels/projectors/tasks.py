@@ -1,13 +1,33 @@
 """TasksProjector - builds tasks read model from events"""
 from datetime import date, time, datetime
+from collections import defaultdict
 from decimal import Decimal
+from typing import List
+
+from sqlalchemy import select
+
+from app.application import caldav_sync
 from app.readmodels.projectors.base import BaseProjector
 from app.infrastructure.db.models import TaskModel, TaskReminderModel, EventLog
 
 
 class TasksProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (TaskModel, TaskReminderModel)
+    # update_task (api/v2/tasks), CalDAV PUT/DELETE и перенос по доске проекта
+    # меняют tasks напрямую, без событий
+    direct_writes = True
+
     def __init__(self, db):
         super().__init__(db, projector_name="tasks")
+        # account_id -> task_id, изменённые в текущем _apply (для CalDAV sync)
+        self._touched: dict[int, set[int]] = defaultdict(set)
+
+    def _apply(self, events: List[EventLog], batch: bool) -> None:
+        super()._apply(events, batch)
+        touched, self._touched = self._touched, defaultdict(set)
+        for account_id, task_ids in touched.items():
+            caldav_sync.record_changes(self.db, account_id, task_ids)
 
     def handle_event(self, event: EventLog) -> None:
         handlers = {
@@ -22,6 +42,7 @@ class TasksProjector(BaseProjector):
         handler = handlers.get(event.event_type)
         if handler:
             handler(event)
+            self._touched[event.account_id].add(event.payload_json["task_id"])
 
     def _handle_created(self, event: EventLog) -> None:
         payload = event.payload_json
@@ -129,6 +150,13 @@ class TasksProjector(BaseProjector):
             task.status = "ARCHIVED"
             task.archived_at = datetime.fromisoformat(payload["archived_at"])
 
+    def read_model_filter(self, model, account_id: int):
+        if model is TaskReminderModel:
+            return TaskReminderModel.task_id.in_(
+                select(TaskModel.task_id).where(TaskModel.account_id == account_id)
+            )
+        return super().read_model_filter(model, account_id)
+
     def reset(self, account_id: int) -> None:
         task_ids = [
             t.task_id for t in
@@ -3,9 +3,12 @@ TransactionsFeedProjector - builds transactions_feed read model from events
 """
 from decimal import Decimal
 from datetime import datetime
+from typing import List
 
+from app.application import category_suggest
+from app.readmodels.fact_cube import FactCubeDelta
 from app.readmodels.projectors.base import BaseProjector
-from app.infrastructure.db.models import TransactionFeed, EventLog
+from app.infrastructure.db.models import BudgetFactCube, TransactionFeed, EventLog
 
 
 class TransactionsFeedProjector(BaseProjector):
@@ -14,10 +17,61 @@ class TransactionsFeedProjector(BaseProjector):
 
     Обрабатывает события:
     - transaction_created: добавить транзакцию в ленту
+
+    Заодно ведёт модели подсказки категорий (category_suggest): новые строки
+    добавляются в модель, правка/отмена сбрасывает модель (ленивая пересборка).
+
+    И куб фактов бюджета (budget_fact_cube): создание +1, правка −старая/+новая
+    строка, отмена −1 — одним upsert'ом на батч.
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (TransactionFeed, BudgetFactCube)
+    # 2: в snapshot добавлен budget_fact_cube
+    snapshot_version = 2
+    # budget_month переопределяется только fact_cube.set_budget_month — без события
+    direct_writes = True
+
     def __init__(self, db):
         super().__init__(db, projector_name="transactions_feed")
+        # Батч-режим: transaction_id → строка ленты, предзагруженная одним запросом;
+        # новые строки копятся в _new_feed и вставляются одним INSERT'ом
+        self._feed: dict[int, TransactionFeed] | None = None
+        self._new_feed: dict[int, TransactionFeed] | None = None
+        self._suggest_new: list[TransactionFeed] = []
+        self._suggest_stale: set[tuple[int, str]] = set()
+        self._cube = FactCubeDelta()
+
+    def _apply(self, events: List[EventLog], batch: bool) -> None:
+        self._cube = FactCubeDelta()
+        super()._apply(events, batch)
+        self.db.flush()
+        self._cube.apply(self.db)
+        category_suggest.observe_transactions(self.db, self._suggest_new)
+        category_suggest.drop_models(self.db, self._suggest_stale)
+        self._suggest_new, self._suggest_stale = [], set()
+
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """Set-based обработка: одна предзагрузка строк ленты на батч"""
+        self._feed = self.preload(
+            TransactionFeed, TransactionFeed.transaction_id,
+            (e.payload_json.get("transaction_id") for e in events
+             if e.event_type.startswith("transaction_")),
+        )
+        self._new_feed = {}
+        try:
+            for event in events:
+                self.handle_event(event)
+            self.bulk_insert(TransactionFeed, list(self._new_feed.values()))
+        finally:
+            self._feed = self._new_feed = None
+
+    def _get_tx(self, tx_id) -> TransactionFeed | None:
+        if self._feed is not None:
+            return self._feed.get(tx_id)
+        return self.db.query(TransactionFeed).filter(
+            TransactionFeed.transaction_id == tx_id
+        ).first()
 
     def handle_event(self, event: EventLog) -> None:
         if event.event_type == "transaction_created":
@@ -30,6 +84,19 @@ class TransactionsFeedProjector(BaseProjector):
     def _handle_transaction_cancelled(self, event: EventLog) -> None:
         """Удалить транзакцию из ленты."""
         tx_id = event.payload_json["transaction_id"]
+        if self._feed is not None:
+            tx = self._feed.pop(tx_id, None)
+            if tx is None:
+                return
+            self._suggest_stale.add((tx.account_id, tx.operation_type))
+            self._cube.add(tx, -1)
+            if self._new_feed.pop(tx_id, None) is None:
+                self.db.delete(tx)
+            return
+        tx = self._get_tx(tx_id)
+        if tx is not None:
+            self._suggest_stale.add((tx.account_id, tx.operation_type))
+            self._cube.add(tx, -1)
         self.db.query(TransactionFeed).filter(
             TransactionFeed.transaction_id == tx_id
         ).delete(synchronize_session=False)
@@ -37,11 +104,11 @@ class TransactionsFeedProjector(BaseProjector):
     def _handle_transaction_updated(self, event: EventLog) -> None:
         """Обновить транзакцию в ленте"""
         payload = event.payload_json
-        tx = self.db.query(TransactionFeed).filter(
-            TransactionFeed.transaction_id == payload["transaction_id"]
-        ).first()
+        tx = self._get_tx(payload["transaction_id"])
         if not tx:
             return
+        self._suggest_stale.add((tx.account_id, tx.operation_type))
+        self._cube.add(tx, -1)
 
         if "amount" in payload:
             tx.amount = Decimal(payload["amount"])
@@ -61,17 +128,14 @@ class TransactionsFeedProjector(BaseProjector):
             tx.from_goal_id = payload["from_goal_id"]
         if "to_goal_id" in payload:
             tx.to_goal_id = payload["to_goal_id"]
+        self._cube.add(tx, +1)
 
     def _handle_transaction_created(self, event: EventLog) -> None:
         """Добавить транзакцию в ленту"""
         payload = event.payload_json
 
         # Идемпотентность
-        existing = self.db.query(TransactionFeed).filter(
-            TransactionFeed.transaction_id == payload["transaction_id"]
-        ).first()
-
-        if existing:
+        if self._get_tx(payload["transaction_id"]):
             return
 
         transaction = TransactionFeed(
@@ -90,11 +154,23 @@ class TransactionsFeedProjector(BaseProjector):
             description=payload.get("description", ""),
             occurred_at=datetime.fromisoformat(payload["occurred_at"])
         )
-        self.db.add(transaction)
+        if self._feed is not None:
+            self._feed[transaction.transaction_id] = transaction
+            self._new_feed[transaction.transaction_id] = transaction
+        else:
+            self.db.add(transaction)
+        self._suggest_new.append(transaction)
+        self._cube.add(transaction, +1)
 
     def reset(self, account_id: int) -> None:
         """Удалить все транзакции для аккаунта"""
         self.db.query(TransactionFeed).filter(
             TransactionFeed.account_id == account_id
         ).delete()
+        self.db.query(BudgetFactCube).filter(
+            BudgetFactCube.account_id == account_id
+        ).delete()
+        category_suggest.drop_models(
+            self.db, ((account_id, t) for t in category_suggest.SUGGEST_TYPES)
+        )
         super().reset(account_id)
@@ -1,11 +1,15 @@
 """
 WalletBalancesProjector - builds wallet_balances read model from events
 """
+from collections import defaultdict
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime, timezone
+from typing import List
+
+from sqlalchemy import func
 
 from app.readmodels.projectors.base import BaseProjector
-from app.infrastructure.db.models import WalletBalance, EventLog
+from app.infrastructure.db.models import EventLog, TransactionFeed, WalletBalance, WalletBalanceDaily
 
 
 class WalletBalancesProjector(BaseProjector):
@@ -16,10 +20,61 @@ class WalletBalancesProjector(BaseProjector):
     - wallet_created: создать кошелёк с balance=0
     - wallet_archived: пометить кошелёк как архивированный
     - transaction_created: обновить балансы (INCOME/EXPENSE/TRANSFER)
+
+    Батч-режим: все кошельки, упомянутые в батче, загружаются одним запросом
+    в self._wallets; обработчики работают с этим кэшем вместо query().first().
+
+    Заодно ведёт wallet_balance_daily — баланс на конец дня по кошельку
+    (только дни с движением): движения копятся по (кошелёк, день) и пишутся
+    после батча, операция задним числом сдвигает все более поздние дни.
     """
 
+    # Ключи payload, в которых встречаются wallet_id
+    _WALLET_KEYS = (
+        "wallet_id", "from_wallet_id", "to_wallet_id",
+        "old_wallet_id", "old_from_wallet_id", "old_to_wallet_id",
+    )
+
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (WalletBalance, WalletBalanceDaily)
+
     def __init__(self, db):
         super().__init__(db, projector_name="wallet_balances")
+        self._wallets: dict[int, WalletBalance] | None = None
+        self._tx_dates: dict[int, datetime] | None = None
+        # (wallet_id, day) -> нетто-движение, ещё не записанное в wallet_balance_daily
+        self._movements: dict[tuple[int, date], Decimal] = defaultdict(Decimal)
+        self._moved_wallets: dict[int, WalletBalance] = {}
+
+    def _apply(self, events: List[EventLog], batch: bool) -> None:
+        super()._apply(events, batch)
+        self._write_daily()
+
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """Set-based обработка: одна предзагрузка кошельков на батч"""
+        wallet_ids = {
+            event.payload_json.get(key)
+            for event in events
+            for key in self._WALLET_KEYS
+        }
+        self._wallets = self.preload(WalletBalance, WalletBalance.wallet_id, wallet_ids)
+        # Даты операций для старых событий правки/отмены без occurred_at в payload
+        legacy_tx_ids = [
+            event.payload_json.get("transaction_id") for event in events
+            if (event.event_type == "transaction_updated" and not event.payload_json.get("old_occurred_at"))
+            or (event.event_type == "transaction_cancelled" and not event.payload_json.get("occurred_at"))
+        ]
+        self._tx_dates = dict(
+            self.db.query(TransactionFeed.transaction_id, TransactionFeed.occurred_at)
+            .filter(TransactionFeed.transaction_id.in_(legacy_tx_ids))
+            .all()
+        ) if legacy_tx_ids else {}
+        try:
+            for event in events:
+                self.handle_event(event)
+        finally:
+            self._wallets = None
+            self._tx_dates = None
 
     def handle_event(self, event: EventLog) -> None:
         """Process event and update wallet_balances"""
@@ -44,14 +99,11 @@ class WalletBalancesProjector(BaseProjector):
         payload = event.payload_json
 
         # Идемпотентность: проверить существование
-        # Flush чтобы увидеть объекты, добавленные в этой же транзакции
-        self.db.flush()
+        if self._wallets is None:
+            # Flush чтобы увидеть объекты, добавленные в этой же транзакции
+            self.db.flush()
 
-        existing = self.db.query(WalletBalance).filter(
-            WalletBalance.wallet_id == payload["wallet_id"]
-        ).first()
-
-        if existing:
+        if self._get_wallet(payload["wallet_id"]):
             return  # Уже обработано
 
         wallet = WalletBalance(
@@ -65,16 +117,17 @@ class WalletBalancesProjector(BaseProjector):
             created_at=datetime.fromisoformat(payload["created_at"])
         )
         self.db.add(wallet)
-        # Flush чтобы следующая итерация увидела этот объект
-        self.db.flush()
+        if self._wallets is not None:
+            self._wallets[wallet.wallet_id] = wallet
+        else:
+            # Flush чтобы следующая итерация увидела этот объект
+            self.db.flush()
 
     def _handle_wallet_renamed(self, event: EventLog) -> None:
         """Переименовать кошелёк"""
         payload = event.payload_json
 
-        wallet = self.db.query(WalletBalance).filter(
-            WalletBalance.wallet_id == payload["wallet_id"]
-        ).first()
+        wallet = self._get_wallet(payload["wallet_id"])
 
         if wallet:
             wallet.title = payload["title"]
@@ -83,9 +136,7 @@ class WalletBalancesProjector(BaseProjector):
         """Пометить кошелёк как архивированный"""
         payload = event.payload_json
 
-        wallet = self.db.query(WalletBalance).filter(
-            WalletBalance.wallet_id == payload["wallet_id"]
-        ).first()
+        wallet = self._get_wallet(payload["wallet_id"])
 
         if wallet:
             wallet.is_archived = True
@@ -94,9 +145,7 @@ class WalletBalancesProjector(BaseProjector):
         """Убрать кошелёк из архива"""
         payload = event.payload_json
 
-        wallet = self.db.query(WalletBalance).filter(
-            WalletBalance.wallet_id == payload["wallet_id"]
-        ).first()
+        wallet = self._get_wallet(payload["wallet_id"])
 
         if wallet:
             wallet.is_archived = False
@@ -110,60 +159,62 @@ class WalletBalancesProjector(BaseProjector):
 
         if operation_type == "INCOME":
             # Увеличить баланс кошелька
-            wallet = self.db.query(WalletBalance).filter(
-                WalletBalance.wallet_id == payload["wallet_id"]
-            ).first()
+            wallet = self._get_wallet(payload["wallet_id"])
             if wallet:
                 wallet.balance += amount
                 wallet.last_operation_at = occurred_at
+                self._move(wallet, occurred_at, amount)
 
         elif operation_type == "EXPENSE":
             # Уменьшить баланс кошелька
-            wallet = self.db.query(WalletBalance).filter(
-                WalletBalance.wallet_id == payload["wallet_id"]
-            ).first()
+            wallet = self._get_wallet(payload["wallet_id"])
             if wallet:
                 wallet.balance -= amount
                 wallet.last_operation_at = occurred_at
+                self._move(wallet, occurred_at, -amount)
 
         elif operation_type == "TRANSFER":
             # Уменьшить баланс from_wallet, увеличить to_wallet
-            from_wallet = self.db.query(WalletBalance).filter(
-                WalletBalance.wallet_id == payload["from_wallet_id"]
-            ).first()
-            to_wallet = self.db.query(WalletBalance).filter(
-                WalletBalance.wallet_id == payload["to_wallet_id"]
-            ).first()
+            from_wallet = self._get_wallet(payload["from_wallet_id"])
+            to_wallet = self._get_wallet(payload["to_wallet_id"])
 
             if from_wallet:
                 from_wallet.balance -= amount
                 from_wallet.last_operation_at = occurred_at
+                self._move(from_wallet, occurred_at, -amount)
             if to_wallet:
                 to_wallet.balance += amount
                 to_wallet.last_operation_at = occurred_at
+                self._move(to_wallet, occurred_at, amount)
 
     def _handle_transaction_updated(self, event: EventLog) -> None:
         """Реверс старых балансов + применение новых."""
         p = event.payload_json
         old_op = p["old_operation_type"]
         old_amount = Decimal(p["old_amount"])
+        old_at = self._occurred_at(event, "old_occurred_at")
+        new_at = datetime.fromisoformat(p["occurred_at"]) if "occurred_at" in p else old_at
 
         # --- Step 1: Reverse old impact ---
         if old_op == "INCOME":
             w = self._get_wallet(p.get("old_wallet_id"))
             if w:
                 w.balance -= old_amount
+                self._move(w, old_at, -old_amount)
         elif old_op == "EXPENSE":
             w = self._get_wallet(p.get("old_wallet_id"))
             if w:
                 w.balance += old_amount
+                self._move(w, old_at, old_amount)
         elif old_op == "TRANSFER":
             fw = self._get_wallet(p.get("old_from_wallet_id"))
             tw = self._get_wallet(p.get("old_to_wallet_id"))
             if fw:
                 fw.balance += old_amount
+                self._move(fw, old_at, old_amount)
             if tw:
                 tw.balance -= old_amount
+                self._move(tw, old_at, -old_amount)
 
         # --- Step 2: Apply new impact ---
         new_op = p["operation_type"]
@@ -173,43 +224,154 @@ class WalletBalancesProjector(BaseProjector):
             w = self._get_wallet(p.get("wallet_id", p.get("old_wallet_id")))
             if w:
                 w.balance += new_amount
+                self._move(w, new_at, new_amount)
         elif new_op == "EXPENSE":
             w = self._get_wallet(p.get("wallet_id", p.get("old_wallet_id")))
             if w:
                 w.balance -= new_amount
+                self._move(w, new_at, -new_amount)
         elif new_op == "TRANSFER":
             fw = self._get_wallet(p.get("from_wallet_id", p.get("old_from_wallet_id")))
             tw = self._get_wallet(p.get("to_wallet_id", p.get("old_to_wallet_id")))
             if fw:
                 fw.balance -= new_amount
+                self._move(fw, new_at, -new_amount)
             if tw:
                 tw.balance += new_amount
+                self._move(tw, new_at, new_amount)
 
     def _handle_transaction_cancelled(self, event: EventLog) -> None:
         """Разворачивает влияние отменённой операции на балансы."""
         p = event.payload_json
         op = p["operation_type"]
         amount = Decimal(p["amount"])
+        at = self._occurred_at(event, "occurred_at")
 
         if op == "INCOME":
             w = self._get_wallet(p.get("wallet_id"))
             if w:
                 w.balance -= amount
+                self._move(w, at, -amount)
         elif op == "EXPENSE":
             w = self._get_wallet(p.get("wallet_id"))
             if w:
                 w.balance += amount
+                self._move(w, at, amount)
         elif op == "TRANSFER":
             fw = self._get_wallet(p.get("from_wallet_id"))
             tw = self._get_wallet(p.get("to_wallet_id"))
             if fw:
                 fw.balance += amount
+                self._move(fw, at, amount)
             if tw:
                 tw.balance -= amount
+                self._move(tw, at, -amount)
+
+    # --- wallet_balance_daily ---
+
+    def _occurred_at(self, event: EventLog, key: str) -> datetime:
+        """
+        Дата операции из payload
+
+        У старых событий её нет — берём из ленты, а если строки уже нет —
+        время самого события (итог по кошельку при этом сходится).
+        """
+        payload = event.payload_json
+        if payload.get(key):
+            return datetime.fromisoformat(payload[key])
+        tx_id = payload.get("transaction_id")
+        if self._tx_dates is not None:
+            occurred_at = self._tx_dates.get(tx_id)
+        else:
+            occurred_at = self.db.query(TransactionFeed.occurred_at).filter(
+                TransactionFeed.transaction_id == tx_id
+            ).scalar()
+        return occurred_at or event.occurred_at
+
+    def _move(self, wallet: WalletBalance, occurred_at: datetime, delta: Decimal) -> None:
+        if occurred_at.tzinfo is not None:
+            occurred_at = occurred_at.astimezone(timezone.utc)
+        self._movements[(wallet.wallet_id, occurred_at.date())] += delta
+        self._moved_wallets[wallet.wallet_id] = wallet
+
+    def _write_daily(self) -> None:
+        """
+        Записать накопленные движения в wallet_balance_daily (set-based)
+
+        Для затронутых кошельков одним запросом читаются строки от самого
+        раннего дня движения (и последняя строка до него), в памяти каждая
+        строка сдвигается на сумму движений до её дня включительно, новые
+        дни получают баланс предыдущего дня + движение; результат пишется
+        одним upsert'ом.
+        """
+        movements, wallets = self._movements, self._moved_wallets
+        self._movements, self._moved_wallets = defaultdict(Decimal), {}
+        if not movements:
+            return
+        self.db.flush()
+        start = min(day for _, day in movements)
+        wallet_ids = list(wallets)
+
+        last_before = (
+            self.db.query(WalletBalanceDaily.wallet_id, func.max(WalletBalanceDaily.day).label("day"))
+            .filter(WalletBalanceDaily.wallet_id.in_(wallet_ids), WalletBalanceDaily.day < start)
+            .group_by(WalletBalanceDaily.wallet_id)
+            .subquery()
+        )
+        before = dict(
+            self.db.query(WalletBalanceDaily.wallet_id, WalletBalanceDaily.balance)
+            .join(last_before, (last_before.c.wallet_id == WalletBalanceDaily.wallet_id)
+                  & (last_before.c.day == WalletBalanceDaily.day))
+            .all()
+        )
+        existing: dict[int, dict[date, tuple[Decimal, Decimal]]] = defaultdict(dict)
+        for wallet_id, day, delta, balance in (
+            self.db.query(WalletBalanceDaily.wallet_id, WalletBalanceDaily.day,
+                          WalletBalanceDaily.delta, WalletBalanceDaily.balance)
+            .filter(WalletBalanceDaily.wallet_id.in_(wallet_ids), WalletBalanceDaily.day >= start)
+        ):
+            existing[wallet_id][day] = (delta, balance)
+
+        moved: dict[int, dict[date, Decimal]] = defaultdict(dict)
+        for (wallet_id, day), delta in movements.items():
+            moved[wallet_id][day] = delta
+
+        rows = []
+        for wallet_id, w_moves in moved.items():
+            w_rows = existing.get(wallet_id, {})
+            if wallet_id in before:
+                running = before[wallet_id]
+            elif w_rows:
+                delta, balance = w_rows[min(w_rows)]
+                running = balance - delta
+            else:
+                # Истории нет: баланс до батча = текущий минус движения батча
+                running = wallets[wallet_id].balance - sum(w_moves.values(), Decimal("0"))
+            shift = Decimal("0")
+            for day in sorted(w_rows.keys() | w_moves.keys()):
+                move = w_moves.get(day, Decimal("0"))
+                shift += move
+                if day in w_rows:
+                    delta, balance = w_rows[day]
+                    delta, running = delta + move, balance + shift
+                else:
+                    delta, running = move, running + move
+                rows.append({
+                    "wallet_id": wallet_id, "day": day,
+                    "account_id": wallets[wallet_id].account_id,
+                    "delta": delta, "balance": running,
+                })
+
+        self.bulk_upsert(
+            WalletBalanceDaily, rows, ["wallet_id", "day"],
+            lambda excluded: {"delta": excluded.delta, "balance": excluded.balance},
+        )
 
     def _get_wallet(self, wallet_id):
         if wallet_id is None:
             return None
+        if self._wallets is not None:
+            return self._wallets.get(wallet_id)
         return self.db.query(WalletBalance).filter(
             WalletBalance.wallet_id == wallet_id
         ).first()
@@ -219,4 +381,7 @@ class WalletBalancesProjector(BaseProjector):
         self.db.query(WalletBalance).filter(
             WalletBalance.account_id == account_id
         ).delete()
+        self.db.query(WalletBalanceDaily).filter(
+            WalletBalanceDaily.account_id == account_id
+        ).delete()
         super().reset(account_id)
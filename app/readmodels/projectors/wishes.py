@@ -18,6 +18,9 @@ class WishesProjector(BaseProjector):
     - wish_completed: отметить выполненной
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (WishModel,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="wishes")
 
@@ -5,6 +5,9 @@ from app.infrastructure.db.models import WorkCategory, EventLog
 
 
 class WorkCategoriesProjector(BaseProjector):
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (WorkCategory,)
+
     def __init__(self, db):
         super().__init__(db, projector_name="work_categories")
 
@@ -15,6 +15,7 @@ Level formula: level N requires 100 * N² XP to complete.
   ...
 """
 from datetime import date, datetime, timezone, timedelta
+from typing import List
 
 from app.readmodels.projectors.base import BaseProjector
 from app.infrastructure.db.models import UserXpState, XpEvent, EventLog
@@ -78,8 +79,13 @@ class XpProjector(BaseProjector):
     event_log event never double-awards XP.
     """
 
+    # Таблицы, которые reset() очищает (сверка при rebuild --dry-run)
+    read_models = (XpEvent, UserXpState)
+
     def __init__(self, db):
         super().__init__(db, projector_name="xp")
+        # task_id → TaskModel, prefetched by handle_batch
+        self._tasks: dict | None = None
 
     def handle_event(self, event: EventLog) -> None:
         if event.event_type not in XP_RULES:
@@ -87,6 +93,55 @@ class XpProjector(BaseProjector):
         xp_amount = self._compute_xp_amount(event)
         self._award_xp(event, xp_amount)
 
+    def handle_batch(self, events: List[EventLog]) -> None:
+        """
+        Set-based path: one query each for already-awarded events, completed
+        tasks (for the early bonus) and XP states; awards are inserted together
+        and every touched state is updated once per batch.
+        """
+        events = [e for e in events if e.event_type in XP_RULES]
+        if not events:
+            return
+
+        from app.infrastructure.db.models import TaskModel
+
+        awarded = self.preload(XpEvent, XpEvent.source_event_id, (e.id for e in events))
+        self._tasks = self.preload(TaskModel, TaskModel.task_id, (
+            int(e.payload_json["task_id"])
+            for e in events
+            if e.event_type == "task_completed" and (e.payload_json or {}).get("task_id")
+        ))
+        states = self.preload(UserXpState, UserXpState.user_id, (e.account_id for e in events))
+
+        awards: list[XpEvent] = []
+        try:
+            for event in events:
+                if event.id in awarded:
+                    continue
+                xp_amount = self._compute_xp_amount(event)
+                awards.append(XpEvent(
+                    user_id=event.account_id,
+                    source_event_id=event.id,
+                    xp_amount=xp_amount,
+                    reason=event.event_type,
+                ))
+                awarded[event.id] = awards[-1]
+
+                state = states.get(event.account_id)
+                if state is None:
+                    state = UserXpState(user_id=event.account_id, total_xp=0, level=1,
+                                        current_level_xp=0, xp_to_next_level=100)
+                    self.db.add(state)
+                    states[event.account_id] = state
+                state.total_xp += xp_amount
+        finally:
+            self._tasks = None
+
+        self.bulk_insert(XpEvent, awards)
+        for state in states.values():
+            state.level, state.current_level_xp, state.xp_to_next_level = compute_level(state.total_xp)
+        self.db.flush()
+
     # ------------------------------------------------------------------
     # XP amount computation
     # ------------------------------------------------------------------
@@ -104,10 +159,13 @@ class XpProjector(BaseProjector):
         if not task_id:
             return BASE_TASK_COMPLETED_XP
 
-        from app.infrastructure.db.models import TaskModel
-        task = self.db.query(TaskModel).filter(
-            TaskModel.task_id == int(task_id)
-        ).first()
+        if self._tasks is not None:
+            task = self._tasks.get(int(task_id))
+        else:
+            from app.infrastructure.db.models import TaskModel
+            task = self.db.query(TaskModel).filter(
+                TaskModel.task_id == int(task_id)
+            ).first()
         if not task or not task.due_date:
             return BASE_TASK_COMPLETED_XP
 
@@ -0,0 +1,328 @@
+"""
+Full rebuild of read models — python -m app.readmodels.rebuild
+
+For every account: reset the selected projectors (delete their read model
+rows, checkpoint → 0) and replay the account's event log through the batch
+path (ProjectorOrchestrator.run_all). Accounts are independent, so they are
+fanned out over a process pool, one session per account.
+
+Usage:
+    python -m app.readmodels.rebuild [--projectors wallet_balances,xp] [--accounts 1,2]
+                                     [-j PROCESSES] [--state FILE] [--dry-run]
+                                     [--from-snapshots | --verify-snapshots] [--force]
+
+--state FILE  — rebuilt accounts are recorded in FILE; a re-run with the same
+                file skips them (an interrupted account is rebuilt again).
+--dry-run     — rebuild inside a transaction that is rolled back and diff the
+                rebuilt rows against the live read models; nothing changes.
+                Exit code 1 if any account differs.
+--from-snapshots   — start from the latest projector snapshot of each account
+                     (app.readmodels.snapshots) and replay only the tail.
+--verify-snapshots — rolled back like --dry-run: diff snapshot + tail against
+                     a full replay from event zero.
+
+--force       — allow the projectors listed below in --projectors.
+
+Projectors without their own reset() (read_models empty — budget, events:
+some of their rows are written outside the event log) are never rebuilt.
+Projectors whose read models are also edited directly (direct_writes — tasks,
+transactions_feed) are not in the default set: a replay reverts those edits.
+They are rebuilt only when named in --projectors with --force; --dry-run and
+--verify-snapshots change nothing and need no --force.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from sqlalchemy import DateTime, select
+from sqlalchemy.orm import Session
+
+import app.application.session_hooks  # noqa: F401 — registers the global Session hooks
+from app.infrastructure.db.models import EventLog
+from app.infrastructure.eventlog.repository import lock_account
+from app.readmodels.projectors.registry import PROJECTORS, all_projectors, build_orchestrator
+from app.readmodels.snapshots import restore_latest
+
+logger = logging.getLogger("app.readmodels.rebuild")
+
+DIFF_SAMPLE = 5  # rows per table shown in a dry-run diff
+
+
+def rebuildable_projectors(names: Optional[List[str]] = None, force: bool = False) -> List[str]:
+    """
+    Names of projectors that can be rebuilt, in registry order
+
+    direct_writes projectors are left out of the default set; naming them
+    explicitly requires force (their direct edits are lost on replay).
+    """
+    allowed = [cls(None).projector_name for cls in PROJECTORS if cls.read_models]
+    unsafe = {cls(None).projector_name for cls in PROJECTORS if cls.read_models and cls.direct_writes}
+    if names is None:
+        return [n for n in allowed if n not in unsafe]
+    refused = [n for n in names if n not in allowed]
+    if refused:
+        raise ValueError(f"Projectors cannot be rebuilt: {', '.join(refused)}")
+    forced = [n for n in allowed if n in names and n in unsafe]
+    if forced and not force:
+        raise ValueError(
+            f"Projectors have rows written outside the event log, a rebuild reverts them: "
+            f"{', '.join(forced)} (use --force)"
+        )
+    if forced:
+        logger.warning("%s: rows written outside the event log are replaced by the replay", ", ".join(forced))
+    return [n for n in allowed if n in names]
+
+
+def list_accounts(db: Session) -> List[int]:
+    return list(db.execute(select(EventLog.account_id).distinct().order_by(EventLog.account_id)).scalars())
+
+
+# ── Dry-run diff ─────────────────────────────────────────────────────────────
+
+def _compared_columns(model) -> list:
+    """Columns that must match after a replay: no surrogate ids, no now() timestamps."""
+    cols = []
+    for col in model.__table__.c:
+        if col.primary_key and col.name == "id":
+            continue
+        if isinstance(col.type, DateTime) and (col.server_default is not None or col.onupdate is not None):
+            continue
+        cols.append(col)
+    return cols
+
+
+def snapshot(db: Session, projectors, account_id: int) -> Dict[str, Counter]:
+    """Rows of the account per projector table, as a multiset of comparable tuples."""
+    result = {}
+    for projector in projectors:
+        for model in projector.read_models:
+            cols = _compared_columns(model)
+            rows = db.execute(select(*cols).where(projector.read_model_filter(model, account_id))).all()
+            key = f"{projector.projector_name}.{model.__tablename__}"
+            result[key] = Counter(tuple(str(v) for v in row) for row in rows)
+    return result
+
+
+def diff_snapshots(live: Dict[str, Counter], rebuilt: Dict[str, Counter]) -> dict:
+    """{table: {"missing": n, "extra": n, "sample": [...]}} for tables that differ."""
+    diff = {}
+    for table in live:
+        missing = live[table] - rebuilt.get(table, Counter())  # есть в live, нет после пересборки
+        extra = rebuilt.get(table, Counter()) - live[table]
+        if missing or extra:
+            diff[table] = {
+                "missing": sum(missing.values()),
+                "extra": sum(extra.values()),
+                "sample": (
+                    [["-", *row] for row in list(missing)[:DIFF_SAMPLE]]
+                    + [["+", *row] for row in list(extra)[:DIFF_SAMPLE]]
+                ),
+            }
+    return diff
+
+
+# ── Rebuild ──────────────────────────────────────────────────────────────────
+
+def _replay(db: Session, projectors, account_id: int, names: List[str], from_snapshots: bool) -> dict:
+    """Reset (or restore the latest snapshot of) every projector, then apply the remaining events."""
+    for projector in projectors:
+        if from_snapshots:
+            restore_latest(db, projector, account_id)
+        else:
+            projector.reset(account_id)
+    return build_orchestrator(db, names).run_all(account_id)
+
+
+def rebuild_account(
+    db: Session,
+    account_id: int,
+    names: List[str],
+    dry_run: bool = False,
+    from_snapshots: bool = False,
+) -> dict:
+    """
+    Reset the projectors for one account and replay its events (commits per batch)
+
+    В dry-run сессия должна быть открыта внутри внешней транзакции, которую
+    вызывающий откатит (см. _rebuild_in_process).
+    """
+    started = time.monotonic()
+    projectors = all_projectors(db, names)
+
+    lock_account(db, account_id)
+    live = snapshot(db, projectors, account_id) if dry_run else None
+    applied = _replay(db, projectors, account_id, names, from_snapshots)
+
+    result = {
+        "account_id": account_id,
+        "events": max(applied.values(), default=0),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    if dry_run:
+        result["diff"] = diff_snapshots(live, snapshot(db, projectors, account_id))
+    return result
+
+
+def verify_snapshots(db: Session, account_id: int, names: List[str]) -> dict:
+    """
+    Compare snapshot + tail with a full replay (session inside a rolled-back transaction)
+
+    diff: "missing" — строки полной пересборки, которых нет после snapshot'а.
+    """
+    started = time.monotonic()
+    projectors = all_projectors(db, names)
+
+    lock_account(db, account_id)
+    applied = _replay(db, projectors, account_id, names, from_snapshots=True)
+    from_snapshot = snapshot(db, projectors, account_id)
+    _replay(db, projectors, account_id, names, from_snapshots=False)
+    return {
+        "account_id": account_id,
+        "events": max(applied.values(), default=0),
+        "seconds": round(time.monotonic() - started, 2),
+        "diff": diff_snapshots(snapshot(db, projectors, account_id), from_snapshot),
+    }
+
+
+def _rebuild_in_process(account_id: int, names: List[str], mode: str, from_snapshots: bool = False) -> dict:
+    """Pool task: own session; dry-run/verify work inside a rolled-back connection transaction."""
+    from app.infrastructure.db.session import get_engine, get_session_factory
+
+    if mode == "rebuild":
+        db = get_session_factory()()
+        try:
+            return rebuild_account(db, account_id, names, from_snapshots=from_snapshots)
+        finally:
+            db.close()
+
+    with get_engine().connect() as conn:
+        outer = conn.begin()
+        # commit() projector'ов фиксирует только SAVEPOINT внутри outer
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            if mode == "verify":
+                return verify_snapshots(db, account_id, names)
+            return rebuild_account(db, account_id, names, dry_run=True, from_snapshots=from_snapshots)
+        finally:
+            db.close()
+            outer.rollback()
+
+
+def _load_state(path: Optional[str], names: List[str], mode: str) -> dict:
+    state = {"projectors": names, "mode": mode, "done": []}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("projectors") != names or saved.get("mode") != mode:
+            raise SystemExit(f"{path} belongs to another rebuild (projectors/mode differ)")
+        state = saved
+    return state
+
+
+def _save_state(path: Optional[str], state: dict) -> None:
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.readmodels.rebuild", description=__doc__.splitlines()[1])
+    parser.add_argument("--projectors", default="", help="comma-separated projector names (default: all)")
+    parser.add_argument("--accounts", default="", help="comma-separated account ids (default: all with events)")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--state", help="progress file for resuming an interrupted rebuild")
+    parser.add_argument("--dry-run", action="store_true")
+    snapshots = parser.add_mutually_exclusive_group()
+    snapshots.add_argument("--from-snapshots", action="store_true")
+    snapshots.add_argument("--verify-snapshots", action="store_true")
+    parser.add_argument("--force", action="store_true", help="rebuild projectors with direct writes")
+    args = parser.parse_args(argv)
+    mode = "verify" if args.verify_snapshots else "dry-run" if args.dry_run else "rebuild"
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    from app.infrastructure.db.session import get_session_factory
+
+    names = rebuildable_projectors(
+        [n.strip() for n in args.projectors.split(",") if n.strip()] or None,
+        force=args.force or mode != "rebuild",
+    )
+    if args.accounts:
+        accounts = sorted({int(a) for a in args.accounts.split(",") if a.strip()})
+    else:
+        db = get_session_factory()()
+        try:
+            accounts = list_accounts(db)
+        finally:
+            db.close()
+
+    state = _load_state(args.state, names, mode)
+    done = set(state["done"])
+    pending = [a for a in accounts if a not in done]
+    total = len(accounts)
+    logger.info(
+        "Rebuilding %s for %d account(s) [%s%s], %d already done",
+        ",".join(names), total, mode, ", from snapshots" if args.from_snapshots else "", total - len(pending),
+    )
+
+    started = time.monotonic()
+    failed, differing = [], []
+
+    def _record(account_id: int, result: Optional[dict]) -> None:
+        if result is None:
+            failed.append(account_id)
+        else:
+            state["done"].append(account_id)
+            _save_state(args.state, state)
+            if result.get("diff"):
+                differing.append(account_id)
+                for table, d in result["diff"].items():
+                    logger.warning("account %s %s: -%d +%d %s", account_id, table, d["missing"], d["extra"], d["sample"])
+        n = len(state["done"]) + len(failed)
+        logger.info(
+            "[%d/%d] account %s: %s", n, total, account_id,
+            "FAILED" if result is None else f"{result['events']} events in {result['seconds']}s",
+        )
+
+    if args.processes <= 1:
+        for account_id in pending:
+            try:
+                result = _rebuild_in_process(account_id, names, mode, args.from_snapshots)
+            except Exception:
+                logger.exception("account %s failed", account_id)
+                result = None
+            _record(account_id, result)
+    else:
+        # Каждый процесс создаёт свой engine/пул соединений (spawn, не fork)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.processes, mp_context=ctx) as pool:
+            futures = {
+                pool.submit(_rebuild_in_process, a, names, mode, args.from_snapshots): a for a in pending
+            }
+            for future in as_completed(futures):
+                account_id = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception("account %s failed", account_id)
+                    result = None
+                _record(account_id, result)
+
+    logger.info(
+        "Finished in %.1fs: %d rebuilt, %d failed%s",
+        time.monotonic() - started, len(pending) - len(failed), len(failed),
+        f", {len(differing)} differ" if mode != "rebuild" else "",
+    )
+    return 1 if failed or differing else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
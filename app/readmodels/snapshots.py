@@ -0,0 +1,219 @@
+"""
+Projector snapshots — read-model rows of an account at a checkpoint
+
+A rebuild from a snapshot costs O(tail) instead of O(history):
+
+    >>> restore_latest(db, XpProjector(db), account_id)  # rows + checkpoint
+    >>> XpProjector(db).run(account_id)                   # only newer events
+
+Snapshots are taken nightly for accounts that moved at least
+PROJECTOR_SNAPSHOT_MIN_EVENTS events past their last snapshot (background
+job projector.snapshots); the newest PROJECTOR_SNAPSHOT_KEEP per projector
+and account are kept. Rows are stored as zlib-compressed JSON.
+
+A snapshot is only restored by a projector with the same snapshot_version —
+bump it when a projector bug is fixed, so that its rows are rebuilt from
+events instead of from a snapshot of the buggy state.
+
+Projectors with direct_writes (tasks, transactions_feed) are not snapshotted:
+restoring would revert rows edited outside the event log since the snapshot.
+restore_latest falls back to a full replay for them.
+"""
+import json
+import logging
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import ProjectorCheckpoint, ProjectorSnapshot
+from app.infrastructure.eventlog.repository import lock_account
+from app.readmodels.projectors.base import BaseProjector
+from app.readmodels.projectors.registry import PROJECTORS
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot snapshot value of type {type(value).__name__}")
+
+
+def _decoder(column):
+    """str → Python value for columns json can't round-trip (None — as is)."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    return {
+        Decimal: Decimal,
+        datetime: datetime.fromisoformat,
+        date: date.fromisoformat,
+        time: time.fromisoformat,
+    }.get(python_type)
+
+
+def dump_rows(db: Session, projector: BaseProjector, account_id: int) -> dict:
+    """{table: {"columns": [...], "rows": [[...], ...]}} for the projector's read models."""
+    tables = {}
+    for model in projector.read_models:
+        columns = list(model.__table__.c)
+        rows = db.execute(select(*columns).where(projector.read_model_filter(model, account_id))).all()
+        tables[model.__tablename__] = {
+            "columns": [c.name for c in columns],
+            "rows": [list(row) for row in rows],
+        }
+    return tables
+
+
+def take_snapshot(db: Session, projector: BaseProjector, account_id: int) -> Optional[ProjectorSnapshot]:
+    """
+    Snapshot the projector's rows of the account at its checkpoint (caller commits)
+
+    Блокировка аккаунта: строки и checkpoint читаются согласованно, пока
+    projection не может их сдвинуть. None — projector ещё не запускался.
+    """
+    lock_account(db, account_id)
+    checkpoint = projector.get_checkpoint(account_id)
+    if not checkpoint:
+        return None
+    tables = dump_rows(db, projector, account_id)
+    data = zlib.compress(json.dumps(tables, default=_encode, separators=(",", ":")).encode("utf-8"))
+    snap = ProjectorSnapshot(
+        projector_name=projector.projector_name,
+        account_id=account_id,
+        version=projector.snapshot_version,
+        last_event_id=checkpoint,
+        row_count=sum(len(t["rows"]) for t in tables.values()),
+        data=data,
+    )
+    db.add(snap)
+    db.flush()
+    return snap
+
+
+def latest_snapshot(db: Session, projector: BaseProjector, account_id: int) -> Optional[ProjectorSnapshot]:
+    if projector.direct_writes:
+        return None
+    return (
+        db.query(ProjectorSnapshot)
+        .filter(
+            ProjectorSnapshot.projector_name == projector.projector_name,
+            ProjectorSnapshot.account_id == account_id,
+            ProjectorSnapshot.version == projector.snapshot_version,
+        )
+        .order_by(ProjectorSnapshot.last_event_id.desc(), ProjectorSnapshot.id.desc())
+        .first()
+    )
+
+
+def restore_snapshot(db: Session, projector: BaseProjector, account_id: int, snap: ProjectorSnapshot) -> int:
+    """Replace the account's read model with the snapshot rows; returns the restored checkpoint."""
+    tables = json.loads(zlib.decompress(snap.data))
+    projector.reset(account_id)
+    db.flush()
+    for model in projector.read_models:
+        table = tables.get(model.__tablename__)
+        if not table or not table["rows"]:
+            continue
+        decoders = [_decoder(model.__table__.c[name]) for name in table["columns"]]
+        rows = [
+            {
+                name: (dec(value) if dec and value is not None else value)
+                for name, dec, value in zip(table["columns"], decoders, row)
+            }
+            for row in table["rows"]
+        ]
+        db.execute(insert(model.__table__), rows)
+    projector.save_checkpoint(account_id, snap.last_event_id)
+    return snap.last_event_id
+
+
+def restore_latest(db: Session, projector: BaseProjector, account_id: int) -> int:
+    """Restore the newest usable snapshot, or reset to zero without one; returns the checkpoint."""
+    snap = latest_snapshot(db, projector, account_id)
+    if snap is None:
+        projector.reset(account_id)
+        return 0
+    return restore_snapshot(db, projector, account_id, snap)
+
+
+# ── Periodic snapshots and retention ────────────────────────────────────────
+
+def accounts_due(db: Session, projector: BaseProjector, min_events: int) -> list[int]:
+    """Accounts whose checkpoint is at least min_events ids past their last snapshot."""
+    last = (
+        select(ProjectorSnapshot.account_id, func.max(ProjectorSnapshot.last_event_id).label("snap_id"))
+        .where(
+            ProjectorSnapshot.projector_name == projector.projector_name,
+            ProjectorSnapshot.version == projector.snapshot_version,
+        )
+        .group_by(ProjectorSnapshot.account_id)
+        .subquery()
+    )
+    return list(db.execute(
+        select(ProjectorCheckpoint.account_id)
+        .outerjoin(last, last.c.account_id == ProjectorCheckpoint.account_id)
+        .where(
+            ProjectorCheckpoint.projector_name == projector.projector_name,
+            ProjectorCheckpoint.last_event_id - func.coalesce(last.c.snap_id, 0) >= min_events,
+        )
+        .order_by(ProjectorCheckpoint.account_id)
+    ).scalars())
+
+
+def purge_snapshots(db: Session, keep: int) -> int:
+    """Keep the newest `keep` snapshots per projector/account; drop outdated versions (commits)."""
+    deleted = 0
+    for cls in PROJECTORS:
+        if not cls.read_models:
+            continue
+        outdated = ProjectorSnapshot.projector_name == cls(None).projector_name
+        if not cls.direct_writes:  # direct_writes — не восстанавливаются, удаляются все
+            outdated &= ProjectorSnapshot.version != cls.snapshot_version
+        deleted += db.execute(
+            delete(ProjectorSnapshot)
+            .where(outdated)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    ranked = select(
+        ProjectorSnapshot.id,
+        func.row_number().over(
+            partition_by=(ProjectorSnapshot.projector_name, ProjectorSnapshot.account_id),
+            order_by=(ProjectorSnapshot.last_event_id.desc(), ProjectorSnapshot.id.desc()),
+        ).label("rn"),
+    ).subquery()
+    deleted += db.execute(
+        delete(ProjectorSnapshot)
+        .where(ProjectorSnapshot.id.in_(select(ranked.c.id).where(ranked.c.rn > keep)))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def take_due_snapshots(db: Session, min_events: int, keep: int) -> int:
+    """Snapshot every (projector, account) that is due, then apply retention; returns snapshots taken."""
+    taken = 0
+    for cls in PROJECTORS:
+        if not cls.read_models or cls.direct_writes:
+            continue
+        projector = cls(db)
+        for account_id in accounts_due(db, projector, min_events):
+            try:
+                if take_snapshot(db, projector, account_id) is not None:
+                    taken += 1
+                db.commit()  # снимает блокировку аккаунта
+            except Exception:
+                db.rollback()
+                logger.exception("Snapshot %s for account %s failed", projector.projector_name, account_id)
+    purged = purge_snapshots(db, keep)
+    logger.info("Projector snapshots: %d taken, %d purged", taken, purged)
+    return taken
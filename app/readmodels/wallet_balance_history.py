@@ -0,0 +1,82 @@
+"""
+Wallet balance history — balances at arbitrary dates from wallet_balance_daily.
+
+WalletBalancesProjector keeps one row per wallet per day with movement
+(end-of-day balance). A capital-over-time chart is then two queries for any
+window: the last row before the window per wallet plus the rows from the
+window start on, carried forward in Python.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import WalletBalance, WalletBalanceDaily
+
+
+def balances_at(
+    db: Session,
+    wallets: Iterable[WalletBalance],
+    boundaries: list[date],
+) -> dict[int, list[Decimal]]:
+    """
+    {wallet_id: [баланс на начало каждой даты boundaries]} (boundaries по возрастанию)
+
+    Баланс на начало дня b = баланс на конец последнего дня с движением < b.
+    Считается от текущего баланса кошелька минус движения после b — как
+    обратный проход по ленте: внешние правки баланса (COLLECTION) не портят
+    историю, а дают ту же картину, что и раньше.
+    """
+    wallets = list(wallets)
+    if not wallets or not boundaries:
+        return {}
+    wallet_ids = [w.wallet_id for w in wallets]
+    first = boundaries[0]
+
+    # Последняя строка до окна по каждому кошельку
+    last_before = (
+        db.query(WalletBalanceDaily.wallet_id, func.max(WalletBalanceDaily.day).label("day"))
+        .filter(WalletBalanceDaily.wallet_id.in_(wallet_ids), WalletBalanceDaily.day < first)
+        .group_by(WalletBalanceDaily.wallet_id)
+        .subquery()
+    )
+    rows = (
+        db.query(WalletBalanceDaily.wallet_id, WalletBalanceDaily.day,
+                 WalletBalanceDaily.delta, WalletBalanceDaily.balance)
+        .join(last_before, (last_before.c.wallet_id == WalletBalanceDaily.wallet_id)
+              & (last_before.c.day == WalletBalanceDaily.day))
+        .all()
+    )
+    # Строки от начала окна до последней (включая будущие даты)
+    rows += (
+        db.query(WalletBalanceDaily.wallet_id, WalletBalanceDaily.day,
+                 WalletBalanceDaily.delta, WalletBalanceDaily.balance)
+        .filter(WalletBalanceDaily.wallet_id.in_(wallet_ids), WalletBalanceDaily.day >= first)
+        .order_by(WalletBalanceDaily.wallet_id, WalletBalanceDaily.day)
+        .all()
+    )
+    by_wallet: dict[int, list] = {}
+    for row in rows:
+        by_wallet.setdefault(row.wallet_id, []).append(row)
+
+    result: dict[int, list[Decimal]] = {}
+    for w in wallets:
+        current = Decimal(str(w.balance))
+        w_rows = by_wallet.get(w.wallet_id)
+        if not w_rows:
+            result[w.wallet_id] = [current] * len(boundaries)
+            continue
+        latest = w_rows[-1].balance
+        # баланс «до первой известной строки»
+        running = w_rows[0].balance - w_rows[0].delta
+        series: list[Decimal] = []
+        i = 0
+        for b in boundaries:
+            while i < len(w_rows) and w_rows[i].day < b:
+                running = w_rows[i].balance
+                i += 1
+            series.append(current - (latest - running))
+        result[w.wallet_id] = series
+    return result
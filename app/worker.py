@@ -0,0 +1,102 @@
+"""
+Background job worker — python -m app.worker
+
+Runs N processes that take jobs from background_jobs (see
+app.application.job_queue). Start it next to uvicorn and set
+JOB_QUEUE_INPROCESS=false so the web workers stop draining the queue.
+
+Usage:
+    python -m app.worker [-n PROCESSES] [--kinds digest.weekly,digest.ai_comment]
+
+SIGTERM/SIGINT: each process finishes its current job and exits.
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import timedelta
+
+import app.application.session_hooks  # noqa: F401 — registers the global Session hooks
+
+logger = logging.getLogger("app.worker")
+
+MAINTENANCE_EVERY = 60.0  # seconds between stale-requeue / purge passes
+
+
+def work(stop: threading.Event, kinds: list[str] | None = None) -> None:
+    """Worker loop of one process: run ready jobs, sleep when the queue is empty."""
+    from app.config import get_settings
+    from app.infrastructure.db.session import get_session_factory
+    from app.application.job_queue import default_worker_id, purge_finished, requeue_stale, run_pending
+
+    settings = get_settings()
+    worker_id = default_worker_id()
+    Session = get_session_factory()
+    last_maintenance = 0.0
+    logger.info("Worker %s started (kinds=%s)", worker_id, kinds or "all")
+
+    while not stop.is_set():
+        db = Session()
+        try:
+            if time.monotonic() - last_maintenance > MAINTENANCE_EVERY:
+                requeue_stale(db, timedelta(seconds=settings.JOB_STALE_SECONDS))
+                purge_finished(db, timedelta(days=settings.JOB_RETENTION_DAYS))
+                last_maintenance = time.monotonic()
+            taken = run_pending(db, worker_id, limit=1, kinds=kinds)
+        except Exception:
+            logger.exception("Worker %s: queue error", worker_id)
+            db.rollback()
+            taken = 0
+        finally:
+            db.close()
+        if not taken:
+            stop.wait(settings.JOB_POLL_SECONDS)
+
+    logger.info("Worker %s stopped", worker_id)
+
+
+def _process_main(kinds: list[str] | None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    work(stop, kinds)
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.config import get_settings
+
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--processes", type=int, default=get_settings().JOB_WORKERS)
+    parser.add_argument("--kinds", default="", help="comma-separated job kinds (default: all)")
+    args = parser.parse_args(argv)
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()] or None
+
+    if args.processes <= 1:
+        _process_main(kinds)
+        return
+
+    # Каждый процесс создаёт свой engine/пул соединений после fork
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=_process_main, args=(kinds,), name=f"job-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+
+    def _forward(sig, _frame):
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
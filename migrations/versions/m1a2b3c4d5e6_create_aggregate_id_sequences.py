@@ -0,0 +1,56 @@
+"""Per-aggregate id sequences for IdAllocator
+
+Заменяют MAX(CAST(payload_json->>'x_id' AS INT)) по всему event_log на
+nextval(). Каждая sequence засевается максимумом из event_log и read model
+(те же источники, что app/infrastructure/id_allocator.SEQUENCES).
+
+Revision ID: m1a2b3c4d5e6
+Revises: l0a1b2c3d4e5
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m1a2b3c4d5e6"
+down_revision = "l0a1b2c3d4e5"
+branch_labels = None
+depends_on = None
+
+# sequence → (table, pk column, creation event_type, payload key)
+_SEQUENCES = {
+    "task_id_seq": ("tasks", "task_id", "task_created", "task_id"),
+    "transaction_id_seq": ("transactions_feed", "transaction_id", "transaction_created", "transaction_id"),
+    "calendar_event_id_seq": ("events", "event_id", "calendar_event_created", "event_id"),
+    "habit_id_seq": ("habits", "habit_id", "habit_created", "habit_id"),
+    "budget_month_id_seq": ("budget_months", "id", None, None),
+    "budget_line_id_seq": ("budget_lines", "id", None, None),
+}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    for seq, (table, column, event_type, key) in _SEQUENCES.items():
+        max_id = conn.execute(sa.text(
+            f"SELECT COALESCE(MAX({column}), 0) FROM {table}"
+        )).scalar() or 0
+        if event_type:
+            max_from_log = conn.execute(sa.text(
+                f"SELECT COALESCE(MAX((payload_json->>'{key}')::int), 0) "
+                f"FROM event_log WHERE event_type = :et"
+            ), {"et": event_type}).scalar() or 0
+            max_id = max(max_id, max_from_log)
+
+        # task_id_seq уже существует (h1i2j3k4l5m6) - IF NOT EXISTS + GREATEST
+        # не дают sequence уйти назад.
+        conn.execute(sa.text(f"CREATE SEQUENCE IF NOT EXISTS {seq}"))
+        if max_id:
+            conn.execute(sa.text(
+                f"SELECT setval('{seq}', GREATEST((SELECT last_value FROM {seq}), {int(max_id)}), true)"
+            ))
+
+
+def downgrade() -> None:
+    # task_id_seq принадлежит предыдущей миграции
+    for seq in _SEQUENCES:
+        if seq != "task_id_seq":
+            op.execute(f"DROP SEQUENCE IF EXISTS {seq}")
@@ -0,0 +1,32 @@
+"""Per-account, per-rule occurrence materialization watermarks
+
+OccurrenceGenerator пропускает сущность, если rule_hash совпадает и
+materialized_until покрывает окно генерации.
+
+Revision ID: m2b3c4d5e6f7
+Revises: m1a2b3c4d5e6
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m2b3c4d5e6f7"
+down_revision = "m1a2b3c4d5e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "occurrence_watermarks",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("rule_hash", sa.String(64), nullable=False),
+        sa.Column("materialized_until", sa.Date(), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "kind", "entity_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("occurrence_watermarks")
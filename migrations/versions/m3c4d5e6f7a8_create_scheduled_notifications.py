@@ -0,0 +1,38 @@
+"""Scheduled notifications: precomputed reminder fire_at index
+
+reminder_dispatcher читает только строки с fire_at в окне вместо скана всех
+ACTIVE задач / привычек / вхождений событий каждые 2 минуты. Таблица
+заполняется app.application.reminder_index (rebuild при старте scheduler).
+
+Revision ID: m3c4d5e6f7a8
+Revises: m2b3c4d5e6f7
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m3c4d5e6f7a8"
+down_revision = "m2b3c4d5e6f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduled_notifications",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(16), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("occurrence_id", sa.Integer(), nullable=True),
+        sa.Column("fire_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("trigger", sa.String(16), nullable=False, server_default="reminder"),
+        sa.Column("body", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_scheduled_notifications_fire_at", "scheduled_notifications", ["fire_at"])
+    op.create_index("ix_scheduled_notifications_entity", "scheduled_notifications", ["source", "entity_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scheduled_notifications_entity", table_name="scheduled_notifications")
+    op.drop_index("ix_scheduled_notifications_fire_at", table_name="scheduled_notifications")
+    op.drop_table("scheduled_notifications")
@@ -0,0 +1,33 @@
+"""Dashboard block cache: shared tier of the dashboard response cache
+
+Строка на (account_id, block) с версией по event_log — общий кэш для всех
+воркеров при DASHBOARD_CACHE_SHARED=true (см. app.application.dashboard_cache).
+
+Revision ID: m4d5e6f7a8b9
+Revises: m3c4d5e6f7a8
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "m4d5e6f7a8b9"
+down_revision = "m3c4d5e6f7a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dashboard_block_cache",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("block", sa.String(32), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("payload", JSONB, nullable=False),
+        sa.Column("computed_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "block"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dashboard_block_cache")
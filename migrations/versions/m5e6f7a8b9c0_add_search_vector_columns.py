@@ -0,0 +1,49 @@
+"""Stored search_vector columns for global search
+
+Генерируемые колонки tsvector + GIN вместо выражений to_tsvector(...) в
+запросах: SearchService ищет одним UNION ALL по search_vector. Старые
+индексы по выражению (j3k4l5m6n7o8, k4l5m6n7o8p9) больше не используются.
+
+Revision ID: m5e6f7a8b9c0
+Revises: m4d5e6f7a8b9
+"""
+from alembic import op
+
+revision = "m5e6f7a8b9c0"
+down_revision = "m4d5e6f7a8b9"
+branch_labels = None
+depends_on = None
+
+# table -> (text columns, old expression index); keep in sync with app.application.search._SOURCES
+_TABLES = {
+    "tasks": (("title", "note"), "idx_tasks_fts"),
+    "events": (("title", "description"), "idx_events_fts"),
+    "operation_templates": (("title", "note"), "idx_optemplates_fts"),
+    "transactions_feed": (("description",), "idx_txfeed_fts"),
+    "habits": (("title", "note"), "idx_habits_fts"),
+    "goals": (("title",), "idx_goals_fts"),
+    "subscriptions": (("name",), "idx_subscriptions_fts"),
+    "contacts": (("name", "note"), "idx_contacts_fts"),
+    "articles": (("title", "content_md"), "idx_articles_fts"),
+}
+
+
+def _expr(columns: tuple[str, ...]) -> str:
+    return "to_tsvector('russian', " + " || ' ' || ".join(f"coalesce({c},'')" for c in columns) + ")"
+
+
+def upgrade() -> None:
+    for table, (columns, old_index) in _TABLES.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector"
+            f" GENERATED ALWAYS AS ({_expr(columns)}) STORED"
+        )
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+        op.execute(f"DROP INDEX IF EXISTS {old_index}")
+
+
+def downgrade() -> None:
+    for table, (columns, old_index) in _TABLES.items():
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        op.execute(f"CREATE INDEX IF NOT EXISTS {old_index} ON {table} USING GIN ({_expr(columns)})")
@@ -0,0 +1,27 @@
+"""Composite index for keyset pagination of the transaction feed
+
+GET /api/v2/transactions листает по (occurred_at, transaction_id) < курсор
+вместо OFFSET — каждая страница один range scan по этому индексу.
+
+Revision ID: m6f7a8b9c0d1
+Revises: m5e6f7a8b9c0
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m6f7a8b9c0d1"
+down_revision = "m5e6f7a8b9c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transactions_feed_account_occurred",
+        "transactions_feed",
+        ["account_id", sa.text("occurred_at DESC"), sa.text("transaction_id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_feed_account_occurred", table_name="transactions_feed")
@@ -0,0 +1,34 @@
+"""Category suggestion models: precomputed per (account, operation_type)
+
+Гистограммы сумм и приоры категорий для POST /transactions/suggest-category
+вместо скана ленты за 180 дней на каждый вызов
+(см. app.application.category_suggest).
+
+Revision ID: m7a8b9c0d1e2
+Revises: m6f7a8b9c0d1
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "m7a8b9c0d1e2"
+down_revision = "m6f7a8b9c0d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_suggest_models",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("operation_type", sa.String(16), nullable=False),
+        sa.Column("since", sa.Date(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("payload", JSONB, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "operation_type"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("category_suggest_models")
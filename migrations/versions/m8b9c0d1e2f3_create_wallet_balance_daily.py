@@ -0,0 +1,67 @@
+"""Wallet balance daily snapshots for net-worth and savings reports
+
+Баланс на конец дня по кошельку, только дни с движением; ведёт
+WalletBalancesProjector. Бэкфилл из transactions_feed: баланс дня =
+текущий баланс минус движения после этого дня.
+
+Revision ID: m8b9c0d1e2f3
+Revises: m7a8b9c0d1e2
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m8b9c0d1e2f3"
+down_revision = "m7a8b9c0d1e2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "wallet_balance_daily",
+        sa.Column("wallet_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("delta", sa.Numeric(precision=20, scale=2), nullable=False),
+        sa.Column("balance", sa.Numeric(precision=20, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint("wallet_id", "day"),
+    )
+    op.create_index("ix_wallet_balance_daily_account_id", "wallet_balance_daily", ["account_id"])
+
+    op.execute("""
+        WITH moves AS (
+            SELECT account_id, wallet_id AS wid, occurred_at, amount AS delta
+              FROM transactions_feed
+             WHERE operation_type = 'INCOME' AND wallet_id IS NOT NULL
+            UNION ALL
+            SELECT account_id, wallet_id, occurred_at, -amount
+              FROM transactions_feed
+             WHERE operation_type = 'EXPENSE' AND wallet_id IS NOT NULL
+            UNION ALL
+            SELECT account_id, from_wallet_id, occurred_at, -amount
+              FROM transactions_feed
+             WHERE operation_type = 'TRANSFER' AND from_wallet_id IS NOT NULL
+            UNION ALL
+            SELECT account_id, to_wallet_id, occurred_at, amount
+              FROM transactions_feed
+             WHERE operation_type = 'TRANSFER' AND to_wallet_id IS NOT NULL
+        ),
+        daily AS (
+            SELECT account_id, wid, (occurred_at AT TIME ZONE 'UTC')::date AS day, sum(delta) AS delta
+              FROM moves
+             GROUP BY account_id, wid, (occurred_at AT TIME ZONE 'UTC')::date
+        )
+        INSERT INTO wallet_balance_daily (wallet_id, day, account_id, delta, balance)
+        SELECT d.wid, d.day, d.account_id, d.delta,
+               w.balance - coalesce(sum(d.delta) OVER (
+                   PARTITION BY d.wid ORDER BY d.day DESC
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ), 0)
+          FROM daily d
+          JOIN wallet_balances w ON w.wallet_id = d.wid
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_wallet_balance_daily_account_id", table_name="wallet_balance_daily")
+    op.drop_table("wallet_balance_daily")
@@ -0,0 +1,51 @@
+"""CalDAV sync state: per-account change counter and change journal
+
+caldav_sync_state — getctag / sync-token; caldav_changes — последняя
+правка каждой задачи (надгробия для архивных). Бэкфилл: все задачи
+получают seq = 1, счётчик аккаунта — 1.
+
+Revision ID: m9c0d1e2f3a4
+Revises: m8b9c0d1e2f3
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "m9c0d1e2f3a4"
+down_revision = "m8b9c0d1e2f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "caldav_sync_state",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("account_id"),
+    )
+    op.create_table(
+        "caldav_changes",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), server_default="false", nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "task_id"),
+    )
+    op.create_index("ix_caldav_changes_account_seq", "caldav_changes", ["account_id", "seq"])
+
+    op.execute("""
+        INSERT INTO caldav_changes (account_id, task_id, seq, deleted)
+        SELECT account_id, task_id, 1, status = 'ARCHIVED'
+          FROM tasks
+    """)
+    op.execute("""
+        INSERT INTO caldav_sync_state (account_id, seq)
+        SELECT DISTINCT account_id, 1
+          FROM tasks
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_caldav_changes_account_seq", table_name="caldav_changes")
+    op.drop_table("caldav_changes")
+    op.drop_table("caldav_sync_state")
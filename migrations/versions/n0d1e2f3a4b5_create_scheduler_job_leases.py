@@ -0,0 +1,37 @@
+"""Scheduler job leases for running several uvicorn workers
+
+Одна строка на задание планировщика: кто и до какого момента держит тик,
+плюс длительность/статус последнего запуска.
+
+Revision ID: n0d1e2f3a4b5
+Revises: m9c0d1e2f3a4
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "n0d1e2f3a4b5"
+down_revision = "m9c0d1e2f3a4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduler_job_leases",
+        sa.Column("job_id", sa.String(length=64), nullable=False),
+        sa.Column("owner", sa.String(length=128), nullable=True),
+        sa.Column("lease_until", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_started_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_duration_ms", sa.Integer(), nullable=True),
+        sa.Column("last_status", sa.String(length=16), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("run_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("failure_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total_duration_ms", sa.BigInteger(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduler_job_leases")
@@ -0,0 +1,53 @@
+"""Durable background job queue
+
+Очередь фоновых задач: воркеры (python -m app.worker) забирают готовые
+строки через FOR UPDATE SKIP LOCKED; повторы с backoff, приоритеты,
+idempotency_key.
+
+Revision ID: o1e2f3a4b5c6
+Revises: n0d1e2f3a4b5
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "o1e2f3a4b5c6"
+down_revision = "n0d1e2f3a4b5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "background_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column("payload", JSONB(), server_default="{}", nullable=False),
+        sa.Column("priority", sa.SmallInteger(), server_default="0", nullable=False),
+        sa.Column("status", sa.String(length=16), server_default="queued", nullable=False),
+        sa.Column("run_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("attempts", sa.SmallInteger(), server_default="0", nullable=False),
+        sa.Column("max_attempts", sa.SmallInteger(), server_default="5", nullable=False),
+        sa.Column("idempotency_key", sa.String(length=200), nullable=True),
+        sa.Column("locked_by", sa.String(length=128), nullable=True),
+        sa.Column("locked_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("idempotency_key"),
+    )
+    op.create_index(
+        "ix_background_jobs_ready", "background_jobs", [sa.text("priority DESC"), "run_at"],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        "ix_background_jobs_running", "background_jobs", ["locked_at"],
+        postgresql_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_background_jobs_running", table_name="background_jobs")
+    op.drop_index("ix_background_jobs_ready", table_name="background_jobs")
+    op.drop_table("background_jobs")
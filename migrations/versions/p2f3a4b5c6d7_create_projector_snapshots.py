@@ -0,0 +1,39 @@
+"""Projector read-model snapshots
+
+Снимки строк read model'а projector'а на checkpoint: пересборка
+восстанавливает последний снимок и проигрывает только хвост event_log.
+
+Revision ID: p2f3a4b5c6d7
+Revises: o1e2f3a4b5c6
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "p2f3a4b5c6d7"
+down_revision = "o1e2f3a4b5c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "projector_snapshots",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("projector_name", sa.String(length=128), nullable=False),
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("last_event_id", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_projector_snapshots_lookup", "projector_snapshots",
+        ["projector_name", "account_id", "last_event_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_projector_snapshots_lookup", table_name="projector_snapshots")
+    op.drop_table("projector_snapshots")
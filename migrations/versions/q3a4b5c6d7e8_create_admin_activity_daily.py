@@ -0,0 +1,74 @@
+"""Admin activity rollup
+
+admin_activity_daily: события активности по аккаунту и дню (МСК) —
+/admin считает DAU/WAU/MAU и счётчики по ней, а не по event_log.
+Backfill — одним INSERT … SELECT … GROUP BY (account, день МСК) с
+checkpoint'ами AdminActivityProjector на последнем событии аккаунта;
+дальше таблицу ведёт проектор.
+
+Revision ID: q3a4b5c6d7e8
+Revises: p2f3a4b5c6d7
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "q3a4b5c6d7e8"
+down_revision = "p2f3a4b5c6d7"
+branch_labels = None
+depends_on = None
+
+# Копия projectors.admin_activity.ACTIVITY_EVENT_TYPES на момент миграции:
+# порядок = номер бита в type_mask
+_ACTIVITY_EVENT_TYPES = (
+    "transaction_created",
+    "task_created",
+    "task_completed",
+    "task_occurrence_completed",
+    "habit_occurrence_completed",
+    "calendar_event_created",
+    "wallet_created",
+    "category_created",
+    "wish_created",
+    "goal_created",
+    "budget_month_created",
+    "user_logged_in",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "admin_activity_daily",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("event_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("type_mask", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_event_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "day"),
+    )
+    op.create_index("ix_admin_activity_daily_day", "admin_activity_daily", ["day"])
+
+    bits = ", ".join(f"('{t}', {1 << i})" for i, t in enumerate(_ACTIVITY_EVENT_TYPES))
+    op.execute(f"""
+        INSERT INTO admin_activity_daily (account_id, day, event_count, type_mask, last_event_at)
+        SELECT e.account_id,
+               ((e.occurred_at AT TIME ZONE 'UTC') + INTERVAL '3 hours')::date,
+               COUNT(*),
+               BIT_OR(t.bit),
+               MAX(e.occurred_at)
+        FROM event_log e
+        JOIN (VALUES {bits}) AS t(event_type, bit) ON t.event_type = e.event_type
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO projector_checkpoints (projector_name, account_id, last_event_id)
+        SELECT 'admin_activity', account_id, MAX(id)
+        FROM event_log
+        GROUP BY account_id
+        ON CONFLICT (projector_name, account_id) DO UPDATE SET last_event_id = EXCLUDED.last_event_id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM projector_checkpoints WHERE projector_name = 'admin_activity'")
+    op.drop_index("ix_admin_activity_daily_day", table_name="admin_activity_daily")
+    op.drop_table("admin_activity_daily")
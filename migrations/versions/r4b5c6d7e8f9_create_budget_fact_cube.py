@@ -0,0 +1,65 @@
+"""Budget fact cube
+
+budget_fact_cube: суммы transactions_feed по бюджетному дню, категории,
+целям, типам кошельков и валюте — бюджет/матрица/отчёт читают факт из
+него. Заполняется из текущей ленты (budget_month живёт только в ней),
+дальше ведётся TransactionsFeedProjector.
+
+Revision ID: r4b5c6d7e8f9
+Revises: q3a4b5c6d7e8
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "r4b5c6d7e8f9"
+down_revision = "q3a4b5c6d7e8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "budget_fact_cube",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("operation_type", sa.String(20), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("from_goal_id", sa.Integer(), nullable=False),
+        sa.Column("to_goal_id", sa.Integer(), nullable=False),
+        sa.Column("from_wallet_type", sa.String(20), nullable=False),
+        sa.Column("to_wallet_type", sa.String(20), nullable=False),
+        sa.Column("currency", sa.String(3), nullable=False),
+        sa.Column("amount_sum", sa.Numeric(precision=20, scale=2), nullable=False),
+        sa.Column("tx_count", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint(
+            "account_id", "day", "operation_type", "category_id", "from_goal_id", "to_goal_id",
+            "from_wallet_type", "to_wallet_type", "currency",
+        ),
+    )
+    op.execute("""
+        INSERT INTO budget_fact_cube (
+            account_id, day, operation_type, category_id, from_goal_id, to_goal_id,
+            from_wallet_type, to_wallet_type, currency, amount_sum, tx_count
+        )
+        SELECT f.account_id,
+               COALESCE(f.budget_month, (f.occurred_at AT TIME ZONE 'UTC')::date),
+               f.operation_type,
+               COALESCE(f.category_id, 0),
+               COALESCE(f.from_goal_id, 0),
+               COALESCE(f.to_goal_id, 0),
+               COALESCE(fw.wallet_type, ''),
+               COALESCE(tw.wallet_type, ''),
+               f.currency,
+               SUM(f.amount),
+               COUNT(*)
+        FROM transactions_feed f
+        LEFT JOIN wallet_balances fw ON fw.wallet_id =
+            CASE WHEN f.operation_type = 'EXPENSE' THEN f.wallet_id ELSE f.from_wallet_id END
+        LEFT JOIN wallet_balances tw ON tw.wallet_id =
+            CASE WHEN f.operation_type = 'INCOME' THEN f.wallet_id ELSE f.to_wallet_id END
+        GROUP BY 1, 2, 3, 4, 5, 6, 7, 8, 9
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("budget_fact_cube")
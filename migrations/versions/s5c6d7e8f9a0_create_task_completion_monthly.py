@@ -0,0 +1,45 @@
+"""Task completion monthly rollup
+
+task_completion_monthly: выполненные задачи со сроком (в срок / с опозданием)
+по месяцу выполнения — глобальная дисциплина Life Score читается отсюда.
+Заполняется из текущих tasks; закрытые месяцы сразу заморожены
+(calculated_at позже конца месяца), открытый пересчитывает StrategyService.
+
+Revision ID: s5c6d7e8f9a0
+Revises: r4b5c6d7e8f9
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "s5c6d7e8f9a0"
+down_revision = "r4b5c6d7e8f9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "task_completion_monthly",
+        sa.Column("account_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("on_time", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("late", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("calculated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("account_id", "year", "month"),
+    )
+    op.execute("""
+        INSERT INTO task_completion_monthly (account_id, year, month, on_time, late)
+        SELECT account_id,
+               EXTRACT(YEAR FROM completed_at AT TIME ZONE 'UTC')::int,
+               EXTRACT(MONTH FROM completed_at AT TIME ZONE 'UTC')::int,
+               COUNT(*) FILTER (WHERE (completed_at AT TIME ZONE 'UTC')::date <= due_date),
+               COUNT(*) FILTER (WHERE (completed_at AT TIME ZONE 'UTC')::date > due_date)
+        FROM tasks
+        WHERE status = 'DONE' AND completed_at IS NOT NULL AND due_date IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("task_completion_monthly")
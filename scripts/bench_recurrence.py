@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: expand thousands of synthetic recurrence rules over the
+standard occurrence window.
+
+Rules start up to 10 years in the past, so the cost of reaching the window
+dominates if expansion steps period by period instead of seeking.
+
+Usage:
+    python scripts/bench_recurrence.py [rules] [repeats]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, ".")
+
+from app.domain.recurrence import RuleSpec, generate_occurrence_dates, expand_rules
+
+
+def synthetic_rules(n: int, seed: int = 42) -> list[RuleSpec]:
+    rnd = random.Random(seed)
+    today = date.today()
+    rules = []
+    for _ in range(n):
+        freq = rnd.choice(["DAILY", "INTERVAL_DAYS", "WEEKLY", "MONTHLY", "YEARLY"])
+        start = today - timedelta(days=rnd.randrange(0, 3650))
+        rules.append(RuleSpec(
+            freq=freq,
+            interval=rnd.choice([1, 1, 2, 3, 7]),
+            start_date=start,
+            until_date=None,
+            count=rnd.randint(10, 5000) if rnd.random() < 0.2 else None,
+            by_weekday=set(rnd.sample(range(7), rnd.randint(1, 5))) if freq == "WEEKLY" else None,
+            by_monthday=rnd.randint(1, 31) if freq == "MONTHLY" else None,
+            monthday_clip_to_last_day=rnd.random() < 0.5,
+            by_month=start.month if freq == "YEARLY" else None,
+            by_monthday_for_year=start.day if freq == "YEARLY" else None,
+            dates=None,
+        ))
+    return rules
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rules = synthetic_rules(n)
+    today = date.today()
+    # Same window as OccurrenceGenerator._get_window
+    ws = today - timedelta(days=30)
+    we = max(today + timedelta(days=90), date(today.year, 12, 31))
+
+    def bench(label, fn):
+        best = float("inf")
+        total = 0
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            total = fn()
+            best = min(best, time.perf_counter() - t0)
+        print(f"{label:<26} {total} dates, best of {repeats}: "
+              f"{best * 1000:.1f} ms ({best / n * 1e6:.1f} us/rule)")
+
+    print(f"{n} rules, window {ws}..{we}")
+    bench("generate_occurrence_dates", lambda: sum(len(generate_occurrence_dates(r, ws, we)) for r in rules))
+    bench("expand_rules", lambda: len(expand_rules(rules, ws, we)))
+
+
+if __name__ == "__main__":
+    main()
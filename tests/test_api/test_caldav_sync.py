@@ -0,0 +1,198 @@
+"""
+Tests for CalDAV incremental sync: getctag, sync-collection, calendar-multiget,
+conditional GET.
+"""
+import re
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event as sa_event, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.infrastructure.db.session import Base, get_db
+from app.application.tasks_usecases import (
+    ArchiveTaskUseCase, CreateTaskUseCase, DeleteTaskUseCase, UpdateTaskUseCase,
+)
+
+ACCT = 1
+BASE = f"/caldav/calendars/{ACCT}/tasks/"
+
+SYNC = (
+    '<?xml version="1.0"?><D:sync-collection xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    "<D:sync-token>{token}</D:sync-token><D:sync-level>1</D:sync-level>"
+    "<D:prop><D:getetag/>{data}</D:prop></D:sync-collection>"
+)
+
+
+@pytest.fixture()
+def engine():
+    eng = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    for table in Base.metadata.tables.values():
+        for col in table.columns:
+            if isinstance(col.type, JSONB):
+                col.type = JSON()
+    Base.metadata.create_all(eng)
+    yield eng
+    eng.dispose()
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture()
+def client(db):
+    def override_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_db
+    with patch("app.api.caldav.router.authenticate_caldav", return_value=SimpleNamespace(id=ACCT)):
+        yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _task(db, title):
+    return CreateTaskUseCase(db).execute(account_id=ACCT, title=title)
+
+
+def _sync(client, token="", data=True):
+    body = SYNC.format(token=token, data="<C:calendar-data/>" if data else "")
+    return client.request("REPORT", BASE, content=body, headers={"Depth": "1"})
+
+
+def _token(text):
+    return re.search(r"<D:sync-token>([^<]*)</D:sync-token>", text).group(1)
+
+
+def _hrefs(text):
+    return re.findall(r"<D:href>([^<]*)</D:href>", text)
+
+
+class TestCollectionVersion:
+    def test_ctag_changes_with_tasks(self, client, db):
+        r1 = client.request("PROPFIND", BASE, headers={"Depth": "0"})
+        _task(db, "Купить хлеб")
+        r2 = client.request("PROPFIND", BASE, headers={"Depth": "0"})
+        ctag = re.compile(r"<CS:getctag>([^<]*)</CS:getctag>")
+        assert ctag.search(r1.text).group(1) != ctag.search(r2.text).group(1)
+        assert "<D:sync-collection/>" in r2.text
+
+
+class TestSyncCollection:
+    def test_initial_sync_returns_everything(self, client, db):
+        a, b = _task(db, "A"), _task(db, "B")
+        r = _sync(client)
+        assert r.status_code == 207
+        assert _hrefs(r.text) == [f"{BASE}task-{a}.ics", f"{BASE}task-{b}.ics"]
+        assert "BEGIN:VTODO" in r.text
+
+    def test_unchanged_calendar_is_one_query(self, client, db, engine):
+        _task(db, "A")
+        token = _token(_sync(client).text)
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(engine, "before_cursor_execute", listener)
+        try:
+            r = _sync(client, token)
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", listener)
+        assert _hrefs(r.text) == []
+        assert _token(r.text) == token
+        assert len(statements) == 1
+
+    def test_delta_with_tombstones(self, client, db):
+        a, b, c, d = (_task(db, t) for t in "ABCD")
+        token = _token(_sync(client).text)
+
+        UpdateTaskUseCase(db).execute(a, ACCT, title="A2")
+        ArchiveTaskUseCase(db).execute(b, ACCT)
+        DeleteTaskUseCase(db).execute(c, ACCT)
+        r = _sync(client, token)
+
+        assert sorted(_hrefs(r.text)) == sorted(f"{BASE}task-{t}.ics" for t in (a, b, c))
+        assert "SUMMARY:A2" in r.text
+        assert r.text.count("HTTP/1.1 404 Not Found") == 2
+        assert f"task-{d}.ics" not in r.text
+        assert _token(r.text) != token
+
+    def test_foreign_or_future_token_rejected(self, client, db):
+        _task(db, "A")
+        token = _token(_sync(client).text)
+        for bad in ("garbage", token.replace(f":{ACCT}:", ":2:"), token[:-1] + "9"):
+            r = _sync(client, bad)
+            assert r.status_code == 403
+            assert "valid-sync-token" in r.text
+
+    def test_etag_only_sync_skips_calendar_data(self, client, db):
+        _task(db, "A")
+        r = _sync(client, data=False)
+        assert "<D:getetag>" in r.text
+        assert "calendar-data" not in r.text
+
+
+class TestMultiget:
+    def test_requested_hrefs_only(self, client, db):
+        a, _b = _task(db, "Хлеб & молоко"), _task(db, "B")
+        body = (
+            '<C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+            "<D:prop><D:getetag/><C:calendar-data/></D:prop>"
+            f"<D:href>{BASE}task-{a}.ics</D:href><D:href>{BASE}task-999.ics</D:href>"
+            "</C:calendar-multiget>"
+        )
+        r = client.request("REPORT", BASE, content=body)
+        assert _hrefs(r.text) == [f"{BASE}task-{a}.ics", f"{BASE}task-999.ics"]
+        assert "SUMMARY:Хлеб &amp; молоко" in r.text
+        assert r.text.count("HTTP/1.1 404 Not Found") == 1
+
+
+class TestConditionalGet:
+    def test_if_none_match(self, client, db):
+        a = _task(db, "A")
+        etag = client.get(f"{BASE}task-{a}.ics").headers["ETag"]
+        assert client.get(f"{BASE}task-{a}.ics", headers={"If-None-Match": etag}).status_code == 304
+
+        UpdateTaskUseCase(db).execute(a, ACCT, note="заметка")
+        r = client.get(f"{BASE}task-{a}.ics", headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["ETag"] != etag
+
+    def test_put_and_delete_bump_journal(self, client, db):
+        a = _task(db, "A")
+        token = _token(_sync(client).text)
+        vtodo = "BEGIN:VCALENDAR\r\nBEGIN:VTODO\r\nSUMMARY:A из iPhone\r\nEND:VTODO\r\nEND:VCALENDAR\r\n"
+        r = client.put(f"{BASE}task-{a}.ics", content=vtodo)
+        assert r.status_code == 204
+        assert client.get(f"{BASE}task-{a}.ics").headers["ETag"] == r.headers["ETag"]
+
+        assert client.delete(f"{BASE}task-{a}.ics").status_code == 204
+        r = _sync(client, token)
+        assert _hrefs(r.text) == [f"{BASE}task-{a}.ics"]
+        assert "HTTP/1.1 404 Not Found" in r.text
+
+
+class TestDirectEdits:
+    def test_v2_patch_bumps_ctag(self, client, db):
+        a = _task(db, "A")
+        ctag = re.compile(r"<CS:getctag>([^<]*)</CS:getctag>")
+        before = ctag.search(client.request("PROPFIND", BASE, headers={"Depth": "0"}).text).group(1)
+        etag = client.get(f"{BASE}task-{a}.ics").headers["ETag"]
+
+        with patch("app.api.v2.tasks.get_user_id", return_value=ACCT):
+            assert client.patch(f"/api/v2/tasks/{a}", json={"title": "A2"}).status_code == 200
+
+        after = ctag.search(client.request("PROPFIND", BASE, headers={"Depth": "0"}).text).group(1)
+        assert after != before
+        r = client.get(f"{BASE}task-{a}.ics", headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert "SUMMARY:A2" in r.text
@@ -0,0 +1,108 @@
+"""
+Tests that async handlers with sync DB work do not block the event loop.
+
+A probe coroutine ticks every few ms while a request runs against a DB
+whose every statement is artificially slow; the largest gap between ticks
+is the time the loop was blocked.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event as sa_event, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.infrastructure.db.session import Base, get_db
+from app.application.tasks_usecases import CreateTaskUseCase
+
+ACCT = 1
+BASE = f"/caldav/calendars/{ACCT}/tasks/"
+SLOW_QUERY = 0.05     # seconds per SQL statement
+MAX_BLOCK = 0.04      # loop stall we tolerate (must be < SLOW_QUERY)
+
+
+@pytest.fixture()
+def db():
+    eng = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    for table in Base.metadata.tables.values():
+        for col in table.columns:
+            if isinstance(col.type, JSONB):
+                col.type = JSON()
+    Base.metadata.create_all(eng)
+    session = sessionmaker(bind=eng)()
+    for title in ("A", "B", "C"):
+        CreateTaskUseCase(session).execute(account_id=ACCT, title=title)
+    session.commit()
+
+    sa_event.listen(eng, "before_cursor_execute", lambda *a: time.sleep(SLOW_QUERY))
+    yield session
+    session.close()
+    eng.dispose()
+
+
+@pytest.fixture()
+def override(db):
+    def override_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_db
+    with patch("app.api.caldav.router.authenticate_caldav", return_value=SimpleNamespace(id=ACCT)):
+        yield
+    app.dependency_overrides.clear()
+
+
+async def _max_loop_block(work) -> float:
+    """Run `work` while ticking the loop; return the longest stall in seconds."""
+    stop = asyncio.Event()
+    worst = 0.0
+
+    async def probe():
+        nonlocal worst
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            worst = max(worst, now - last - 0.005)
+            last = now
+
+    task = asyncio.create_task(probe())
+    await asyncio.sleep(0.01)
+    try:
+        await work()
+    finally:
+        stop.set()
+        await task
+    return worst
+
+
+def _request(method, url, **kwargs):
+    async def work():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            r = await client.request(method, url, **kwargs)
+            assert r.status_code < 400, r.text
+    return work
+
+
+def test_probe_detects_blocking():
+    async def blocking():
+        time.sleep(SLOW_QUERY)
+
+    assert asyncio.run(_max_loop_block(blocking)) >= MAX_BLOCK
+
+
+@pytest.mark.parametrize("method,url,kwargs", [
+    ("PROPFIND", BASE, {"headers": {"Depth": "1"}}),
+    ("REPORT", BASE, {"content": '<C:calendar-query xmlns:C="urn:ietf:params:xml:ns:caldav"/>'}),
+    ("GET", f"{BASE}task-1.ics", {}),
+])
+def test_caldav_handlers_do_not_block_loop(override, method, url, kwargs):
+    assert asyncio.run(_max_loop_block(_request(method, url, **kwargs))) < MAX_BLOCK
@@ -0,0 +1,126 @@
+"""
+Tests for GET /api/v2/transactions — keyset pagination and cached filter totals.
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event as sa_event, JSON
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.main import app
+from app.application import dashboard_cache
+from app.infrastructure.db.session import Base, get_db
+from app.infrastructure.db.models import TransactionFeed
+from app.infrastructure.eventlog.repository import EventLogRepository
+
+ACCT = 1
+_T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    # StaticPool: the test commits, and TestClient runs the endpoint in another thread
+    eng = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
+    for table in Base.metadata.tables.values():
+        for col in table.columns:
+            if isinstance(col.type, JSONB):
+                col.type = JSON()
+    Base.metadata.create_all(eng)
+    yield eng
+    eng.dispose()
+
+
+@pytest.fixture()
+def db(engine):
+    dashboard_cache.invalidate_all()
+    SessionLocal = sessionmaker(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.query(TransactionFeed).delete()
+    session.commit()
+    session.close()
+    dashboard_cache.invalidate_all()
+
+
+@pytest.fixture()
+def client(db):
+    def override_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_db
+    with patch("app.api.v2.finance.get_user_id", return_value=ACCT):
+        yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _seed(db, n=7):
+    # Two rows share a timestamp so the tiebreak on transaction_id matters
+    for i in range(1, n + 1):
+        db.add(TransactionFeed(
+            transaction_id=i, account_id=ACCT,
+            operation_type="INCOME" if i % 3 == 0 else "EXPENSE",
+            amount=Decimal(i * 10), currency="RUB", description=f"tx {i}",
+            occurred_at=_T0 + timedelta(hours=min(i, 5)),
+        ))
+    db.commit()
+
+
+def test_cursor_walks_all_rows_in_order(client, db):
+    _seed(db)
+    seen, cursor = [], None
+    for _ in range(10):
+        params = {"per_page": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v2/transactions", params=params).json()
+        seen += [item["transaction_id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+    assert body["total"] == 7
+
+
+def test_offset_pages_still_supported(client, db):
+    _seed(db)
+    body = client.get("/api/v2/transactions", params={"per_page": 3, "page": 2}).json()
+    assert [i["transaction_id"] for i in body["items"]] == [4, 3, 2]
+    assert body["pages"] == 3
+
+
+def test_invalid_cursor_rejected(client, db):
+    assert client.get("/api/v2/transactions", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_totals_cached_until_transaction_event(client, db, engine):
+    _seed(db)
+    first = client.get("/api/v2/transactions", params={"operation_type": "EXPENSE"}).json()
+    assert first["total"] == 5
+    assert first["totals"] == {"EXPENSE": 10 + 20 + 40 + 50 + 70}
+
+    statements = []
+    listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+    sa_event.listen(engine, "before_cursor_execute", listener)
+    try:
+        body = client.get("/api/v2/transactions", params={"operation_type": "EXPENSE", "per_page": 2}).json()
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", listener)
+    assert body["totals"] == first["totals"]
+    assert not any("GROUP BY transactions_feed" in s for s in statements)
+
+    db.add(TransactionFeed(
+        transaction_id=100, account_id=ACCT, operation_type="EXPENSE", amount=Decimal(5),
+        currency="RUB", description="new", occurred_at=_T0,
+    ))
+    EventLogRepository(db).append_event(ACCT, "transaction_created", {"transaction_id": 100})
+    db.commit()
+
+    body = client.get("/api/v2/transactions", params={"operation_type": "EXPENSE"}).json()
+    assert body["total"] == 6
+    assert body["totals"]["EXPENSE"] == first["totals"]["EXPENSE"] + 5
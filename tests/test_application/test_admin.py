@@ -168,3 +168,54 @@ class TestCSRF:
         with pytest.raises(HTTPException) as exc_info:
             _verify_csrf(request, "wrong_token")
         assert exc_info.value.status_code == 403
+
+
+# ── Activity rollup ──────────────────────────────────────────────────────────
+
+class TestActivityRollup:
+    """DAU/WAU/MAU and per-user counts come from admin_activity_daily."""
+
+    NOW = datetime(2026, 3, 20, 12, 0, tzinfo=timezone(timedelta(hours=3)))
+
+    def _seed(self, db):
+        for uid in (1, 2, 3):
+            db.add(User(id=uid, email=f"u{uid}@example.com"))
+        events = [
+            (1, "transaction_created", 0), (1, "task_completed", 0), (1, "user_logged_in", 3),
+            (2, "habit_occurrence_completed", 5),
+            (3, "transaction_created", 20),
+            (3, "wallet_renamed", 0),  # не активность
+        ]
+        for i, (uid, etype, days_ago) in enumerate(events, start=1):
+            db.add(EventLog(id=i, account_id=uid, event_type=etype, payload_json={},
+                            occurred_at=self.NOW - timedelta(days=days_ago)))
+        db.commit()
+
+    def test_overview_from_rollup(self, db_session):
+        from app.readmodels.admin_stats import get_overview_stats
+        self._seed(db_session)
+        stats = get_overview_stats(db_session, self.NOW)
+        assert (stats["dau"], stats["wau"], stats["mau"]) == (1, 2, 3)
+        assert stats["retention_14d"] == 1
+        assert stats["top_active_30d"][0] == {"user_id": 1, "email": "u1@example.com", "events_30d": 3}
+
+    def test_users_and_detail(self, db_session):
+        from app.readmodels.admin_stats import get_user_detail, get_users_list
+        self._seed(db_session)
+        users = {u["user_id"]: u for u in get_users_list(db_session, self.NOW)}
+        assert (users[1]["activity_7d"], users[3]["activity_7d"], users[3]["activity_30d"]) == (3, 0, 1)
+        assert users[2]["is_active"]
+
+        detail = get_user_detail(db_session, 1, self.NOW)
+        assert detail["active_days_14d"] == 2
+        assert detail["event_types_30d"] == ["transaction_created", "task_completed", "user_logged_in"]
+
+    def test_refresh_is_incremental(self, db_session):
+        from app.readmodels.admin_stats import refresh_activity_rollup
+        self._seed(db_session)
+        assert refresh_activity_rollup(db_session) == 6  # все события, включая не-активность
+        assert refresh_activity_rollup(db_session) == 0
+        db_session.add(EventLog(id=10, account_id=2, event_type="task_created", payload_json={},
+                                occurred_at=self.NOW))
+        db_session.commit()
+        assert refresh_activity_rollup(db_session) == 1
@@ -5,9 +5,10 @@ Batch 4A tests:
 """
 import pytest
 from datetime import date, datetime, time, timedelta, timezone
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
 
 from app.infrastructure.db.models import (
+    BackgroundJob,
     User,
     CalendarEventModel,
     EventOccurrenceModel,
@@ -16,7 +17,8 @@ from app.infrastructure.db.models import (
     NotificationDelivery,
     UserNotificationSettings,
 )
-from app.application.reminder_dispatcher import _dispatch_event_reminders, MSK
+from app.application.reminder_dispatcher import dispatch_due_reminders, MSK
+from app.application.reminder_index import ReminderIndex
 from app.application.notification_engine import dispatch_pending_deliveries
 
 _UTC = timezone.utc
@@ -79,6 +81,17 @@ def _event_reminder(db, occ: EventOccurrenceModel, *, mode="fixed_time",
     return rem
 
 
+def _queued(db) -> list[dict]:
+    """Messages queued as delivery.send jobs."""
+    return [m for job in db.query(BackgroundJob).filter_by(kind="delivery.send") for m in job.payload["messages"]]
+
+
+def _dispatch_events(db, now_msk: datetime) -> int:
+    # Index is built relative to "now"; the flush hook used the real clock
+    ReminderIndex(db, now=now_msk).rebuild()
+    return dispatch_due_reminders(db, now_msk)
+
+
 def _notif(db, *, user_id=USER_ID) -> NotificationModel:
     n = NotificationModel(
         user_id=user_id,
@@ -102,7 +115,7 @@ def _notif(db, *, user_id=USER_ID) -> NotificationModel:
 # ---------------------------------------------------------------------------
 
 def test_event_fixed_time_reminder_fires(db_session):
-    """All-day event with fixed_time=09:00 reminder: dispatcher calls send_push at 09:01 MSK."""
+    """All-day event with fixed_time=09:00 reminder: dispatcher queues the push at 09:01 MSK."""
     ev = _event(db_session)
     occ = _occurrence(db_session, ev, start_date=TODAY, start_time=None)
     _event_reminder(db_session, occ, mode="fixed_time", fixed_time=time(9, 0))
@@ -110,11 +123,10 @@ def test_event_fixed_time_reminder_fires(db_session):
     # now_msk = 09:01 on the event date — just inside the 2-minute window
     now_msk = datetime.combine(TODAY, time(9, 1), tzinfo=MSK)
 
-    with patch("app.application.reminder_dispatcher.send_push_to_user", return_value=1) as mock_send:
-        result = _dispatch_event_reminders(db_session, now_msk)
+    result = _dispatch_events(db_session, now_msk)
 
     assert result == 1
-    mock_send.assert_called_once()
+    assert len(_queued(db_session)) == 1
 
 
 def test_event_fixed_time_reminder_too_early_does_not_fire(db_session):
@@ -125,11 +137,10 @@ def test_event_fixed_time_reminder_too_early_does_not_fire(db_session):
 
     now_msk = datetime.combine(TODAY, time(8, 58), tzinfo=MSK)
 
-    with patch("app.application.reminder_dispatcher.send_push_to_user", return_value=1) as mock_send:
-        result = _dispatch_event_reminders(db_session, now_msk)
+    result = _dispatch_events(db_session, now_msk)
 
     assert result == 0
-    mock_send.assert_not_called()
+    assert _queued(db_session) == []
 
 
 def test_event_fixed_time_reminder_skipped_when_no_fixed_time(db_session):
@@ -140,11 +151,10 @@ def test_event_fixed_time_reminder_skipped_when_no_fixed_time(db_session):
 
     now_msk = datetime.combine(TODAY, time(9, 1), tzinfo=MSK)
 
-    with patch("app.application.reminder_dispatcher.send_push_to_user", return_value=1) as mock_send:
-        result = _dispatch_event_reminders(db_session, now_msk)
+    result = _dispatch_events(db_session, now_msk)
 
     assert result == 0
-    mock_send.assert_not_called()
+    assert _queued(db_session) == []
 
 
 def test_event_offset_reminder_still_fires(db_session):
@@ -156,11 +166,10 @@ def test_event_offset_reminder_still_fires(db_session):
 
     now_msk = datetime.combine(TODAY, time(9, 55, 30), tzinfo=MSK)
 
-    with patch("app.application.reminder_dispatcher.send_push_to_user", return_value=1) as mock_send:
-        result = _dispatch_event_reminders(db_session, now_msk)
+    result = _dispatch_events(db_session, now_msk)
 
     assert result == 1
-    mock_send.assert_called_once()
+    assert len(_queued(db_session)) == 1
 
 
 # ---------------------------------------------------------------------------
@@ -196,9 +205,9 @@ def test_dispatch_pending_deliveries_limit(db_session):
         db_session.add(d)
         db_session.flush()
 
-    # Patch send_push_to_user so inapp delivery completes without real push
-    with patch("app.application.push_service.send_push_to_user", return_value=0):
-        dispatch_pending_deliveries(db_session)
+    # In-app pushes are queued for the worker in one delivery.send job
+    dispatch_pending_deliveries(db_session)
+    assert len(_queued(db_session)) == 500
 
     sent_count = db_session.query(NotificationDelivery).filter_by(status="sent").count()
     still_pending = db_session.query(NotificationDelivery).filter_by(status="pending").count()
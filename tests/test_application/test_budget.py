@@ -16,6 +16,7 @@ from app.application.budget import (
     CreateBudgetVariantUseCase,
     BudgetValidationError, build_budget_view,
 )
+from app.readmodels.fact_cube import rebuild_fact_cube
 
 
 _NOW = datetime(2026, 2, 14, 12, 0, 0)
@@ -206,6 +207,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 12),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
 
@@ -241,6 +243,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 15),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
 
@@ -267,6 +270,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 10),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
         line = next(l for l in view["income_lines"] if l["category_id"] == 1)
@@ -285,6 +289,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 10),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
         line = next(l for l in view["income_lines"] if l["category_id"] == 1)
@@ -299,6 +304,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 5),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
         assert view["other_expense"]["fact"] == Decimal("3000")
@@ -312,6 +318,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 8),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
         assert view["other_income"]["fact"] == Decimal("500")
@@ -345,6 +352,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 2, 10),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
         line = next(l for l in view["income_lines"] if l["category_id"] == 1)
@@ -387,6 +395,7 @@ class TestBuildBudgetView:
             ),
         ])
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
 
@@ -414,6 +423,7 @@ class TestBuildBudgetView:
             occurred_at=datetime(2026, 3, 15),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, sample_account_id)
 
         view = build_budget_view(db_session, sample_account_id, 2026, 2)
 
@@ -13,6 +13,7 @@ from app.application.budget import (
     EnsureBudgetMonthUseCase, SetBudgetLineUseCase,
     BudgetViewService, ensure_budget_positions, swap_budget_position,
 )
+from app.readmodels.fact_cube import rebuild_fact_cube
 
 
 _NOW = datetime(2026, 2, 14, 12, 0, 0)
@@ -201,6 +202,7 @@ class TestDayView:
             occurred_at=datetime(2026, 2, 15, 10, 0),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, ACCOUNT)
 
         view = BudgetViewService(db_session).build(
             account_id=ACCOUNT, grain="day", date_param=date(2026, 2, 14),
@@ -233,6 +235,7 @@ class TestWeekView:
             occurred_at=datetime(2026, 2, 16, 10, 0),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, ACCOUNT)
 
         view = BudgetViewService(db_session).build(
             account_id=ACCOUNT, grain="week", date_param=date(2026, 2, 14),
@@ -269,6 +272,7 @@ class TestYearView:
             occurred_at=datetime(2026, 12, 30),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, ACCOUNT)
 
         view = BudgetViewService(db_session).build(
             account_id=ACCOUNT, grain="year", year=2026,
@@ -299,6 +303,7 @@ class TestCategoryFilter:
             occurred_at=datetime(2026, 2, 10),
         ))
         db_session.flush()
+        rebuild_fact_cube(db_session, ACCOUNT)
 
         # Filter to only category 3 (Еда)
         view = BudgetViewService(db_session).build(
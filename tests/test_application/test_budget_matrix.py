@@ -10,6 +10,7 @@ from app.infrastructure.db.models import (
     OperationTemplateModel, OperationOccurrence, RecurrenceRuleModel,
 )
 from app.application.budget import EnsureBudgetMonthUseCase, SetBudgetLineUseCase
+from app.readmodels.fact_cube import rebuild_fact_cube
 from app.application.budget_matrix import BudgetMatrixService
 
 
@@ -70,6 +71,7 @@ def _add_tx(db, tx_id, kind, amount, cat_id, occurred_at):
         occurred_at=occurred_at,
     ))
     db.flush()
+    rebuild_fact_cube(db, ACCOUNT)
 
 
 def _add_recurrence_rule(db, rule_id, freq="MONTHLY", start="2026-01-01"):
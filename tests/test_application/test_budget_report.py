@@ -10,6 +10,7 @@ from app.infrastructure.db.models import (
     CategoryInfo, TransactionFeed, GoalInfo, WalletBalance,
 )
 from app.application.budget_report import BudgetReportService
+from app.readmodels.fact_cube import rebuild_fact_cube
 
 
 _NOW = datetime(2025, 10, 15, 12, 0, 0)
@@ -123,6 +124,7 @@ def _add_expense(db, account_id, category_id, amount, dt):
     )
     db.add(t)
     db.flush()
+    rebuild_fact_cube(db, account_id)
     return t
 
 
@@ -136,6 +138,7 @@ def _add_income(db, account_id, category_id, amount, dt):
     )
     db.add(t)
     db.flush()
+    rebuild_fact_cube(db, account_id)
     return t
 
 
@@ -150,6 +153,7 @@ def _add_goal_deposit(db, account_id, goal_id, amount, dt, from_wid=100, to_wid=
     )
     db.add(t)
     db.flush()
+    rebuild_fact_cube(db, account_id)
     return t
 
 
@@ -164,6 +168,7 @@ def _add_goal_withdrawal(db, account_id, goal_id, amount, dt, from_wid=200, to_w
     )
     db.add(t)
     db.flush()
+    rebuild_fact_cube(db, account_id)
     return t
 
 
@@ -0,0 +1,161 @@
+"""
+Tests for the precomputed category-suggestion model (app.application.category_suggest).
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from app.application import category_suggest
+from app.application.category_suggest import SuggestModel, load_model
+from app.application.transactions import CreateTransactionUseCase, UpdateTransactionUseCase
+from app.infrastructure.db.models import (
+    CategoryInfo, CategorySuggestLog, CategorySuggestModel, WalletBalance,
+)
+
+TODAY = date.today()
+PHONE, FOOD, CAFE = 10, 11, 12
+
+
+@pytest.fixture(autouse=True)
+def _fresh_lru():
+    category_suggest.invalidate_all()
+    yield
+    category_suggest.invalidate_all()
+
+
+def _model(rows, since=TODAY - timedelta(days=180)) -> SuggestModel:
+    model = SuggestModel(since)
+    for cid, amount, days_ago, desc in rows:
+        at = datetime.combine(TODAY - timedelta(days=days_ago), datetime.min.time()).replace(hour=12)
+        model.observe(cid, amount, 1, at, desc)
+    return model
+
+
+HISTORY = [
+    (PHONE, 857, 5, "МТС"), (PHONE, 857, 35, "МТС"), (PHONE, 857, 65, "МТС"),
+    (FOOD, 2300, 2, "Пятёрочка"), (FOOD, 2410, 4, "Пятёрочка"), (FOOD, 2150, 9, "Перекрёсток"),
+    (FOOD, 2600, 11, "Пятёрочка"),
+    (CAFE, 350, 1, "кофе"), (CAFE, 420, 3, "кофе"), (CAFE, 380, 6, "обед"),
+]
+
+
+def _setup(db):
+    now = datetime.utcnow()
+    db.add(WalletBalance(
+        wallet_id=1, account_id=1, title="Карта", currency="RUB", wallet_type="REGULAR",
+        balance=Decimal("100000"), is_archived=False, created_at=now, updated_at=now,
+    ))
+    for cid in (PHONE, FOOD, CAFE):
+        db.add(CategoryInfo(
+            category_id=cid, account_id=1, title=f"C{cid}", category_type="EXPENSE",
+            is_archived=False, sort_order=0, created_at=now, updated_at=now,
+        ))
+    db.flush()
+
+
+def _expense(db, cid, amount, days_ago=0, desc=""):
+    return CreateTransactionUseCase(db).execute_expense(
+        account_id=1, wallet_id=1, amount=Decimal(str(amount)), currency="RUB",
+        category_id=cid, description=desc,
+        occurred_at=datetime.utcnow() - timedelta(days=days_ago),
+    )
+
+
+class TestScoring:
+    def test_exact_repeat(self):
+        [s] = _model(HISTORY).suggest(857.0, wallet_id=1)
+        assert (s["category_id"], s["exact"], s["reason"]) == (PHONE, True, "повторяющийся платёж")
+
+    def test_description_wins_over_amount(self):
+        [s] = _model(HISTORY).suggest(857.0, description="пятерочка у дома")
+        assert (s["category_id"], s["reason"]) == (FOOD, "по описанию")
+
+    def test_similar_amounts(self):
+        result = _model(HISTORY).suggest(2250.0, wallet_id=1)
+        assert result[0]["category_id"] == FOOD
+        assert all(r["category_id"] != PHONE for r in result)
+
+    def test_unrelated_amount_gives_nothing(self):
+        assert _model(HISTORY).suggest(90000.0) == []
+
+    def test_corrections(self):
+        model = _model(HISTORY)
+        for _ in range(2):
+            model.observe_correction(857, 1, PHONE, CAFE, accepted=False)
+        model.observe_correction(857, 1, PHONE, PHONE, accepted=True)
+        assert model._correction_multipliers(860.0, 1) == pytest.approx({PHONE: 0.5625, CAFE: 1.3225})
+        assert model._correction_multipliers(860.0, 2) == {}
+        assert model._correction_multipliers(2000.0, 1) == {}
+
+    def test_json_roundtrip(self):
+        model = _model(HISTORY)
+        model.observe_correction(2300, None, FOOD, CAFE, accepted=False)
+        restored = SuggestModel.from_json(model.to_json())
+        for amount in (857.0, 2250.0, 400.0):
+            assert restored.suggest(amount, wallet_id=1, hour=13) == model.suggest(amount, wallet_id=1, hour=13)
+
+    def test_rows_before_window_ignored(self):
+        model = _model([(FOOD, 100, 200, "")])
+        assert model.size == 0
+
+
+class TestMaintenance:
+    def test_lru_hit_is_one_query(self, db_session, db_engine):
+        _setup(db_session)
+        for cid, amount, days_ago, desc in HISTORY:
+            _expense(db_session, cid, amount, days_ago, desc)
+        load_model(db_session, 1, "EXPENSE")   # пересборка
+        load_model(db_session, 1, "EXPENSE")   # payload → LRU
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            model = load_model(db_session, 1, "EXPENSE")
+        finally:
+            sa_event.remove(db_engine, "before_cursor_execute", listener)
+        assert model.size == len(HISTORY)
+        assert len(statements) == 1
+        assert "transactions_feed" not in statements[0]
+
+    def test_projector_adds_new_transactions(self, db_session):
+        _setup(db_session)
+        _expense(db_session, CAFE, 300)
+        assert load_model(db_session, 1, "EXPENSE").size == 1
+        version = db_session.get(CategorySuggestModel, (1, "EXPENSE")).version
+
+        _expense(db_session, CAFE, 320)
+        row = db_session.get(CategorySuggestModel, (1, "EXPENSE"))
+        db_session.refresh(row)
+        assert row.version == version + 1
+        assert load_model(db_session, 1, "EXPENSE").size == 2
+
+    def test_edit_drops_model(self, db_session):
+        _setup(db_session)
+        tx_id = _expense(db_session, CAFE, 300)
+        _expense(db_session, CAFE, 320)
+        assert load_model(db_session, 1, "EXPENSE").size == 2
+
+        UpdateTransactionUseCase(db_session).execute(tx_id, 1, category_id=FOOD)
+        assert db_session.get(CategorySuggestModel, (1, "EXPENSE")) is None
+        assert set(load_model(db_session, 1, "EXPENSE").categories) == {CAFE, FOOD}
+
+    def test_suggest_log_adds_correction(self, db_session):
+        _setup(db_session)
+        _expense(db_session, CAFE, 300)
+        load_model(db_session, 1, "EXPENSE")
+
+        log = CategorySuggestLog(
+            account_id=1, operation_type="EXPENSE", amount=Decimal("300"), wallet_id=1,
+            suggested_category_id=CAFE, chosen_category_id=FOOD, accepted=False,
+        )
+        db_session.add(log)
+        category_suggest.record_correction(db_session, log)
+        db_session.commit()
+
+        model = load_model(db_session, 1, "EXPENSE")
+        assert list(model.corrections.values()) == [1]
+        # пересборка из category_suggest_log даёт то же
+        assert category_suggest.build_model(db_session, 1, "EXPENSE").corrections == model.corrections
@@ -840,3 +840,54 @@ class TestEventRemindersInMeta:
         ev_b = next(e for e in block["events"] if e["title"] == "Event B")
         assert ev_a["meta"]["reminders"] == ["09:00"]
         assert ev_b["meta"]["reminders"] == ["18:00"]
+
+
+# ======================================================================
+# Query count: constant round-trips regardless of item count
+# ======================================================================
+
+class TestTodayBlockQueryCount:
+    @staticmethod
+    def _populate(db, n: int, base: int):
+        r = _add_rule(db, base)
+        for i in range(base, base + n):
+            _add_task(db, i, due_date=YESTERDAY, title=f"Overdue {i}")
+            _add_task(db, 1000 + i, due_date=TODAY, title=f"Today {i}")
+            _add_task(db, 2000 + i, due_date=TODAY, status="DONE", title=f"Done {i}")
+            _add_task_template(db, i, r.rule_id, title=f"RecTask {i}")
+            _add_task_occ(db, i, i, YESTERDAY)
+            _add_task_occ(db, 1000 + i, i, TODAY, status="DONE")
+            _add_op_template(db, i, r.rule_id, title=f"Op {i}")
+            _add_op_occ(db, i, i, TODAY)
+            _add_habit(db, i, r.rule_id, title=f"Habit {i}")
+            _add_habit_occ(db, i, i, TODAY)
+            _add_event(db, i, title=f"Event {i}", category_id=1)
+            _add_event_occ(db, i, i, TODAY)
+
+    @staticmethod
+    def _count(db, engine) -> tuple[int, dict]:
+        from sqlalchemy import event as sa_event
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(engine, "before_cursor_execute", listener)
+        try:
+            block = DashboardService(db).get_today_block(ACCOUNT, TODAY)
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", listener)
+        return len(statements), block
+
+    def test_constant_round_trips(self, db_session, db_engine):
+        self._populate(db_session, 1, base=1)
+        small, block = self._count(db_session, db_engine)
+        assert len(block["overdue"]) == 2 and len(block["done"]) == 2
+
+        self._populate(db_session, 20, base=100)
+        large, block = self._count(db_session, db_engine)
+        assert len(block["overdue"]) == 42
+        assert len(block["active"]) == 63
+        assert len(block["done"]) == 42
+        assert len(block["events"]) == 21
+
+        assert large == small
+        assert large <= 15
@@ -0,0 +1,157 @@
+"""
+Tests for the versioned dashboard block cache (app.application.dashboard_cache).
+"""
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.application import dashboard_cache
+from app.application.dashboard_cache import DashboardCache, affected_blocks
+from app.infrastructure.db.models import DashboardBlockCache, EventLog
+from app.infrastructure.eventlog.repository import EventLogRepository
+
+TODAY = date(2026, 2, 14)
+ACCOUNT = 1
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    dashboard_cache.invalidate_all()
+    yield
+    dashboard_cache.invalidate_all()
+
+
+def _settings(shared=False, ttl=60, async_=False):
+    return SimpleNamespace(
+        DASHBOARD_CACHE_TTL=ttl, DASHBOARD_CACHE_SIZE=100, DASHBOARD_CACHE_SHARED=shared,
+        PROJECTION_ASYNC=async_,
+    )
+
+
+class _Counter:
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+
+    def __call__(self, block):
+        def compute():
+            self.calls[block] = self.calls.get(block, 0) + 1
+            return {"block": block, "n": self.calls[block]}
+        return compute
+
+
+def _request(db, counter, blocks=("today", "financial_summary", "feed")):
+    cache = DashboardCache(db, ACCOUNT, TODAY)
+    values = {b: cache.get(b, counter(b)) for b in blocks}
+    cache.save()
+    return values
+
+
+def _append(db, event_type, account_id=ACCOUNT):
+    EventLogRepository(db).append_event(account_id, event_type, {})
+    db.commit()
+
+
+class TestDependencies:
+    def test_event_types_map_to_blocks(self):
+        assert set(affected_blocks("transaction_created")) == {
+            "financial_summary", "fin_state", "feed", "level", "transaction_totals",
+        }
+        assert "today" in affected_blocks("task_completed")
+        assert "financial_summary" not in affected_blocks("habit_occurrence_completed")
+        assert set(affected_blocks("user_logged_in")) == {"feed", "level"}
+
+
+class TestL1:
+    def test_second_request_served_from_cache(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings()):
+            first = _request(db_session, counter)
+            second = _request(db_session, counter)
+        assert first == second
+        assert counter.calls == {"today": 1, "financial_summary": 1, "feed": 1}
+
+    def test_event_recomputes_only_affected_blocks(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings()):
+            _request(db_session, counter)
+            _append(db_session, "task_completed")
+            _request(db_session, counter)
+        assert counter.calls == {"today": 2, "financial_summary": 1, "feed": 2}
+
+    def test_event_from_other_process_picked_up(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings()):
+            _request(db_session, counter)
+            # Insert bypassing append_event: no in-process bump, only event_log
+            db_session.add(EventLog(account_id=ACCOUNT, event_type="transaction_created", payload_json={},
+                                  occurred_at=datetime(2026, 2, 14, 12, 0)))
+            db_session.commit()
+            _request(db_session, counter)
+        assert counter.calls == {"today": 1, "financial_summary": 2, "feed": 2}
+
+    def test_rolled_back_event_does_not_bump(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings()):
+            _request(db_session, counter)
+            EventLogRepository(db_session).append_event(ACCOUNT, "task_completed", {})
+            db_session.rollback()
+            _request(db_session, counter)
+        assert counter.calls == {"today": 1, "financial_summary": 1, "feed": 1}
+
+    def test_other_account_events_ignored(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings()):
+            _request(db_session, counter)
+            _append(db_session, "task_completed", account_id=2)
+            _request(db_session, counter)
+        assert counter.calls == {"today": 1, "financial_summary": 1, "feed": 1}
+
+    def test_async_projection_lag_not_cached(self, db_session):
+        from app.application.projection import catch_up
+
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings(async_=True)):
+            catch_up(db_session, ACCOUNT)
+            _request(db_session, counter)
+            _append(db_session, "task_viewed")  # daemon ещё не спроецировал
+            _request(db_session, counter)
+            _request(db_session, counter)
+            assert counter.calls == {"today": 3, "financial_summary": 1, "feed": 3}
+
+            catch_up(db_session, ACCOUNT)
+            _request(db_session, counter)
+            _request(db_session, counter)
+        assert counter.calls == {"today": 4, "financial_summary": 1, "feed": 4}
+
+    def test_ttl_zero_disables(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings(ttl=0)):
+            _request(db_session, counter)
+            _request(db_session, counter)
+        assert counter.calls["today"] == 2
+
+
+class TestShared:
+    def test_l2_survives_process_restart(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings(shared=True)):
+            first = _request(db_session, counter)
+            assert db_session.query(DashboardBlockCache).count() == 3
+
+            dashboard_cache.invalidate_all()  # another worker: empty L1, no versions
+            second = _request(db_session, counter)
+        assert first == second
+        assert counter.calls == {"today": 1, "financial_summary": 1, "feed": 1}
+
+    def test_l2_row_replaced_on_new_version(self, db_session):
+        counter = _Counter()
+        with patch.object(dashboard_cache, "get_settings", return_value=_settings(shared=True)):
+            _request(db_session, counter)
+            _append(db_session, "transaction_created")
+            dashboard_cache.invalidate_all()
+            values = _request(db_session, counter)
+        assert values["financial_summary"]["n"] == 2
+        row = db_session.query(DashboardBlockCache).filter_by(block="financial_summary").one()
+        assert row.payload == {"value": {"block": "financial_summary", "n": 2}}
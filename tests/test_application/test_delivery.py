@@ -0,0 +1,112 @@
+"""
+Tests for the pooled delivery pipeline (app.infrastructure.delivery).
+"""
+import time
+from unittest.mock import patch
+
+from sqlalchemy import event as sa_event
+
+from app.infrastructure.crypto import encrypt
+from app.infrastructure.delivery import OutboundMessage, RateLimiter, enqueue_many
+from app.infrastructure.db.models import PushSubscription, TelegramSettings, UserNotificationSettings
+
+
+def _sub(db, user_id, endpoint):
+    db.add(PushSubscription(user_id=user_id, endpoint=endpoint, p256dh="p", auth="a"))
+    db.flush()
+
+
+def _bot(db, user_id):
+    db.add(TelegramSettings(
+        user_id=user_id, bot_token=encrypt(f"token-{user_id}"), chat_id=encrypt(str(user_id)),
+        connected=True,
+    ))
+    db.flush()
+
+
+def _msg(user_id, kind="task_reminder"):
+    return OutboundMessage(
+        user_id=user_id, kind=kind,
+        push={"title": "⏰", "body": "b", "url": "/tasks"}, telegram="⏰ <b>b</b>",
+    )
+
+
+class TestRateLimiter:
+    def test_burst_then_throttle(self):
+        limiter = RateLimiter(5, per=0.2)
+        t0 = time.monotonic()
+        for _ in range(5):
+            limiter.acquire("bot")
+        assert time.monotonic() - t0 < 0.05
+        limiter.acquire("bot")
+        assert time.monotonic() - t0 >= 0.03
+
+    def test_keys_independent(self):
+        limiter = RateLimiter(1, per=10)
+        t0 = time.monotonic()
+        limiter.acquire("a")
+        limiter.acquire("b")
+        assert time.monotonic() - t0 < 0.05
+
+
+class TestEnqueueMany:
+    def test_fan_out_and_bulk_prefetch(self, db_session, db_engine):
+        for uid in (1, 2, 3):
+            _sub(db_session, uid, f"https://push/{uid}")
+            _bot(db_session, uid)
+        _sub(db_session, 1, "https://push/1b")
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            with patch("app.infrastructure.delivery.webpush_send", return_value=201) as push, \
+                 patch("app.infrastructure.delivery.telegram_send", return_value=True) as tg:
+                report = enqueue_many(db_session, [_msg(1), _msg(2), _msg(3)])
+        finally:
+            sa_event.remove(db_engine, "before_cursor_execute", listener)
+
+        assert push.call_count == 4
+        assert tg.call_count == 3
+        assert report.push_sent == 4 and report.telegram_sent == 3
+        assert len(statements) == 3  # subscriptions + notification settings + bots
+        assert {c.args[0] for c in tg.call_args_list} == {"token-1", "token-2", "token-3"}
+
+    def test_expired_subscriptions_deleted(self, db_session):
+        _sub(db_session, 1, "https://push/ok")
+        _sub(db_session, 1, "https://push/gone")
+
+        def fake(endpoint, *a):
+            return 410 if endpoint.endswith("gone") else 201
+
+        with patch("app.infrastructure.delivery.webpush_send", side_effect=fake):
+            report = enqueue_many(db_session, [OutboundMessage(1, "task_reminder", push={"title": "x"})])
+
+        assert report.push_sent == 1
+        assert len(report.expired_subscriptions) == 1
+        assert [s.endpoint for s in db_session.query(PushSubscription).all()] == ["https://push/ok"]
+
+    def test_telegram_prefs_respected(self, db_session):
+        _bot(db_session, 1)
+        _bot(db_session, 2)
+        db_session.add(UserNotificationSettings(
+            user_id=1, enabled=True, channels_json={"telegram": True},
+            rule_prefs_json={"task_reminder": {"enabled": True, "silent": True}},
+        ))
+        db_session.add(UserNotificationSettings(
+            user_id=2, enabled=True, channels_json={"telegram": False}, rule_prefs_json={},
+        ))
+        db_session.flush()
+
+        with patch("app.infrastructure.delivery.telegram_send", return_value=True) as tg:
+            report = enqueue_many(db_session, [
+                OutboundMessage(1, "task_reminder", telegram="a"),
+                OutboundMessage(2, "task_reminder", telegram="b"),
+            ])
+
+        assert report.telegram_sent == 1
+        payload = tg.call_args.args[1]
+        assert payload["chat_id"] == "1" and payload["disable_notification"] is True
+
+    def test_empty_batch_no_queries(self, db_session):
+        assert enqueue_many(db_session, []).push_sent == 0
@@ -39,6 +39,11 @@ def _push_sub(db, user_id=USER_ID):
     return sub
 
 
+def _pushes(mock_enqueue) -> int:
+    """Push messages queued for delivery across all enqueue_delivery calls."""
+    return sum(1 for c in mock_enqueue.call_args_list for m in c.args[1] if m.push)
+
+
 class TestDigestServiceDedup:
     def test_morning_digest_sent_only_once(self, db_session):
         """
@@ -50,7 +55,7 @@ class TestDigestServiceDedup:
 
         with patch("app.application.digest_service.OccurrenceGenerator") as mock_gen, \
              patch("app.application.digest_service.DashboardService") as mock_dash, \
-             patch("app.application.digest_service.send_push_to_user") as mock_push, \
+             patch("app.application.digest_service.enqueue_delivery") as mock_push, \
              patch("app.application.digest_service.date") as mock_date:
 
             mock_date.today.return_value = TODAY
@@ -69,7 +74,7 @@ class TestDigestServiceDedup:
             send_morning_digest(db_session)
 
         # Push must have been called exactly once
-        assert mock_push.call_count == 1
+        assert _pushes(mock_push) == 1
 
     def test_evening_digest_sent_only_once(self, db_session):
         """
@@ -79,7 +84,7 @@ class TestDigestServiceDedup:
         _push_sub(db_session)
 
         with patch("app.application.digest_service.DashboardService") as mock_dash, \
-             patch("app.application.digest_service.send_push_to_user") as mock_push, \
+             patch("app.application.digest_service.enqueue_delivery") as mock_push, \
              patch("app.application.digest_service.date") as mock_date:
 
             mock_date.today.return_value = TODAY
@@ -96,7 +101,7 @@ class TestDigestServiceDedup:
             send_evening_digest(db_session)
             send_evening_digest(db_session)
 
-        assert mock_push.call_count == 1
+        assert _pushes(mock_push) == 1
 
     def test_morning_and_evening_both_succeed_same_day(self, db_session):
         """
@@ -108,7 +113,7 @@ class TestDigestServiceDedup:
 
         with patch("app.application.digest_service.OccurrenceGenerator") as mock_gen, \
              patch("app.application.digest_service.DashboardService") as mock_dash, \
-             patch("app.application.digest_service.send_push_to_user") as mock_push, \
+             patch("app.application.digest_service.enqueue_delivery") as mock_push, \
              patch("app.application.digest_service.date") as mock_date:
 
             mock_date.today.return_value = TODAY
@@ -127,7 +132,7 @@ class TestDigestServiceDedup:
             send_evening_digest(db_session)
 
         # Both morning and evening should have fired push once each
-        assert mock_push.call_count == 2
+        assert _pushes(mock_push) == 2
 
     def test_dispatch_log_row_created(self, db_session):
         """
@@ -138,7 +143,7 @@ class TestDigestServiceDedup:
 
         with patch("app.application.digest_service.OccurrenceGenerator") as mock_gen, \
              patch("app.application.digest_service.DashboardService") as mock_dash, \
-             patch("app.application.digest_service.send_push_to_user") as mock_push, \
+             patch("app.application.digest_service.enqueue_delivery") as mock_push, \
              patch("app.application.digest_service.date") as mock_date:
 
             mock_date.today.return_value = TODAY
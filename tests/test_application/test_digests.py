@@ -77,6 +77,37 @@ def test_save_digest_upsert_updates(db_session):
     assert d.payload['tasks']['completed'] == 7
 
 
+def test_generate_weekly_digests_batch(db_session):
+    from app.application.digests import generate_weekly_digests
+    from app.infrastructure.db.models import BackgroundJob, User
+    db_session.add(User(id=1, email='u1@example.com', ai_digest_enabled=True))
+    db_session.add(User(id=2, email='u2@example.com', ai_digest_enabled=True))
+    db_session.add(User(id=3, email='u3@example.com'))
+    ts = datetime(2026, 4, 15, 10, 0, tzinfo=timezone.utc)
+    _task(db_session, status='DONE', completed_at=ts)
+    _task(db_session, status='DONE', completed_at=ts, account_id=2)
+    _task(db_session, status='DONE', completed_at=ts, account_id=2)
+    _task(db_session, status='ACTIVE', due_date=date(2026, 4, 10), account_id=3)
+    db_session.flush()
+
+    week = date(2026, 4, 13)
+    assert generate_weekly_digests(db_session, [1, 2, 3], week) == 3
+    assert generate_weekly_digests(db_session, [1, 2, 3], week) == 3  # upsert, no duplicates
+    db_session.commit()
+
+    digests = {d.account_id: d for d in db_session.query(DigestModel).filter_by(period_key='2026-W16')}
+    assert set(digests) == {1, 2, 3}
+    for account_id, d in digests.items():
+        assert d.payload == build_weekly_payload(db_session, account_id, week)
+    assert digests[2].payload['tasks']['completed'] == 2
+    assert digests[3].payload['tasks']['overdue_open'] == 1
+
+    # AI-комментарии — только opted-in, разнесены по времени
+    jobs = db_session.query(BackgroundJob).filter_by(kind='digest.ai_comment').order_by(BackgroundJob.run_at).all()
+    assert [j.payload['account_id'] for j in jobs] == [1, 2]
+    assert jobs[1].run_at > jobs[0].run_at
+
+
 def test_ai_comment_returns_none_without_key(monkeypatch):
     from app.infrastructure.ai import generate_digest_comment
     import app.config as cfg_module
@@ -87,6 +118,18 @@ def test_ai_comment_returns_none_without_key(monkeypatch):
     cfg_module.get_settings.cache_clear()
 
 
+def test_failed_ai_comment_raises_for_retry(db_session, monkeypatch):
+    from app.application.digests import add_ai_comment
+    monkeypatch.setattr('app.application.app_config.get_openai_key', lambda db: 'sk-test')
+    monkeypatch.setattr('app.infrastructure.ai.generate_digest_comment', lambda payload, api_key=None: None)
+    save_digest(db_session, ACCT, 'week', '2026-W16', {'tasks': {'completed': 1}})
+    with pytest.raises(RuntimeError):
+        add_ai_comment(db_session, ACCT, 'week', '2026-W16')
+
+    monkeypatch.setattr('app.application.app_config.get_openai_key', lambda db: None)
+    assert add_ai_comment(db_session, ACCT, 'week', '2026-W16') is None
+
+
 def test_weekly_digest_notification_not_on_weekday(db_session):
     from app.application.notification_engine import _run_weekly_digest
     from app.infrastructure.db.models import NotificationModel
@@ -311,3 +311,52 @@ def test_empty_account_returns_defaults(db_session):
     assert data["wip_count"] == 0
     assert data["velocity_7d"] == 0.0
     assert data["efficiency_score"] >= 0
+
+
+# ── Batch calculation / ready snapshots ──────────────────────────────────────
+
+
+def test_calculate_all_matches_per_account(db_session):
+    """Set-based calculation for several accounts gives the same data as calculate()."""
+    from app.infrastructure.db.models import User
+
+    for uid in (1, 2, 3):
+        db_session.add(User(id=uid, email=f"u{uid}@example.com", password_hash="x"))
+    _task(db_session, due_date=date(2026, 2, 20), status="DONE",
+          completed_at=datetime(2026, 2, 18, tzinfo=_tz))
+    _task(db_session, due_date=date(2026, 2, 5), status="DONE",
+          completed_at=datetime(2026, 2, 20, tzinfo=_tz), account_id=2)
+    _task(db_session, due_date=date(2026, 2, 1), account_id=2)
+    _task(db_session, board_status="in_progress", account_id=2)
+    db_session.add(TaskDueChangeLog(user_id=2, task_id=3, old_due_date=date(2026, 1, 25),
+                                    new_due_date=date(2026, 2, 1), changed_at=datetime(2026, 2, 25, tzinfo=_tz)))
+    db_session.flush()
+
+    svc = _svc(db_session)
+    batch = svc.calculate_all(TODAY)
+    assert set(batch) == {1, 2, 3}
+    assert batch[2]["ontime_rate"] == 0.0
+    assert (batch[2]["overdue_open"], batch[2]["reschedule_count"], batch[2]["wip_count"]) == (1, 1, 1)
+    assert batch[3]["efficiency_score"] >= 0
+
+    for uid in (1, 2, 3):
+        single = svc.calculate(uid, TODAY)
+        assert {k: v for k, v in single.items() if k != "snapshot_id"} == \
+            {k: v for k, v in batch[uid].items() if k != "snapshot_id"}
+    assert db_session.query(EfficiencySnapshot).filter_by(snapshot_date=TODAY).count() == 3
+    assert db_session.query(EfficiencySnapshotItem).filter_by(
+        snapshot_id=batch[2]["snapshot_id"], metric_key="ontime"
+    ).count() == 1
+
+
+def test_get_or_calculate_reads_ready_snapshot(db_session):
+    """Dashboard/digests read the nightly snapshot instead of recomputing it."""
+    svc = _svc(db_session)
+    first = svc.get_or_calculate(ACCT, TODAY)
+    assert first["overdue_open"] == 0
+
+    _task(db_session, due_date=date(2026, 2, 1))
+    again = svc.get_or_calculate(ACCT, TODAY)
+    assert again["overdue_open"] == 0
+    assert again["snapshot_id"] == first["snapshot_id"]
+    assert again["efficiency_score"] == pytest.approx(first["efficiency_score"])
@@ -0,0 +1,57 @@
+"""
+Tests for IdAllocator (SQLite fallback path).
+
+PostgreSQL path uses nextval() on per-aggregate sequences created by
+migration m1a2b3c4d5e6 and needs a live PG connection.
+"""
+import pytest
+from datetime import datetime
+
+from app.infrastructure.db.models import EventLog, TransactionFeed, BudgetLine
+from app.infrastructure.id_allocator import IdAllocator, SEQUENCES
+
+ACC = 1
+_NOW = datetime(2026, 5, 1, 12, 0)
+
+
+def _event(db, event_type: str, payload: dict) -> None:
+    db.add(EventLog(account_id=ACC, event_type=event_type, payload_json=payload, occurred_at=_NOW))
+    db.flush()
+
+
+class TestIdAllocatorSqlite:
+    def test_starts_at_1_on_empty_db(self, db_session):
+        for aggregate in SEQUENCES:
+            assert IdAllocator(db_session).next_id(aggregate) == 1
+
+    def test_uses_max_of_event_log_and_read_model(self, db_session):
+        _event(db_session, "transaction_created", {"transaction_id": 7})
+        db_session.add(TransactionFeed(
+            transaction_id=12, account_id=ACC, operation_type="EXPENSE",
+            amount=1, currency="RUB", occurred_at=_NOW,
+        ))
+        db_session.flush()
+        assert IdAllocator(db_session).next_id("transaction") == 13
+
+    def test_event_log_ahead_of_lagging_read_model(self, db_session):
+        _event(db_session, "transaction_created", {"transaction_id": 40})
+        assert IdAllocator(db_session).next_id("transaction") == 41
+
+    def test_repeated_calls_do_not_reissue_before_flush(self, db_session):
+        ids = IdAllocator(db_session)
+        assert [ids.next_id("habit"), ids.next_id("habit")] == [1, 2]
+
+    def test_allocate_block(self, db_session):
+        db_session.add(BudgetLine(
+            id=5, account_id=ACC, budget_month_id=1, category_id=1,
+            kind="EXPENSE", plan_amount=0,
+        ))
+        db_session.flush()
+        ids = IdAllocator(db_session)
+        assert ids.allocate_block("budget_line", 3) == [6, 7, 8]
+        assert ids.next_id("budget_line") == 9
+        assert ids.allocate_block("budget_line", 0) == []
+
+    def test_unknown_aggregate_raises(self, db_session):
+        with pytest.raises(KeyError):
+            IdAllocator(db_session).next_id("nope")
@@ -0,0 +1,142 @@
+"""
+Tests for the background job queue: idempotency, priorities, retries, stale locks.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.application import job_queue
+from app.application.job_queue import enqueue, job_handler, run_pending, requeue_stale, purge_finished
+from app.application.jobs import DELIVERY_JOB_SIZE, enqueue_delivery
+from app.infrastructure.db.models import BackgroundJob
+from app.infrastructure.delivery import OutboundMessage
+
+CALLS: list = []
+
+
+@job_handler("test.record")
+def _record(db, payload):
+    CALLS.append(payload["n"])
+
+
+@job_handler("test.flaky")
+def _flaky(db, payload):
+    CALLS.append("flaky")
+    raise RuntimeError("upstream 503")
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    CALLS.clear()
+
+
+def _job(db, job_id) -> BackgroundJob:
+    db.expire_all()
+    return db.get(BackgroundJob, job_id)
+
+
+class TestEnqueue:
+    def test_idempotency_key_dedupes(self, db_session):
+        first = enqueue(db_session, "test.record", {"n": 1}, idempotency_key="k1")
+        second = enqueue(db_session, "test.record", {"n": 2}, idempotency_key="k1")
+        db_session.commit()
+        assert first is not None
+        assert second is None
+        assert db_session.query(BackgroundJob).count() == 1
+
+    def test_priority_then_fifo(self, db_session):
+        enqueue(db_session, "test.record", {"n": 1})
+        enqueue(db_session, "test.record", {"n": 2}, priority=5)
+        enqueue(db_session, "test.record", {"n": 3})
+        db_session.commit()
+        assert run_pending(db_session, "w1") == 3
+        assert CALLS == [2, 1, 3]
+
+    def test_delayed_job_waits(self, db_session):
+        enqueue(db_session, "test.record", {"n": 1}, run_at=datetime.now(timezone.utc) + timedelta(hours=1))
+        db_session.commit()
+        assert run_pending(db_session, "w1") == 0
+        assert CALLS == []
+
+
+    def test_delivery_is_split_into_jobs(self, db_session):
+        messages = [OutboundMessage(user_id=i, kind="digest_morning", telegram="hi") for i in range(DELIVERY_JOB_SIZE + 1)]
+        assert enqueue_delivery(db_session, messages, idempotency_key="digest:1") == DELIVERY_JOB_SIZE + 1
+        assert enqueue_delivery(db_session, messages, idempotency_key="digest:1") == 0
+        db_session.commit()
+        jobs = db_session.query(BackgroundJob).order_by(BackgroundJob.id).all()
+        assert [len(j.payload["messages"]) for j in jobs] == [DELIVERY_JOB_SIZE, 1]
+        assert jobs[1].payload["messages"][0]["user_id"] == DELIVERY_JOB_SIZE
+
+class TestRetries:
+    def test_failure_is_retried_with_backoff_then_failed(self, db_session):
+        job_id = enqueue(db_session, "test.flaky", max_attempts=2)
+        db_session.commit()
+
+        before = datetime.now(timezone.utc)
+        assert run_pending(db_session, "w1") == 1
+        job = _job(db_session, job_id)
+        assert job.status == "queued"
+        assert job.attempts == 1
+        assert "upstream 503" in job.last_error
+        run_at = job.run_at if job.run_at.tzinfo else job.run_at.replace(tzinfo=timezone.utc)
+        assert run_at >= before + job_queue.BACKOFF_BASE
+        assert run_pending(db_session, "w1") == 0  # ещё не время
+
+        job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db_session.commit()
+        assert run_pending(db_session, "w1") == 1
+        job = _job(db_session, job_id)
+        assert job.status == "failed"
+        assert job.finished_at is not None
+        assert CALLS == ["flaky", "flaky"]
+
+    def test_unknown_kind_fails_immediately(self, db_session):
+        job_id = enqueue(db_session, "test.nobody")
+        db_session.commit()
+        run_pending(db_session, "w1")
+        job = _job(db_session, job_id)
+        assert job.status == "failed"
+        assert "no handler" in job.last_error
+
+    def test_backoff_is_capped(self):
+        assert job_queue.backoff(1) == job_queue.BACKOFF_BASE
+        assert job_queue.backoff(2) == job_queue.BACKOFF_BASE * 2
+        assert job_queue.backoff(30) == job_queue.BACKOFF_MAX
+
+
+class TestMaintenance:
+    def test_stale_running_job_is_requeued(self, db_session):
+        job_id = enqueue(db_session, "test.record", {"n": 7})
+        db_session.commit()
+        job = job_queue.dequeue(db_session, "dead-worker")
+        job.locked_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db_session.commit()
+
+        assert requeue_stale(db_session, timedelta(minutes=15)) == 1
+        assert run_pending(db_session, "w2") == 1
+        assert CALLS == [7]
+        assert _job(db_session, job_id).attempts == 2
+
+    def test_stale_job_without_attempts_left_fails(self, db_session):
+        job_id = enqueue(db_session, "test.record", {"n": 7}, max_attempts=1)
+        db_session.commit()
+        job = job_queue.dequeue(db_session, "dead-worker")
+        job.locked_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db_session.commit()
+
+        assert requeue_stale(db_session, timedelta(minutes=15)) == 0
+        job = _job(db_session, job_id)
+        assert (job.status, job.locked_by) == ("failed", None)
+        assert job.finished_at is not None
+        assert run_pending(db_session, "w2") == 0
+
+    def test_purge_frees_idempotency_key(self, db_session):
+        enqueue(db_session, "test.record", {"n": 1}, idempotency_key="daily")
+        db_session.commit()
+        run_pending(db_session, "w1")
+        db_session.query(BackgroundJob).update({"finished_at": datetime.now(timezone.utc) - timedelta(days=8)})
+        db_session.commit()
+
+        assert purge_finished(db_session, timedelta(days=7)) == 1
+        assert enqueue(db_session, "test.record", {"n": 2}, idempotency_key="daily") is not None
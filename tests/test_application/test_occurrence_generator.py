@@ -1,112 +1,178 @@
 """
-Tests for OccurrenceGenerator race-condition / IntegrityError handling.
+Tests for OccurrenceGenerator: bulk ON CONFLICT insert and incremental watermarks.
 """
 import pytest
-from datetime import date
-from unittest.mock import MagicMock, patch
-from sqlalchemy.exc import IntegrityError
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import event as sa_event
 
+import app.application.occurrence_generator as og
 from app.application.occurrence_generator import OccurrenceGenerator
+from app.infrastructure.db.models import (
+    HabitModel, HabitOccurrence, RecurrenceRuleModel, OperationTemplateModel,
+    OperationOccurrence, CalendarEventModel, EventOccurrenceModel,
+    EventDefaultReminderModel, EventReminderModel, OccurrenceWatermark,
+)
 
+WS = date(2026, 4, 1)
+WE = date(2026, 4, 10)
 
-class TestOccurrenceGeneratorIntegrityError:
-    """Ensure the generator silently skips rows when a UNIQUE constraint fires."""
-
-    def test_habit_occurrences_skips_on_integrity_error(self, db_session):
-        """
-        If begin_nested + flush raises IntegrityError (simulated race), the generator
-        must not re-raise and must return 0 new rows.
-        """
-        from app.infrastructure.db.models import (
-            HabitModel, RecurrenceRuleModel
-        )
-
-        rule = RecurrenceRuleModel(
-            rule_id=1,
-            account_id=1,
-            freq="daily",
-            interval=1,
-            start_date=date(2026, 4, 1),
-            until_date=None,
-            count=None,
-            by_weekday=None,
-            by_monthday=None,
-            by_month=None,
-        )
-        db_session.add(rule)
-
-        habit = HabitModel(
-            habit_id=1,
-            account_id=1,
-            rule_id=1,
-            title="Test habit",
-            active_from=date(2026, 4, 1),
-            active_until=None,
-            is_archived=False,
-        )
-        db_session.add(habit)
+
+@pytest.fixture
+def window(monkeypatch):
+    """Pin the generation window; returns a setter to move it."""
+    current = {"w": (WS, WE)}
+    monkeypatch.setattr(og, "_get_window", lambda: current["w"])
+
+    def move(ws, we):
+        current["w"] = (ws, we)
+    return move
+
+
+def _daily_habit(db, habit_id=1, rule_id=1, **rule_kw):
+    db.add(RecurrenceRuleModel(
+        rule_id=rule_id, account_id=1, freq=rule_kw.pop("freq", "DAILY"), interval=1,
+        start_date=date(2026, 1, 1), **rule_kw,
+    ))
+    db.add(HabitModel(
+        habit_id=habit_id, account_id=1, rule_id=rule_id, title="Зарядка",
+        active_from=date(2026, 1, 1), is_archived=False,
+    ))
+    db.flush()
+
+
+def _dates(db):
+    return sorted(r.scheduled_date for r in db.query(HabitOccurrence).all())
+
+
+def _count_queries(engine):
+    counter = {"n": 0}
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter["n"] += 1
+
+    sa_event.listen(engine, "before_cursor_execute", _before)
+    return counter, lambda: sa_event.remove(engine, "before_cursor_execute", _before)
+
+
+class TestBulkInsert:
+    def test_generates_window(self, db_session, window):
+        _daily_habit(db_session)
+        assert OccurrenceGenerator(db_session).generate_habit_occurrences(1) == 10
+        assert _dates(db_session) == [WS + timedelta(days=i) for i in range(10)]
+
+    def test_existing_rows_skipped_on_conflict(self, db_session, window):
+        """A concurrent request already inserted some rows: no error, no duplicates."""
+        _daily_habit(db_session)
+        for d in (WS, WS + timedelta(days=3)):
+            db_session.add(HabitOccurrence(account_id=1, habit_id=1, scheduled_date=d, status="DONE"))
         db_session.flush()
 
-        gen = OccurrenceGenerator(db_session)
+        assert OccurrenceGenerator(db_session).generate_habit_occurrences(1) == 8
+        assert len(_dates(db_session)) == 10
+        assert db_session.query(HabitOccurrence).filter_by(status="DONE").count() == 2
+
+    def test_operation_occurrences(self, db_session, window):
+        db_session.add(RecurrenceRuleModel(
+            rule_id=2, account_id=1, freq="WEEKLY", interval=1,
+            start_date=date(2026, 1, 1), by_weekday="MO",
+        ))
+        db_session.add(OperationTemplateModel(
+            template_id=1, account_id=1, title="Rent", rule_id=2,
+            active_from=date(2026, 1, 1), is_archived=False,
+            kind="EXPENSE", amount=Decimal("1000.00"),
+        ))
+        db_session.flush()
+        assert OccurrenceGenerator(db_session).generate_operation_occurrences(1) == 1
+        assert [o.scheduled_date for o in db_session.query(OperationOccurrence).all()] == [
+            date(2026, 4, 6),
+        ]
+
+    def test_event_occurrences_copy_default_reminders(self, db_session):
+        today = date.today()
+        db_session.add(RecurrenceRuleModel(
+            rule_id=3, account_id=1, freq="DAILY", interval=7, start_date=today,
+        ))
+        db_session.add(CalendarEventModel(
+            event_id=1, account_id=1, title="Созвон", category_id=1, repeat_rule_id=3,
+            is_active=True,
+        ))
+        db_session.add(EventDefaultReminderModel(
+            event_id=1, channel="ui", mode="offset", offset_minutes=15, is_enabled=True,
+        ))
+        db_session.flush()
 
-        with patch.object(db_session, "begin_nested") as mock_nested:
-            cm = MagicMock()
-            cm.__enter__ = MagicMock(return_value=None)
-            cm.__exit__ = MagicMock(side_effect=IntegrityError(
-                "UNIQUE constraint failed", params=None, orig=Exception()
-            ))
-            mock_nested.return_value = cm
-
-            result = gen.generate_habit_occurrences(account_id=1)
-
-        # All rows skipped due to IntegrityError → count = 0
-        assert result == 0
-
-    def test_operation_occurrences_skips_on_integrity_error(self, db_session):
-        """Same contract for generate_operation_occurrences."""
-        from app.infrastructure.db.models import (
-            OperationTemplateModel, RecurrenceRuleModel
-        )
-        from decimal import Decimal
-
-        rule = RecurrenceRuleModel(
-            rule_id=2,
-            account_id=1,
-            freq="daily",
-            interval=1,
-            start_date=date(2026, 4, 1),
-            until_date=None,
-            count=None,
-            by_weekday=None,
-            by_monthday=None,
-            by_month=None,
-        )
-        db_session.add(rule)
-
-        tmpl = OperationTemplateModel(
-            template_id=1,
-            account_id=1,
-            title="Rent",
-            rule_id=2,
-            active_from=date(2026, 4, 1),
-            active_until=None,
-            is_archived=False,
-            kind="EXPENSE",
-            amount=Decimal("1000.00"),
-        )
-        db_session.add(tmpl)
+        created = OccurrenceGenerator(db_session).generate_event_occurrences(1)
+        occs = db_session.query(EventOccurrenceModel).all()
+        assert created == len(occs) == 13  # today .. today+90 every 7 days
+        assert all(o.source == "rule" for o in occs)
+        reminders = db_session.query(EventReminderModel).all()
+        assert {r.occurrence_id for r in reminders} == {o.id for o in occs}
+
+
+    def test_count_counted_from_active_from(self, db_session, window):
+        """The window is clipped to active_from before expansion, so COUNT starts there."""
+        _daily_habit(db_session, count=3)
+        db_session.query(HabitModel).update({"active_from": WS + timedelta(days=5)})
         db_session.flush()
+        OccurrenceGenerator(db_session).generate_habit_occurrences(1)
+        assert _dates(db_session) == [WS + timedelta(days=i) for i in (5, 6, 7)]
+
+
+class TestWatermarks:
+    def test_second_call_is_noop(self, db_session, db_engine, window):
+        _daily_habit(db_session)
+        gen = OccurrenceGenerator(db_session)
+        gen.generate_habit_occurrences(1)
+
+        counter, stop = _count_queries(db_engine)
+        try:
+            assert gen.generate_habit_occurrences(1) == 0
+        finally:
+            stop()
+        assert counter["n"] <= 3  # entities, rules, watermarks — no inserts
+
+    def test_deleted_occurrence_not_resurrected(self, db_session, window):
+        _daily_habit(db_session)
+        gen = OccurrenceGenerator(db_session)
+        gen.generate_habit_occurrences(1)
+        db_session.query(HabitOccurrence).filter_by(scheduled_date=WS).delete()
 
+        assert gen.generate_habit_occurrences(1) == 0
+        assert WS not in _dates(db_session)
+
+    def test_window_forward_inserts_only_tail(self, db_session, window):
+        _daily_habit(db_session)
+        gen = OccurrenceGenerator(db_session)
+        gen.generate_habit_occurrences(1)
+        db_session.query(HabitOccurrence).filter_by(scheduled_date=WE).delete()
+
+        window(WS + timedelta(days=1), WE + timedelta(days=1))
+        assert gen.generate_habit_occurrences(1) == 1
+        assert WE not in _dates(db_session)  # only dates after the watermark
+        assert _dates(db_session)[-1] == WE + timedelta(days=1)
+
+        mark = db_session.query(OccurrenceWatermark).one()
+        assert (mark.kind, mark.entity_id, mark.materialized_until) == ("habit", 1, WE + timedelta(days=1))
+
+    def test_rule_change_regenerates_window(self, db_session, window):
+        _daily_habit(db_session, freq="WEEKLY", by_weekday="MO")
         gen = OccurrenceGenerator(db_session)
+        assert gen.generate_habit_occurrences(1) == 1  # Mon Apr 6
 
-        with patch.object(db_session, "begin_nested") as mock_nested:
-            cm = MagicMock()
-            cm.__enter__ = MagicMock(return_value=None)
-            cm.__exit__ = MagicMock(side_effect=IntegrityError(
-                "UNIQUE constraint failed", params=None, orig=Exception()
-            ))
-            mock_nested.return_value = cm
+        rule = db_session.query(RecurrenceRuleModel).one()
+        rule.by_weekday = "MO,TU"
+        db_session.flush()
+        assert gen.generate_habit_occurrences(1) == 1  # + Tue Apr 7
+        assert _dates(db_session) == [date(2026, 4, 6), date(2026, 4, 7)]
 
-            result = gen.generate_operation_occurrences(account_id=1)
+    def test_archived_entity_drops_watermark(self, db_session, window):
+        _daily_habit(db_session)
+        gen = OccurrenceGenerator(db_session)
+        gen.generate_habit_occurrences(1)
 
-        assert result == 0
+        habit = db_session.query(HabitModel).one()
+        habit.is_archived = True
+        db_session.flush()
+        gen.generate_habit_occurrences(1)
+        assert db_session.query(OccurrenceWatermark).count() == 0
@@ -305,3 +305,30 @@ class TestSnapshotUpsert:
         svc.compute(proj.id, ACCT, 2026, 2)
         db_session.refresh(snap)
         assert snap.tasks_completed_total == 2
+
+
+# ── Batched compute ──
+
+class TestComputeMany:
+    def test_matches_per_project_compute(self, db_session):
+        a = _project(db_session, "A")
+        b = _project(db_session, "B")
+        empty = _project(db_session, "Empty")
+        _task(db_session, a, due_date=date(2026, 2, 10), status="DONE",
+              completed_at=datetime(2026, 2, 9, 18, 0, tzinfo=_tz))
+        _task(db_session, b, due_date=date(2026, 2, 5), status="DONE",
+              completed_at=datetime(2026, 2, 20, 12, 0, tzinfo=_tz))
+        _task(db_session, b, due_date=date(2026, 1, 5))
+        _event(db_session, 2, "task_updated", {"task_id": 2, "due_date": "2026-02-05"},
+               datetime(2026, 2, 3, 10, 0, tzinfo=_tz))
+
+        svc = ProjectAnalyticsService(db_session)
+        batched = svc.compute_many([a.id, b.id, empty.id], ACCT, 2026, 2)
+
+        assert set(batched) == {a.id, b.id}
+        assert batched[a.id] == svc.compute(a.id, ACCT, 2026, 2)
+        assert batched[b.id] == svc.compute(b.id, ACCT, 2026, 2)
+        assert batched[b.id]["tasks_completed_late"] == 1
+        assert batched[b.id]["overdue_open_count"] == 1
+        assert batched[b.id]["reschedule_count"] == 1
+        assert batched[b.id]["velocity_week3"] == 1
@@ -0,0 +1,95 @@
+"""
+Tests for asynchronous projection: inline vs deferred, read-your-writes wait, lag sweep.
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.application import projection
+from app.application.projection import (
+    accounts_behind, catch_up, parse_notify, projected_up_to, wait_for_projection,
+)
+from app.application.tasks_usecases import CompleteTaskUseCase, CreateTaskUseCase
+from app.infrastructure.db.models import EventLog, TaskModel
+from app.infrastructure.eventlog.repository import track_request_events
+
+
+def _settings(async_=False, wait_ms=0):
+    return SimpleNamespace(PROJECTION_ASYNC=async_, PROJECTION_WAIT_MS=wait_ms)
+
+
+@pytest.fixture
+def async_mode():
+    with patch.object(projection, "get_settings", return_value=_settings(async_=True)):
+        yield
+
+
+def _last_event_id(db) -> int:
+    return db.query(EventLog.id).order_by(EventLog.id.desc()).limit(1).scalar()
+
+
+class TestProject:
+    def test_inline_by_default(self, db_session, sample_account_id):
+        task_id = CreateTaskUseCase(db_session).execute(account_id=sample_account_id, title="Inline")
+        assert db_session.query(TaskModel).filter_by(task_id=task_id).one().status == "ACTIVE"
+
+    def test_async_only_appends(self, db_session, sample_account_id, async_mode):
+        task_id = CreateTaskUseCase(db_session).execute(account_id=sample_account_id, title="Deferred")
+        assert db_session.query(TaskModel).filter_by(task_id=task_id).first() is None
+        assert accounts_behind(db_session) == [sample_account_id]
+
+        catch_up(db_session, sample_account_id)
+        assert db_session.query(TaskModel).filter_by(task_id=task_id).one().title == "Deferred"
+        assert projected_up_to(db_session, sample_account_id) == _last_event_id(db_session)
+        assert accounts_behind(db_session) == []
+
+
+class TestReadYourWrites:
+    def test_request_collects_last_event_id(self, db_session, sample_account_id):
+        holder = track_request_events()
+        task_id = CreateTaskUseCase(db_session).execute(account_id=sample_account_id, title="Token")
+        CompleteTaskUseCase(db_session).execute(task_id, sample_account_id)
+        assert holder["last_event_id"] == _last_event_id(db_session)
+
+    def test_wait_projects_inline_when_daemon_is_late(self, db_session, sample_account_id, async_mode):
+        task_id = CreateTaskUseCase(db_session).execute(account_id=sample_account_id, title="Late")
+        token = _last_event_id(db_session)
+
+        assert wait_for_projection(db_session, sample_account_id, token, timeout=0) is False
+        assert db_session.query(TaskModel).filter_by(task_id=task_id).one().title == "Late"
+        # Уже спроецировано — ждать нечего
+        assert wait_for_projection(db_session, sample_account_id, token, timeout=0) is True
+
+    def test_sweep_window_skips_old_events(self, db_session, sample_account_id, async_mode):
+        CreateTaskUseCase(db_session).execute(account_id=sample_account_id, title="Old")
+        assert accounts_behind(db_session, after_event_id=_last_event_id(db_session)) == []
+
+
+def test_parse_notify_ignores_garbage():
+    assert parse_notify(["7:120", "7:121", "9:5", "junk", ""]) == {7, 9}
+
+
+def test_daemon_sweep_failure_keeps_high_water():
+    from app import projection_daemon
+
+    with patch.object(projection_daemon, "sweep", side_effect=RuntimeError("boom")):
+        assert projection_daemon._sweep_logged(0) == 0
+        assert projection_daemon._sweep_logged(900, 1900) == 1900
+    with patch.object(projection_daemon, "sweep", return_value=2000):
+        assert projection_daemon._sweep_logged(900, 1900) == 2000
+
+
+@pytest.mark.parametrize("entrypoint", ["app.projection_daemon", "app.worker", "app.readmodels.rebuild"])
+def test_entrypoint_registers_session_hooks(entrypoint):
+    # Отдельный процесс: в тестах хуки уже зарегистрированы импортом app.main
+    import subprocess
+    import sys
+    code = (
+        f"import sys, {entrypoint}\n"
+        "hooks = ('reminder_index', 'caldav_sync', 'dashboard_cache')\n"
+        "missing = [h for h in hooks if f'app.application.{h}' not in sys.modules]\n"
+        "sys.exit(f'not registered: {missing}' if missing else 0)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,173 @@
+"""
+Tests for the scheduled_notifications reminder index and the indexed dispatcher.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import event as sa_event
+
+from app.application.reminder_index import ReminderIndex, MSK, event_fire_times
+from app.application.reminder_dispatcher import (
+    dispatch_due_reminders, _collect_task_reminders, _collect_habit_reminders, _collect_hourly_summary,
+)
+from app.infrastructure.db.models import (
+    BackgroundJob, ScheduledNotification, TaskModel, TaskReminderModel, HabitModel, HabitOccurrence,
+    TelegramSettings,
+)
+
+# Far enough in the future that the flush hook (real clock) indexes everything
+DAY = date.today() + timedelta(days=3)
+
+
+def _task(db, task_id=1, due_time=time(10, 0), **kw):
+    db.add(TaskModel(
+        task_id=task_id, account_id=1, title=f"Задача {task_id}", status="ACTIVE",
+        due_kind="DATETIME", due_date=DAY, due_time=due_time, **kw,
+    ))
+    db.flush()
+
+
+def _rows(db, source=None):
+    q = db.query(ScheduledNotification)
+    if source:
+        q = q.filter_by(source=source)
+    return sorted(
+        (r.entity_id, r.fire_at.replace(tzinfo=None), r.trigger, r.body) for r in q.all()
+    )
+
+
+def _queued(db) -> list[dict]:
+    """Messages queued as delivery.send jobs."""
+    return [m for job in db.query(BackgroundJob).filter_by(kind="delivery.send") for m in job.payload["messages"]]
+
+
+def _utc(d: date, t: time) -> datetime:
+    return datetime.combine(d, t, tzinfo=MSK).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class TestMaintenance:
+    def test_task_auto_reminder_indexed_on_flush(self, db_session):
+        _task(db_session)
+        assert _rows(db_session) == [(1, _utc(DAY, time(10, 0)), "auto", "Запланировано на 10:00")]
+
+    def test_explicit_reminders_replace_auto(self, db_session):
+        _task(db_session)
+        db_session.add(TaskReminderModel(task_id=1, offset_minutes=-15, reminder_kind="OFFSET"))
+        db_session.add(TaskReminderModel(task_id=1, offset_minutes=8 * 60, reminder_kind="DAY_TIME"))
+        db_session.flush()
+        assert _rows(db_session) == [
+            (1, _utc(DAY, time(8, 0)), "reminder", "Напоминание (08:00)"),
+            (1, _utc(DAY, time(9, 45)), "reminder", "Через 15 мин (10:00)"),
+        ]
+
+    def test_done_task_leaves_index(self, db_session):
+        _task(db_session)
+        db_session.query(TaskModel).one().status = "DONE"
+        db_session.flush()
+        assert _rows(db_session) == []
+
+    def test_rescheduled_task_moves_fire_at(self, db_session):
+        _task(db_session)
+        db_session.query(TaskModel).one().due_time = time(18, 30)
+        db_session.flush()
+        assert [r[1] for r in _rows(db_session)] == [_utc(DAY, time(18, 30))]
+
+    def test_habit_occurrences(self, db_session):
+        db_session.add(HabitModel(
+            habit_id=7, account_id=1, rule_id=1, title="Чтение", active_from=DAY,
+            reminder_time=time(21, 0), is_archived=False,
+        ))
+        for i in range(2):
+            db_session.add(HabitOccurrence(
+                account_id=1, habit_id=7, scheduled_date=DAY + timedelta(days=i), status="ACTIVE",
+            ))
+        db_session.flush()
+        assert [r[1] for r in _rows(db_session, "habit")] == [
+            _utc(DAY, time(21, 0)), _utc(DAY + timedelta(days=1), time(21, 0)),
+        ]
+
+        db_session.query(HabitOccurrence).filter_by(scheduled_date=DAY).one().status = "DONE"
+        db_session.flush()
+        assert len(_rows(db_session, "habit")) == 1
+
+    def test_past_reminders_not_stored(self, db_session):
+        _task(db_session, due_time=time(10, 0))
+        ReminderIndex(db_session, now=datetime.combine(DAY, time(11, 0), tzinfo=MSK)).rebuild()
+        assert _rows(db_session) == []
+
+
+class TestFireTimes:
+    def test_event_body_relative_to_fire_time(self):
+        occ = SimpleNamespace(start_date=date(2026, 5, 12), start_time=time(19, 30), is_completed=False)
+        rem = lambda mode, offset=None, fixed=None: SimpleNamespace(
+            mode=mode, offset_minutes=offset, fixed_time=fixed)
+        got = event_fire_times(occ, [
+            rem("offset", 30), rem("offset", 24 * 60), rem("offset", 3 * 24 * 60), rem("fixed_time", fixed=time(9, 0)),
+        ])
+        assert [(f.replace(tzinfo=None), body) for f, _, body in got] == [
+            (datetime(2026, 5, 12, 19, 0), "Сегодня в 19:30"),
+            (datetime(2026, 5, 11, 19, 30), "Завтра в 19:30"),
+            (datetime(2026, 5, 9, 19, 30), "12.05 в 19:30"),
+            (datetime(2026, 5, 12, 9, 0), "Сегодня в 19:30"),
+        ]
+
+
+class TestDispatch:
+    def test_fires_only_due_rows_with_one_index_query(self, db_session, db_engine):
+        for i in range(1, 51):
+            _task(db_session, task_id=i, due_time=time(10, 0) if i == 1 else time(15, 0))
+        now = datetime.combine(DAY, time(10, 1), tzinfo=MSK)
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            messages = _collect_task_reminders(db_session, now)
+        finally:
+            sa_event.remove(db_engine, "before_cursor_execute", listener)
+
+        [message] = messages
+        assert message.push["title"] == "⏰ Задача 1"
+        assert len(statements) == 2  # due index rows + their tasks
+
+    def test_hourly_summary_loads_all_users_at_once(self, db_session, db_engine):
+        for user_id in (1, 2, 3):
+            db_session.add(TelegramSettings(user_id=user_id, bot_token="t", chat_id="c", connected=True))
+            db_session.add(TaskModel(
+                task_id=user_id, account_id=user_id, title=f"Задача {user_id}", status="ACTIVE",
+                due_kind="DATETIME", due_date=DAY, due_time=time(10 if user_id < 3 else 15, 0),
+            ))
+        db_session.flush()
+        now = datetime.combine(DAY, time(11, 0, 30), tzinfo=MSK)
+
+        statements = []
+        listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+        sa_event.listen(db_engine, "before_cursor_execute", listener)
+        try:
+            messages = _collect_hourly_summary(db_session, now)
+        finally:
+            sa_event.remove(db_engine, "before_cursor_execute", listener)
+
+        assert [(m.user_id, m.kind) for m in messages] == [(1, "hourly_pending"), (2, "hourly_pending")]
+        assert "Задача 1" in messages[0].telegram and messages[0].push is None
+        assert len(statements) == 4  # bots, settings, habits, tasks
+
+    def test_purge_prevents_double_send(self, db_session):
+        _task(db_session)
+        now = datetime.combine(DAY, time(10, 1), tzinfo=MSK)
+        assert dispatch_due_reminders(db_session, now) == 1
+        assert dispatch_due_reminders(db_session, now + timedelta(seconds=30)) == 0
+        assert [m["kind"] for m in _queued(db_session)] == ["task_reminder"]
+
+    def test_stale_habit_row_is_not_sent(self, db_session):
+        db_session.add(HabitModel(
+            habit_id=7, account_id=1, rule_id=1, title="Чтение", active_from=DAY,
+            reminder_time=time(21, 0), is_archived=False,
+        ))
+        db_session.add(HabitOccurrence(account_id=1, habit_id=7, scheduled_date=DAY, status="ACTIVE"))
+        db_session.flush()
+        # Bulk update bypasses the ORM hook - the index row stays, dispatcher re-checks
+        db_session.query(HabitOccurrence).update({"status": "DONE"}, synchronize_session=False)
+
+        now = datetime.combine(DAY, time(21, 1), tzinfo=MSK)
+        assert _collect_habit_reminders(db_session, now) == []
@@ -0,0 +1,102 @@
+"""
+Tests for scheduler job leases: one worker per tick, run stats, missed-run catch-up.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy.orm import sessionmaker
+
+from app.application import scheduler_leases as leases
+from app.infrastructure.db.models import SchedulerJobLease
+
+NOW = datetime(2026, 3, 10, 5, 0, 3, tzinfo=timezone.utc)
+LEASE = timedelta(minutes=30)
+DEDUPE = timedelta(minutes=1)
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    factory = sessionmaker(bind=db_engine)
+    with patch("app.infrastructure.db.session.get_session_factory", return_value=factory):
+        yield factory
+
+
+class TestClaim:
+    def test_same_tick_on_second_worker_is_skipped(self, db_session):
+        assert leases.claim(db_session, "reminders", NOW, DEDUPE, LEASE)
+        db_session.commit()
+        leases.finish(db_session, "reminders", 10, None)
+        db_session.commit()
+
+        with patch.object(leases, "_WORKER_ID", "other:2"):
+            assert not leases.claim(db_session, "reminders", NOW + timedelta(seconds=5), DEDUPE, LEASE)
+            assert leases.claim(db_session, "reminders", NOW + timedelta(minutes=2), DEDUPE, LEASE)
+
+    def test_running_job_is_not_started_again(self, db_session):
+        assert leases.claim(db_session, "weekly_digest", NOW, DEDUPE, LEASE)
+        later = NOW + timedelta(minutes=5)
+        assert not leases.claim(db_session, "weekly_digest", later, DEDUPE, LEASE)
+        # Упавший воркер держит задание только до lease_until
+        assert leases.claim(db_session, "weekly_digest", NOW + LEASE + timedelta(seconds=1), DEDUPE, LEASE)
+
+
+class TestRunLeased:
+    def test_runs_once_and_records_stats(self, session_factory):
+        calls = []
+        assert leases.run_leased("morning_digest", lambda: calls.append(1), DEDUPE)
+        with patch.object(leases, "_WORKER_ID", "other:2"):
+            assert not leases.run_leased("morning_digest", lambda: calls.append(2), DEDUPE)
+        assert calls == [1]
+
+        db = session_factory()
+        row = db.get(SchedulerJobLease, "morning_digest")
+        assert row.lease_until is None
+        assert row.run_count == 1
+        assert row.last_status == "ok"
+        assert row.last_duration_ms is not None
+
+    def test_failure_is_recorded(self, session_factory):
+        def boom():
+            raise RuntimeError("smtp down")
+
+        assert leases.run_leased("evening_digest", boom, DEDUPE)
+        stats = leases.job_stats(session_factory())
+        assert stats[0]["last_status"] == "failed"
+        assert stats[0]["failure_count"] == 1
+
+
+class TestPeriods:
+    def test_interval_and_cron_periods(self):
+        assert leases.trigger_period(IntervalTrigger(minutes=2)) == timedelta(minutes=2)
+        hourly = CronTrigger(hour="15,16,17", minute=0, timezone="UTC")
+        assert leases.trigger_period(hourly, NOW) == timedelta(hours=1)
+        assert leases.dedupe_window(timedelta(seconds=30)) == timedelta(seconds=15)
+        assert leases.dedupe_window(timedelta(days=1)) == leases.MAX_DEDUPE
+
+
+class TestCatchUp:
+    trigger = CronTrigger(hour=5, minute=0, timezone="UTC")
+
+    def _started(self, db, at):
+        db.add(SchedulerJobLease(job_id="morning_digest", last_started_at=at))
+        db.commit()
+
+    def test_missed_tick_is_reported(self, db_session):
+        self._started(db_session, NOW - timedelta(days=1))
+        now = NOW + timedelta(hours=2)
+        fire = leases.missed_fire_time(db_session, "morning_digest", self.trigger, now, timedelta(hours=6))
+        assert fire == NOW.replace(second=0)
+
+    def test_executed_tick_is_not_repeated(self, db_session):
+        self._started(db_session, NOW)
+        now = NOW + timedelta(hours=2)
+        assert leases.missed_fire_time(db_session, "morning_digest", self.trigger, now, timedelta(hours=6)) is None
+
+    def test_tick_older_than_horizon_or_new_job_is_skipped(self, db_session):
+        now = NOW + timedelta(hours=2)
+        assert leases.missed_fire_time(db_session, "morning_digest", self.trigger, now, timedelta(hours=6)) is None
+        self._started(db_session, NOW - timedelta(days=1))
+        assert leases.missed_fire_time(db_session, "morning_digest", self.trigger, now, timedelta(hours=1)) is None
@@ -809,3 +809,77 @@ def test_search_returns_all_nine_keys(db_session):
     for key in ("tasks", "events", "operations", "transactions",
                 "habits", "goals", "subscriptions", "contacts", "articles", "total"):
         assert key in result
+
+
+# ── index / single-query plan ─────────────────────────────────────────────────
+
+def test_postgres_plan_is_single_union_query():
+    from app.application.search import _HITS_SQL, _SOURCES
+    assert _HITS_SQL.count("UNION ALL") == len(_SOURCES) - 1
+    assert "search_vector @@" in _HITS_SQL
+    assert "to_tsvector" not in _HITS_SQL
+
+
+def test_ngram_index_matches_substring_scan():
+    from app.application.search import _NgramIndex
+    docs = [(1, "купить молоко\x00", False), (2, "молот\x00тор", True), (3, "ab\x00cd", False)]
+    idx = _NgramIndex(docs)
+    assert idx.search("мол") == [(2, True), (1, False)]
+    assert idx.search("оло") == [(2, True), (1, False)]
+    assert idx.search("bc") == []  # не склеивает соседние поля
+    assert idx.search("xyz") == []
+
+
+def test_index_reused_between_searches(db_session, db_engine):
+    from sqlalchemy import event as sa_event
+    _task(db_session, title="Кэш индекса")
+    svc(db_session).search(ACCT, "кэш", 30)
+
+    statements = []
+    listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+    sa_event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        result = svc(db_session).search(ACCT, "индекс", 30)
+    finally:
+        sa_event.remove(db_engine, "before_cursor_execute", listener)
+    assert [t["title"] for t in result["tasks"]] == ["Кэш индекса"]
+    assert len(statements) == 1  # only hydration of the hit
+
+
+def test_index_invalidated_on_change(db_session):
+    t = _task(db_session, title="Старое название")
+    assert svc(db_session).search(ACCT, "старое", 30)["tasks"]
+    t.title = "Новое название"
+    db_session.flush()
+    assert not svc(db_session).search(ACCT, "старое", 30)["tasks"]
+    assert svc(db_session).search(ACCT, "новое", 30)["tasks"]
+
+
+def test_event_index_invalidated_by_occurrence(db_session):
+    e = _event(db_session, title="Живое событие")
+    assert svc(db_session).search(ACCT, "живое", 30)["events"][0]["is_archived"] is True
+    _occ_event(db_session, e.event_id)
+    assert svc(db_session).search(ACCT, "живое", 30)["events"][0]["is_archived"] is False
+
+
+def test_event_and_operation_hits_hydrated_in_batch(db_session, db_engine):
+    from sqlalchemy import event as sa_event
+    for i in range(4):
+        e = _event(db_session, title=f"Пакетное событие {i}")
+        _occ_event(db_session, e.event_id, start_date=date(2026, 6, 20 - i))
+        _occ_event(db_session, e.event_id, start_date=date(2026, 6, 10 - i))
+        t = _op_template(db_session, title=f"Пакетная операция {i}")
+        _occ_op(db_session, t.template_id, scheduled_date=date(2026, 7, 1 + i))
+    svc(db_session).search(ACCT, "пакетн", 90)  # build indexes
+
+    statements = []
+    listener = lambda conn, cur, stmt, *a: statements.append(stmt)
+    sa_event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        result = svc(db_session).search(ACCT, "пакетн", 90)
+    finally:
+        sa_event.remove(db_engine, "before_cursor_execute", listener)
+    # events + first occurrences, operations + next occurrences
+    assert len(statements) == 4
+    assert sorted(e["subtitle"] for e in result["events"]) == ["07.06.2026", "08.06.2026", "09.06.2026", "10.06.2026"]
+    assert sorted(o["date"] for o in result["operations"]) == [date(2026, 7, 1 + i) for i in range(4)]
@@ -8,7 +8,7 @@ from decimal import Decimal
 from app.infrastructure.db.models import (
     WalletBalance, TransactionFeed, ProjectModel, TaskModel,
     StrategicMonthSnapshot, StrategicScoreBreakdown,
-    StrategicDailySnapshot, StrategicWeeklyReview,
+    StrategicDailySnapshot, StrategicWeeklyReview, TaskCompletionMonthly,
 )
 from app.application.strategy import (
     StrategyService, _clamp, _last_12_months,
@@ -357,6 +357,50 @@ class TestSnapshotUpsert:
         assert snap is not None
 
 
+# ── Frozen closed months ──
+
+class TestFrozenMonths:
+    def test_closed_month_is_frozen(self, db_session):
+        _task(db_session, due_date=date(2026, 2, 10), status="DONE",
+              completed_at=datetime(2026, 2, 9, 10, 0, tzinfo=_tz))
+        svc = StrategyService(db_session)
+        first = svc.compute(ACCT, 2026, 2)
+        assert first["global_discipline_percent"] == 100
+
+        row = db_session.get(TaskCompletionMonthly, (ACCT, 2026, 2))
+        assert (row.on_time, row.late) == (1, 0)
+
+        # Поздняя правка закрытого месяца не пересчитывает снимок
+        _task(db_session, due_date=date(2026, 2, 1), status="DONE",
+              completed_at=datetime(2026, 2, 20, 10, 0, tzinfo=_tz))
+        again = svc.compute(ACCT, 2026, 2)
+        assert again["global_discipline_percent"] == 100
+        assert again["life_score"] == first["life_score"]
+
+    def test_open_month_is_recomputed(self, db_session):
+        today = date.today()
+        done_at = datetime(today.year, today.month, 1, 10, 0, tzinfo=_tz)
+        _task(db_session, due_date=done_at.date(), status="DONE", completed_at=done_at)
+        svc = StrategyService(db_session)
+        assert svc.compute(ACCT, today.year, today.month)["global_discipline_percent"] == 100
+
+        _task(db_session, due_date=date(2000, 1, 1), status="DONE", completed_at=done_at)
+        assert svc.compute(ACCT, today.year, today.month)["global_discipline_percent"] == 50
+
+    def test_history_recomputes_snapshot_taken_before_close(self, db_session):
+        svc = StrategyService(db_session)
+        svc.get_history(ACCT, 2026, 2)
+        snap = db_session.query(StrategicMonthSnapshot).filter(
+            StrategicMonthSnapshot.year == 2026, StrategicMonthSnapshot.month == 2,
+        ).one()
+        snap.calculated_at = datetime(2026, 2, 15, tzinfo=_tz)
+        snap.life_score = 0
+        db_session.flush()
+
+        history = svc.get_history(ACCT, 2026, 2)
+        assert history[-1]["life_score"] > 0
+
+
 # ── Empty data defaults ──
 
 class TestEmptyData:
@@ -0,0 +1,309 @@
+"""
+Tests for recurrence expansion.
+
+The randomized suites compare generate_occurrence_dates against
+- the generator as it was before window seeking (_legacy_*, kept verbatim),
+- a brute-force oracle that walks every day of the window, applies UNTIL
+  and keeps the first COUNT matches.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.domain.recurrence import (
+    RuleSpec, add_months, generate_occurrence_dates, expand_rules, last_day_of_month,
+)
+
+
+def _rule(freq, start, interval=1, until=None, count=None, **kw) -> RuleSpec:
+    return RuleSpec(
+        freq=freq, interval=interval, start_date=start, until_date=until, count=count,
+        by_weekday=kw.get("by_weekday"), by_monthday=kw.get("by_monthday"),
+        monthday_clip_to_last_day=kw.get("clip", False), by_month=kw.get("by_month"),
+        by_monthday_for_year=kw.get("by_monthday_for_year"), dates=kw.get("dates"),
+    )
+
+
+def _matches(rule: RuleSpec, d: date) -> bool:
+    s = rule.start_date
+    if rule.freq in ("DAILY", "INTERVAL_DAYS"):
+        return (d - s).days % rule.interval == 0
+    if rule.freq == "WEEKLY":
+        monday0 = s - timedelta(days=s.weekday())
+        return d.weekday() in rule.by_weekday and ((d - monday0).days // 7) % rule.interval == 0
+    if rule.freq == "MONTHLY":
+        months = (d.year - s.year) * 12 + d.month - s.month
+        last = last_day_of_month(d.year, d.month)
+        if rule.monthday_clip_to_last_day:
+            day = min(rule.by_monthday, last)
+        elif rule.by_monthday <= last:
+            day = rule.by_monthday
+        else:
+            return False
+        return months % rule.interval == 0 and d.day == day
+    if rule.freq == "YEARLY":
+        last = last_day_of_month(d.year, rule.by_month)
+        return ((d.year - s.year) % rule.interval == 0 and d.month == rule.by_month
+                and d.day == min(rule.by_monthday_for_year, last))
+    raise AssertionError(rule.freq)
+
+
+def _oracle(rule: RuleSpec, ws: date, we: date) -> list[date]:
+    out = []
+    d = max(ws, rule.start_date)
+    while d <= we:
+        if rule.until_date is not None and d > rule.until_date:
+            break
+        if rule.count is not None and len(out) >= rule.count:
+            break
+        if _matches(rule, d):
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+
+# --- Pre-seek generator (reference for equivalence) ---
+
+def _legacy_apply_until_count(dates: list[date], rule: RuleSpec) -> list[date]:
+    out = dates
+    if rule.until_date is not None:
+        out = [d for d in out if d <= rule.until_date]
+    if rule.count is not None:
+        out = out[:rule.count]
+    return out
+
+
+def _legacy_daily_or_interval(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
+    out: list[date] = []
+    d = rule.start_date
+    while d <= window_end:
+        if d >= window_start:
+            out.append(d)
+        if rule.count is not None and len(out) >= rule.count:
+            break
+        if rule.until_date is not None and d >= rule.until_date:
+            break
+        d += timedelta(days=rule.interval)
+    return _legacy_apply_until_count(out, rule)
+
+
+def _legacy_weekly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
+    wd = rule.start_date.weekday()
+    monday0 = rule.start_date - timedelta(days=wd)
+    out: list[date] = []
+    k = 0
+    while True:
+        week_monday = monday0 + timedelta(days=k * 7 * rule.interval)
+        if week_monday > window_end:
+            break
+        for dow in rule.by_weekday or set():
+            d = week_monday + timedelta(days=dow)
+            if d < rule.start_date:
+                continue
+            if d > window_end:
+                continue
+            if d >= window_start:
+                out.append(d)
+        if rule.count is not None and len(out) >= rule.count:
+            break
+        k += 1
+    out.sort()
+    return _legacy_apply_until_count(out, rule)
+
+
+def _legacy_monthly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
+    by_md = rule.by_monthday or 0
+    out: list[date] = []
+    k = 0
+    while True:
+        base = add_months(rule.start_date.replace(day=1), k * rule.interval)
+        last = last_day_of_month(base.year, base.month)
+        if rule.monthday_clip_to_last_day:
+            day = min(by_md, last)
+        else:
+            if by_md > last:
+                k += 1
+                continue
+            day = by_md
+        d = date(base.year, base.month, day)
+        if d < rule.start_date:
+            k += 1
+            continue
+        if d > window_end:
+            break
+        if d >= window_start:
+            out.append(d)
+        if rule.count is not None and len(out) >= rule.count:
+            break
+        if rule.until_date is not None and d >= rule.until_date:
+            break
+        k += 1
+    return _legacy_apply_until_count(out, rule)
+
+
+def _legacy_yearly(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
+    by_m = rule.by_month or 1
+    by_md = rule.by_monthday_for_year or 1
+    out: list[date] = []
+    k = 0
+    while True:
+        y = rule.start_date.year + k * rule.interval
+        last = last_day_of_month(y, by_m)
+        day = min(by_md, last)
+        d = date(y, by_m, day)
+        if d < rule.start_date:
+            k += 1
+            continue
+        if d > window_end:
+            break
+        if d >= window_start:
+            out.append(d)
+        if rule.count is not None and len(out) >= rule.count:
+            break
+        if rule.until_date is not None and d >= rule.until_date:
+            break
+        k += 1
+    return _legacy_apply_until_count(out, rule)
+
+
+def _legacy_multi_date(rule: RuleSpec, window_start: date, window_end: date) -> list[date]:
+    dates = rule.dates or []
+    out = [d for d in dates if d >= rule.start_date and window_start <= d <= window_end]
+    if rule.until_date is not None:
+        out = [d for d in out if d <= rule.until_date]
+    out = sorted(set(out))
+    if rule.count is not None:
+        out = out[:rule.count]
+    return out
+
+
+def _never_fires(rule: RuleSpec) -> bool:
+    """MONTHLY without clipping whose months never have by_monthday days (e.g. the 31st every 12th month of April)."""
+    if rule.freq != "MONTHLY" or rule.monthday_clip_to_last_day:
+        return False
+    base = rule.start_date.replace(day=1)
+    months = (add_months(base, k * rule.interval) for k in range(12))
+    return all(rule.by_monthday > last_day_of_month(m.year, m.month) for m in months)
+
+
+_LEGACY = {
+    "DAILY": _legacy_daily_or_interval,
+    "INTERVAL_DAYS": _legacy_daily_or_interval,
+    "WEEKLY": _legacy_weekly,
+    "MONTHLY": _legacy_monthly,
+    "YEARLY": _legacy_yearly,
+    "MULTI_DATE": _legacy_multi_date,
+}
+
+
+def _random_rule(rnd: random.Random, freq: str, with_count: bool = True) -> RuleSpec:
+    start = date(2023, 1, 1) + timedelta(days=rnd.randrange(0, 3 * 365))
+    kw = {}
+    if freq == "WEEKLY":
+        kw["by_weekday"] = set(rnd.sample(range(7), rnd.randint(1, 7)))
+    elif freq == "MONTHLY":
+        kw["by_monthday"] = rnd.choice([1, 15, 28, 29, 30, 31, rnd.randint(1, 31)])
+        kw["clip"] = rnd.random() < 0.5
+    elif freq == "YEARLY":
+        kw["by_month"] = rnd.randint(1, 12)
+        kw["by_monthday_for_year"] = rnd.choice([1, 29, 31, rnd.randint(1, 31)])
+    elif freq == "MULTI_DATE":
+        kw["dates"] = [start + timedelta(days=rnd.randrange(-30, 4 * 365)) for _ in range(rnd.randint(0, 20))]
+    return _rule(
+        freq, start,
+        interval=rnd.choice([1, 1, 2, 3, rnd.randint(1, 12)]),
+        until=start + timedelta(days=rnd.randrange(0, 4 * 365)) if rnd.random() < 0.3 else None,
+        count=rnd.randint(1, 60) if with_count and rnd.random() < 0.3 else None,
+        **kw,
+    )
+
+
+def _random_window(rnd: random.Random, rule: RuleSpec) -> tuple[date, date]:
+    ws = rule.start_date + timedelta(days=rnd.randrange(-60, 4 * 365))
+    return ws, ws + timedelta(days=rnd.randrange(0, 400))
+
+
+@pytest.mark.parametrize("freq", ["DAILY", "INTERVAL_DAYS", "WEEKLY", "MONTHLY", "YEARLY", "MULTI_DATE"])
+@pytest.mark.parametrize("with_count", [False, True], ids=["no-count", "count"])
+def test_matches_pre_seek_generator(freq, with_count):
+    rnd = random.Random(f"legacy-{freq}-{with_count}")
+    for _ in range(300):
+        rule = _random_rule(rnd, freq, with_count)
+        ws, we = _random_window(rnd, rule)
+        if _never_fires(rule):
+            # Старый генератор здесь зацикливался до date overflow
+            assert generate_occurrence_dates(rule, ws, we) == []
+            continue
+        assert generate_occurrence_dates(rule, ws, we) == _LEGACY[freq](rule, ws, we), (rule, ws, we)
+
+
+@pytest.mark.parametrize("freq", ["DAILY", "INTERVAL_DAYS", "WEEKLY", "MONTHLY", "YEARLY"])
+def test_matches_brute_force_oracle(freq):
+    rnd = random.Random(f"recurrence-{freq}")
+    for _ in range(300):
+        rule = _random_rule(rnd, freq)
+        ws, we = _random_window(rnd, rule)
+        assert generate_occurrence_dates(rule, ws, we) == _oracle(rule, ws, we), (rule, ws, we)
+
+
+class TestSeek:
+    def test_daily_started_years_ago(self):
+        rule = _rule("DAILY", date(2020, 1, 1), interval=3)
+        got = generate_occurrence_dates(rule, date(2026, 4, 1), date(2026, 4, 10))
+        assert got == [date(2026, 4, 2), date(2026, 4, 5), date(2026, 4, 8)]
+
+    def test_count_caps_the_window(self):
+        # COUNT ограничивает даты окна, а не отсчитывается от start_date
+        rule = _rule("DAILY", date(2026, 1, 1), count=3)
+        got = generate_occurrence_dates(rule, date(2026, 4, 1), date(2026, 4, 10))
+        assert got == [date(2026, 4, 1), date(2026, 4, 2), date(2026, 4, 3)]
+
+    def test_weekly_count_after_seek(self):
+        rule = _rule("WEEKLY", date(2026, 3, 30), count=4, by_weekday={0, 2})  # Mon, Wed
+        got = generate_occurrence_dates(rule, date(2026, 4, 3), date(2026, 4, 30))
+        assert got == [date(2026, 4, 6), date(2026, 4, 8), date(2026, 4, 13), date(2026, 4, 15)]
+
+    def test_monthly_31st_skips_short_months_in_count(self):
+        rule = _rule("MONTHLY", date(2026, 1, 31), count=3, by_monthday=31)
+        got = generate_occurrence_dates(rule, date(2026, 1, 1), date(2026, 12, 31))
+        assert got == [date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31)]
+
+    def test_yearly_feb_29_clipped(self):
+        rule = _rule("YEARLY", date(2024, 2, 29), by_month=2, by_monthday_for_year=29)
+        got = generate_occurrence_dates(rule, date(2025, 1, 1), date(2028, 12, 31))
+        assert got == [date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)]
+
+    def test_multi_date_count_within_window(self):
+        dates = [date(2026, 1, 5), date(2026, 2, 5), date(2026, 3, 5), date(2026, 4, 5)]
+        rule = _rule("MULTI_DATE", date(2026, 1, 1), count=2, dates=dates)
+        got = generate_occurrence_dates(rule, date(2026, 2, 1), date(2026, 12, 31))
+        assert got == [date(2026, 2, 5), date(2026, 3, 5)]
+
+
+class TestExpandRules:
+    def test_matches_per_rule_expansion(self):
+        rnd = random.Random("expand-rules")
+        rules = [
+            _random_rule(rnd, rnd.choice(["DAILY", "INTERVAL_DAYS", "WEEKLY", "MONTHLY", "YEARLY"]))
+            for _ in range(500)
+        ]
+        ws, we = date(2025, 6, 1), date(2026, 3, 31)
+        batch = expand_rules(rules, ws, we)
+
+        assert not batch.errors
+        for i, rule in enumerate(rules):
+            assert batch.dates_for(i) == generate_occurrence_dates(rule, ws, we), rule
+        assert len(batch) == len(batch.owners) == batch.offsets[-1]
+        assert list(batch.owners) == sorted(batch.owners)
+
+    def test_invalid_rule_does_not_break_batch(self):
+        rules = [
+            _rule("WEEKLY", date(2026, 1, 1)),  # no by_weekday
+            _rule("DAILY", date(2026, 1, 1), interval=2),
+        ]
+        batch = expand_rules(rules, date(2026, 1, 1), date(2026, 1, 5))
+        assert set(batch.errors) == {0}
+        assert batch.dates_for(0) == []
+        assert batch.dates_for(1) == [date(2026, 1, 1), date(2026, 1, 3), date(2026, 1, 5)]
+        assert list(batch.owners) == [1, 1, 1]
@@ -0,0 +1,206 @@
+"""
+Tests for the batched (set-based) projector path and ProjectorOrchestrator.run_all.
+
+Batch mode must produce exactly the same read models as the per-event
+handle_event fallback, with a constant number of queries per batch.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event as sa_event
+
+from app.infrastructure.db.models import (
+    EventLog, UserActivityDaily, UserXpState, WalletBalance, WalletBalanceDaily, XpEvent,
+    TransactionFeed,
+)
+from app.readmodels.projectors.activity import ActivityProjector
+from app.readmodels.projectors.base import ProjectorOrchestrator
+from app.readmodels.projectors.transactions_feed import TransactionsFeedProjector
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+from app.readmodels.projectors.xp import XpProjector
+
+ACC = 1
+T0 = datetime(2026, 3, 1, 9, 0)
+
+
+def _seed_history(db, n_tx: int = 450) -> None:
+    """Two wallets plus a long mix of income/expense/transfer/update/cancel events."""
+    events = []
+    for wid, title in ((1, "Наличные"), (2, "Карта")):
+        events.append(("wallet_created", {
+            "wallet_id": wid, "account_id": ACC, "title": title, "currency": "RUB",
+            "initial_balance": "1000", "created_at": T0.isoformat(),
+        }))
+    for i in range(n_tx):
+        occurred = (T0 + timedelta(hours=i * 7)).isoformat()
+        tx_id = i + 1
+        kind = i % 5
+        if kind == 0:
+            events.append(("transaction_created", {
+                "transaction_id": tx_id, "account_id": ACC, "operation_type": "INCOME",
+                "amount": "100", "currency": "RUB", "wallet_id": 1, "occurred_at": occurred,
+            }))
+        elif kind in (1, 2):
+            events.append(("transaction_created", {
+                "transaction_id": tx_id, "account_id": ACC, "operation_type": "EXPENSE",
+                "amount": "30", "currency": "RUB", "wallet_id": 2, "occurred_at": occurred,
+            }))
+        elif kind == 3:
+            events.append(("transaction_created", {
+                "transaction_id": tx_id, "account_id": ACC, "operation_type": "TRANSFER",
+                "amount": "15", "currency": "RUB", "from_wallet_id": 1, "to_wallet_id": 2,
+                "occurred_at": occurred,
+            }))
+        else:
+            events.append(("transaction_created", {
+                "transaction_id": tx_id, "account_id": ACC, "operation_type": "EXPENSE",
+                "amount": "10", "currency": "RUB", "wallet_id": 1, "occurred_at": occurred,
+            }))
+            events.append(("transaction_updated", {
+                "transaction_id": tx_id, "old_operation_type": "EXPENSE", "old_amount": "10",
+                "old_wallet_id": 1, "operation_type": "EXPENSE", "amount": "12", "wallet_id": 2,
+            }))
+            if i % 10 == 4:
+                events.append(("transaction_cancelled", {
+                    "transaction_id": tx_id, "operation_type": "EXPENSE", "amount": "12",
+                    "wallet_id": 2,
+                }))
+        if i % 3 == 0:
+            events.append(("task_completed", {"task_id": 1000 + i}))
+
+    for idx, (etype, payload) in enumerate(events, start=1):
+        db.add(EventLog(
+            id=idx, account_id=ACC, event_type=etype, payload_json=payload,
+            occurred_at=T0 + timedelta(hours=idx),
+        ))
+    db.commit()
+
+
+def _snapshot(db) -> dict:
+    return {
+        "wallets": sorted(
+            (w.wallet_id, w.balance) for w in db.query(WalletBalance).all()
+        ),
+        "wallet_daily": sorted(
+            (d.wallet_id, d.day, d.delta, d.balance) for d in db.query(WalletBalanceDaily).all()
+        ),
+        "activity": sorted(
+            (a.day_date, a.ops_count, a.tasks_count, a.points)
+            for a in db.query(UserActivityDaily).all()
+        ),
+        "xp": [(s.total_xp, s.level) for s in db.query(UserXpState).all()],
+        "xp_events": db.query(XpEvent).count(),
+        "feed": sorted(
+            (t.transaction_id, t.amount, t.wallet_id) for t in db.query(TransactionFeed).all()
+        ),
+    }
+
+
+def _projectors(db):
+    return [
+        WalletBalancesProjector(db),
+        TransactionsFeedProjector(db),
+        ActivityProjector(db),
+        XpProjector(db),
+    ]
+
+
+def _count_queries(engine):
+    counter = {"n": 0}
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter["n"] += 1
+
+    sa_event.listen(engine, "before_cursor_execute", _before)
+    return counter, lambda: sa_event.remove(engine, "before_cursor_execute", _before)
+
+
+def test_batch_matches_per_event_path(db_session):
+    _seed_history(db_session)
+
+    for p in _projectors(db_session):
+        p.run(ACC, batch=False)
+    per_event = _snapshot(db_session)
+
+    for p in _projectors(db_session):
+        p.reset(ACC)
+    db_session.commit()
+    for p in _projectors(db_session):
+        p.run(ACC)
+    batched = _snapshot(db_session)
+
+    assert batched == per_event
+    assert per_event["wallets"][0][1] != Decimal("1000")  # history actually applied
+    # последний день с движением = текущий баланс кошелька
+    last_day = {wid: balance for wid, _, _, balance in per_event["wallet_daily"]}
+    assert last_day == dict(per_event["wallets"])
+
+
+def test_activity_batch_accumulates_across_runs(db_session):
+    for i in range(3):
+        db_session.add(EventLog(
+            id=i + 1, account_id=ACC, event_type="transaction_created",
+            payload_json={}, occurred_at=T0,
+        ))
+    db_session.commit()
+    ActivityProjector(db_session).run(ACC, batch_size=2)
+
+    row = db_session.query(UserActivityDaily).one()
+    assert row.ops_count == 3
+    assert row.points == 6
+
+
+def test_orchestrator_run_all_matches_individual_runs(db_session):
+    _seed_history(db_session, n_tx=120)
+
+    for p in _projectors(db_session):
+        p.run(ACC)
+    expected = _snapshot(db_session)
+
+    for p in _projectors(db_session):
+        p.reset(ACC)
+    db_session.commit()
+
+    orchestrator = ProjectorOrchestrator(db_session)
+    for p in _projectors(db_session):
+        orchestrator.register(p)
+    results = orchestrator.run_all(ACC)
+
+    total = db_session.query(EventLog).count()
+    assert results == {
+        "wallet_balances": total, "transactions_feed": total,
+        "activity": total, "xp": total,
+    }
+    assert _snapshot(db_session) == expected
+
+
+def test_orchestrator_respects_individual_checkpoints(db_session):
+    _seed_history(db_session, n_tx=20)
+    total = db_session.query(EventLog).count()
+
+    WalletBalancesProjector(db_session).run(ACC)  # already caught up
+    orchestrator = ProjectorOrchestrator(db_session)
+    orchestrator.register(WalletBalancesProjector(db_session))
+    orchestrator.register(ActivityProjector(db_session))
+
+    assert orchestrator.run_all(ACC) == {"wallet_balances": 0, "activity": total}
+
+
+def test_batch_query_count_independent_of_event_count(db_session, db_engine):
+    """Full rebuild costs O(batches) round-trips, not O(events)."""
+    _seed_history(db_session, n_tx=150)
+    total = db_session.query(EventLog).count()
+    assert total < 400  # fits in two batches of 200
+
+    orchestrator = ProjectorOrchestrator(db_session)
+    for p in _projectors(db_session):
+        orchestrator.register(p)
+
+    counter, stop = _count_queries(db_engine)
+    try:
+        orchestrator.run_all(ACC)
+    finally:
+        stop()
+
+    assert counter["n"] < 100
+    assert counter["n"] < total / 2
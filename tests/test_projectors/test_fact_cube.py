@@ -0,0 +1,119 @@
+"""
+Tests for the budget fact cube: projector maintenance (create/update/cancel),
+budget_month moves and period sums.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.infrastructure.db.models import BudgetFactCube, EventLog, TransactionFeed
+from app.readmodels.fact_cube import rebuild_fact_cube, set_budget_month, sum_facts
+from app.readmodels.projectors.transactions_feed import TransactionsFeedProjector
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+
+ACC = 1
+T0 = datetime(2026, 3, 1, 9, 0)
+_next_id = {"n": 0}
+
+
+def _append(db, events):
+    for etype, payload in events:
+        _next_id["n"] += 1
+        db.add(EventLog(id=_next_id["n"], account_id=ACC, event_type=etype, payload_json=payload,
+                        occurred_at=T0 + timedelta(minutes=_next_id["n"])))
+    db.commit()
+
+
+def _wallet(wallet_id, wallet_type):
+    return ("wallet_created", {
+        "wallet_id": wallet_id, "account_id": ACC, "title": f"W{wallet_id}", "currency": "RUB",
+        "wallet_type": wallet_type, "initial_balance": "0", "created_at": T0.isoformat(),
+    })
+
+
+def _tx(tx_id, op, amount, day, **extra):
+    return ("transaction_created", {
+        "transaction_id": tx_id, "account_id": ACC, "operation_type": op,
+        "amount": amount, "currency": "RUB", "occurred_at": datetime(2026, 3, day, 12).isoformat(),
+        **extra,
+    })
+
+
+def _cells(db):
+    db.expire_all()
+    return sorted(
+        (c.day, c.operation_type, c.category_id, c.from_wallet_type, c.to_wallet_type, c.amount_sum, c.tx_count)
+        for c in db.query(BudgetFactCube).all()
+    )
+
+
+@pytest.fixture(autouse=True)
+def _reset_ids():
+    _next_id["n"] = 0
+
+
+@pytest.mark.parametrize("batch", [True, False])
+def test_create_update_cancel(db_session, batch):
+    _append(db_session, [
+        _wallet(1, "REGULAR"), _wallet(2, "CREDIT"),
+        _tx(10, "EXPENSE", "100", 2, wallet_id=1, category_id=5),
+        _tx(11, "EXPENSE", "50", 2, wallet_id=1, category_id=5),
+        _tx(12, "TRANSFER", "300", 3, from_wallet_id=1, to_wallet_id=2),
+        _tx(13, "INCOME", "999", 4, wallet_id=1),
+        ("transaction_updated", {"transaction_id": 11, "amount": "70", "category_id": 6}),
+        ("transaction_cancelled", {"transaction_id": 13}),
+    ])
+    WalletBalancesProjector(db_session).run(ACC, event_types=["wallet_created"])
+    TransactionsFeedProjector(db_session).run(ACC, batch=batch)
+
+    assert _cells(db_session) == [
+        (date(2026, 3, 2), "EXPENSE", 5, "REGULAR", "", Decimal("100"), 1),
+        (date(2026, 3, 2), "EXPENSE", 6, "REGULAR", "", Decimal("70"), 1),
+        (date(2026, 3, 3), "TRANSFER", 0, "REGULAR", "CREDIT", Decimal("300"), 1),
+    ]
+
+    live = _cells(db_session)
+    rebuild_fact_cube(db_session, ACC)
+    assert _cells(db_session) == live
+
+
+def test_budget_month_moves_cell(db_session):
+    _append(db_session, [_wallet(1, "REGULAR"), _tx(10, "INCOME", "5000", 29, wallet_id=1, category_id=1)])
+    WalletBalancesProjector(db_session).run(ACC, event_types=["wallet_created"])
+    TransactionsFeedProjector(db_session).run(ACC)
+
+    tx = db_session.get(TransactionFeed, 10)
+    set_budget_month(db_session, tx, date(2026, 4, 1))
+    db_session.commit()
+    assert _cells(db_session) == [(date(2026, 4, 1), "INCOME", 1, "", "REGULAR", Decimal("5000"), 1)]
+
+    # Отмена после переноса снимает сумму с нового месяца
+    _append(db_session, [("transaction_cancelled", {"transaction_id": 10})])
+    TransactionsFeedProjector(db_session).run(ACC)
+    assert _cells(db_session) == []
+
+
+def test_sum_facts_by_period(db_session):
+    _append(db_session, [
+        _wallet(1, "REGULAR"),
+        _tx(10, "EXPENSE", "10", 1, wallet_id=1, category_id=5),
+        _tx(11, "EXPENSE", "20", 15, wallet_id=1, category_id=5),
+        _tx(12, "EXPENSE", "40", 20, wallet_id=1),
+    ])
+    WalletBalancesProjector(db_session).run(ACC, event_types=["wallet_created"])
+    TransactionsFeedProjector(db_session).run(ACC)
+
+    periods = [
+        {"index": 0, "range_start": date(2026, 3, 1), "range_end": date(2026, 3, 15)},
+        {"index": 1, "range_start": date(2026, 3, 15), "range_end": date(2026, 4, 1)},
+    ]
+    rows = sum_facts(
+        db_session, ACC, date(2026, 3, 1), datetime(2026, 4, 1),
+        [BudgetFactCube.category_id],
+        BudgetFactCube.operation_type == "EXPENSE",
+        periods=periods,
+    )
+    assert sorted((r.category_id, r.period_idx, r.total) for r in rows) == [
+        (0, 1, Decimal("40")), (5, 0, Decimal("10")), (5, 1, Decimal("20")),
+    ]
@@ -0,0 +1,107 @@
+"""
+Tests for the full read-model rebuild (app.readmodels.rebuild).
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.infrastructure.db.models import EventLog, WalletBalance
+from app.readmodels import rebuild
+from app.readmodels.projectors.registry import build_orchestrator
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+
+ACC = 1
+T0 = datetime(2026, 3, 1, 9, 0)
+NAMES = ["wallet_balances", "transactions_feed"]
+
+
+def _seed(db, account_id=ACC, first_id=1):
+    events = [
+        ("wallet_created", {
+            "wallet_id": account_id * 10, "account_id": account_id, "title": "Карта", "currency": "RUB",
+            "initial_balance": "1000", "created_at": T0.isoformat(),
+        }),
+    ]
+    for i in range(5):
+        events.append(("transaction_created", {
+            "transaction_id": account_id * 100 + i, "account_id": account_id, "operation_type": "EXPENSE",
+            "amount": "50", "currency": "RUB", "wallet_id": account_id * 10,
+            "occurred_at": (T0 + timedelta(days=i)).isoformat(),
+        }))
+    for idx, (etype, payload) in enumerate(events, start=first_id):
+        db.add(EventLog(id=idx, account_id=account_id, event_type=etype, payload_json=payload,
+                        occurred_at=T0 + timedelta(hours=idx)))
+    db.commit()
+    build_orchestrator(db, NAMES).run_all(account_id)
+
+
+def _balance(db, account_id=ACC):
+    db.expire_all()
+    return db.query(WalletBalance).filter_by(account_id=account_id).one().balance
+
+
+def test_only_projectors_with_reset_are_rebuildable():
+    names = rebuild.rebuildable_projectors()
+    assert "wallet_balances" in names and "xp" in names
+    assert "budget" not in names and "events" not in names
+    with pytest.raises(ValueError):
+        rebuild.rebuildable_projectors(["events"])
+
+
+def test_direct_writes_projectors_need_force():
+    names = rebuild.rebuildable_projectors()
+    assert "tasks" not in names and "transactions_feed" not in names
+    with pytest.raises(ValueError):
+        rebuild.rebuildable_projectors(["tasks", "xp"])
+    assert rebuild.rebuildable_projectors(["xp", "tasks"], force=True) == ["tasks", "xp"]
+
+
+def test_rebuild_repairs_corrupted_read_model(db_session):
+    _seed(db_session)
+    expected = _balance(db_session)
+    db_session.query(WalletBalance).update({"balance": 1})
+    db_session.commit()
+
+    result = rebuild.rebuild_account(db_session, ACC, NAMES)
+    assert result["events"] == 6
+    assert _balance(db_session) == expected
+
+
+def test_snapshot_diff_reports_drift(db_session):
+    _seed(db_session)
+    projectors = [WalletBalancesProjector(db_session)]
+    live = rebuild.snapshot(db_session, projectors, ACC)
+    assert rebuild.diff_snapshots(live, rebuild.snapshot(db_session, projectors, ACC)) == {}
+
+    db_session.query(WalletBalance).update({"balance": 1})
+    db_session.commit()
+    diff = rebuild.diff_snapshots(live, rebuild.snapshot(db_session, projectors, ACC))
+    assert diff["wallet_balances.wallet_balances"]["missing"] == 1
+    assert diff["wallet_balances.wallet_balances"]["extra"] == 1
+
+
+def test_state_file_skips_rebuilt_accounts(db_engine, tmp_path):
+    factory = sessionmaker(bind=db_engine)
+    db = factory()
+    _seed(db, account_id=1, first_id=1)
+    _seed(db, account_id=2, first_id=100)
+    state = tmp_path / "rebuild.json"
+    state.write_text(json.dumps({"projectors": NAMES, "mode": "rebuild", "done": [1]}))
+
+    calls = []
+    real = rebuild.rebuild_account
+
+    def _spy(session, account_id, names, **kwargs):
+        calls.append(account_id)
+        return real(session, account_id, names, **kwargs)
+
+    with patch("app.infrastructure.db.session.get_session_factory", return_value=factory), \
+            patch.object(rebuild, "rebuild_account", side_effect=_spy):
+        code = rebuild.main(["--projectors", ",".join(NAMES), "-j", "1", "--state", str(state)])
+
+    assert code == 0
+    assert calls == [2]
+    assert sorted(json.loads(state.read_text())["done"]) == [1, 2]
@@ -0,0 +1,118 @@
+"""
+Tests for projector snapshots: round-trip, restore + tail replay, retention, verification.
+"""
+from datetime import datetime, timedelta
+
+from app.infrastructure.db.models import EventLog, ProjectorSnapshot, WalletBalance, WalletBalanceDaily
+from app.readmodels import rebuild, snapshots
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+
+ACC = 1
+T0 = datetime(2026, 3, 1, 9, 0)
+_next_id = {"n": 0}
+
+
+def _append(db, events):
+    for etype, payload in events:
+        _next_id["n"] += 1
+        db.add(EventLog(id=_next_id["n"], account_id=ACC, event_type=etype, payload_json=payload,
+                        occurred_at=T0 + timedelta(hours=_next_id["n"])))
+    db.commit()
+
+
+def _expenses(start, n):
+    return [
+        ("transaction_created", {
+            "transaction_id": start + i, "account_id": ACC, "operation_type": "EXPENSE",
+            "amount": "12.50", "currency": "RUB", "wallet_id": 1,
+            "occurred_at": (T0 + timedelta(days=start + i)).isoformat(),
+        })
+        for i in range(n)
+    ]
+
+
+def _seed(db):
+    _next_id["n"] = 0
+    _append(db, [("wallet_created", {
+        "wallet_id": 1, "account_id": ACC, "title": "Карта", "currency": "RUB",
+        "initial_balance": "1000", "created_at": T0.isoformat(),
+    })] + _expenses(0, 4))
+    WalletBalancesProjector(db).run(ACC)
+
+
+def _state(db):
+    db.expire_all()
+    return (
+        [(w.wallet_id, w.balance) for w in db.query(WalletBalance).all()],
+        sorted((d.wallet_id, d.day, d.delta, d.balance) for d in db.query(WalletBalanceDaily).all()),
+    )
+
+
+def test_restore_plus_tail_matches_live(db_session):
+    _seed(db_session)
+    projector = WalletBalancesProjector(db_session)
+    snap = snapshots.take_snapshot(db_session, projector, ACC)
+    db_session.commit()
+    assert snap.last_event_id == 5
+    assert snap.row_count == db_session.query(WalletBalance).count() + db_session.query(WalletBalanceDaily).count()
+
+    _append(db_session, _expenses(10, 3))
+    projector.run(ACC)
+    live = _state(db_session)
+
+    db_session.query(WalletBalance).update({"balance": 0})
+    db_session.commit()
+    assert snapshots.restore_latest(db_session, projector, ACC) == 5
+    assert projector.run(ACC) == 3  # только хвост
+    assert _state(db_session) == live
+
+
+def test_outdated_version_is_not_restored(db_session, monkeypatch):
+    _seed(db_session)
+    projector = WalletBalancesProjector(db_session)
+    snapshots.take_snapshot(db_session, projector, ACC)
+    db_session.commit()
+
+    monkeypatch.setattr(WalletBalancesProjector, "snapshot_version", 2)
+    assert snapshots.latest_snapshot(db_session, projector, ACC) is None
+    assert snapshots.restore_latest(db_session, projector, ACC) == 0
+
+
+def test_direct_writes_projector_is_not_restored(db_session, monkeypatch):
+    _seed(db_session)
+    projector = WalletBalancesProjector(db_session)
+    snapshots.take_snapshot(db_session, projector, ACC)
+    db_session.commit()
+
+    monkeypatch.setattr(WalletBalancesProjector, "direct_writes", True)
+    assert snapshots.restore_latest(db_session, projector, ACC) == 0
+    assert snapshots.take_due_snapshots(db_session, min_events=1, keep=2) == 0
+    assert db_session.query(ProjectorSnapshot).filter_by(projector_name="wallet_balances").count() == 0
+
+
+def test_due_accounts_and_retention(db_session):
+    _seed(db_session)
+    projector = WalletBalancesProjector(db_session)
+    assert snapshots.accounts_due(db_session, projector, min_events=5) == [ACC]
+    assert snapshots.take_due_snapshots(db_session, min_events=5, keep=2) >= 1
+    assert snapshots.accounts_due(db_session, projector, min_events=5) == []
+
+    for i in range(3):
+        _append(db_session, _expenses(20 + i * 10, 5))
+        projector.run(ACC)
+        snapshots.take_snapshot(db_session, projector, ACC)
+        db_session.commit()
+    snapshots.purge_snapshots(db_session, keep=2)
+    kept = db_session.query(ProjectorSnapshot).filter_by(projector_name="wallet_balances").all()
+    assert sorted(s.last_event_id for s in kept) == [15, 20]
+
+
+def test_verify_snapshot_against_full_replay(db_session):
+    _seed(db_session)
+    snapshots.take_snapshot(db_session, WalletBalancesProjector(db_session), ACC)
+    db_session.commit()
+    _append(db_session, _expenses(10, 2))
+
+    result = rebuild.verify_snapshots(db_session, ACC, ["wallet_balances"])
+    assert result["events"] == 2
+    assert result["diff"] == {}
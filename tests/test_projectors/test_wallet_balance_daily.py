@@ -0,0 +1,139 @@
+"""
+Tests for the wallet_balance_daily snapshots maintained by WalletBalancesProjector.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from app.application.transactions import CreateTransactionUseCase, UpdateTransactionUseCase
+from app.infrastructure.db.models import WalletBalance, WalletBalanceDaily
+from app.infrastructure.eventlog.repository import EventLogRepository
+from app.readmodels.projectors.wallet_balances import WalletBalancesProjector
+from app.readmodels.wallet_balance_history import balances_at
+
+D0 = date(2026, 3, 1)
+
+
+def _wallet(db, wallet_id, balance="1000", wallet_type="REGULAR"):
+    now = datetime.utcnow()
+    db.add(WalletBalance(
+        wallet_id=wallet_id, account_id=1, title=f"W{wallet_id}", currency="RUB",
+        wallet_type=wallet_type, balance=Decimal(balance), is_archived=False,
+        created_at=now, updated_at=now,
+    ))
+    db.flush()
+
+
+def _at(day_offset: int) -> datetime:
+    return datetime.combine(D0 + timedelta(days=day_offset), datetime.min.time()).replace(hour=12)
+
+
+def _income(db, amount, day_offset, wallet_id=1):
+    return CreateTransactionUseCase(db).execute_income(
+        account_id=1, wallet_id=wallet_id, amount=Decimal(amount), currency="RUB",
+        category_id=None, description="", occurred_at=_at(day_offset),
+    )
+
+
+def _expense(db, amount, day_offset, wallet_id=1):
+    return CreateTransactionUseCase(db).execute_expense(
+        account_id=1, wallet_id=wallet_id, amount=Decimal(amount), currency="RUB",
+        category_id=None, description="", occurred_at=_at(day_offset),
+    )
+
+
+def _rows(db, wallet_id=1):
+    return [
+        (r.day, r.delta, r.balance)
+        for r in db.query(WalletBalanceDaily).filter_by(wallet_id=wallet_id).order_by(WalletBalanceDaily.day)
+    ]
+
+
+def _day(offset):
+    return D0 + timedelta(days=offset)
+
+
+class TestMaintenance:
+    def test_end_of_day_balance_per_day_with_movement(self, db_session):
+        _wallet(db_session, 1)
+        _income(db_session, "500", 0)
+        _expense(db_session, "200", 0)
+        _expense(db_session, "100", 5)
+        assert _rows(db_session) == [
+            (_day(0), Decimal("300"), Decimal("1300")),
+            (_day(5), Decimal("-100"), Decimal("1200")),
+        ]
+
+    def test_backdated_operation_shifts_later_days(self, db_session):
+        _wallet(db_session, 1)
+        _income(db_session, "500", 5)
+        _expense(db_session, "50", 2)
+        _expense(db_session, "25", 9)
+        assert _rows(db_session) == [
+            (_day(2), Decimal("-50"), Decimal("950")),
+            (_day(5), Decimal("500"), Decimal("1450")),
+            (_day(9), Decimal("-25"), Decimal("1425")),
+        ]
+        assert _rows(db_session)[-1][2] == db_session.get(WalletBalance, 1).balance
+
+    def test_transfer_moves_both_wallets(self, db_session):
+        _wallet(db_session, 1)
+        _wallet(db_session, 2, balance="0")
+        CreateTransactionUseCase(db_session).execute_transfer(
+            account_id=1, from_wallet_id=1, to_wallet_id=2, amount=Decimal("300"),
+            currency="RUB", description="", occurred_at=_at(3),
+        )
+        assert _rows(db_session, 1) == [(_day(3), Decimal("-300"), Decimal("700"))]
+        assert _rows(db_session, 2) == [(_day(3), Decimal("300"), Decimal("300"))]
+
+    def test_update_moves_amount_between_days(self, db_session):
+        _wallet(db_session, 1)
+        _expense(db_session, "100", 1)
+        tx_id = _expense(db_session, "200", 4)
+        UpdateTransactionUseCase(db_session).execute(
+            tx_id, 1, amount=Decimal("250"), occurred_at=_at(0),
+        )
+        assert _rows(db_session) == [
+            (_day(0), Decimal("-250"), Decimal("750")),
+            (_day(1), Decimal("-100"), Decimal("650")),
+            (_day(4), Decimal("0"), Decimal("650")),
+        ]
+        assert db_session.get(WalletBalance, 1).balance == Decimal("650")
+
+    def test_cancel_reverses_day(self, db_session):
+        _wallet(db_session, 1)
+        _expense(db_session, "100", 1)
+        tx_id = _expense(db_session, "40", 2)
+        EventLogRepository(db_session).append_event(
+            account_id=1, event_type="transaction_cancelled",
+            payload={
+                "transaction_id": tx_id, "account_id": 1, "operation_type": "EXPENSE",
+                "amount": "40", "currency": "RUB", "wallet_id": 1,
+            },
+        )
+        db_session.commit()
+        WalletBalancesProjector(db_session).run(1)
+        assert _rows(db_session)[-1] == (_day(2), Decimal("0"), Decimal("900"))
+
+
+class TestBalancesAt:
+    def test_carry_forward_matches_backward_walk(self, db_session):
+        _wallet(db_session, 1)
+        _wallet(db_session, 2, balance="70")
+        _income(db_session, "500", 0)
+        _expense(db_session, "100", 10)
+        _expense(db_session, "30", 40)
+
+        wallets = db_session.query(WalletBalance).order_by(WalletBalance.wallet_id).all()
+        boundaries = [_day(-1), _day(1), _day(10), _day(11), _day(60)]
+        assert balances_at(db_session, wallets, boundaries) == {
+            1: [Decimal(x) for x in ("1000", "1500", "1500", "1400", "1370")],
+            2: [Decimal("70")] * 5,   # без движений — текущий баланс
+        }
+
+    def test_window_after_history(self, db_session):
+        _wallet(db_session, 1)
+        _expense(db_session, "100", 0)
+        wallet = db_session.get(WalletBalance, 1)
+        assert balances_at(db_session, [wallet], [_day(30), _day(31)]) == {
+            1: [Decimal("900"), Decimal("900")],
+        }